@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.db.models import Avg, F, RowRange, Window
 
-from solarData.models import Cliente, Departamento, Ciudad, MarcasInversores, Proyecto, GeneracionEnergiaDiaria, Inversor, GeneracionInversorDiaria, Granular, GeneracionGranularDiaria, Instalador
+from solarData.models import Cliente, Departamento, Ciudad, MarcasInversores, Proyecto, GeneracionEnergiaDiaria, Inversor, GeneracionInversorDiaria, Granular, GeneracionGranularDiaria, Instalador, EstadoRecoleccion, EjecucionRecoleccion, EjecucionComando, PuntoControlRecoleccion, ColaRecoleccion, TareaRecoleccion
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
@@ -125,3 +126,111 @@ class MarcasInversoresAdmin(admin.ModelAdmin):
     list_display = ('marca', 'informacion_granular')
     list_filter = ('informacion_granular',)
     search_fields = ('marca',)
+
+@admin.register(EstadoRecoleccion)
+class EstadoRecoleccionAdmin(admin.ModelAdmin):
+    list_display = ('nivel', 'identificador', 'fecha', 'estado', 'fecha_actualizacion')
+    list_filter = ('nivel', 'estado', 'fecha')
+    search_fields = ('identificador',)
+    readonly_fields = ('fecha_actualizacion',)
+
+class PuntoControlRecoleccionInline(admin.TabularInline):
+    model = PuntoControlRecoleccion
+    extra = 0
+    readonly_fields = ('comando', 'lote', 'fecha_registro')
+
+class EjecucionComandoInline(admin.TabularInline):
+    model = EjecucionComando
+    extra = 0
+    fields = ('comando', 'estado', 'duracion_segundos', 'entidades', 'nulos', 'errores', 'llamadas_api', 'limites_tasa', 'segundos_http', 'segundos_limite_tasa')
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(EjecucionRecoleccion)
+class EjecucionRecoleccionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'fecha', 'estado', 'fecha_inicio', 'fecha_fin', 'get_duracion')
+    list_filter = ('estado', 'fecha')
+    readonly_fields = ('fecha_inicio', 'fecha_fin')
+    inlines = [EjecucionComandoInline, PuntoControlRecoleccionInline]
+
+    def get_duracion(self, obj):
+        if not obj.fecha_fin:
+            return '-'
+        return str(obj.fecha_fin - obj.fecha_inicio).split('.')[0]
+    get_duracion.short_description = 'Duración'
+
+# Runs of the same command the trend columns compare against
+VENTANA_TENDENCIA = 7
+# Duration ratio against that average flagged as a regression
+UMBRAL_REGRESION = 1.5
+
+@admin.register(EjecucionComando)
+class EjecucionComandoAdmin(admin.ModelAdmin):
+    """
+    Command history with trend columns: each row is compared with the average of the previous
+    VENTANA_TENDENCIA runs of the same command (within the current filters), so a command that
+    suddenly takes twice as long, or a vendor whose latency grows, stands out.
+    """
+    list_display = (
+        'fecha_inicio', 'comando', 'estado', 'duracion_segundos', 'get_tendencia_duracion', 'entidades', 'nulos',
+        'errores', 'llamadas_api', 'get_latencia_media', 'get_tendencia_latencia', 'limites_tasa', 'segundos_limite_tasa',
+    )
+    list_filter = ('comando', 'marca', 'estado', 'fecha_inicio')
+    date_hierarchy = 'fecha_inicio'
+    search_fields = ('comando', 'mensaje_error')
+    readonly_fields = [field.name for field in EjecucionComando._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_queryset(self, request):
+        anteriores = {
+            'partition_by': [F('comando')],
+            'order_by': F('fecha_inicio').asc(),
+            'frame': RowRange(start=-VENTANA_TENDENCIA, end=-1),
+        }
+        return super().get_queryset(request).annotate(
+            duracion_previa=Window(Avg('duracion_segundos'), **anteriores),
+            segundos_http_previos=Window(Avg('segundos_http'), **anteriores),
+            llamadas_api_previas=Window(Avg('llamadas_api'), **anteriores),
+        )
+
+    @staticmethod
+    def _tendencia(actual, previo):
+        if actual is None or not previo:
+            return '-'
+        ratio = actual / previo
+        marca = ' ⚠️' if ratio >= UMBRAL_REGRESION else ''
+        return f'{ratio:.2f}x{marca}'
+
+    def get_tendencia_duracion(self, obj):
+        return self._tendencia(obj.duracion_segundos, obj.duracion_previa)
+    get_tendencia_duracion.short_description = f'Duración vs. {VENTANA_TENDENCIA} anteriores'
+
+    def get_latencia_media(self, obj):
+        latencia = obj.latencia_media_ms
+        return '-' if latencia is None else f'{latencia:.0f} ms'
+    get_latencia_media.short_description = 'Latencia media API'
+
+    def get_tendencia_latencia(self, obj):
+        if not obj.llamadas_api_previas:
+            return '-'
+        return self._tendencia(obj.latencia_media_ms, obj.segundos_http_previos / obj.llamadas_api_previas * 1000)
+    get_tendencia_latencia.short_description = f'Latencia vs. {VENTANA_TENDENCIA} anteriores'
+
+@admin.register(ColaRecoleccion)
+class ColaRecoleccionAdmin(admin.ModelAdmin):
+    list_display = ('nivel', 'identificador', 'fecha', 'marca_inversor', 'estado', 'intentos', 'proximo_intento')
+    list_filter = ('estado', 'nivel', 'marca_inversor', 'fecha')
+    search_fields = ('identificador',)
+    readonly_fields = ('fecha_creacion', 'fecha_actualizacion')
+
+@admin.register(TareaRecoleccion)
+class TareaRecoleccionAdmin(admin.ModelAdmin):
+    list_display = ('comando', 'fragmento', 'fecha', 'estado', 'intentos', 'trabajador', 'ultimo_latido', 'fecha_fin')
+    list_filter = ('estado', 'comando', 'fecha')
+    search_fields = ('comando', 'trabajador')
+    readonly_fields = ('fecha_creacion', 'ultimo_latido', 'fecha_fin')
@@ -1,63 +1,241 @@
 import logging
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from collections import deque
 from datetime import datetime
-import traceback
+import atexit
+import queue
+import re
+import sys
+import threading
+import time
+
+# Control messages for the sender thread
+_FLUSH = 'flush'
+_STOP = 'stop'
+
+DEFAULT_DIGEST_WINDOW = 300        # seconds errors are collected before a digest is sent
+DEFAULT_MAX_EMAILS_PER_HOUR = 6
+DEFAULT_QUEUE_SIZE = 10000
+MAX_DISTINCT_ALERTS = 200          # distinct fingerprints kept per digest; the rest are only counted
+FLUSH_TIMEOUT = 30                 # seconds flush() waits for the digest to be sent (process exit)
 
 class EmailAlertHandler(logging.Handler):
     """
     Custom email handler that sends alerts for ERROR and CRITICAL logs only.
     Integrates with AWS SES through Django's email backend.
+
+    emit() never talks to SMTP: records are queued for a background thread, so the fetch and
+    store loops are not slowed down by alerts. The thread coalesces records by component and
+    message fingerprint (numbers masked) for digest_window seconds and sends one digest email on
+    a reused SMTP connection, at most max_emails_per_hour times per hour. Pending alerts are sent
+    when the process exits (logging.shutdown / atexit).
     """
-    
+
+    def __init__(self, digest_window=DEFAULT_DIGEST_WINDOW, max_emails_per_hour=DEFAULT_MAX_EMAILS_PER_HOUR, queue_size=DEFAULT_QUEUE_SIZE):
+        super().__init__()
+        self.digest_window = max(0, digest_window)
+        self.max_emails_per_hour = max(1, max_emails_per_hour)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        # Counted by emit() on the logging threads and taken off by the sender thread
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        # Sender thread state
+        self._pending = {}
+        self._overflow = 0
+        self._window_start = None
+        self._sent = deque()
+        self._connection = None
+
     def emit(self, record):
-        """Send email alert for ERROR and CRITICAL logs"""
+        """Queue ERROR and CRITICAL logs for the next digest email"""
         try:
             # Only send emails for ERROR (40) and CRITICAL (50) levels
             if record.levelno < logging.ERROR:
                 return
-                
+
             # Skip if email settings are not configured
             if not hasattr(settings, 'ALERT_EMAIL_RECIPIENTS') or not settings.ALERT_EMAIL_RECIPIENTS:
                 return
-                
-            # Format the log message
-            log_entry = self.format(record)
-            
-            # Determine email subject based on log level
-            level = record.levelname
-            if level == 'CRITICAL':
-                emoji = '🚨'
-                priority = 'URGENT'
-            else:  # ERROR
-                emoji = '❌'
-                priority = 'HIGH'
-                
-            subject = f"{emoji} Solar Monitoring Alert - {priority}: {level}"
-            
-            # Extract component information from logger name
-            component = self._get_component_name(record.name)
-            
-            # Create detailed email body
-            message = self._create_email_body(record, log_entry, level, component)
-            
-            # Send email to all recipients
-            recipients = [email.strip() for email in settings.ALERT_EMAIL_RECIPIENTS if email.strip()]
-            
-            if recipients:
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=recipients,
-                    fail_silently=True  # Don't crash the app if email fails
-                )
-                
+
+            # Formatted here: the record's arguments may change once the caller moves on
+            alert = {
+                'level': record.levelname,
+                'levelno': record.levelno,
+                'logger': record.name,
+                'component': self._get_component_name(record.name),
+                'message': record.getMessage(),
+                'log_entry': self.format(record),
+                'pathname': record.pathname,
+                'funcName': record.funcName,
+                'lineno': record.lineno,
+                'time': datetime.now(),
+            }
+            self._ensure_thread()
+            try:
+                self._queue.put_nowait(('alert', alert))
+            except queue.Full:
+                with self._dropped_lock:
+                    self._dropped += 1
+
         except Exception as e:
             # Don't crash the application if email sending fails
             # Could log this to a file, but avoid infinite loops
             pass
-    
+
+    def flush(self):
+        """Send the pending digest now (ignores the window and the hourly cap) and wait for it."""
+        self._control(_FLUSH)
+
+    def close(self):
+        """Send the pending digest and stop the sender thread."""
+        self._control(_STOP)
+        super().close()
+
+    def _control(self, command):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put((command, done), timeout=FLUSH_TIMEOUT)
+        except queue.Full:
+            return
+        done.wait(FLUSH_TIMEOUT)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                # Restarted when records still arrive after close() (e.g. drained from the log queue
+                # at exit); logging.shutdown flushes them
+                if self._thread is None:
+                    # Daemon threads are killed at exit; deliver what is still pending first
+                    atexit.register(self.close)
+                self._thread = threading.Thread(target=self._run, name='email-alert-sender', daemon=True)
+                self._thread.start()
+
+    # Sender thread
+
+    def _run(self):
+        while True:
+            try:
+                kind, payload = self._queue.get(timeout=self._seconds_until_due())
+            except queue.Empty:
+                kind, payload = None, None
+
+            if kind == 'alert':
+                self._add(payload)
+            elif kind in (_FLUSH, _STOP):
+                self._send_digest(force=True)
+                self._close_connection()
+                payload.set()
+                if kind == _STOP:
+                    return
+                continue
+
+            if (self._pending or self._overflow or self._dropped) and self._seconds_until_due() == 0:
+                self._send_digest()
+
+    def _add(self, alert):
+        fingerprint = (alert['logger'], alert['levelno'], self._fingerprint(alert['message']))
+        if self._window_start is None:
+            self._window_start = time.monotonic()
+        entry = self._pending.get(fingerprint)
+        if entry is not None:
+            entry['count'] += 1
+            entry['last_time'] = alert['time']
+        elif len(self._pending) < MAX_DISTINCT_ALERTS:
+            self._pending[fingerprint] = dict(alert, count=1, last_time=alert['time'])
+        else:
+            self._overflow += 1
+
+    @staticmethod
+    def _fingerprint(message):
+        """Message with numbers masked, so per-inverter/per-batch variants of one error group together"""
+        return re.sub(r'\d+', '#', message)[:300]
+
+    def _seconds_until_due(self):
+        """Seconds until the pending digest may be sent (None when nothing is pending)"""
+        if not self._pending and not self._overflow and not self._dropped:
+            return None
+        now = time.monotonic()
+        if self._window_start is None:
+            # Only drops so far: the window starts when the sender thread first sees them
+            self._window_start = now
+        due = self._window_start + self.digest_window
+        while self._sent and now - self._sent[0] >= 3600:
+            self._sent.popleft()
+        if len(self._sent) >= self.max_emails_per_hour:
+            due = max(due, self._sent[0] + 3600)
+        return max(0, due - now)
+
+    def _send_digest(self, force=False):
+        if not self._pending and not self._overflow and not self._dropped:
+            return
+        if not force and self._seconds_until_due():
+            return
+        alerts = sorted(self._pending.values(), key=lambda alert: (-alert['levelno'], alert['time']))
+        overflow, dropped = self._overflow, self._dropped
+        self._pending = {}
+        self._overflow = 0
+        # emit() counts drops on the logging threads; only the ones reported here are taken off
+        with self._dropped_lock:
+            self._dropped -= dropped
+        self._window_start = None
+
+        recipients = [email.strip() for email in settings.ALERT_EMAIL_RECIPIENTS if email.strip()]
+        if not recipients:
+            return
+        if len(alerts) == 1 and alerts[0]['count'] == 1 and not overflow and not dropped:
+            alert = alerts[0]
+            subject = self._subject(alert['level'])
+            message = self._create_email_body(alert)
+        else:
+            total = sum(alert['count'] for alert in alerts) + overflow + dropped
+            # Only counts when every alert of the window was dropped from the full queue
+            level = alerts[0]['level'] if alerts else 'ERROR'
+            subject = f"{self._subject(level)} ({total} alerts, {len(alerts)} distinct)"
+            message = self._create_digest_body(alerts, overflow, dropped)
+
+        email = EmailMessage(subject=subject, body=message, from_email=settings.DEFAULT_FROM_EMAIL, to=recipients)
+        for attempt in range(2):
+            try:
+                if self._connection is None:
+                    self._connection = get_connection(fail_silently=False)
+                    self._connection.open()
+                email.connection = self._connection
+                email.send()
+                self._sent.append(time.monotonic())
+                return
+            except Exception as e:
+                # The server may have dropped the idle connection; reconnect once
+                self._close_connection()
+                if attempt == 1:
+                    print(f"|EmailAlertHandler|_send_digest| Could not send alert email: {e}", file=sys.stderr)
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    @staticmethod
+    def _subject(level):
+        # Determine email subject based on log level
+        if level == 'CRITICAL':
+            emoji = '🚨'
+            priority = 'URGENT'
+        else:  # ERROR
+            emoji = '❌'
+            priority = 'HIGH'
+        return f"{emoji} Solar Monitoring Alert - {priority}: {level}"
+
     def _get_component_name(self, logger_name):
         """Extract human-readable component name from logger name"""
         component_map = {
@@ -70,35 +248,35 @@ class EmailAlertHandler(logging.Handler):
             'management_commands': 'Management Commands'
         }
         return component_map.get(logger_name, logger_name.title())
-    
-    def _create_email_body(self, record, log_entry, level, component):
+
+    def _create_email_body(self, alert):
         """Create detailed email body with context information"""
         return f"""
 🔴 Solar Monitoring System Alert
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (Colombian Time)
-🔖 Level: {level}
-🏗️ Component: {component}
-📍 Logger: {record.name}
+⏰ Time: {alert['time'].strftime('%Y-%m-%d %H:%M:%S')} (Colombian Time)
+🔖 Level: {alert['level']}
+🏗️ Component: {alert['component']}
+📍 Logger: {alert['logger']}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 📝 Message:
-{record.getMessage()}
+{alert['message']}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 🔍 Technical Details:
-File: {record.pathname}
-Function: {record.funcName}
-Line: {record.lineno}
+File: {alert['pathname']}
+Function: {alert['funcName']}
+Line: {alert['lineno']}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 📋 Full Log Entry:
-{log_entry}
+{alert['log_entry']}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -112,4 +290,54 @@ Line: {record.lineno}
 
 This is an automated alert from the Solar Monitoring System.
 Please do not reply to this email.
-""" 
\ No newline at end of file
+"""
+
+    def _create_digest_body(self, alerts, overflow, dropped):
+        """Digest email: one section per component, one line per distinct alert with its count"""
+        separator = '━' * 72
+        sections = []
+        components = {}
+        for alert in alerts:
+            components.setdefault(alert['component'], []).append(alert)
+        for component, component_alerts in components.items():
+            lines = [f"🏗️ {component} ({sum(alert['count'] for alert in component_alerts)} alerts)"]
+            for alert in component_alerts:
+                when = alert['time'].strftime('%H:%M:%S')
+                if alert['count'] > 1:
+                    when += f" - {alert['last_time'].strftime('%H:%M:%S')}"
+                lines.append(f"\n  {alert['count']}x {alert['level']} [{when}] {alert['funcName']} (line {alert['lineno']})")
+                lines.append(f"  {alert['message']}")
+            sections.append('\n'.join(lines))
+        notes = []
+        if overflow:
+            notes.append(f"⚠️ {overflow} more alerts with other messages were not itemized.")
+        if dropped:
+            notes.append(f"⚠️ {dropped} alerts were dropped because the alert queue was full.")
+        notes_text = ('\n'.join(notes) + f"\n\n{separator}\n") if notes else ''
+        sections_text = f'\n\n{separator}\n\n'.join(sections)
+        return f"""
+🔴 Solar Monitoring System Alert Digest
+
+{separator}
+
+⏰ Sent: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (Colombian Time)
+Repeated alerts are grouped; numbers in messages are ignored when grouping.
+
+{separator}
+
+{sections_text}
+
+{separator}
+
+{notes_text}
+🛠️ Next Steps:
+1. Check the application logs for more context
+2. Verify API connectivity and credentials
+3. Check system resources (disk space, memory)
+4. Review recent deployments or configuration changes
+
+{separator}
+
+This is an automated alert from the Solar Monitoring System.
+Please do not reply to this email.
+"""
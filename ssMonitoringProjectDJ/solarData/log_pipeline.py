@@ -0,0 +1,196 @@
+"""
+Asynchronous logging pipeline (settings.LOGGING_CONFIG).
+
+settings.LOGGING is applied as usual, then every configured logger's handlers are swapped for a
+QueueHandler feeding one shared queue. A single QueueListener thread hands each record to the
+handlers its logger was configured with (file, console, email alert), so a logging call in a
+fetch or store loop costs one queue put and never waits on disk or SMTP.
+
+- LazyJson defers json.dumps of payloads until a record is actually emitted, so disabled
+  levels cost nothing.
+- SamplingFilter keeps a fraction of a logger's DEBUG/INFO records (settings.LOG_SAMPLING);
+  warnings and errors are never sampled out.
+- log_event logs one event per batch (counts, durations, identifiers) as extra fields;
+  JsonFormatter (LOG_FORMAT=json) writes each record as one JSON line so CloudWatch Logs
+  Insights can query those fields.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.config
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+
+from django.conf import settings
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class LazyJson:
+    """Log argument that serializes obj to compact JSON only when the record is formatted."""
+
+    __slots__ = ('obj', 'limit')
+
+    def __init__(self, obj, limit=None):
+        """
+        Args:
+            obj: JSON-serializable payload
+            limit (int): Maximum characters logged; longer payloads end with '... [TRUNCATED]'
+        """
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self):
+        try:
+            text = json.dumps(self.obj, ensure_ascii=False, separators=(',', ':'), default=str)
+        except Exception as e:
+            return f'<payload not serializable: {e}>'
+        if self.limit and len(text) > self.limit:
+            return text[:self.limit] + '... [TRUNCATED]'
+        return text
+
+
+def log_event(logger, event, message, level=logging.INFO, **fields):
+    """
+    Logs a structured event: message as usual for the text format, event and fields as
+    top-level keys of the JSON line.
+    Args:
+        logger (Logger): Component logger
+        event (str): Event name, e.g. 'fetch_batch' or 'store_batch'
+        message (str): Human-readable message in the '|Component|function| ...' style
+        level (int): Logging level
+        **fields: JSON-serializable values (counts, duration_ms, identifiers)
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={'event': event, 'event_fields': fields}, stacklevel=2)
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record: time, level, logger, message, event fields and exception."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        event = getattr(record, 'event', None)
+        if event:
+            entry['event'] = event
+            for key, value in getattr(record, 'event_fields', {}).items():
+                entry.setdefault(key, value)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps rate (0-1) of the records below WARNING, spread evenly (rate 0.25 keeps every 4th).
+    Attached to a logger, sampled-out records are dropped before they are formatted or queued.
+    """
+
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = min(1.0, max(0.0, float(rate)))
+        self._credit = 1.0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        with self._lock:
+            self._credit += self.rate
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return True
+            return False
+
+
+class RoutedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that tags records with the logger whose handlers must receive them.
+    Its level is the lowest level of those handlers, so records none of them would emit are
+    dropped before they are queued.
+    """
+
+    def __init__(self, log_queue, route, level=logging.NOTSET):
+        super().__init__(log_queue)
+        self.route = route
+        self.setLevel(level)
+
+    def prepare(self, record):
+        # Queued unformatted, with msg, args and exc_info intact: the listener thread's handlers
+        # format it with their own formatters (JsonFormatter keeps the exception as a field)
+        record = copy.copy(record)
+        record.log_route = self.route
+        return record
+
+
+class RoutingQueueListener(logging.handlers.QueueListener):
+    """Single listener thread that fans each record out to its logger's original handlers."""
+
+    def __init__(self, log_queue, routes):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.routes = routes
+
+    def handle(self, record):
+        """Formatting happens here, in each handler's emit, off the logging caller's thread."""
+        record = self.prepare(record)
+        for handler in self.routes.get(getattr(record, 'log_route', None), ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def configure_logging(logging_settings):
+    """
+    Django LOGGING_CONFIG callable: applies logging_settings with dictConfig, then routes every
+    configured logger through the shared queue (unless settings.LOG_QUEUE_ENABLED is False) and
+    attaches the SamplingFilters of settings.LOG_SAMPLING.
+    """
+    global _listener
+    logging.config.dictConfig(logging_settings)
+
+    for logger_name, rate in getattr(settings, 'LOG_SAMPLING', {}).items():
+        if rate < 1.0:
+            logging.getLogger(logger_name).addFilter(SamplingFilter(rate))
+
+    if not getattr(settings, 'LOG_QUEUE_ENABLED', True):
+        return
+
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+        log_queue = queue.SimpleQueue()
+        routes = {}
+        for logger_name in logging_settings.get('loggers', {}):
+            logger = logging.getLogger(logger_name)
+            if not logger.handlers:
+                continue
+            routes[logger_name] = list(logger.handlers)
+            level = min(handler.level for handler in logger.handlers)
+            logger.handlers = [RoutedQueueHandler(log_queue, logger_name, level)]
+        _listener = RoutingQueueListener(log_queue, routes)
+        _listener.start()
+
+
+def stop_listener():
+    """Writes out every queued record and stops the listener thread (registered with atexit)."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+# Registered after logging's own exit hook, so it runs first: queued records reach the
+# handlers before logging.shutdown flushes and closes them
+atexit.register(stop_listener)
@@ -0,0 +1,112 @@
+"""
+Base of the solarData management commands.
+
+ProfiledCommand adds two options to every command, also under call_command (collect_all_gen
+forwards them to each child command, so every command of the run gets its own profile):
+    --profile [sample|cprofile]   profile the run into settings.PROFILE_DIR (solarData/profiling.py)
+    --trace-sql                   query count, total SQL time and slowest statements of the run
+
+and logs the wall time of the run and of its phases when it ends: the pipeline stages it went
+through (huawei.http, store.upsert, ...) and the blocks wrapped in self.phase('name').
+"""
+
+import contextlib
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from solarData.log_pipeline import log_event
+from solarData.pipeline_metrics import PipelineMetrics
+from solarData.profiling import PROFILE_MODES, CommandProfiler, SqlTrace
+
+logger = logging.getLogger('management_commands')
+
+
+class ProfiledCommand(BaseCommand):
+    """BaseCommand with --profile, --trace-sql and per-phase wall times in the logs."""
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        group = parser.add_argument_group('profiling')
+        group.add_argument(
+            '--profile',
+            nargs='?',
+            const='sample',
+            choices=PROFILE_MODES,
+            help='Profile the run into PROFILE_DIR: "sample" (default, every thread, stats + flame graph '
+                 'collapsed stacks) or "cprofile" (calling thread, .prof stats)'
+        )
+        group.add_argument(
+            '--trace-sql',
+            action='store_true',
+            help='Log the query count, total SQL time and slowest statements of the run'
+        )
+        return parser
+
+    @property
+    def command_name(self):
+        return self.__module__.rsplit('.', 1)[-1]
+
+    def phase(self, name):
+        """Context manager timing a phase of the command; logged with the others at the end of the run."""
+        return PipelineMetrics.stage(f'{self.command_name}.{name}')
+
+    def execute(self, *args, **options):
+        mode = options.get('profile')
+        profiler = CommandProfiler(self.command_name, mode) if mode else None
+        sql = SqlTrace() if options.get('trace_sql') else None
+        before = PipelineMetrics.snapshot()
+        started = time.monotonic()
+        error = None
+        try:
+            with profiler or contextlib.nullcontext(), sql or contextlib.nullcontext():
+                return super().execute(*args, **options)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.log_phases(time.monotonic() - started, before, error)
+            verbose = options.get('verbosity', 1) >= 1
+            if profiler:
+                self.report_profile(profiler, verbose)
+            if sql:
+                self.report_sql(sql, verbose)
+
+    def log_phases(self, seconds, before, error=None):
+        """Logs the wall time of the run and of each stage it recorded in PipelineMetrics."""
+        phases = {
+            name: round(stats['seconds'], 3)
+            for name, stats in PipelineMetrics.diff(before, PipelineMetrics.snapshot()).items()
+            if stats['seconds'] > 0
+        }
+        detail = ', '.join(f'{name} {value:.2f}s' for name, value in phases.items())
+        log_event(
+            logger, 'command_phases',
+            f"|ProfiledCommand|execute| {self.command_name} {'failed' if error else 'finished'} in {seconds:.2f}s"
+            + (f": {detail}" if detail else ''),
+            command=self.command_name, seconds=round(seconds, 3), phases=phases, error=str(error) if error else None,
+        )
+
+    def report_profile(self, profiler, verbose):
+        files = ', '.join(str(path) for path in profiler.files)
+        top = '; '.join(f'{frame} {seconds:.2f}s' for frame, seconds in profiler.top[:5])
+        log_event(
+            logger, 'command_profile',
+            f"|ProfiledCommand|report_profile| {self.command_name} {profiler.mode} profile written to {files}. Most self time: {top}",
+            command=self.command_name, mode=profiler.mode, files=[str(path) for path in profiler.files],
+        )
+        if verbose:
+            self.stdout.write(f'🔬 Profile of {self.command_name} ({profiler.mode}): {files}')
+
+    def report_sql(self, sql, verbose):
+        lines = sql.summary()
+        log_event(
+            logger, 'command_sql',
+            f"|ProfiledCommand|report_sql| {self.command_name}: " + '\n'.join(lines),
+            command=self.command_name, queries=sql.queries, sql_seconds=round(sql.seconds, 3),
+        )
+        if verbose:
+            self.stdout.write(f'🗄️  SQL of {self.command_name}:')
+            for line in lines:
+                self.stdout.write(f'  {line}')
@@ -0,0 +1,295 @@
+"""
+Backfill generation data for a date range.
+Uses the range-capable vendor endpoints where they exist (Huawei month KPIs, Hoymiles 30-day
+station series) and falls back to per-day collection otherwise, running several days in parallel.
+Everything is written through the bulk ingest path in solarDataStore.cruds.
+"""
+
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
+from django.core.management import call_command
+from django.db import connection
+from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
+from solarDataFetch.fetchers.hoymilesFetcher import HoymilesFetcher
+from solarDataFetch.fetchers.hoymilesExecutor import HoymilesMinuteBudget
+from solarDataFetch.fetchers.huaweiBatchPlanner import HuaweiBatchPlanner, KPI_BATCH_SIZE
+from solarDataFetch.fetchers.huaweiBatchSizer import HuaweiBatchSizer
+from solarDataFetch.fetchers.huaweiExecutor import rate_limit_pause
+from solarDataStore.cruds.huaweiCruds import (
+    insert_huawei_generacion_sistema_dia, insert_huawei_generacion_inversor_dia, insert_huawei_generacion_granular_dia,
+)
+from solarDataStore.cruds.hoymilesCruds import insert_hoymiles_generacion_sistema_dia
+from solarData.models import Proyecto
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import time
+import logging
+
+logger = logging.getLogger('management_commands')
+
+VENDORS = ['huawei', 'solis', 'hoymiles']
+HUAWEI_DEV_TYPE_IDS = ["1", "38"]
+HOYMILES_MARCA_ID = 3
+HOYMILES_WINDOW_DAYS = 30  # findStation30dayEnergy returns the 30 days ending at endDate
+
+
+class Command(ProfiledCommand):
+    help = 'Backfill Solis, Huawei and Hoymiles generation data for a date range using range endpoints where available.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=str,
+            required=True,
+            help='First date to backfill in YYYY-MM-DD format'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            required=True,
+            help='Last date to backfill (inclusive) in YYYY-MM-DD format'
+        )
+        parser.add_argument(
+            '--vendor',
+            action='append',
+            choices=VENDORS,
+            help='Vendor to backfill (repeatable, defaults to all vendors)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Days collected in parallel for vendors without range endpoints, and Hoymiles stations fetched in parallel (default: 2)'
+        )
+        parser.add_argument(
+            '--skip-errors',
+            action='store_true',
+            help='Continue with the remaining days and vendors when a step fails',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Invalid date format. Please use YYYY-MM-DD format.')
+        if end < start:
+            raise CommandError('--end must be on or after --start.')
+
+        vendors = options['vendor'] or VENDORS
+        workers = self.workers = max(1, options['workers'])
+        self.skip_errors = options['skip_errors']
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+        logger.info(f"|BackfillGen|handle| Starting backfill from {start} to {end} ({len(days)} days) for {', '.join(vendors)}")
+        self.stdout.write(self.style.SUCCESS(f'🚀 Backfilling {len(days)} days ({start} to {end}) for {", ".join(vendors)}'))
+
+        self.failures = []
+
+        # Range endpoints first: one call covers many days
+        if 'huawei' in vendors:
+            self.run_step('huawei range', self.backfill_huawei_ranges, start, end)
+        if 'hoymiles' in vendors:
+            self.run_step('hoymiles range', self.backfill_hoymiles_systems, start, end)
+
+        # Per-day fallbacks, several days at a time. They stay threads of this process, unlike the
+        # per-date processes of collect_all_gen --replay: these days call the vendor APIs and must
+        # share the process-wide quota pacing and circuit breakers, and nothing here resets those
+        # registries or writes per-date metrics
+        per_day_commands = []
+        if 'solis' in vendors:
+            per_day_commands += ['solis_system_gen', 'solis_inverter_gen']
+        if 'hoymiles' in vendors:
+            per_day_commands += ['hoymiles_inverter_granular_gen']
+
+        futures = {}
+        with ThreadPoolExecutor(max_workers=1) as huawei_executor, ThreadPoolExecutor(max_workers=workers) as day_executor:
+            if 'huawei' in vendors:
+                # Huawei granular has no range endpoint; its days run one after another on the shared session
+                futures[huawei_executor.submit(self.in_thread, self.backfill_huawei_granular, days)] = 'huawei granular'
+            if per_day_commands:
+                for day in days:
+                    futures[day_executor.submit(self.in_thread, self.backfill_day, day, per_day_commands)] = f'per-day {day}'
+            for future in as_completed(futures):
+                label = futures[future]
+                try:
+                    future.result()
+                    self.stdout.write(self.style.SUCCESS(f'✅ {label} - SUCCESS'))
+                except Exception as e:
+                    logger.error(f"|BackfillGen|handle| {label} failed: {e}")
+                    self.stdout.write(self.style.ERROR(f'❌ {label} - FAILED: {e}'))
+                    self.failures.append((label, str(e)))
+
+        self.stdout.write('\n' + '='*60)
+        if self.failures:
+            for label, error in self.failures:
+                self.stdout.write(self.style.ERROR(f'  ❌ {label}: {error}'))
+            logger.warning(f"|BackfillGen|handle| Backfill from {start} to {end} finished with {len(self.failures)} failures")
+            raise CommandError(f'Backfill finished with {len(self.failures)} failed steps.')
+        logger.info(f"|BackfillGen|handle| Backfill from {start} to {end} completed successfully")
+        self.stdout.write(self.style.SUCCESS(f'🎉 Backfill from {start} to {end} completed successfully!'))
+
+    def run_step(self, label, func, *args):
+        """Runs one backfill step, recording the failure instead of raising when --skip-errors is set."""
+        try:
+            func(*args)
+            self.stdout.write(self.style.SUCCESS(f'✅ {label} - SUCCESS'))
+        except Exception as e:
+            logger.error(f"|BackfillGen|run_step| {label} failed: {e}")
+            self.stdout.write(self.style.ERROR(f'❌ {label} - FAILED: {e}'))
+            if not self.skip_errors:
+                raise CommandError(f'{label} failed: {e}')
+            self.failures.append((label, str(e)))
+
+    @staticmethod
+    def in_thread(func, *args):
+        """Runs func in a worker thread and releases that thread's DB connection afterwards."""
+        try:
+            return func(*args)
+        finally:
+            connection.close()
+
+    def backfill_day(self, day, command_names):
+        """Per-day fallback: runs the regular collection commands for one date."""
+        collect_date = day.strftime('%Y-%m-%d')
+        for command_name in command_names:
+            logger.info(f"|BackfillGen|backfill_day| Running {command_name} for {collect_date}")
+            try:
+                call_command(command_name, verbosity=0, date=collect_date)
+            except Exception as e:
+                if not self.skip_errors:
+                    raise
+                logger.error(f"|BackfillGen|backfill_day| {command_name} failed for {collect_date}: {e}")
+                self.failures.append((f'{command_name} {collect_date}', str(e)))
+
+    # ------------------------------------------------------------------ Huawei
+
+    def huawei_call(self, fetch, **kwargs):
+        """
+        Calls a Huawei fetch method with the shared session token.
+        Re-logs in once on 305 and waits out 407 rate limits (up to 3 times).
+        """
+        relogged = False
+        rate_limited = 0
+        while True:
+            try:
+                return fetch(token=self.huawei_token, **kwargs)
+            except RuntimeError as e:
+                code = e.args[1] if len(e.args) > 1 else None
+                if code == 305 and not relogged:
+                    logger.warning("|BackfillGen|huawei_call| Session expired, re-authenticating")
+                    self.huawei_token = self.huawei_fetcher.refresh_token(self.huawei_token)
+                    relogged = True
+                    continue
+                if code == 407 and rate_limited < 3:
+                    rate_limited += 1
+                    pause = rate_limit_pause()
+                    logger.warning(f"|BackfillGen|huawei_call| Rate limit hit, pausing {pause} seconds ({rate_limited}/3)")
+                    time.sleep(pause)
+                    continue
+                raise
+
+    def ensure_huawei_session(self):
+        if getattr(self, 'huawei_fetcher', None) is None:
+            self.huawei_fetcher = HuaweiFetcher()
+            self.huawei_token = self.huawei_fetcher.get_token()
+
+    def backfill_huawei_ranges(self, start, end):
+        """Huawei systems and inverters: getKpiStationDay/getDevKpiDay return a whole month per call."""
+        self.ensure_huawei_session()
+        fetcher = self.huawei_fetcher
+        project_planner = HuaweiBatchPlanner.proyectos(KPI_BATCH_SIZE)
+        inverter_planners = {dev_type_id: HuaweiBatchPlanner.inversores(dev_type_id, KPI_BATCH_SIZE) for dev_type_id in HUAWEI_DEV_TYPE_IDS}
+
+        month = start.replace(day=1)
+        while month <= end:
+            collect_time = fetcher.midnight_colombia_timestamp(datetime.combine(month, datetime.min.time()))
+            logger.info(f"|BackfillGen|backfill_huawei_ranges| Processing Huawei month {month.strftime('%Y-%m')}")
+
+            for batch_number, identificadores in project_planner.batches():
+                system_data = self.huawei_call(
+                    fetcher.fetch_huawei_generacion_sistema_mes,
+                    batch_number=batch_number, collect_time=collect_time, identificadores=identificadores,
+                )
+                rows = [row for row in system_data if self.huawei_in_range(row['collectTime'], start, end)]
+                insert_huawei_generacion_sistema_dia(rows)
+                self.stdout.write(self.style.SUCCESS(f'Huawei systems {month.strftime("%Y-%m")} batch {batch_number}: {len(rows)} station-days'))
+
+            for dev_type_id, planner in inverter_planners.items():
+                for batch_number, identificadores in planner.batches():
+                    inverter_data = self.huawei_call(
+                        fetcher.fetch_huawei_generacion_inversor_mes,
+                        dev_type_id=dev_type_id, batch_number=batch_number, collect_time=collect_time, identificadores=identificadores,
+                    )
+                    rows = [row for row in inverter_data if self.huawei_in_range(row['collectTime'], start, end)]
+                    insert_huawei_generacion_inversor_dia(rows)
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Huawei inverters {month.strftime("%Y-%m")} dev_type_id {dev_type_id} batch {batch_number}: {len(rows)} inverter-days'
+                    ))
+
+            # First day of the next month
+            month = (month + timedelta(days=32)).replace(day=1)
+
+    @staticmethod
+    def huawei_in_range(collect_time, start, end):
+        if collect_time is None:
+            return False
+        day = datetime.strptime(HuaweiFetcher.colombia_date_from_timestamp(collect_time), '%Y-%m-%d').date()
+        return start <= day <= end
+
+    def backfill_huawei_granular(self, days):
+        """Huawei MPPT data has no range endpoint: one getDevHistoryKpi window per day and batch."""
+        self.ensure_huawei_session()
+        fetcher = self.huawei_fetcher
+        # Start from the getDevHistoryKpi batch size the nightly runs found to work
+        batch_size = HuaweiBatchSizer.cargar('getDevHistoryKpi').size
+        planners = {dev_type_id: HuaweiBatchPlanner.inversores(dev_type_id, batch_size) for dev_type_id in HUAWEI_DEV_TYPE_IDS}
+        for day in days:
+            collect_time_0 = fetcher.midnight_colombia_timestamp(datetime.combine(day, datetime.min.time()))
+            collect_time_1 = fetcher.midnight_colombia_timestamp(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+            for dev_type_id, planner in planners.items():
+                for batch_number, identificadores in planner.batches():
+                    mppt_energy_dict = self.huawei_call(
+                        fetcher.fetch_huawei_generacion_granular_dia,
+                        dev_type_id=dev_type_id, batch_number=batch_number,
+                        collect_time_0=collect_time_0, collect_time_1=collect_time_1, identificadores=identificadores,
+                    )
+                    insert_huawei_generacion_granular_dia(mppt_energy_dict, day)
+            logger.info(f"|BackfillGen|backfill_huawei_granular| Huawei granular data for {day} completed")
+
+    # ---------------------------------------------------------------- Hoymiles
+
+    def backfill_hoymiles_systems(self, start, end):
+        """
+        Hoymiles systems: findStation30dayEnergy returns a 30-day series, one call per station and
+        window. Stations are fetched self.workers at a time under the process-wide Hoymiles budget.
+        """
+        fetcher = HoymilesFetcher()
+        budget = HoymilesMinuteBudget.shared()
+        hoymiles_projects = list(Proyecto.objects.filter(marca_inversor_id=HOYMILES_MARCA_ID))
+
+        def fetch_station(project, window_start, window_end):
+            budget.acquire()
+            return fetcher.fetch_hoymiles_generacion_sistema_rango(
+                project.identificador_planta, window_start.strftime('%Y-%m-%d'), window_end.strftime('%Y-%m-%d')
+            )
+
+        window_start = start
+        while window_start <= end:
+            window_end = min(window_start + timedelta(days=HOYMILES_WINDOW_DAYS - 1), end)
+            logger.info(f"|BackfillGen|backfill_hoymiles_systems| Processing Hoymiles window {window_start} to {window_end}")
+            all_system_data = []
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(fetch_station, project, window_start, window_end): project for project in hoymiles_projects}
+                for future in as_completed(futures):
+                    project = futures[future]
+                    try:
+                        all_system_data.extend(future.result())
+                    except RuntimeError as e:
+                        logger.error(f"|BackfillGen|backfill_hoymiles_systems| Error fetching station {project.identificador_planta}: {e}")
+                        self.stdout.write(self.style.ERROR(f'✗ {project.dealname}: {e}'))
+            insert_hoymiles_generacion_sistema_dia(all_system_data)
+            self.stdout.write(self.style.SUCCESS(
+                f'Hoymiles systems {window_start} to {window_end}: {len(all_system_data)} station-days'
+            ))
+            window_start = window_end + timedelta(days=1)
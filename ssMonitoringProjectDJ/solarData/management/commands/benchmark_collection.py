@@ -0,0 +1,256 @@
+"""
+Runs the full collect_all_gen against local stand-ins of the Huawei, Solis and Hoymiles APIs
+(solarDataFetch/mockServers.py) and reports the end-to-end throughput: wall time per command,
+requests and bytes per second, rows stored per second and coverage of the fleet.
+
+Meant for a benchmark database (a restored copy, or one filled with generate_synthetic_fleet);
+it writes the day's generation rows like a real run. No vendor credentials are needed:
+    python manage.py generate_synthetic_fleet --projects 200 --years 0.1 --seed 1
+    python manage.py benchmark_collection --latency 0.2 --quota 100 --window 5 --token-requests 500
+
+--window shortens the vendors' one-minute rate-limit window on both sides (servers and clients),
+so quota pauses take seconds instead of minutes. Each run is appended to
+settings.COLLECTION_BENCHMARK_FILE.
+"""
+
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
+from django.db.models import Count
+from django.test.utils import override_settings
+
+from solarData.models import (
+    GeneracionEnergiaDiaria, GeneracionGranularDiaria, GeneracionInversorDiaria, Inversor, Proyecto, TokenSesionApi,
+)
+from solarData.pipeline_metrics import PipelineMetrics
+from solarDataFetch.fetchers.huaweiTokenCache import PROVEEDOR_HUAWEI
+from solarDataFetch.mockServers import MockVendorServers, DEFAULT_SAMPLES_PER_DAY, DEFAULT_OFFLINE
+import logging
+
+logger = logging.getLogger('management_commands')
+
+# The stand-ins accept any credentials, but the fetchers refuse to start without them
+CREDENCIALES = ('HUAWEI_API_USERNAME', 'HUAWEI_API_SYSTEM_CODE', 'SOLIS_API_SECRET', 'HOYMILES_API_KEY')
+
+
+class Command(ProfiledCommand):
+    help = 'Run collect_all_gen against local Huawei/Solis/Hoymiles stand-in servers and report its throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Date to collect in YYYY-MM-DD format (defaults to yesterday)'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            help='Seconds every stand-in waits before answering (default: 0.05)'
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0.0,
+            help='Random extra seconds added to the latency, up to this value (default: 0)'
+        )
+        parser.add_argument(
+            '--quota',
+            type=int,
+            help='Requests allowed per window: per endpoint for Huawei (then 407), per key for Hoymiles (default: unlimited)'
+        )
+        parser.add_argument(
+            '--window',
+            type=float,
+            default=60.0,
+            help='Rate-limit window in seconds, for the stand-ins and the collectors alike (default: 60, as the real APIs)'
+        )
+        parser.add_argument(
+            '--token-requests',
+            type=int,
+            help='Requests a Huawei token is valid for before failCode 305 (default: never expires)'
+        )
+        parser.add_argument(
+            '--samples-per-day',
+            type=int,
+            default=DEFAULT_SAMPLES_PER_DAY,
+            help=f'Points of the intraday series, i.e. payload size (default: {DEFAULT_SAMPLES_PER_DAY}, every 5 minutes)'
+        )
+        parser.add_argument(
+            '--offline',
+            type=float,
+            default=DEFAULT_OFFLINE,
+            help=f'Share of Solis and Hoymiles devices answered without data (default: {DEFAULT_OFFLINE})'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the values and jitter of the stand-ins (default: 0)'
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Show the output of collect_all_gen'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                target_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date format. Please use YYYY-MM-DD format.')
+        else:
+            target_date = datetime.now().date() - timedelta(days=1)
+        if options['window'] <= 0 or options['samples_per_day'] < 1:
+            raise CommandError('--window and --samples-per-day must be positive.')
+
+        flota = self.flota()
+        if not flota['proyectos']:
+            raise CommandError('No projects to collect; generate a fleet first (generate_synthetic_fleet).')
+        for name in CREDENCIALES:
+            os.environ.setdefault(name, 'benchmark')
+
+        config = {
+            key: options[key] for key in ('latency', 'jitter', 'quota', 'window', 'samples_per_day', 'offline', 'seed')
+        }
+        servers = MockVendorServers(
+            estaciones_solis=flota['estaciones_solis'], canales=flota['canales'],
+            token_requests=options['token_requests'], **config,
+        )
+        # The run logs in to the stand-ins; the real token is put back afterwards
+        token_real = TokenSesionApi.objects.filter(proveedor=PROVEEDOR_HUAWEI).values('token', 'fecha_obtencion').first()
+        output = self.stdout if options['verbose'] else io.StringIO()
+        logger.info(f"|BenchmarkCollection|handle| Collecting {target_date} from the stand-ins with {config}")
+        self.stdout.write(self.style.NOTICE(
+            f"Collecting {target_date} for {flota['proyectos']} projects, {flota['inversores']} inverters "
+            f"and {flota['granulares']} granulars from local stand-ins..."
+        ))
+
+        error = None
+        try:
+            # Metrics of benchmark runs stay out of the production metrics file
+            with servers, override_settings(**servers.settings(), PIPELINE_METRICS_FILE=''):
+                started = time.perf_counter()
+                try:
+                    call_command(
+                        'collect_all_gen', date=target_date.isoformat(), skip_errors=True,
+                        verbose=options['verbose'], stdout=output,
+                        profile=options['profile'], trace_sql=options['trace_sql'],
+                    )
+                except Exception as e:
+                    error = str(e)
+                seconds = time.perf_counter() - started
+                stages = PipelineMetrics.snapshot()
+                servidor = servers.stats()
+        finally:
+            self.restaurar_token(token_real)
+
+        result = self.resultado(target_date, flota, config, options['token_requests'], seconds, stages, servidor, error)
+        self.write_report(result, stages)
+        self.guardar(result)
+
+    @staticmethod
+    def flota():
+        """Projects, inverters and granulars the collectors will ask for, and what the stand-ins need to answer them."""
+        proyectos = Proyecto.objects.exclude(identificador_planta__isnull=True).exclude(identificador_planta='')
+        por_marca = dict(
+            proyectos.values_list('marca_inversor__marca').annotate(total=Count('id')).order_by()
+        )
+        inversores = Inversor.objects.filter(id_proyecto__in=proyectos).annotate(total=Count('granular'))
+        canales = {identificador: total for identificador, total in inversores.values_list('identificador_inversor', 'total') if total}
+        return {
+            'proyectos': sum(por_marca.values()),
+            'por_marca': {marca or 'sin marca': total for marca, total in por_marca.items()},
+            'inversores': inversores.count(),
+            'granulares': sum(canales.values()),
+            'estaciones_solis': list(proyectos.filter(marca_inversor__marca='Solis').values_list('identificador_planta', flat=True)),
+            'canales': canales,
+        }
+
+    @staticmethod
+    def restaurar_token(token_real):
+        if token_real:
+            TokenSesionApi.objects.filter(proveedor=PROVEEDOR_HUAWEI).update(**token_real)
+        else:
+            TokenSesionApi.objects.filter(proveedor=PROVEEDOR_HUAWEI).delete()
+
+    @staticmethod
+    def resultado(target_date, flota, config, token_requests, seconds, stages, servidor, error):
+        """Benchmark result: configuration, fleet, totals and rates, one entry per command."""
+        requests = sum(stats['requests'] for stats in servidor.values())
+        received = sum(stats['bytes'] for stats in servidor.values())
+        rows = stages.get('store.upsert', {}).get('rows', 0)
+        seconds = max(seconds, 1e-6)
+        return {
+            'recorded': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'date': target_date.isoformat(),
+            'config': dict(config, token_requests=token_requests),
+            'fleet': {key: flota[key] for key in ('proyectos', 'por_marca', 'inversores', 'granulares')},
+            'seconds': round(seconds, 2),
+            'requests': requests,
+            'requests_per_second': round(requests / seconds, 1),
+            'megabytes': round(received / 1e6, 2),
+            'megabytes_per_second': round(received / 1e6 / seconds, 2),
+            'rows_stored': rows,
+            'rows_per_second': round(rows / seconds, 1),
+            'coverage': {
+                'sistema': [GeneracionEnergiaDiaria.objects.filter(fecha_generacion_dia=target_date).count(), flota['proyectos']],
+                'inversor': [GeneracionInversorDiaria.objects.filter(fecha_generacion_inversor_dia=target_date).count(), flota['inversores']],
+                'granular': [GeneracionGranularDiaria.objects.filter(fecha_generacion_granular_dia=target_date).count(), flota['granulares']],
+            },
+            'servers': servidor,
+            'commands': {
+                name.split('.', 1)[1]: round(stats['seconds'], 2)
+                for name, stats in stages.items() if name.startswith('command.')
+            },
+            'error': error,
+        }
+
+    def write_report(self, result, stages):
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f"📈 COLLECTION BENCHMARK for {result['date']}: {result['seconds']}s"))
+        self.stdout.write(
+            f"  {result['requests']} requests ({result['requests_per_second']}/s), "
+            f"{result['megabytes']} MB received ({result['megabytes_per_second']} MB/s), "
+            f"{result['rows_stored']} rows stored ({result['rows_per_second']}/s)"
+        )
+        for level, (stored, expected) in result['coverage'].items():
+            self.stdout.write(f'  {level}: {stored} rows for the date / {expected} in the fleet')
+        for vendor, stats in result['servers'].items():
+            self.stdout.write(
+                f"  {vendor}: {stats['requests']} requests, {stats['rate_limited']} rate limited, {stats['relogin']} re-login answers"
+            )
+        self.stdout.write('\n⏱️  COMMANDS:')
+        for name, seconds in result['commands'].items():
+            self.stdout.write(f'  {name.ljust(32)} {seconds:>8.2f}s')
+        sleeps = {name: stats['seconds'] for name, stats in stages.items() if name.endswith('.rate_limit_sleep')}
+        if sleeps:
+            self.stdout.write('\n💤 RATE LIMIT SLEEPS:')
+            for name, seconds in sleeps.items():
+                self.stdout.write(f'  {name.ljust(32)} {seconds:>8.2f}s')
+        if result['error']:
+            self.stdout.write(self.style.ERROR(f"\n💥 collect_all_gen failed: {result['error']}"))
+
+    def guardar(self, result):
+        """Appends the result to settings.COLLECTION_BENCHMARK_FILE as one JSON line."""
+        path = getattr(settings, 'COLLECTION_BENCHMARK_FILE', None)
+        if not path:
+            return
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a') as f:
+                f.write(json.dumps(result, separators=(',', ':')) + '\n')
+        except OSError as e:
+            logger.warning(f"|BenchmarkCollection|guardar| Could not write the benchmark result to {path}: {e}")
+            return
+        self.stdout.write(f'  📄 Result appended to {path}')
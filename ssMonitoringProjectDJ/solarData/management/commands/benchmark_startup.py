@@ -0,0 +1,156 @@
+"""
+Measures how long the solarData management commands take to start, each in a fresh interpreter
+like a cron, job queue or n8n invocation:
+- help: python manage.py <command> --help
+- no-op: django.setup(), loading the command and building its argument parser, i.e. everything
+  python manage.py <command> does before handle()
+
+Heavy libraries (requests, reportlab, pytz, boto3) must load on first use, not when a command
+module is imported; the no-op run reports the ones that were loaded anyway.
+    python manage.py benchmark_startup
+    python manage.py benchmark_startup collect_all_gen generate_daily_report --runs 10
+
+Each run is appended to settings.STARTUP_BENCHMARK_FILE.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import get_commands
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
+import logging
+
+logger = logging.getLogger('management_commands')
+
+# Libraries that only the commands that talk to vendors or build PDFs should load
+HEAVY_MODULES = ('requests', 'reportlab', 'pytz', 'boto3')
+
+# Everything manage.py <command> does before handle(); prints the heavy modules it loaded
+NOOP_SCRIPT = """
+import json, os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ssMonitoringProjectDJ.settings')
+import django
+django.setup()
+from django.core.management import get_commands, load_command_class
+for name in sys.argv[2:]:
+    command = load_command_class(get_commands()[name], name)
+    command.create_parser('manage.py', name)
+print(json.dumps(sorted(module for module in json.loads(sys.argv[1]) if module in sys.modules)))
+"""
+
+
+def solar_commands():
+    """Names of the solarData management commands."""
+    return sorted(name for name, app in get_commands().items() if app == 'solarData')
+
+
+def heavy_modules_loaded(commands):
+    """
+    Loads the commands in a fresh interpreter as a no-op run does.
+    Returns:
+        list: HEAVY_MODULES that were imported by it
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', NOOP_SCRIPT, json.dumps(HEAVY_MODULES), *commands],
+        cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class Command(ProfiledCommand):
+    help = 'Measure the startup time of the management commands (--help and a no-op run) in fresh interpreters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'commands',
+            nargs='*',
+            help='Commands to measure (default: every solarData command)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Runs per command and mode; the median is reported (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        available = solar_commands()
+        commands = options['commands'] or available
+        unknown = sorted(set(commands) - set(available))
+        if unknown:
+            raise CommandError(f"Unknown solarData commands: {', '.join(unknown)}")
+        runs = options['runs']
+        if runs < 1:
+            raise CommandError('--runs must be positive.')
+
+        manage = str(Path(settings.BASE_DIR) / 'manage.py')
+        logger.info(f"|BenchmarkStartup|handle| Measuring the startup of {len(commands)} commands, {runs} runs each")
+        self.stdout.write(self.style.NOTICE(f'Measuring the startup of {len(commands)} commands, {runs} runs each...'))
+
+        # Floor every command pays: the interpreter and django.setup()
+        setup = self.medir([sys.executable, '-c', NOOP_SCRIPT, '[]'], runs)
+        results = {}
+        for name in commands:
+            results[name] = {
+                'help': self.medir([sys.executable, manage, name, '--help'], runs),
+                'noop': self.medir([sys.executable, '-c', NOOP_SCRIPT, '[]', name], runs),
+                'heavy_modules': heavy_modules_loaded([name]),
+            }
+
+        result = {
+            'recorded': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'runs': runs,
+            'setup': setup,
+            'commands': results,
+        }
+        self.write_report(result)
+        self.guardar(result)
+
+    @staticmethod
+    def medir(argv, runs):
+        """
+        Runs argv runs times in fresh interpreters.
+        Returns:
+            dict: median and min wall seconds
+        """
+        seconds = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run(argv, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            seconds.append(time.perf_counter() - started)
+        return {'median': round(statistics.median(seconds), 3), 'min': round(min(seconds), 3)}
+
+    def write_report(self, result):
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"🚀 STARTUP (median of {result['runs']}): interpreter + django.setup() {result['setup']['median']:.3f}s"
+        ))
+        self.stdout.write(f"  {'command'.ljust(32)} {'--help':>8} {'no-op':>8}  heavy modules loaded")
+        for name, stats in result['commands'].items():
+            heavy = ', '.join(stats['heavy_modules']) or '-'
+            self.stdout.write(f"  {name.ljust(32)} {stats['help']['median']:>7.3f}s {stats['noop']['median']:>7.3f}s  {heavy}")
+        loaded = [name for name, stats in result['commands'].items() if stats['heavy_modules']]
+        if loaded:
+            self.stdout.write(self.style.WARNING(f"\n⚠️  Heavy modules loaded at startup by: {', '.join(loaded)}"))
+
+    def guardar(self, result):
+        """Appends the result to settings.STARTUP_BENCHMARK_FILE as one JSON line."""
+        path = getattr(settings, 'STARTUP_BENCHMARK_FILE', None)
+        if not path:
+            return
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a') as f:
+                f.write(json.dumps(result, separators=(',', ':')) + '\n')
+        except OSError as e:
+            logger.warning(f"|BenchmarkStartup|guardar| Could not write the benchmark result to {path}: {e}")
+            return
+        self.stdout.write(f'  📄 Result appended to {path}')
@@ -3,17 +3,29 @@ Master command to collect all solar data from all systems for a specific date.
 This command orchestrates all individual data collection commands.
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
+from django.conf import settings
 from django.core.management import call_command
 from django.utils import timezone
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+import subprocess
+import sys
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataFetch.fetchers.circuitBreaker import CircuitBreaker, OPEN
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.ejecucionesCruds import registrar_ejecucion_comando
+from solarData.pipeline_metrics import PipelineMetrics
+from solarData.models import EjecucionRecoleccion
 import logging
 
 # Use the management commands logger for orchestration logging
 logger = logging.getLogger('management_commands')
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Collect all data from Solis, Huawei, and Hoymiles systems for a specific date'
 
     def add_arguments(self, parser):
@@ -32,14 +44,62 @@ class Command(BaseCommand):
             action='store_true',
             help='Show detailed output from each command',
         )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch systems, inverters and MPPTs that still lack data for the date (see EstadoRecoleccion)',
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            metavar='RUN_ID',
+            help='Resume an interrupted run (EjecucionRecoleccion id) right after its last committed batch. '
+                 'The run\'s own date is used and finished commands are skipped.',
+        )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the APIs. '
+                 'Without --date every archived date is replayed.',
+        )
+        parser.add_argument(
+            '--replay-workers',
+            type=int,
+            default=4,
+            help='Number of archived dates replayed in parallel, each in its own process, when --replay '
+                 'is used without --date (default: 4)',
+        )
 
     def handle(self, *args, **options):
         skip_errors = options['skip_errors']
         verbose = options['verbose']
         target_date = options['date']
-        
-        # Handle date parameter
-        if target_date:
+        replay_dir = options['replay']
+        only_missing = options['only_missing']
+
+        if replay_dir and not target_date:
+            self.replay_all_dates(replay_dir, options['replay_workers'], skip_errors, verbose, options)
+            return
+
+        run = None
+        if options['resume']:
+            if replay_dir:
+                raise CommandError('--resume cannot be combined with --replay.')
+            try:
+                run = EjecucionRecoleccion.objects.get(pk=options['resume'])
+            except EjecucionRecoleccion.DoesNotExist:
+                raise CommandError(f'Collection run {options["resume"]} does not exist.')
+            if target_date and target_date != run.fecha.isoformat():
+                raise CommandError(f'Run {run.pk} collected {run.fecha}; --date {target_date} does not match.')
+            target_date = run.fecha.isoformat()
+            run.estado = 'en_curso'
+            run.fecha_fin = None
+            run.save(update_fields=['estado', 'fecha_fin'])
+            logger.info(f"Resuming collection run {run.pk} for {target_date}")
+            self.stdout.write(self.style.NOTICE(f'Resuming collection run {run.pk} for {target_date}'))
+
+        # Handle date parameter (a resumed run already carries its date)
+        if run is None and target_date:
             try:
                 # Validate date format
                 datetime.strptime(target_date, '%Y-%m-%d')
@@ -48,7 +108,7 @@ class Command(BaseCommand):
             except ValueError:
                 self.stdout.write(self.style.ERROR('Invalid date format. Please use YYYY-MM-DD format.'))
                 return
-        else:
+        elif run is None:
             # Default to yesterday
             now = timezone.now()
             yesterday = now - timedelta(days=1)
@@ -71,6 +131,17 @@ class Command(BaseCommand):
             ('hoymiles_system_gen', 'Hoymiles System Generation'),
             ('hoymiles_inverter_granular_gen', 'Hoymiles Inverter & Granular Generation'),
         ]
+
+        # Live runs are checkpointed so an interrupted run can be picked up with --resume
+        if run is None and not replay_dir:
+            run = EjecucionRecoleccion.objects.create(fecha=target_date)
+            logger.info(f"Created collection run {run.pk} for {target_date}")
+            self.stdout.write(self.style.NOTICE(f'Collection run {run.pk} (resume with --resume {run.pk})'))
+        run_id = run.pk if run else None
+
+        # Vendor circuit breakers and stage metrics are shared by every command of the run; start them clean
+        CircuitBreaker.reset_all()
+        PipelineMetrics.reset()
         
         logger.info(f"Starting collection of all data for {target_date} at {timezone.now()}")
         self.stdout.write(
@@ -79,22 +150,38 @@ class Command(BaseCommand):
             )
         )
         
+        # --profile and --trace-sql apply to each command too, so every command gets its own profile
+        profiling = {'profile': options.get('profile'), 'trace_sql': options.get('trace_sql', False)}
+
         success_count = 0
         error_count = 0
         results = []
         
         for command_name, description in commands:
+            checkpoints = PuntosControl(run_id, command_name)
+            if checkpoints.comando_completado:
+                logger.info(f"Command {command_name} already completed in run {run_id}, skipping")
+                self.stdout.write(self.style.SUCCESS(f'⏭️  {description} - already completed in run {run_id}'))
+                success_count += 1
+                results.append((command_name, 'SUCCESS', None))
+                continue
+
             logger.info(f"Running command: {command_name} ({description}) for date {target_date}")
             self.stdout.write(f'\n📊 Running: {description} for {target_date}...')
+            started_at = timezone.now()
+            metrics_before = PipelineMetrics.snapshot()
             
             try:
-                if verbose:
-                    # Show command output with date parameter
-                    call_command(command_name, verbosity=2, date=target_date)
-                else:
-                    # Run silently with date parameter
-                    call_command(command_name, verbosity=0, date=target_date)
+                with PipelineMetrics.stage(f'command.{command_name}'):
+                    if verbose:
+                        # Show command output with date parameter
+                        call_command(command_name, verbosity=2, date=target_date, replay=replay_dir, only_missing=only_missing, run_id=run_id, **profiling)
+                    else:
+                        # Run silently with date parameter
+                        call_command(command_name, verbosity=0, date=target_date, replay=replay_dir, only_missing=only_missing, run_id=run_id, **profiling)
                 
+                checkpoints.registrar_comando()
+                self.record_command(run_id, command_name, started_at, metrics_before)
                 logger.info(f"Command {command_name} completed successfully")
                 self.stdout.write(
                     self.style.SUCCESS(f'✅ {description} - SUCCESS')
@@ -105,6 +192,7 @@ class Command(BaseCommand):
             except Exception as e:
                 error_msg = str(e)
                 logger.error(f"Command {command_name} failed: {error_msg}")
+                self.record_command(run_id, command_name, started_at, metrics_before, error=e)
                 self.stdout.write(
                     self.style.ERROR(f'❌ {description} - FAILED: {error_msg}')
                 )
@@ -120,6 +208,11 @@ class Command(BaseCommand):
                     )
                     break
         
+        if run:
+            run.estado = 'completada' if error_count == 0 else 'fallida'
+            run.fecha_fin = timezone.now()
+            run.save(update_fields=['estado', 'fecha_fin'])
+
         # Summary report
         self.stdout.write('\n' + '='*60)
         self.stdout.write(
@@ -130,6 +223,9 @@ class Command(BaseCommand):
         self.stdout.write(f'✅ Successful: {success_count}')
         self.stdout.write(f'❌ Failed: {error_count}')
         
+        self.write_circuit_summary()
+        self.write_stage_summary(run_id, target_date)
+        
         if verbose or error_count > 0:
             self.stdout.write('\n📋 DETAILED RESULTS:')
             for command_name, status, error in results:
@@ -153,4 +249,108 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f'\n💥 All data collection commands for {target_date} failed!')
             )
-            raise Exception(f'All {len(commands)} data collection commands failed for {target_date}') 
\ No newline at end of file
+            raise Exception(f'All {len(commands)} data collection commands failed for {target_date}')
+
+    def write_circuit_summary(self):
+        """Reports the vendor circuit breakers used by the run; open ones explain fast-failed commands."""
+        circuits = CircuitBreaker.summary()
+        if not circuits:
+            return
+        self.stdout.write('\n🔌 VENDOR CIRCUITS:')
+        for vendor, circuit in circuits.items():
+            line = (
+                f"{vendor}: {circuit['state']} ({circuit['consecutive_failures']} consecutive failures, "
+                f"opened {circuit['times_opened']} times, {circuit['rejected']} requests not sent)"
+            )
+            if circuit['state'] == OPEN or circuit['times_opened'] or circuit['consecutive_failures']:
+                logger.warning(f"Vendor circuit {line}. Last error: {circuit['last_error']}")
+                self.stdout.write(self.style.WARNING(f'  ⚠️  {line} - last error: {circuit["last_error"]}'))
+            else:
+                logger.info(f"Vendor circuit {line}")
+                self.stdout.write(f'  ✅ {line}')
+
+    def record_command(self, run_id, command_name, started_at, metrics_before, error=None):
+        """Stores the command's duration, counts and stage metrics in the run history (EjecucionComando)."""
+        try:
+            registrar_ejecucion_comando(
+                run_id, command_name, started_at, timezone.now(),
+                PipelineMetrics.diff(metrics_before, PipelineMetrics.snapshot()), error=error,
+            )
+        except Exception as e:
+            # The history is informative only; never fail the collection because of it
+            logger.warning(f"Could not store the run history of {command_name}: {e}")
+
+    def write_stage_summary(self, run_id, target_date):
+        """Prints where the run spent its time per stage and exports the metrics (settings.PIPELINE_METRICS_FILE)."""
+        rows = PipelineMetrics.summary_rows()
+        if not rows:
+            return
+        header = ('stage', 'calls', 'total s', 'avg ms', 'max ms', 'requests', 'bytes', 'rows', 'retries', 'errors')
+        widths = [max(len(str(value)) for value in column) for column in zip(header, *rows)]
+        self.stdout.write('\n⏱️  PIPELINE STAGES:')
+        for row in [header] + rows:
+            self.stdout.write('  ' + '  '.join(
+                str(value).ljust(width) if index == 0 else str(value).rjust(width)
+                for index, (value, width) in enumerate(zip(row, widths))
+            ))
+        path = PipelineMetrics.write(run_id=run_id, date=target_date)
+        if path:
+            logger.info(f"Pipeline metrics for run {run_id} written to {path}")
+            self.stdout.write(f'  📄 Metrics written to {path}')
+
+    def replay_all_dates(self, replay_dir, workers, skip_errors, verbose, options):
+        """
+        Replays every date found in the payload archive, several dates at a time; no vendor API is called.
+        Each date runs collect_all_gen --date in its own process: the circuit breakers and stage
+        metrics are process-wide, so every date starts them clean and its metrics file and run
+        history only hold its own numbers.
+        """
+        dates = PayloadArchive(replay_dir).dates()
+        if not dates:
+            logger.warning(f"No archived payloads found in {replay_dir}")
+            self.stdout.write(self.style.WARNING(f'No archived payloads found in {replay_dir}'))
+            return
+
+        workers = max(1, workers)
+        logger.info(f"Replaying {len(dates)} archived dates from {replay_dir} with {workers} workers")
+        self.stdout.write(self.style.SUCCESS(
+            f'🔁 Replaying {len(dates)} archived dates from {replay_dir} with {workers} workers'
+        ))
+
+        argv = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'collect_all_gen', '--replay', replay_dir]
+        argv += ['--verbosity', '2' if verbose else '0']
+        if skip_errors:
+            argv.append('--skip-errors')
+        if verbose:
+            argv.append('--verbose')
+        if options.get('profile'):
+            argv += ['--profile', options['profile']]
+        if options.get('trace_sql'):
+            argv.append('--trace-sql')
+
+        def replay_date(collect_date):
+            return subprocess.run(argv + ['--date', collect_date], cwd=settings.BASE_DIR, capture_output=True, text=True)
+
+        failed_dates = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(replay_date, collect_date): collect_date for collect_date in sorted(dates)}
+            for future in as_completed(futures):
+                collect_date = futures[future]
+                result = future.result()
+                if verbose and result.stdout:
+                    self.stdout.write(result.stdout)
+                if result.returncode == 0:
+                    logger.info(f"Replay for {collect_date} completed")
+                    self.stdout.write(self.style.SUCCESS(f'✅ Replay {collect_date} - SUCCESS'))
+                else:
+                    error = (result.stderr.strip().splitlines() or [f'exit code {result.returncode}'])[-1]
+                    logger.error(f"Replay for {collect_date} failed: {error}")
+                    self.stdout.write(self.style.ERROR(f'❌ Replay {collect_date} - FAILED: {error}'))
+                    failed_dates.append(collect_date)
+
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS(
+            f'📈 REPLAY SUMMARY: {len(dates) - len(failed_dates)} dates succeeded, {len(failed_dates)} failed'
+        ))
+        if failed_dates:
+            raise Exception(f'Replay failed for dates: {", ".join(sorted(failed_dates))}')
@@ -0,0 +1,161 @@
+"""
+Collection worker: leases tasks from the task queue (TareaRecoleccion) and runs them.
+
+Several workers can run at once, on one host or many. Tasks are leased with
+SELECT ... FOR UPDATE SKIP LOCKED, so no two workers receive the same task; while a task runs a
+heartbeat thread refreshes its lease, and a task whose worker died (no heartbeat for
+--lease-timeout seconds) is leased again by another worker. Failed tasks are retried with
+exponential backoff up to max_intentos attempts.
+"""
+
+from solarData.management.base import ProfiledCommand
+from django.core.management import call_command
+from django.db import connection
+from solarDataStore.cruds.tareasRecoleccionCruds import (
+    tomar_tarea, latido, completar_tarea, fallar_tarea, liberar_tarea, DEFAULT_LEASE_TIMEOUT,
+)
+from datetime import timedelta
+import logging
+import os
+import socket
+import threading
+import time
+
+logger = logging.getLogger('management_commands')
+
+DEFAULT_POLL_SECONDS = 30
+DEFAULT_HEARTBEAT_SECONDS = 30
+
+
+class Heartbeat(threading.Thread):
+    """Refreshes the lease of the running task every interval seconds until stopped."""
+
+    def __init__(self, tarea_id, trabajador, interval):
+        super().__init__(name=f'heartbeat-{tarea_id}', daemon=True)
+        self.tarea_id = tarea_id
+        self.trabajador = trabajador
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.lease_lost = False
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    if not latido(self.tarea_id, self.trabajador):
+                        self.lease_lost = True
+                        logger.error(f"|CollectionWorker|Heartbeat| Lease of task {self.tarea_id} lost")
+                        return
+                except Exception as e:
+                    logger.warning(f"|CollectionWorker|Heartbeat| Heartbeat for task {self.tarea_id} failed: {e}")
+        finally:
+            # The thread has its own DB connection; release it with the thread
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Command(ProfiledCommand):
+    help = 'Lease and run collection tasks from the task queue; run several workers to collect in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no task is available instead of polling for new ones',
+        )
+        parser.add_argument(
+            '--max-tasks',
+            type=int,
+            help='Exit after running this many tasks',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=DEFAULT_POLL_SECONDS,
+            help=f'Seconds to wait before polling again when the queue is empty (default: {DEFAULT_POLL_SECONDS})',
+        )
+        parser.add_argument(
+            '--heartbeat',
+            type=float,
+            default=DEFAULT_HEARTBEAT_SECONDS,
+            help=f'Seconds between lease heartbeats (default: {DEFAULT_HEARTBEAT_SECONDS})',
+        )
+        parser.add_argument(
+            '--lease-timeout',
+            type=float,
+            default=DEFAULT_LEASE_TIMEOUT.total_seconds(),
+            help=f'Seconds without heartbeat after which a running task is leased again (default: {int(DEFAULT_LEASE_TIMEOUT.total_seconds())})',
+        )
+
+    def handle(self, *args, **options):
+        trabajador = f'{socket.gethostname()}:{os.getpid()}'
+        lease_timeout = timedelta(seconds=options['lease_timeout'])
+        if options['heartbeat'] * 2 > options['lease_timeout']:
+            logger.warning(f"|CollectionWorker|handle| --heartbeat {options['heartbeat']}s is close to --lease-timeout {options['lease_timeout']}s; tasks may be leased twice")
+        logger.info(f"|CollectionWorker|handle| Worker {trabajador} started")
+        self.stdout.write(self.style.SUCCESS(f'Collection worker {trabajador} started'))
+
+        ejecutadas = 0
+        fallidas = 0
+        while options['max_tasks'] is None or ejecutadas < options['max_tasks']:
+            tarea = tomar_tarea(trabajador, lease_timeout)
+            if tarea is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+
+            ejecutadas += 1
+            if not self.run_task(tarea, trabajador, options['heartbeat']):
+                fallidas += 1
+
+        logger.info(f"|CollectionWorker|handle| Worker {trabajador} finished: {ejecutadas} tasks run, {fallidas} failed")
+        self.stdout.write(self.style.SUCCESS(f'Worker finished: {ejecutadas} tasks run, {fallidas} failed'))
+
+    def run_task(self, tarea, trabajador, heartbeat_interval):
+        """Runs one leased task under a heartbeat. Returns True on success."""
+        descripcion = f'{tarea.comando}' + (f' [{tarea.fragmento}]' if tarea.fragmento else '') + f' for {tarea.fecha}'
+        logger.info(f"|CollectionWorker|run_task| Task {tarea.id}: running {descripcion} (attempt {tarea.intentos + 1}/{tarea.max_intentos})")
+        self.stdout.write(f'📊 Task {tarea.id}: {descripcion}...')
+
+        kwargs = dict(tarea.opciones)
+        if tarea.fragmento:
+            kwargs['shard'] = tarea.fragmento
+        heartbeat = Heartbeat(tarea.id, trabajador, heartbeat_interval)
+        heartbeat.start()
+        started = time.monotonic()
+        try:
+            call_command(tarea.comando, date=tarea.fecha.isoformat(), verbosity=0, **kwargs)
+        except KeyboardInterrupt:
+            heartbeat.stop()
+            if not heartbeat.lease_lost and liberar_tarea(tarea):
+                logger.warning(f"|CollectionWorker|run_task| Interrupted, task {tarea.id} handed back to the queue")
+            raise
+        except Exception as e:
+            heartbeat.stop()
+            if self.lease_lost(tarea, heartbeat):
+                return False
+            reintentar = fallar_tarea(tarea, e)
+            if reintentar is None:
+                return False
+            logger.error(f"|CollectionWorker|run_task| Task {tarea.id} failed: {e} ({'will retry' if reintentar else 'giving up'})")
+            self.stdout.write(self.style.ERROR(f'❌ Task {tarea.id} failed: {e}'))
+            return False
+
+        heartbeat.stop()
+        if self.lease_lost(tarea, heartbeat) or not completar_tarea(tarea):
+            return False
+        logger.info(f"|CollectionWorker|run_task| Task {tarea.id} completed in {time.monotonic() - started:.1f}s")
+        self.stdout.write(self.style.SUCCESS(f'✅ Task {tarea.id} completed'))
+        return True
+
+    def lease_lost(self, tarea, heartbeat):
+        """True when another worker took the task over while it ran; its outcome is then not recorded."""
+        if not heartbeat.lease_lost:
+            return False
+        logger.warning(f"|CollectionWorker|run_task| Task {tarea.id} was leased by another worker while it ran, outcome discarded")
+        self.stdout.write(self.style.WARNING(f'⚠️  Task {tarea.id}: lease lost, outcome discarded'))
+        return True
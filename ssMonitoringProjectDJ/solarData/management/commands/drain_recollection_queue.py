@@ -0,0 +1,242 @@
+"""
+Drains the re-collection queue (ColaRecoleccion).
+
+The 3 AM collection stores NULL for Solis systems reported offline (condCodeD=305), Hoymiles
+entries without data and Huawei devices missing from the response; the store layer queues them.
+Vendors often publish the data later in the day, so this command, scheduled in the afternoon,
+fetches only the queued entities. Entities that get a value are resolved by the inserts; the rest
+are retried with exponential backoff and given up after MAX_INTENTOS attempts.
+"""
+
+from solarData.management.base import ProfiledCommand
+from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
+from solarDataFetch.fetchers.huaweiExecutor import HuaweiExecutor
+from solarDataFetch.fetchers.huaweiBatchSizer import HuaweiBatchSizer
+from solarDataFetch.fetchers.solisFetcher import SolisFetcher
+from solarDataFetch.fetchers.solisExecutor import SolisExecutor
+from solarDataFetch.fetchers.hoymilesFetcher import HoymilesFetcher
+from solarDataFetch.fetchers.hoymilesExecutor import HoymilesExecutor
+from solarDataStore.cruds.huaweiCruds import insert_huawei_generacion_sistema_dia, insert_huawei_generacion_inversor_dia, insert_huawei_generacion_granular_dia
+from solarDataStore.cruds.solisCruds import insert_solis_generacion_sistema_dia, insert_solis_generacion_inversores_dia
+from solarDataStore.cruds.hoymilesCruds import insert_hoymiles_generacion_sistema_dia, insert_hoymiles_generacion_estacion_dia
+from solarDataStore.cruds.colaRecoleccionCruds import pendientes, reprogramar, MAX_INTENTOS
+from solarDataStore.cruds.estadoRecoleccionCruds import NIVEL_SISTEMA, NIVEL_INVERSOR, NIVEL_GRANULAR
+from solarData.models import Inversor
+from datetime import datetime, timedelta
+from collections import defaultdict
+import logging
+
+logger = logging.getLogger('management_commands')
+
+DEFAULT_LIMIT = 2000
+DEFAULT_WORKERS = 4
+
+
+class Command(ProfiledCommand):
+    help = 'Re-fetch only the entities queued with NULL readings (ColaRecoleccion), with exponential backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=DEFAULT_LIMIT,
+            help=f'Maximum number of due queue entries to process (default: {DEFAULT_LIMIT})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f'Maximum vendor requests in flight at once (default: {DEFAULT_WORKERS})'
+        )
+
+    def handle(self, *args, **options):
+        logger.info("|DrainRecollectionQueue|handle| Starting re-collection queue drain")
+        self.workers = options['workers']
+
+        entradas = pendientes(options['limit'])
+        if not entradas:
+            logger.info("|DrainRecollectionQueue|handle| No queue entries due")
+            self.stdout.write(self.style.SUCCESS('No re-collection queue entries due.'))
+            return
+
+        # Hoymiles returns inverter and MPPT data in one mi_data_day call, so both levels share a handler
+        grupos = defaultdict(list)
+        for entrada in entradas:
+            marca = entrada.marca_inversor.marca.lower()
+            nivel = NIVEL_INVERSOR if marca == 'hoymiles' and entrada.nivel == NIVEL_GRANULAR else entrada.nivel
+            grupos[(marca, nivel)].append(entrada)
+        logger.info(f"|DrainRecollectionQueue|handle| {len(entradas)} entries due in {len(grupos)} vendor/level groups")
+        self.stdout.write(self.style.NOTICE(f'{len(entradas)} queue entries due'))
+
+        total_reprogramadas = 0
+        total_agotadas = 0
+        for (marca, nivel), grupo in grupos.items():
+            handler = getattr(self, f'recolectar_{marca}_{nivel}', None)
+            ids = [entrada.id for entrada in grupo]
+            errores = {}
+            if handler is None:
+                logger.warning(f"|DrainRecollectionQueue|handle| No re-collection handler for {marca} {nivel}, {len(grupo)} entries rescheduled")
+                errores = {entrada.id: f'No re-collection handler for {marca} {nivel}' for entrada in grupo}
+            else:
+                try:
+                    errores = handler(grupo) or {}
+                except Exception as e:
+                    logger.error(f"|DrainRecollectionQueue|handle| {marca} {nivel} re-collection failed: {e}")
+                    self.stdout.write(self.style.ERROR(f'❌ {marca} {nivel}: {e}'))
+                    errores = {entrada_id: str(e) for entrada_id in ids}
+
+            # Entries resolved by the inserts are no longer pending; reprogramar only touches the rest
+            por_mensaje = defaultdict(list)
+            for entrada_id in ids:
+                por_mensaje[errores.get(entrada_id, 'Still no data from the vendor')].append(entrada_id)
+            resueltas = len(ids)
+            for mensaje, entrada_ids in por_mensaje.items():
+                reprogramadas, agotadas = reprogramar(entrada_ids, mensaje)
+                resueltas -= reprogramadas + agotadas
+                total_reprogramadas += reprogramadas
+                total_agotadas += agotadas
+            logger.info(f"|DrainRecollectionQueue|handle| {marca} {nivel}: {resueltas}/{len(ids)} entries resolved")
+            self.stdout.write(self.style.SUCCESS(f'{marca} {nivel}: {resueltas}/{len(ids)} entries resolved'))
+
+        logger.info(f"|DrainRecollectionQueue|handle| Queue drain completed: {total_reprogramadas} rescheduled, {total_agotadas} given up after {MAX_INTENTOS} attempts")
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-collection completed: {total_reprogramadas} rescheduled, {total_agotadas} given up.'
+        ))
+
+    @staticmethod
+    def _por_fecha(grupo):
+        fechas = defaultdict(list)
+        for entrada in grupo:
+            fechas[entrada.fecha].append(entrada)
+        return fechas.items()
+
+    # Huawei: the batch endpoints accept explicit id lists, so only queued ids are requested (in adaptive batches)
+
+    def _huawei_executor(self):
+        fetcher = HuaweiFetcher()
+        return fetcher, HuaweiExecutor(fetcher, max_in_flight=self.workers)
+
+    def recolectar_huawei_sistema(self, grupo):
+        fetcher, executor = self._huawei_executor()
+        grupos = []
+        for fecha, entradas in self._por_fecha(grupo):
+            collect_time = fetcher.midnight_colombia_timestamp(datetime.combine(fecha, datetime.min.time()))
+            grupos.append(({'collect_time': collect_time}, [entrada.identificador for entrada in entradas]))
+        sizer = HuaweiBatchSizer.cargar('getKpiStationDay')
+        try:
+            for _, system_data in executor.run_adaptive(fetcher.fetch_huawei_generacion_sistema_dia, grupos, sizer):
+                insert_huawei_generacion_sistema_dia(system_data)
+        finally:
+            sizer.guardar()
+
+    def _huawei_grupos_por_dev_type(self, fetcher, grupo, granular):
+        dev_types = dict(
+            Inversor.objects.filter(identificador_inversor__in={entrada.identificador for entrada in grupo})
+            .values_list('identificador_inversor', 'huawei_devTypeId')
+        )
+        grupos = []
+        for fecha, entradas in self._por_fecha(grupo):
+            por_dev_type = defaultdict(list)
+            for entrada in entradas:
+                por_dev_type[dev_types.get(entrada.identificador) or "1"].append(entrada.identificador)
+            for dev_type_id, identificadores in por_dev_type.items():
+                job_kwargs = {'dev_type_id': dev_type_id}
+                if granular:
+                    job_kwargs['collect_time_0'] = fetcher.midnight_colombia_timestamp(datetime.combine(fecha, datetime.min.time()))
+                    job_kwargs['collect_time_1'] = fetcher.midnight_colombia_timestamp(datetime.combine(fecha + timedelta(days=1), datetime.min.time()))
+                else:
+                    job_kwargs['collect_time'] = fetcher.midnight_colombia_timestamp(datetime.combine(fecha, datetime.min.time()))
+                grupos.append((fecha, job_kwargs, identificadores))
+        return grupos
+
+    def recolectar_huawei_inversor(self, grupo):
+        fetcher, executor = self._huawei_executor()
+        grupos = [(job_kwargs, identificadores) for _, job_kwargs, identificadores in self._huawei_grupos_por_dev_type(fetcher, grupo, granular=False)]
+        sizer = HuaweiBatchSizer.cargar('getDevKpiDay')
+        try:
+            for _, inverter_data in executor.run_adaptive(fetcher.fetch_huawei_generacion_inversor_dia, grupos, sizer):
+                insert_huawei_generacion_inversor_dia(inverter_data)
+        finally:
+            sizer.guardar()
+
+    def recolectar_huawei_granular(self, grupo):
+        fetcher, executor = self._huawei_executor()
+        fechas = {}
+        grupos = []
+        for fecha, job_kwargs, identificadores in self._huawei_grupos_por_dev_type(fetcher, grupo, granular=True):
+            fechas[job_kwargs['collect_time_0']] = fecha
+            grupos.append((job_kwargs, identificadores))
+        sizer = HuaweiBatchSizer.cargar('getDevHistoryKpi')
+        try:
+            for job, mppt_energy_dict in executor.run_adaptive(fetcher.fetch_huawei_generacion_granular_dia, grupos, sizer):
+                insert_huawei_generacion_granular_dia(mppt_energy_dict, fechas[job['collect_time_0']])
+        finally:
+            sizer.guardar()
+
+    # Solis
+
+    def recolectar_solis_sistema(self, grupo):
+        # stationDayEnergyList has no per-station filter: its pages (100 stations each) are read and
+        # only the queued stations are stored
+        executor = SolisExecutor(SolisFetcher(), max_in_flight=self.workers)
+        for fecha, entradas in self._por_fecha(grupo):
+            en_cola = {entrada.identificador for entrada in entradas}
+            for _, system_data in executor.run_system_pages(fecha.strftime('%Y-%m-%d')):
+                system_data = [entry for entry in system_data if str(entry.get('id')) in en_cola]
+                if system_data:
+                    insert_solis_generacion_sistema_dia(system_data)
+
+    def recolectar_solis_inversor(self, grupo):
+        executor = SolisExecutor(SolisFetcher(), max_in_flight=self.workers)
+        errores = {}
+        for fecha, entradas in self._por_fecha(grupo):
+            por_identificador = {entrada.identificador: entrada.id for entrada in entradas}
+            for results, errors in executor.run_pages(list(por_identificador), fecha.strftime('%Y-%m-%d')):
+                if results:
+                    insert_solis_generacion_inversores_dia(results)
+                for inverter_id, e in errors.items():
+                    errores[por_identificador[inverter_id]] = str(e)
+        return errores
+
+    # Hoymiles
+
+    def recolectar_hoymiles_sistema(self, grupo):
+        fetcher = HoymilesFetcher(quiet=True)
+        errores = {}
+        for entrada in grupo:
+            try:
+                system_data = fetcher.fetch_hoymiles_generacion_sistema_dia(entrada.identificador, entrada.fecha.strftime('%Y-%m-%d'))
+            except RuntimeError as e:
+                errores[entrada.id] = str(e)
+                continue
+            if system_data:
+                insert_hoymiles_generacion_sistema_dia(system_data)
+        return errores
+
+    def recolectar_hoymiles_inversor(self, grupo):
+        # Inverter and granular entries of the same microinverter and day need one call only
+        executor = HoymilesExecutor(HoymilesFetcher(quiet=True), max_in_flight=self.workers)
+        plantas = dict(
+            Inversor.objects.filter(identificador_inversor__in={entrada.identificador for entrada in grupo})
+            .values_list('identificador_inversor', 'id_proyecto__identificador_planta')
+        )
+        errores = {}
+        for fecha, entradas in self._por_fecha(grupo):
+            ids_por_sn = defaultdict(list)
+            for entrada in entradas:
+                ids_por_sn[entrada.identificador].append(entrada.id)
+            stations = defaultdict(list)
+            for inverter_sn in ids_por_sn:
+                if inverter_sn in plantas:
+                    stations[plantas[inverter_sn]].append(inverter_sn)
+                else:
+                    for entrada_id in ids_por_sn[inverter_sn]:
+                        errores[entrada_id] = f'Inversor {inverter_sn} not found'
+            collect_time = fecha.strftime('%Y-%m-%d')
+            for _, station_data, station_errors in executor.run_stations(stations, collect_time):
+                if station_data:
+                    insert_hoymiles_generacion_estacion_dia(station_data, collect_time)
+                for inverter_sn, e in station_errors.items():
+                    for entrada_id in ids_por_sn[inverter_sn]:
+                        errores[entrada_id] = str(e)
+        return errores
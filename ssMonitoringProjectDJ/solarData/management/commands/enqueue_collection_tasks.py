@@ -0,0 +1,74 @@
+"""
+Creates the collection tasks of one date in the task queue (TareaRecoleccion).
+Each vendor command becomes one task, or --shards tasks for the commands that can be split by
+project/inverter; collection_worker processes lease and run them. Re-enqueueing a date with another
+--shards replaces its tasks only while none is running or done (--requeue also replaces done ones).
+"""
+
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
+from django.utils import timezone
+from datetime import datetime, timedelta
+from solarDataStore.cruds.tareasRecoleccionCruds import encolar_tareas
+import logging
+
+logger = logging.getLogger('management_commands')
+
+# (command, accepts --shard); stationDayEnergyList is one paged sweep, so solis_system_gen is not split
+COLLECTION_COMMANDS = [
+    ('solis_system_gen', False),
+    ('solis_inverter_gen', True),
+    ('huawei_system_gen', True),
+    ('huawei_inverter_gen', True),
+    ('huawei_granular_gen', True),
+    ('hoymiles_system_gen', True),
+    ('hoymiles_inverter_granular_gen', True),
+]
+
+
+class Command(ProfiledCommand):
+    help = 'Queue the per-vendor collection tasks of a date for collection_worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=1,
+            help='Split every shardable command into this many tasks (default: 1)'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Tasks only fetch entities that still lack data for the date (see EstadoRecoleccion)'
+        )
+        parser.add_argument(
+            '--requeue',
+            action='store_true',
+            help='Set completed or failed tasks of the date back to pending'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                target_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date format. Please use YYYY-MM-DD format.')
+        else:
+            target_date = (timezone.now() - timedelta(days=1)).date()
+        if options['shards'] < 1:
+            raise CommandError('--shards must be at least 1.')
+
+        comandos = [(comando, options['shards'] if shardable else 1) for comando, shardable in COLLECTION_COMMANDS]
+        opciones = {'only_missing': True} if options['only_missing'] else {}
+        try:
+            total = encolar_tareas(target_date, comandos, opciones=opciones, reencolar=options['requeue'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        logger.info(f"|EnqueueCollectionTasks|handle| {total} collection tasks queued for {target_date}")
+        self.stdout.write(self.style.SUCCESS(f'{total} collection tasks queued for {target_date}'))
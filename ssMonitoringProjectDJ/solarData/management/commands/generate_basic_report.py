@@ -5,14 +5,14 @@ import logging
 import os
 import shutil
 from datetime import date
-from django.core.management.base import BaseCommand
+from solarData.management.base import ProfiledCommand
 from solarDataReports.processes.analysis_engine import SolarDataAnalysis
 from solarDataReports.processes.report_engine import SolarDataReporter
 from solarDataReports.processes.pdf_generator_engine import SolarDataPDFGenerator
 
 logger = logging.getLogger('solarData.management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Generate basic solar production report (PDF only, no email)'
 
     def handle(self, *args, **options):
@@ -26,14 +26,15 @@ class Command(BaseCommand):
             
             # Run all 6 analyses (defaults to yesterday)
             self.stdout.write("Running analyses...")
-            results = {
-                'no_target': analysis.check_systems_no_target(),
-                'zero_systems': analysis.check_systems_zero_production_single_day(),
-                'null_missing': analysis.check_systems_null_or_missing_single_day(),
-                'under_target_15d': analysis.check_systems_under_target_15d(),
-                'inverters_conditional': analysis.check_inverters_zero_conditional_single_day(),
-                'granular_conditional': analysis.check_granular_zero_conditional_single_day()
-            }
+            with self.phase('analysis'):
+                results = {
+                    'no_target': analysis.check_systems_no_target(),
+                    'zero_systems': analysis.check_systems_zero_production_single_day(),
+                    'null_missing': analysis.check_systems_null_or_missing_single_day(),
+                    'under_target_15d': analysis.check_systems_under_target_15d(),
+                    'inverters_conditional': analysis.check_inverters_zero_conditional_single_day(),
+                    'granular_conditional': analysis.check_granular_zero_conditional_single_day()
+                }
             
             # Get date for summary and filename
             report_date = results['zero_systems']['date']
@@ -72,11 +73,12 @@ SUMMARY OF ISSUES:
             
             # Generate PDF
             self.stdout.write("Creating PDF...")
-            pdf_path = pdf_gen.simple_report(
-                reports,
-                title="Basic Solar Production Report",
-                date=report_date
-            )
+            with self.phase('pdf'):
+                pdf_path = pdf_gen.simple_report(
+                    reports,
+                    title="Basic Solar Production Report",
+                    date=report_date
+                )
             
             if not pdf_path:
                 raise Exception("PDF generation failed")
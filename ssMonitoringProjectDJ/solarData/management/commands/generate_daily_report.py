@@ -3,7 +3,7 @@ Generate and email daily solar production report for yesterday
 """
 import logging
 from datetime import date
-from django.core.management.base import BaseCommand
+from solarData.management.base import ProfiledCommand
 from solarDataReports.processes.analysis_engine import SolarDataAnalysis
 from solarDataReports.processes.report_engine import SolarDataReporter
 from solarDataReports.processes.pdf_generator_engine import SolarDataPDFGenerator
@@ -11,7 +11,7 @@ from solarDataReports.processes.email_sender_engine import SolarDataEmailSender
 
 logger = logging.getLogger('solarData.management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Generate and email daily solar production report for yesterday'
 
     def handle(self, *args, **options):
@@ -24,15 +24,16 @@ class Command(BaseCommand):
 
             # Run detailed analysis (defaults to yesterday)
             self.stdout.write("Generating detailed analysis report...")
-            results_detailed = {
-                'zero_systems': analysis.check_zero_production_system_single_day(),
-                'zero_inverters': analysis.check_zero_production_inverter_single_day(),
-                'zero_granular': analysis.check_zero_production_granular_single_day(),
-                'min_systems': analysis.check_minimum_production_system_single_day(),
-                'dev_systems': analysis.check_production_deviation_systems(),
-                'dev_inverters': analysis.check_production_deviation_inverters(),
-                'dev_granular': analysis.check_production_deviation_granular()
-            }
+            with self.phase('detailed_analysis'):
+                results_detailed = {
+                    'zero_systems': analysis.check_zero_production_system_single_day(),
+                    'zero_inverters': analysis.check_zero_production_inverter_single_day(),
+                    'zero_granular': analysis.check_zero_production_granular_single_day(),
+                    'min_systems': analysis.check_minimum_production_system_single_day(),
+                    'dev_systems': analysis.check_production_deviation_systems(),
+                    'dev_inverters': analysis.check_production_deviation_inverters(),
+                    'dev_granular': analysis.check_production_deviation_granular()
+                }
 
             # Create summary header for detailed report
             today = date.today()
@@ -68,20 +69,22 @@ ANALYSIS SUMMARY:
 
             # Generate detailed PDF
             self.stdout.write("Creating detailed PDF...")
-            pdf_path_detailed = pdf_gen.simple_report(reports_detailed)
+            with self.phase('detailed_pdf'):
+                pdf_path_detailed = pdf_gen.simple_report(reports_detailed)
             if not pdf_path_detailed:
                 raise Exception("Failed to generate detailed PDF")
 
             # Run basic report analysis
             self.stdout.write("Generating basic report...")
-            results_basic = {
-                'no_target': analysis.check_systems_no_target(),
-                'zero_systems': analysis.check_systems_zero_production_single_day(),
-                'null_missing': analysis.check_systems_null_or_missing_single_day(),
-                'under_target_15d': analysis.check_systems_under_target_15d(),
-                'inverters_conditional': analysis.check_inverters_zero_conditional_single_day(),
-                'granular_conditional': analysis.check_granular_zero_conditional_single_day()
-            }
+            with self.phase('basic_analysis'):
+                results_basic = {
+                    'no_target': analysis.check_systems_no_target(),
+                    'zero_systems': analysis.check_systems_zero_production_single_day(),
+                    'null_missing': analysis.check_systems_null_or_missing_single_day(),
+                    'under_target_15d': analysis.check_systems_under_target_15d(),
+                    'inverters_conditional': analysis.check_inverters_zero_conditional_single_day(),
+                    'granular_conditional': analysis.check_granular_zero_conditional_single_day()
+                }
 
             # Get report date
             report_date = results_basic['zero_systems']['date']
@@ -118,11 +121,12 @@ SUMMARY OF ISSUES:
 
             # Generate basic PDF
             self.stdout.write("Creating basic PDF...")
-            pdf_path_basic = pdf_gen.simple_report(
-                reports_basic,
-                title="Basic Solar Production Report",
-                date=report_date
-            )
+            with self.phase('basic_pdf'):
+                pdf_path_basic = pdf_gen.simple_report(
+                    reports_basic,
+                    title="Basic Solar Production Report",
+                    date=report_date
+                )
             if not pdf_path_basic:
                 raise Exception("Failed to generate basic PDF")
 
@@ -133,10 +137,11 @@ SUMMARY OF ISSUES:
                 (pdf_path_basic, f"basic_report_{report_date}.pdf")
             ]
             
-            email_result = email.send_multiple_pdf_reports(
-                pdf_paths=pdf_attachments,
-                report_date=report_date
-            )
+            with self.phase('email'):
+                email_result = email.send_multiple_pdf_reports(
+                    pdf_paths=pdf_attachments,
+                    report_date=report_date
+                )
             
             # Cleanup temp files
             pdf_gen.cleanup_temp_file(pdf_path_detailed)
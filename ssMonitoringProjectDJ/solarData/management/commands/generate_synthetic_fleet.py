@@ -0,0 +1,104 @@
+"""
+Generates a synthetic fleet with years of daily generation for load tests and benchmarks
+(solarData/synthetic_fleet.py). The same --seed always produces the same fleet, so query,
+analysis and report timings can be compared between changes at 10x or 100x the real fleet.
+
+Meant for a benchmark database (a restored copy or a local Postgres), not production:
+    python manage.py generate_synthetic_fleet --scale 10 --years 3 --seed 1
+    python manage.py generate_synthetic_fleet --purge
+"""
+
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
+from datetime import datetime, timedelta
+from solarData.models import Proyecto
+from solarData.synthetic_fleet import generar_flota, borrar_flota, PREFIJO_SINTETICO, TAMANO_LOTE
+import logging
+
+logger = logging.getLogger('management_commands')
+
+
+class Command(ProfiledCommand):
+    help = 'Generate synthetic projects, inverters, granulars and daily generation for load testing'
+
+    def add_arguments(self, parser):
+        size = parser.add_mutually_exclusive_group()
+        size.add_argument(
+            '--projects',
+            type=int,
+            help='Number of projects to generate'
+        )
+        size.add_argument(
+            '--scale',
+            type=float,
+            help='Generate this many times the current (non-synthetic) number of projects, e.g. 10 or 100'
+        )
+        parser.add_argument(
+            '--years',
+            type=float,
+            default=1,
+            help='Years of daily generation ending at --end (default: 1)'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Last generated day in YYYY-MM-DD format (defaults to yesterday)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same seed gives the same fleet (default: 0)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Daily rows per COPY / INSERT batch (default: {TAMANO_LOTE})'
+        )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Delete the synthetic projects already generated first (alone: only delete them)'
+        )
+
+    def handle(self, *args, **options):
+        if options['end']:
+            try:
+                end = datetime.strptime(options['end'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date format. Please use YYYY-MM-DD format.')
+        else:
+            end = datetime.now().date() - timedelta(days=1)
+
+        if options['purge']:
+            deleted = borrar_flota()
+            self.stdout.write(f'Deleted {deleted} synthetic projects')
+            if options['projects'] is None and options['scale'] is None:
+                return
+
+        if options['projects'] is not None:
+            projects = options['projects']
+        elif options['scale'] is not None:
+            real = Proyecto.objects.exclude(dealname__startswith=PREFIJO_SINTETICO).count()
+            projects = round(real * options['scale'])
+            self.stdout.write(f'{real} real projects x {options["scale"]:g} = {projects} synthetic projects')
+        else:
+            raise CommandError('Pass --projects or --scale (or only --purge).')
+        if projects < 1:
+            raise CommandError('Nothing to generate: the fleet size is 0.')
+        if options['years'] <= 0 or options['batch_size'] < 1:
+            raise CommandError('--years and --batch-size must be positive.')
+
+        days = max(1, round(options['years'] * 365))
+        logger.info(f"|GenerateSyntheticFleet|handle| Generating {projects} projects, {days} days up to {end}, seed {options['seed']}")
+        summary = generar_flota(projects, days, fin=end, semilla=options['seed'], tamano_lote=options['batch_size'])
+
+        rows = summary['filas_sistema'] + summary['filas_inversor'] + summary['filas_granular']
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {summary['proyectos']} projects, {summary['inversores']} inverters and {summary['granulares']} granulars"
+        ))
+        self.stdout.write(
+            f"Daily rows: {summary['filas_sistema']} system, {summary['filas_inversor']} inverter, {summary['filas_granular']} granular "
+            f"({rows} in {summary['segundos']}s, {rows / max(summary['segundos'], 0.001):.0f} rows/s)"
+        )
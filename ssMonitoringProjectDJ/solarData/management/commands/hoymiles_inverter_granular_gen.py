@@ -1,14 +1,22 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.hoymilesFetcher import HoymilesFetcher
-from solarDataStore.cruds.hoymilesCruds import insert_hoymiles_generacion_inversor_granular_dia
+from solarDataFetch.fetchers.hoymilesExecutor import HoymilesExecutor, DEFAULT_MAX_IN_FLIGHT, DEFAULT_CALLS_PER_MINUTE
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataStore.cruds.hoymilesCruds import insert_hoymiles_generacion_inversor_granular_dia, insert_hoymiles_generacion_estacion_dia, channels_of
+from solarDataStore.cruds.estadoRecoleccionCruds import filtrar_pendientes, registrar_estados, NIVEL_INVERSOR, NIVEL_GRANULAR, ESTADO_ERROR
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.tareasRecoleccionCruds import filtrar_fragmento, parse_fragmento
 from solarData.models import Inversor
 from django.utils import timezone
 from datetime import datetime, timedelta
+from collections import defaultdict
 import logging
+import time
 
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Fetch and store Hoymiles inverter and granular production data for a specific date.'
 
     def add_arguments(self, parser):
@@ -17,12 +25,41 @@ class Command(BaseCommand):
             type=str,
             help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
         )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the API'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch microinverters that still lack data for the date (see EstadoRecoleccion)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_MAX_IN_FLIGHT,
+            help=f'Maximum number of mi_data_day requests in flight at once (default {DEFAULT_MAX_IN_FLIGHT})'
+        )
+        parser.add_argument(
+            '--per-minute',
+            type=int,
+            default=DEFAULT_CALLS_PER_MINUTE,
+            help=f'Maximum number of Hoymiles requests started per minute (default {DEFAULT_CALLS_PER_MINUTE})'
+        )
+        parser.add_argument(
+            '--run-id',
+            type=int,
+            help='collect_all_gen run (EjecucionRecoleccion) to checkpoint microinverters in; committed ones are skipped'
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='Only collect shard K of N (e.g. 2/4) of the stations; used by collection_worker tasks'
+        )
 
     def handle(self, *args, **options):
         logger.info("|HoymilesInverterGranularGen|handle| Starting Hoymiles inverter and granular generation collection")
-        
-        fetcher = HoymilesFetcher()
-        logger.info("|HoymilesInverterGranularGen|handle| Created HoymilesFetcher instance")
 
         # Handle date parameter
         if options['date']:
@@ -43,11 +80,31 @@ class Command(BaseCommand):
 
         logger.info(f"|HoymilesInverterGranularGen|handle| Processing data for date: {collect_time}")
 
+        if options['replay']:
+            self.handle_replay(options['replay'], collect_time)
+            return
+
+        try:
+            fragmento = parse_fragmento(options.get('shard'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # Batch collection: no per-call debug JSON on stdout
+        fetcher = HoymilesFetcher(quiet=True)
+        logger.info("|HoymilesInverterGranularGen|handle| Created HoymilesFetcher instance")
+
         # Get all Hoymiles inverters from the database
         try:
             hoymiles_inverters = Inversor.objects.filter(
                 id_proyecto__marca_inversor__marca='Hoymiles'
             ).select_related('id_proyecto')
+            if options['only_missing']:
+                # Pending when either the inverter total or its channels are missing
+                hoymiles_inverters = filtrar_pendientes(
+                    hoymiles_inverters, (NIVEL_INVERSOR, NIVEL_GRANULAR), datetime.strptime(collect_time, '%Y-%m-%d').date()
+                )
+            # Sharded by project so every microinverter of a station lands in the same shard
+            hoymiles_inverters = filtrar_fragmento(hoymiles_inverters, fragmento, campo='id_proyecto_id')
             
             total_inverters = hoymiles_inverters.count()
             logger.info(f"|HoymilesInverterGranularGen|handle| Found {total_inverters} Hoymiles inverters to process")
@@ -65,61 +122,97 @@ class Command(BaseCommand):
             f'Found {total_inverters} Hoymiles inverters to process for date: {collect_time}'
         ))
 
+        # Group microinverters by station so each station is stored with one bulk call; microinverters
+        # stored by an earlier attempt of the same run are left out
+        checkpoints = PuntosControl(options.get('run_id'), 'hoymiles_inverter_granular_gen')
+        stations = defaultdict(list)
+        project_names = {}
+        for inverter in hoymiles_inverters:
+            if checkpoints.completado(inverter.identificador_inversor):
+                continue
+            plant_id = inverter.id_proyecto.identificador_planta
+            stations[plant_id].append(inverter.identificador_inversor)
+            project_names[plant_id] = inverter.id_proyecto.dealname
+
+        executor = HoymilesExecutor(fetcher, max_in_flight=options['workers'], calls_per_minute=options['per_minute'])
+        logger.info(f"|HoymilesInverterGranularGen|handle| Fetching {total_inverters} inverters from {len(stations)} stations with {executor.max_in_flight} workers, {executor.budget.calls_per_minute} requests/minute")
+
         successful_inverters = 0
         failed_inverters = 0
+        stations_done = 0
+        started = time.monotonic()
 
-        # Process each inverter individually
-        for inverter in hoymiles_inverters:
-            plant_id = inverter.id_proyecto.identificador_planta
-            inverter_sn = inverter.identificador_inversor
-            project_name = inverter.id_proyecto.dealname
-            
-            logger.info(f"|HoymilesInverterGranularGen|handle| Processing inverter {inverter_sn} from project {project_name} (Plant ID: {plant_id})")
-            
-            try:
-                # Fetch inverter and granular data
-                inverter_data = fetcher.fetch_hoymiles_generacion_inversor_granular_dia(
-                    plant_id, inverter_sn, collect_time
-                )
-                
-                # Always process the data - the fetcher returns valid structure even with null/zero values
-                if inverter_data:
-                    # Insert data into database
-                    insert_hoymiles_generacion_inversor_granular_dia(inverter_data, collect_time)
-                    
-                    successful_inverters += 1
-                    
-                    # Check if data contains meaningful values
-                    pvyield = inverter_data.get('PVYield', 0)
-                    has_channel_data = any(inverter_data.get(f'channel{i}') is not None for i in range(1, 5))
-                    
-                    if pvyield == 0 and not has_channel_data:
-                        logger.info(f"|HoymilesInverterGranularGen|handle| Successfully processed inverter {inverter_sn} (no energy generation)")
-                        self.stdout.write(self.style.WARNING(f'⚠ {project_name} - {inverter_sn}: Data processed (no generation)'))
-                    else:
-                        logger.info(f"|HoymilesInverterGranularGen|handle| Successfully processed inverter {inverter_sn}")
-                        self.stdout.write(self.style.SUCCESS(f'✓ {project_name} - {inverter_sn}: Data processed successfully'))
-                else:
-                    # This should not happen anymore since fetcher always returns data
-                    failed_inverters += 1
-                    logger.warning(f"|HoymilesInverterGranularGen|handle| No data returned for inverter {inverter_sn}")
-                    self.stdout.write(self.style.ERROR(f'✗ {project_name} - {inverter_sn}: No data returned'))
-                    
-            except RuntimeError as e:
+        fecha = datetime.strptime(collect_time, '%Y-%m-%d').date()
+        for plant_id, station_data, station_errors in executor.run_stations(stations, collect_time):
+            project_name = project_names[plant_id]
+            stations_done += 1
+
+            # Failed fetches are recorded in the collection-state index; --only-missing retries them
+            for nivel in (NIVEL_INVERSOR, NIVEL_GRANULAR):
+                registrar_estados(nivel, [(inverter_sn, fecha, ESTADO_ERROR, str(e)[:1000]) for inverter_sn, e in station_errors.items()])
+
+            for inverter_sn, e in station_errors.items():
                 failed_inverters += 1
                 logger.error(f"|HoymilesInverterGranularGen|handle| Error fetching data for inverter {inverter_sn}: {e}")
                 self.stdout.write(self.style.ERROR(f'✗ {project_name} - {inverter_sn}: {e}'))
-                continue
-            except Exception as e:
-                failed_inverters += 1
-                logger.error(f"|HoymilesInverterGranularGen|handle| Unexpected error processing inverter {inverter_sn}: {e}")
-                self.stdout.write(self.style.ERROR(f'✗ {project_name} - {inverter_sn}: Unexpected error: {e}'))
-                continue
+
+            if station_data:
+                try:
+                    with checkpoints.lote(*[inverter_data['inverter_sn'] for inverter_data in station_data]):
+                        insert_hoymiles_generacion_estacion_dia(station_data, collect_time)
+                    successful_inverters += len(station_data)
+                    for inverter_data in station_data:
+                        inverter_sn = inverter_data.get('inverter_sn')
+                        pvyield = inverter_data.get('PVYield', 0)
+                        has_channel_data = any(energy is not None for _, energy in channels_of(inverter_data))
+                        if pvyield == 0 and not has_channel_data:
+                            self.stdout.write(self.style.WARNING(f'⚠ {project_name} - {inverter_sn}: Data processed (no generation)'))
+                        else:
+                            self.stdout.write(self.style.SUCCESS(f'✓ {project_name} - {inverter_sn}: Data processed successfully'))
+                except Exception as e:
+                    failed_inverters += len(station_data)
+                    logger.error(f"|HoymilesInverterGranularGen|handle| Unexpected error storing station {plant_id}: {e}")
+                    self.stdout.write(self.style.ERROR(f'✗ {project_name}: Unexpected error storing station: {e}'))
+
+            # Progress and throughput
+            elapsed_minutes = max(time.monotonic() - started, 1e-6) / 60
+            done = successful_inverters + failed_inverters
+            logger.info(f"|HoymilesInverterGranularGen|handle| Station {plant_id} done ({stations_done}/{len(stations)} stations, {done}/{total_inverters} inverters, {done / elapsed_minutes:.1f} inverters/min, {executor.requests_made / elapsed_minutes:.1f} requests/min)")
+            self.stdout.write(self.style.NOTICE(
+                f'Progress: {stations_done}/{len(stations)} stations, {done}/{total_inverters} inverters ({done / elapsed_minutes:.1f}/min)'
+            ))
+
+        elapsed = time.monotonic() - started
 
         # Summary
-        logger.info(f"|HoymilesInverterGranularGen|handle| Hoymiles inverter and granular collection completed. Successful: {successful_inverters}, Failed: {failed_inverters}, Total: {total_inverters}")
+        logger.info(f"|HoymilesInverterGranularGen|handle| Hoymiles inverter and granular collection completed in {elapsed:.1f}s. Successful: {successful_inverters}, Failed: {failed_inverters}, Total: {total_inverters}, Requests: {executor.requests_made}")
         self.stdout.write(self.style.SUCCESS(
-            f'Hoymiles inverter and granular data collection completed.\n'
+            f'Hoymiles inverter and granular data collection completed in {elapsed:.1f}s.\n'
             f'Successful inverters: {successful_inverters}/{total_inverters}\n'
             f'Failed inverters: {failed_inverters}'
         ))
+
+    def handle_replay(self, replay_dir, collect_time):
+        """Feed archived mi_data_day responses for collect_time through the parse and store path."""
+        logger.info(f"|HoymilesInverterGranularGen|handle_replay| Replaying archived Hoymiles inverter payloads for {collect_time} from {replay_dir}")
+        archive = PayloadArchive(replay_dir)
+        successful_inverters = 0
+        failed_inverters = 0
+        for record in archive.records('hoymiles', 'mi_data_day', collect_time):
+            context = record['context']
+            inverter_sn = context['inverter_sn']
+            try:
+                inverter_data = HoymilesFetcher.parse_generacion_inversor_granular_dia(
+                    record['response'], context['plant_id'], inverter_sn, context['target_date']
+                )
+                insert_hoymiles_generacion_inversor_granular_dia(inverter_data, collect_time)
+                successful_inverters += 1
+            except Exception as e:
+                failed_inverters += 1
+                logger.error(f"|HoymilesInverterGranularGen|handle_replay| Error replaying inverter {inverter_sn}: {e}")
+                self.stdout.write(self.style.ERROR(f'✗ {inverter_sn}: Replay error: {e}'))
+
+        logger.info(f"|HoymilesInverterGranularGen|handle_replay| Replay completed for {collect_time}. Successful: {successful_inverters}, Failed: {failed_inverters}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed Hoymiles inverters: {successful_inverters} successful, {failed_inverters} failed.'
+        ))
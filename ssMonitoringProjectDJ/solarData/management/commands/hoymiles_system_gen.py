@@ -1,6 +1,11 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.hoymilesFetcher import HoymilesFetcher
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
 from solarDataStore.cruds.hoymilesCruds import insert_hoymiles_generacion_sistema_dia
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.tareasRecoleccionCruds import filtrar_fragmento, parse_fragmento
+from solarDataStore.cruds.estadoRecoleccionCruds import filtrar_pendientes, NIVEL_SISTEMA
 from solarData.models import Proyecto
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -8,7 +13,7 @@ import logging
 
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Fetch and store Hoymiles system production data for a specific date.'
 
     def add_arguments(self, parser):
@@ -17,12 +22,29 @@ class Command(BaseCommand):
             type=str,
             help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
         )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the API'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch stations that still lack data for the date (see EstadoRecoleccion)'
+        )
+        parser.add_argument(
+            '--run-id',
+            type=int,
+            help='collect_all_gen run (EjecucionRecoleccion) to checkpoint stations in; committed stations are skipped'
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='Only collect shard K of N (e.g. 2/4) of the stations; used by collection_worker tasks'
+        )
 
     def handle(self, *args, **options):
         logger.info("|HoymilesSystemGen|handle| Starting Hoymiles system generation collection")
-        
-        fetcher = HoymilesFetcher()
-        logger.info("|HoymilesSystemGen|handle| Created HoymilesFetcher instance")
 
         # Handle date parameter
         if options['date']:
@@ -43,9 +65,24 @@ class Command(BaseCommand):
 
         logger.info(f"|HoymilesSystemGen|handle| Processing data for date: {collect_time}")
 
+        if options['replay']:
+            self.handle_replay(options['replay'], collect_time)
+            return
+
+        try:
+            fragmento = parse_fragmento(options.get('shard'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        fetcher = HoymilesFetcher()
+        logger.info("|HoymilesSystemGen|handle| Created HoymilesFetcher instance")
+
         # Get all Hoymiles projects from the database
         try:
             hoymiles_projects = Proyecto.objects.filter(marca_inversor__marca='Hoymiles')
+            if options['only_missing']:
+                hoymiles_projects = filtrar_pendientes(hoymiles_projects, NIVEL_SISTEMA, datetime.strptime(collect_time, '%Y-%m-%d').date())
+            hoymiles_projects = filtrar_fragmento(hoymiles_projects, fragmento)
             total_projects = hoymiles_projects.count()
             logger.info(f"|HoymilesSystemGen|handle| Found {total_projects} Hoymiles projects to process")
             
@@ -61,10 +98,15 @@ class Command(BaseCommand):
         successful_projects = 0
         failed_projects = 0
         all_system_data = []
+        checkpoints = PuntosControl(options.get('run_id'), 'hoymiles_system_gen')
+        fetched_stations = []
 
         # Process each project individually
         for project in hoymiles_projects:
             station_id = project.identificador_planta
+            if checkpoints.completado(station_id):
+                logger.info(f"|HoymilesSystemGen|handle| Station {station_id} already committed in run {checkpoints.run_id}, skipping")
+                continue
             logger.info(f"|HoymilesSystemGen|handle| Processing project {project.dealname} (Station ID: {station_id})")
             
             try:
@@ -74,6 +116,7 @@ class Command(BaseCommand):
                 # Always process the data - even if PVYield is None, we want to record it
                 if system_data:
                     all_system_data.extend(system_data)
+                    fetched_stations.append(station_id)
                     successful_projects += 1
                     
                     # Check if data contains null values
@@ -100,7 +143,8 @@ class Command(BaseCommand):
         if all_system_data:
             try:
                 logger.info(f"|HoymilesSystemGen|handle| Inserting {len(all_system_data)} total system entries into database")
-                insert_hoymiles_generacion_sistema_dia(all_system_data)
+                with checkpoints.lote(*fetched_stations):
+                    insert_hoymiles_generacion_sistema_dia(all_system_data)
                 logger.info("|HoymilesSystemGen|handle| All system data inserted successfully")
                 self.stdout.write(self.style.SUCCESS(f'Database insertion completed: {len(all_system_data)} total entries'))
             except Exception as e:
@@ -118,3 +162,22 @@ class Command(BaseCommand):
             f'Failed projects: {failed_projects}\n'
             f'Total entries processed: {len(all_system_data)}'
         ))
+
+    def handle_replay(self, replay_dir, collect_time):
+        """Feed archived findStation30dayEnergy responses for collect_time through the parse and store path."""
+        logger.info(f"|HoymilesSystemGen|handle_replay| Replaying archived Hoymiles system payloads for {collect_time} from {replay_dir}")
+        archive = PayloadArchive(replay_dir)
+        all_system_data = []
+        for record in archive.records('hoymiles', 'findStation30dayEnergy', collect_time):
+            context = record['context']
+            all_system_data.extend(
+                HoymilesFetcher.parse_generacion_sistema_dia(record['response'], context['station_id'], context['target_date'])
+            )
+
+        if not all_system_data:
+            logger.warning(f"|HoymilesSystemGen|handle_replay| No archived Hoymiles system payloads found for {collect_time}")
+            self.stdout.write(self.style.WARNING(f'No archived Hoymiles system payloads found for {collect_time}.'))
+            return
+        insert_hoymiles_generacion_sistema_dia(all_system_data)
+        logger.info(f"|HoymilesSystemGen|handle_replay| Replay completed for {collect_time}: {len(all_system_data)} entries")
+        self.stdout.write(self.style.SUCCESS(f'Replayed {len(all_system_data)} Hoymiles system entries.'))
@@ -1,13 +1,22 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataStore.cruds.estadoRecoleccionCruds import NIVEL_GRANULAR
+from solarDataFetch.fetchers.huaweiBatchPlanner import HuaweiBatchPlanner, HISTORY_BATCH_SIZE
+from solarDataFetch.fetchers.huaweiBatchSizer import HuaweiBatchSizer
+from solarDataFetch.fetchers.huaweiExecutor import HuaweiExecutor, DEFAULT_MAX_IN_FLIGHT
 from solarDataStore.cruds.huaweiCruds import insert_huawei_generacion_granular_dia
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.tareasRecoleccionCruds import parse_fragmento
+from solarDataStore.cruds.colaRecoleccionCruds import encolar_faltantes
 from django.utils import timezone
 from datetime import datetime, timedelta
 import logging
 import traceback
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Fetch and store Huawei MPPT (granular) production data for a specific date.'
 
     def add_arguments(self, parser):
@@ -16,11 +25,34 @@ class Command(BaseCommand):
             type=str,
             help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
         )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the API'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch inverters whose MPPTs that still lack data for the date (see EstadoRecoleccion)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_MAX_IN_FLIGHT,
+            help=f'Maximum Huawei batch requests in flight at once (default: {DEFAULT_MAX_IN_FLIGHT})'
+        )
+        parser.add_argument(
+            '--run-id',
+            type=int,
+            help='collect_all_gen run (EjecucionRecoleccion) to checkpoint batches in; committed batches are skipped'
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='Only collect shard K of N (e.g. 2/4) of the inverters; used by collection_worker tasks'
+        )
 
     def handle(self, *args, **options):
-        fetcher = HuaweiFetcher()
-        token = fetcher.login()
-
         # Handle date parameter
         if options['date']:
             try:
@@ -37,53 +69,81 @@ class Command(BaseCommand):
             logger.info(f"|HuaweiGranularGen|handle| No date provided, using yesterday: {target_date}")
             self.stdout.write(self.style.NOTICE(f'No date provided, using yesterday: {target_date}'))
 
+        if options['replay']:
+            self.handle_replay(options['replay'], target_date)
+            return
+
+        try:
+            fragmento = parse_fragmento(options.get('shard'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        fetcher = HuaweiFetcher()
+        # One shared session for every worker; a 305 triggers a single re-login
+        executor = HuaweiExecutor(fetcher, max_in_flight=options['workers'])
+
         date_obj = target_date
         collect_time_0 = fetcher.midnight_colombia_timestamp(datetime.combine(date_obj, datetime.min.time()))
         collect_time_1 = fetcher.midnight_colombia_timestamp(datetime.combine(date_obj + timedelta(days=1), datetime.min.time()))
 
-        dev_type_ids = ["1", "38"]
-        BATCH_SIZE = 10  # Must match fetcher batch size
-        for dev_type_id in dev_type_ids:
-            batch_number = 1
-            self.stdout.write(self.style.NOTICE(f'Processing dev_type_id {dev_type_id}...'))
-            while True:
-                retry = False
-                for attempt in range(2):  # Allow one retry per batch
-                    try:
-                        mppt_energy_dict = fetcher.fetch_huawei_generacion_granular_dia(
-                            dev_type_id=dev_type_id,
-                            batch_number=batch_number,
-                            collect_time_0=collect_time_0,
-                            collect_time_1=collect_time_1,
-                            token=token
-                        )
-                        break  # Success: exit retry loop
-                    except RuntimeError as e:
-                        if hasattr(e, 'args') and len(e.args) > 1 and e.args[1] == 305 and not retry:
-                            self.stdout.write(self.style.WARNING('Session expired, re-logging in and retrying batch...'))
-                            token = fetcher.login()
-                            retry = True
-                        else:
-                            raise
-                    except ValueError as ve:
-                        if "No devices found for the given dev_type_id and batch number." in str(ve):
-                            self.stdout.write(self.style.WARNING(f"No devices found for dev_type_id {dev_type_id} and batch {batch_number}. Ending batch loop."))
-                            logger.info(f"|HuaweiGranularGen|handle| No devices found for dev_type_id {dev_type_id} and batch {batch_number}. Ending batch loop.")
-                            break  # No more devices to process in this batch
-                        else:
-                            raise
+        # Inverter lists are loaded once, in id order; batches are cut at the adaptive getDevHistoryKpi size
+        # (at most 10) while up to --workers requests run concurrently over both dev types
+        checkpoints = PuntosControl(options.get('run_id'), 'huawei_granular_gen')
+        grupos = []
+        for dev_type_id in ["1", "38"]:
+            planner = HuaweiBatchPlanner.inversores(
+                dev_type_id, HISTORY_BATCH_SIZE,
+                solo_pendientes_en=date_obj if options['only_missing'] else None, nivel=NIVEL_GRANULAR, fragmento=fragmento,
+            )
+            # Batch boundaries move with the size, so checkpoints are kept per inverter
+            committed = set(checkpoints.completados(f'{dev_type_id}-'))
+            identificadores = [identificador for identificador in planner.identificadores if identificador not in committed]
+            if committed:
+                logger.info(f"|HuaweiGranularGen|handle| dev_type_id {dev_type_id}: {len(planner.identificadores) - len(identificadores)} inverters already committed in run {checkpoints.run_id}, skipping")
+            logger.info(f"|HuaweiGranularGen|handle| dev_type_id {dev_type_id}: {len(identificadores)} inverters to fetch")
+            grupos.append(({'dev_type_id': dev_type_id, 'collect_time_0': collect_time_0, 'collect_time_1': collect_time_1}, identificadores))
+        self.stdout.write(self.style.NOTICE(f'Processing {sum(len(ids) for _, ids in grupos)} inverters with up to {options["workers"]} requests in flight...'))
+
+        sizer = HuaweiBatchSizer.cargar('getDevHistoryKpi')
+        batches = 0
+        try:
+            for job, mppt_energy_dict in executor.run_adaptive(fetcher.fetch_huawei_generacion_granular_dia, grupos, sizer):
+                dev_type_id = job['dev_type_id']
+                batch_number = job['batch_number']
+                batches += 1
                 num_inverters = len(mppt_energy_dict) if mppt_energy_dict else 0
                 logger.info(f"|HuaweiGranularGen|handle| Batch {batch_number} for dev_type_id {dev_type_id}: {num_inverters} inverters processed.")
                 self.stdout.write(self.style.SUCCESS(f"Batch {batch_number} for dev_type_id {dev_type_id}: {num_inverters} inverters processed."))
                 try:
-                    insert_huawei_generacion_granular_dia(mppt_energy_dict, date_obj)
+                    with checkpoints.lote(*(f'{dev_type_id}-{identificador}' for identificador in job['identificadores'])):
+                        insert_huawei_generacion_granular_dia(mppt_energy_dict, date_obj)
+                        # Devices Huawei left out of the response are fetched again in the afternoon
+                        encolar_faltantes(NIVEL_GRANULAR, job['identificadores'], mppt_energy_dict or {}, date_obj)
                 except Exception as e:
                     print(f"[ERROR] Exception in insert_huawei_generacion_granular_dia: {e}")
                     traceback.print_exc()
-                if num_inverters < BATCH_SIZE:
-                    self.stdout.write(self.style.NOTICE(f"Last batch for dev_type_id {dev_type_id}. Processed {num_inverters} inverters, which is less than batch size {BATCH_SIZE}. Exiting batch loop."))
-                    logger.info(f"|HuaweiGranularGen|handle| Last batch for dev_type_id {dev_type_id}. Processed {num_inverters} inverters, which is less than batch size {BATCH_SIZE}. Exiting batch loop.")
-                    break
-                batch_number += 1  # Only increment if not breaking
+        finally:
+            sizer.guardar()
+
+        logger.info(f"|HuaweiGranularGen|handle| All {batches} batches processed")
+        self.stdout.write(self.style.SUCCESS('All batches processed.'))
+
+    def handle_replay(self, replay_dir, date_obj):
+        """Feed archived getDevHistoryKpi responses for date_obj through the parse and store path."""
+        collect_date = date_obj.isoformat()
+        logger.info(f"|HuaweiGranularGen|handle_replay| Replaying archived Huawei granular payloads for {collect_date} from {replay_dir}")
+        archive = PayloadArchive(replay_dir)
+        batches = 0
+        total_inverters = 0
+        for record in archive.records('huawei', 'getDevHistoryKpi', collect_date):
+            mppt_energy_dict = HuaweiFetcher.parse_generacion_granular_dia(record['response'], record['context']['identificadores'])
+            insert_huawei_generacion_granular_dia(mppt_energy_dict, date_obj)
+            batches += 1
+            total_inverters += len(mppt_energy_dict)
 
-        self.stdout.write(self.style.SUCCESS('All batches processed.')) 
\ No newline at end of file
+        if batches == 0:
+            logger.warning(f"|HuaweiGranularGen|handle_replay| No archived Huawei granular payloads found for {collect_date}")
+            self.stdout.write(self.style.WARNING(f'No archived Huawei granular payloads found for {collect_date}.'))
+            return
+        logger.info(f"|HuaweiGranularGen|handle_replay| Replay completed for {collect_date}: {batches} batches, {total_inverters} inverters")
+        self.stdout.write(self.style.SUCCESS(f'Replayed {batches} batches: {total_inverters} inverters processed.'))
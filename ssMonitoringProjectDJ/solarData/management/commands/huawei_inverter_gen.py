@@ -1,13 +1,22 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataFetch.fetchers.huaweiBatchPlanner import HuaweiBatchPlanner, KPI_BATCH_SIZE
+from solarDataFetch.fetchers.huaweiBatchSizer import HuaweiBatchSizer
+from solarDataFetch.fetchers.huaweiExecutor import HuaweiExecutor, DEFAULT_MAX_IN_FLIGHT
 from solarDataStore.cruds.huaweiCruds import insert_huawei_generacion_inversor_dia
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.tareasRecoleccionCruds import parse_fragmento
+from solarDataStore.cruds.colaRecoleccionCruds import encolar_faltantes
+from solarDataStore.cruds.estadoRecoleccionCruds import NIVEL_INVERSOR
 from django.utils import timezone
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Fetch and store Huawei inverter production data for a specific date (devTypeId=1, <100 entries).'
 
     def add_arguments(self, parser):
@@ -16,15 +25,35 @@ class Command(BaseCommand):
             type=str,
             help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
         )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the API'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch inverters that still lack data for the date (see EstadoRecoleccion)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_MAX_IN_FLIGHT,
+            help=f'Maximum Huawei batch requests in flight at once (default: {DEFAULT_MAX_IN_FLIGHT})'
+        )
+        parser.add_argument(
+            '--run-id',
+            type=int,
+            help='collect_all_gen run (EjecucionRecoleccion) to checkpoint batches in; committed batches are skipped'
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='Only collect shard K of N (e.g. 2/4) of the inverters; used by collection_worker tasks'
+        )
 
     def handle(self, *args, **options):
         logger.info("|HuaweiInverterGen|handle| Starting Huawei inverter generation collection")
-        
-        fetcher = HuaweiFetcher()
-        logger.info("|HuaweiInverterGen|handle| Created HuaweiFetcher instance")
-        
-        token = fetcher.login()
-        logger.info("|HuaweiInverterGen|handle| Successfully obtained authentication token")
 
         # Handle date parameter
         if options['date']:
@@ -41,44 +70,57 @@ class Command(BaseCommand):
             logger.info(f"|HuaweiInverterGen|handle| No date provided, using yesterday: {target_date.date()}")
             self.stdout.write(self.style.NOTICE(f'No date provided, using yesterday: {target_date.date()}'))
 
+        if options['replay']:
+            self.handle_replay(options['replay'], target_date.strftime('%Y-%m-%d'))
+            return
+
+        try:
+            fragmento = parse_fragmento(options.get('shard'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        fetcher = HuaweiFetcher()
+        logger.info("|HuaweiInverterGen|handle| Created HuaweiFetcher instance")
+        
+        # One shared session for every worker; a 305 triggers a single re-login
+        executor = HuaweiExecutor(fetcher, max_in_flight=options['workers'])
+        logger.info("|HuaweiInverterGen|handle| Successfully obtained authentication token")
+
         collect_time = fetcher.midnight_colombia_timestamp(target_date)
         logger.info(f"|HuaweiInverterGen|handle| Processing data for date: {target_date.date()}")
         
+        # Inverter lists are loaded once, in id order; batches are cut at the adaptive getDevKpiDay size
+        # while up to --workers requests run concurrently over both dev types
+        checkpoints = PuntosControl(options.get('run_id'), 'huawei_inverter_gen')
+        grupos = []
         for dev_type_id in ["1", "38"]:
-            logger.info(f"|HuaweiInverterGen|handle| Starting processing for dev_type_id {dev_type_id}")
-            batch_number = 1
-            self.stdout.write(self.style.NOTICE(f'Processing dev_type_id {dev_type_id}...'))
-            while True:
-                logger.info(f"|HuaweiInverterGen|handle| Processing dev_type_id {dev_type_id}, batch {batch_number}")
-                retry = False
-                for attempt in range(2):  # Allow one retry per batch
-                    try:
-                        inverter_data = fetcher.fetch_huawei_generacion_inversor_dia(
-                            dev_type_id=dev_type_id,
-                            batch_number=batch_number,
-                            collect_time=collect_time,
-                            token=token
-                        )
-                        logger.info(f"|HuaweiInverterGen|handle| Batch {batch_number} for dev_type_id {dev_type_id} fetched successfully: {len(inverter_data)} inverters")
-                        break  # Success: exit retry loop
-                    except RuntimeError as e:
-                        if hasattr(e, 'args') and len(e.args) > 1 and e.args[1] == 305 and not retry:
-                            logger.warning(f"|HuaweiInverterGen|handle| Session expired on dev_type_id {dev_type_id}, batch {batch_number}, re-authenticating")
-                            self.stdout.write(self.style.WARNING('Session expired, re-logging in and retrying batch...'))
-                            token = fetcher.login()
-                            logger.info("|HuaweiInverterGen|handle| Re-authentication successful, retrying batch")
-                            retry = True
-                            continue
-                        else:
-                            logger.error(f"|HuaweiInverterGen|handle| Error fetching inverter data (dev_type_id {dev_type_id}, batch {batch_number}): {e}")
-                            raise CommandError(f'Error fetching inverter data (dev_type_id {dev_type_id}, batch {batch_number}): {e}')
-                else:
-                    logger.error(f"|HuaweiInverterGen|handle| Failed after retrying batch {batch_number} for dev_type_id {dev_type_id} due to repeated session expiration")
-                    raise CommandError(f'Failed after retrying batch {batch_number} for dev_type_id {dev_type_id} due to repeated session expiration.')
-                self.stdout.write(self.style.NOTICE(f'{inverter_data}'))
-                # Insert always happens once per batch
+            planner = HuaweiBatchPlanner.inversores(
+                dev_type_id, KPI_BATCH_SIZE,
+                solo_pendientes_en=target_date.date() if options['only_missing'] else None, fragmento=fragmento,
+            )
+            # Batch boundaries move with the size, so checkpoints are kept per inverter
+            committed = set(checkpoints.completados(f'{dev_type_id}-'))
+            identificadores = [identificador for identificador in planner.identificadores if identificador not in committed]
+            if committed:
+                logger.info(f"|HuaweiInverterGen|handle| dev_type_id {dev_type_id}: {len(planner.identificadores) - len(identificadores)} inverters already committed in run {checkpoints.run_id}, skipping")
+            logger.info(f"|HuaweiInverterGen|handle| dev_type_id {dev_type_id}: {len(identificadores)} inverters to fetch")
+            grupos.append(({'dev_type_id': dev_type_id, 'collect_time': collect_time}, identificadores))
+        self.stdout.write(self.style.NOTICE(f'Processing {sum(len(ids) for _, ids in grupos)} inverters with up to {options["workers"]} requests in flight...'))
+        
+        sizer = HuaweiBatchSizer.cargar('getDevKpiDay')
+        batches = 0
+        try:
+            for job, inverter_data in executor.run_adaptive(fetcher.fetch_huawei_generacion_inversor_dia, grupos, sizer):
+                dev_type_id = job['dev_type_id']
+                batch_number = job['batch_number']
+                batches += 1
+                logger.info(f"|HuaweiInverterGen|handle| Batch {batch_number} for dev_type_id {dev_type_id} fetched successfully: {len(inverter_data)} inverters")
+                # Insert always happens once per batch, on this thread
                 try:
-                    insert_huawei_generacion_inversor_dia(inverter_data)
+                    with checkpoints.lote(*(f'{dev_type_id}-{identificador}' for identificador in job['identificadores'])):
+                        insert_huawei_generacion_inversor_dia(inverter_data)
+                        # Devices Huawei left out of the response are fetched again in the afternoon
+                        encolar_faltantes(NIVEL_INVERSOR, job['identificadores'], [entry.get('identificador_inversor') for entry in inverter_data], target_date.date())
                     logger.info(f"|HuaweiInverterGen|handle| Batch {batch_number} for dev_type_id {dev_type_id} data inserted successfully")
                 except Exception as e:
                     logger.error(f"|HuaweiInverterGen|handle| Error inserting inverter data (dev_type_id {dev_type_id}, batch {batch_number}): {e}")
@@ -88,10 +130,32 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS(
                     f'dev_type_id {dev_type_id} - Batch {batch_number}: {len(inverter_data)} inverters processed.'
                 ))
-                if len(inverter_data) < 100:
-                    logger.info(f"|HuaweiInverterGen|handle| Last batch for dev_type_id {dev_type_id}. Total batches: {batch_number}")
-                    break
-                batch_number += 1
-            logger.info(f"|HuaweiInverterGen|handle| Completed processing for dev_type_id {dev_type_id}")
+        except RuntimeError as e:
+            logger.error(f"|HuaweiInverterGen|handle| Error fetching inverter data: {e}")
+            raise CommandError(f'Error fetching inverter data: {e}')
+        finally:
+            sizer.guardar()
         
-        logger.info("|HuaweiInverterGen|handle| Huawei inverter generation collection completed successfully") 
\ No newline at end of file
+        logger.info(f"|HuaweiInverterGen|handle| Huawei inverter generation collection completed successfully. Total batches: {batches}")
+
+    def handle_replay(self, replay_dir, collect_date):
+        """Feed archived getDevKpiDay responses for collect_date through the parse and store path."""
+        logger.info(f"|HuaweiInverterGen|handle_replay| Replaying archived Huawei inverter payloads for {collect_date} from {replay_dir}")
+        archive = PayloadArchive(replay_dir)
+        batches = 0
+        total_inverters = 0
+        for record in archive.records('huawei', 'getDevKpiDay', collect_date):
+            context = record['context']
+            inverter_data = HuaweiFetcher.parse_generacion_inversor_dia(
+                record['response'], context['collect_time'], context['identificadores']
+            )
+            insert_huawei_generacion_inversor_dia(inverter_data)
+            batches += 1
+            total_inverters += len(inverter_data)
+
+        if batches == 0:
+            logger.warning(f"|HuaweiInverterGen|handle_replay| No archived Huawei inverter payloads found for {collect_date}")
+            self.stdout.write(self.style.WARNING(f'No archived Huawei inverter payloads found for {collect_date}.'))
+            return
+        logger.info(f"|HuaweiInverterGen|handle_replay| Replay completed for {collect_date}: {batches} batches, {total_inverters} inverters")
+        self.stdout.write(self.style.SUCCESS(f'Replayed {batches} batches: {total_inverters} inverters processed.'))
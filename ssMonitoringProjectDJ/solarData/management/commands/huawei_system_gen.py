@@ -1,14 +1,23 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataFetch.fetchers.huaweiBatchPlanner import HuaweiBatchPlanner
+from solarDataFetch.fetchers.huaweiBatchSizer import HuaweiBatchSizer
+from solarDataFetch.fetchers.huaweiExecutor import HuaweiExecutor
 from solarDataStore.cruds.huaweiCruds import insert_huawei_generacion_sistema_dia
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.tareasRecoleccionCruds import parse_fragmento
+from solarDataStore.cruds.colaRecoleccionCruds import encolar_faltantes
+from solarDataStore.cruds.estadoRecoleccionCruds import NIVEL_SISTEMA
 from django.utils import timezone
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
-    help = 'Fetch and store Huawei system production data for a specific date (single batch, <100 systems).'
+class Command(ProfiledCommand):
+    help = 'Fetch and store Huawei system production data for a specific date (adaptive batches of up to 100 systems).'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -16,15 +25,29 @@ class Command(BaseCommand):
             type=str,
             help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
         )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the API'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch projects that still lack data for the date (see EstadoRecoleccion)'
+        )
+        parser.add_argument(
+            '--run-id',
+            type=int,
+            help='collect_all_gen run (EjecucionRecoleccion) to checkpoint batches in; committed batches are skipped'
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='Only collect shard K of N (e.g. 2/4) of the projects; used by collection_worker tasks'
+        )
 
     def handle(self, *args, **options):
         logger.info("|HuaweiSystemGen|handle| Starting Huawei system generation collection")
-        
-        fetcher = HuaweiFetcher()
-        logger.info("|HuaweiSystemGen|handle| Created HuaweiFetcher instance")
-        
-        token = fetcher.login()
-        logger.info("|HuaweiSystemGen|handle| Successfully obtained authentication token")
 
         # Handle date parameter
         if options['date']:
@@ -41,53 +64,82 @@ class Command(BaseCommand):
             logger.info(f"|HuaweiSystemGen|handle| No date provided, using yesterday: {target_date.date()}")
             self.stdout.write(self.style.NOTICE(f'No date provided, using yesterday: {target_date.date()}'))
 
+        if options['replay']:
+            self.handle_replay(options['replay'], target_date.strftime('%Y-%m-%d'))
+            return
+
+        try:
+            fragmento = parse_fragmento(options.get('shard'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        fetcher = HuaweiFetcher()
+        logger.info("|HuaweiSystemGen|handle| Created HuaweiFetcher instance")
+        
+        # Batches are requested one at a time; the executor handles the 305 re-login
+        executor = HuaweiExecutor(fetcher, max_in_flight=1)
+        logger.info("|HuaweiSystemGen|handle| Successfully obtained authentication token")
+
         # Calculate collect_time for the target date in Colombian timezone
         collect_time = fetcher.midnight_colombia_timestamp(target_date)
         logger.info(f"|HuaweiSystemGen|handle| Processing data for date: {target_date.date()}")
 
-        batch_number = 1
-        while True:
-            logger.info(f"|HuaweiSystemGen|handle| Processing batch {batch_number}")
-            self.stdout.write(self.style.NOTICE(f'Processing batch {batch_number}...'))
-            retry = False
-            for attempt in range(2):  # Allow one retry per batch
+        # Project list is loaded once, in id order; batches are cut at the adaptive getKpiStationDay size
+        planner = HuaweiBatchPlanner.proyectos(solo_pendientes_en=target_date.date() if options['only_missing'] else None, fragmento=fragmento)
+        if options['only_missing']:
+            self.stdout.write(self.style.NOTICE(f'Only missing: {len(planner.identificadores)} projects still lack data'))
+        checkpoints = PuntosControl(options.get('run_id'), 'huawei_system_gen')
+        # Batch boundaries move with the size, so checkpoints are kept per project
+        committed = set(checkpoints.completados('station-'))
+        identificadores = [identificador for identificador in planner.identificadores if identificador not in committed]
+        if committed:
+            logger.info(f"|HuaweiSystemGen|handle| {len(planner.identificadores) - len(identificadores)} projects already committed in run {checkpoints.run_id}, skipping")
+
+        sizer = HuaweiBatchSizer.cargar('getKpiStationDay')
+        batches = 0
+        try:
+            for job, system_data in executor.run_adaptive(fetcher.fetch_huawei_generacion_sistema_dia, [({'collect_time': collect_time}, identificadores)], sizer):
+                batch_number = job['batch_number']
+                batches += 1
+                logger.info(f"|HuaweiSystemGen|handle| Batch {batch_number} fetched successfully: {len(system_data)} systems")
+
+                # Insert always happens once per batch, committed together with its checkpoints
                 try:
-                    system_data = fetcher.fetch_huawei_generacion_sistema_dia(
-                        batch_number=batch_number,
-                        collect_time=collect_time,
-                        token=token
-                    )
-                    logger.info(f"|HuaweiSystemGen|handle| Batch {batch_number} fetched successfully: {len(system_data)} systems")
-                    break  # Success: exit retry loop
-                except RuntimeError as e:
-                    if hasattr(e, 'args') and len(e.args) > 1 and e.args[1] == 305 and not retry:
-                        logger.warning(f"|HuaweiSystemGen|handle| Session expired on batch {batch_number}, re-authenticating")
-                        self.stdout.write(self.style.WARNING('Session expired, re-logging in and retrying batch...'))
-                        token = fetcher.login()
-                        logger.info("|HuaweiSystemGen|handle| Re-authentication successful, retrying batch")
-                        retry = True
-                        continue
-                    else:
-                        logger.error(f"|HuaweiSystemGen|handle| Error fetching batch {batch_number}: {e}")
-                        raise CommandError(f'Error fetching system data (batch {batch_number}): {e}')
-            else:
-                logger.error(f"|HuaweiSystemGen|handle| Failed after retrying batch {batch_number} due to repeated session expiration")
-                raise CommandError(f'Failed after retrying batch {batch_number} due to repeated session expiration.')
+                    with checkpoints.lote(*(f'station-{identificador}' for identificador in job['identificadores'])):
+                        insert_huawei_generacion_sistema_dia(system_data)
+                        # Stations Huawei left out of the response are fetched again in the afternoon
+                        encolar_faltantes(NIVEL_SISTEMA, job['identificadores'], [entry.get('stationCode') for entry in system_data], target_date.date())
+                    logger.info(f"|HuaweiSystemGen|handle| Batch {batch_number} data inserted successfully")
+                except Exception as e:
+                    logger.error(f"|HuaweiSystemGen|handle| Error inserting batch {batch_number} data: {e}")
+                    raise
 
-            # Insert always happens once per batch
-            try:
-                insert_huawei_generacion_sistema_dia(system_data)
-                logger.info(f"|HuaweiSystemGen|handle| Batch {batch_number} data inserted successfully")
-            except Exception as e:
-                logger.error(f"|HuaweiSystemGen|handle| Error inserting batch {batch_number} data: {e}")
-                raise
-                
-            self.stdout.write(self.style.SUCCESS(
-                f'Batch {batch_number}: {len(system_data)} systems processed.'
-            ))
-            if len(system_data) < 100:
-                logger.info(f"|HuaweiSystemGen|handle| Last batch processed. Total batches: {batch_number}")
-                break
-            batch_number += 1
+                self.stdout.write(self.style.SUCCESS(
+                    f'Batch {batch_number}: {len(system_data)} systems processed.'
+                ))
+        except RuntimeError as e:
+            logger.error(f"|HuaweiSystemGen|handle| Error fetching system data: {e}")
+            raise CommandError(f'Error fetching system data: {e}')
+        finally:
+            sizer.guardar()
             
-        logger.info("|HuaweiSystemGen|handle| Huawei system generation collection completed successfully") 
\ No newline at end of file
+        logger.info(f"|HuaweiSystemGen|handle| Huawei system generation collection completed successfully. Total batches: {batches}")
+
+    def handle_replay(self, replay_dir, collect_date):
+        """Feed archived getKpiStationDay responses for collect_date through the parse and store path."""
+        logger.info(f"|HuaweiSystemGen|handle_replay| Replaying archived Huawei system payloads for {collect_date} from {replay_dir}")
+        archive = PayloadArchive(replay_dir)
+        batches = 0
+        total_systems = 0
+        for record in archive.records('huawei', 'getKpiStationDay', collect_date):
+            system_data = HuaweiFetcher.parse_generacion_sistema_dia(record['response'], record['context']['collect_time'])
+            insert_huawei_generacion_sistema_dia(system_data)
+            batches += 1
+            total_systems += len(system_data)
+
+        if batches == 0:
+            logger.warning(f"|HuaweiSystemGen|handle_replay| No archived Huawei system payloads found for {collect_date}")
+            self.stdout.write(self.style.WARNING(f'No archived Huawei system payloads found for {collect_date}.'))
+            return
+        logger.info(f"|HuaweiSystemGen|handle_replay| Replay completed for {collect_date}: {batches} batches, {total_systems} systems")
+        self.stdout.write(self.style.SUCCESS(f'Replayed {batches} batches: {total_systems} systems processed.'))
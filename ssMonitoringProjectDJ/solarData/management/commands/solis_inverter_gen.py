@@ -1,6 +1,12 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.solisFetcher import SolisFetcher
-from solarDataStore.cruds.solisCruds import insert_solis_generacion_inversor_dia
+from solarDataFetch.fetchers.solisExecutor import SolisExecutor, DEFAULT_MAX_IN_FLIGHT, DEFAULT_MIN_INTERVAL, DEFAULT_PAGE_SIZE
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataStore.cruds.solisCruds import insert_solis_generacion_inversor_dia, insert_solis_generacion_inversores_dia
+from solarDataStore.cruds.estadoRecoleccionCruds import filtrar_pendientes, registrar_estados, NIVEL_INVERSOR, ESTADO_ERROR
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.tareasRecoleccionCruds import filtrar_fragmento, parse_fragmento
 from solarData.models import Inversor
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -9,8 +15,8 @@ import logging
 
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
-    help = 'Fetch and store Solis inverter production data for a specific date (one inverter at a time).'
+class Command(ProfiledCommand):
+    help = 'Fetch and store Solis inverter production data for a specific date (several inverters in flight, paced to the API quota).'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -18,21 +24,44 @@ class Command(BaseCommand):
             type=str,
             help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
         )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the API'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch inverters that still lack data for the date (see EstadoRecoleccion)'
+        )
         parser.add_argument(
             '--pause',
             type=float,
-            default=1.0,
-            help='Pause time in seconds between inverter requests (default: 1.0)'
+            default=DEFAULT_MIN_INTERVAL,
+            help=f'Minimum time in seconds between inverter request starts (default: {DEFAULT_MIN_INTERVAL})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_MAX_IN_FLIGHT,
+            help=f'Maximum number of inverterDay requests in flight at once (default: {DEFAULT_MAX_IN_FLIGHT})'
+        )
+        parser.add_argument(
+            '--run-id',
+            type=int,
+            help='collect_all_gen run (EjecucionRecoleccion) to checkpoint inverters in; committed inverters are skipped'
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='Only collect shard K of N (e.g. 2/4) of the inverters; used by collection_worker tasks'
         )
 
     def handle(self, *args, **options):
         logger.info("|SolisInverterGen|handle| Starting Solis inverter generation collection")
         
-        fetcher = SolisFetcher()
-        logger.info("|SolisInverterGen|handle| Created SolisFetcher instance")
-        
         pause_time = options['pause']
-        logger.info(f"|SolisInverterGen|handle| Using pause time: {pause_time} seconds between requests")
+        logger.info(f"|SolisInverterGen|handle| Using pause time: {pause_time} seconds between request starts, {options['workers']} workers")
 
         # Handle date parameter
         if options['date']:
@@ -53,10 +82,25 @@ class Command(BaseCommand):
 
         logger.info(f"|SolisInverterGen|handle| Processing data for date: {collect_time}")
 
+        if options['replay']:
+            self.handle_replay(options['replay'], collect_time)
+            return
+
+        try:
+            fragmento = parse_fragmento(options.get('shard'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        fetcher = SolisFetcher()
+        logger.info("|SolisInverterGen|handle| Created SolisFetcher instance")
+
         # Get all Solis inverters (marca_inversor_id = 2)
         solis_inverters = Inversor.objects.filter(
             id_proyecto__marca_inversor_id=2
         ).select_related('id_proyecto')
+        if options['only_missing']:
+            solis_inverters = filtrar_pendientes(solis_inverters, NIVEL_INVERSOR, datetime.strptime(collect_time, '%Y-%m-%d').date())
+        solis_inverters = filtrar_fragmento(solis_inverters, fragmento)
 
         total_inverters = solis_inverters.count()
         logger.info(f"|SolisInverterGen|handle| Found {total_inverters} Solis inverters in database")
@@ -72,67 +116,54 @@ class Command(BaseCommand):
             f'Found {total_inverters} Solis inverters to process for date: {collect_time}'
         ))
         self.stdout.write(self.style.NOTICE(
-            f'Using pause time: {pause_time} seconds between requests'
+            f'Using pause time: {pause_time} seconds between request starts, {options["workers"]} requests in flight'
         ))
 
         successful_count = 0
         error_count = 0
-
-        for index, inversor in enumerate(solis_inverters, 1):
-            inverter_id = inversor.identificador_inversor
-            project_name = inversor.id_proyecto.dealname
-            
-            logger.info(f"|SolisInverterGen|handle| Processing inverter {index}/{total_inverters}: {inverter_id} ({project_name})")
-            self.stdout.write(self.style.NOTICE(
-                f'Processing {index}/{total_inverters}: Inverter {inverter_id} ({project_name})'
-            ))
-
-            try:
-                # Fetch data for this specific inverter
-                inverter_data = fetcher.fetch_solis_generacion_un_inversor_dia(
-                    inverter_id=inverter_id,
-                    collect_time=collect_time
-                )
-
-                # Store data in database
-                if inverter_data:
-                    try:
-                        insert_solis_generacion_inversor_dia(inverter_data)
-                        successful_count += 1
-                        logger.info(f"|SolisInverterGen|handle| Inverter {inverter_id} processed successfully: PVYield = {inverter_data.get('PVYield', 'N/A')} kWh")
-                        
-                        self.stdout.write(self.style.SUCCESS(
-                            f'✅ Inverter {inverter_id}: PVYield = {inverter_data.get("PVYield", "N/A")} kWh'
-                        ))
-                    except Exception as e:
-                        error_count += 1
-                        logger.error(f"|SolisInverterGen|handle| Error inserting data for inverter {inverter_id}: {e}")
-                        self.stdout.write(self.style.ERROR(
-                            f'❌ Error inserting data for inverter {inverter_id}: {e}'
-                        ))
-                else:
-                    logger.warning(f"|SolisInverterGen|handle| Inverter {inverter_id}: No data returned")
-                    self.stdout.write(self.style.WARNING(
-                        f'⚠️ Inverter {inverter_id}: No data returned'
-                    ))
-
-            except RuntimeError as e:
+        processed = 0
+        started = time.monotonic()
+
+        # Pages are filled in completion order, so checkpoints are kept per inverter rather than per page
+        checkpoints = PuntosControl(options.get('run_id'), 'solis_inverter_gen')
+        inverter_ids = [inversor.identificador_inversor for inversor in solis_inverters]
+        if checkpoints.run_id is not None:
+            inverter_ids = [inverter_id for inverter_id in inverter_ids if not checkpoints.completado(inverter_id)]
+            logger.info(f"|SolisInverterGen|handle| Run {checkpoints.run_id}: {total_inverters - len(inverter_ids)} inverters already committed, {len(inverter_ids)} left")
+        executor = SolisExecutor(fetcher, max_in_flight=options['workers'], min_interval=pause_time)
+
+        # Results come back in completion order; each page is stored with one bulk upsert
+        fecha = datetime.strptime(collect_time, '%Y-%m-%d').date()
+        for page_results, page_errors in executor.run_pages(inverter_ids, collect_time, page_size=DEFAULT_PAGE_SIZE):
+            # Failed fetches are recorded in the collection-state index; --only-missing retries them
+            registrar_estados(NIVEL_INVERSOR, [(inverter_id, fecha, ESTADO_ERROR, str(e)[:1000]) for inverter_id, e in page_errors.items()])
+            for inverter_id, e in page_errors.items():
                 error_count += 1
-                logger.error(f"|SolisInverterGen|handle| RuntimeError processing inverter {inverter_id}: {e}")
+                logger.error(f"|SolisInverterGen|handle| Error processing inverter {inverter_id}: {e}")
                 self.stdout.write(self.style.ERROR(
                     f'❌ Error processing inverter {inverter_id}: {e}'
                 ))
-            except Exception as e:
-                error_count += 1
-                logger.error(f"|SolisInverterGen|handle| Unexpected error processing inverter {inverter_id}: {e}")
-                self.stdout.write(self.style.ERROR(
-                    f'❌ Unexpected error processing inverter {inverter_id}: {e}'
-                ))
 
-            # Add pause between requests (except for the last one)
-            if index < total_inverters and pause_time > 0:
-                self.stdout.write(self.style.NOTICE(f'Pausing for {pause_time} seconds...'))
-                time.sleep(pause_time)
+            if page_results:
+                try:
+                    with checkpoints.lote(*[inverter_data['identificador_inversor'] for inverter_data in page_results]):
+                        insert_solis_generacion_inversores_dia(page_results)
+                    successful_count += len(page_results)
+                    for inverter_data in page_results:
+                        self.stdout.write(self.style.SUCCESS(
+                            f'✅ Inverter {inverter_data["identificador_inversor"]}: PVYield = {inverter_data.get("PVYield", "N/A")} kWh'
+                        ))
+                except Exception as e:
+                    error_count += len(page_results)
+                    logger.error(f"|SolisInverterGen|handle| Error inserting page of {len(page_results)} inverters: {e}")
+                    self.stdout.write(self.style.ERROR(
+                        f'❌ Error inserting data for {len(page_results)} inverters: {e}'
+                    ))
+
+            processed += len(page_results) + len(page_errors)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            logger.info(f"|SolisInverterGen|handle| Progress: {processed}/{total_inverters} inverters, {processed / elapsed * 60:.1f} inverters/min")
+            self.stdout.write(self.style.NOTICE(f'Processed {processed}/{total_inverters} inverters'))
 
         # Final summary
         logger.info(f"|SolisInverterGen|handle| Solis inverter generation collection completed. Total: {total_inverters}, Successful: {successful_count}, Errors: {error_count}")
@@ -153,4 +184,26 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.SUCCESS(
                 f'❌ Errors: {error_count}'
-            )) 
\ No newline at end of file
+            ))
+
+    def handle_replay(self, replay_dir, collect_time):
+        """Feed archived inverterDay responses for collect_time through the parse and store path."""
+        logger.info(f"|SolisInverterGen|handle_replay| Replaying archived Solis inverter payloads for {collect_time} from {replay_dir}")
+        archive = PayloadArchive(replay_dir)
+        successful_count = 0
+        error_count = 0
+        for record in archive.records('solis', 'inverterDay', collect_time):
+            context = record['context']
+            inverter_id = context['inverter_id']
+            try:
+                inverter_data = SolisFetcher.parse_generacion_un_inversor_dia(record['response'], inverter_id, context['collect_time'])
+                if inverter_data:
+                    insert_solis_generacion_inversor_dia(inverter_data)
+                    successful_count += 1
+            except Exception as e:
+                error_count += 1
+                logger.error(f"|SolisInverterGen|handle_replay| Error replaying inverter {inverter_id}: {e}")
+                self.stdout.write(self.style.ERROR(f'❌ Error replaying inverter {inverter_id}: {e}'))
+
+        logger.info(f"|SolisInverterGen|handle_replay| Replay completed for {collect_time}. Successful: {successful_count}, Errors: {error_count}")
+        self.stdout.write(self.style.SUCCESS(f'Replayed Solis inverters: {successful_count} successful, {error_count} errors.'))
@@ -1,13 +1,19 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.solisFetcher import SolisFetcher
+from solarDataFetch.fetchers.solisExecutor import SolisExecutor, DEFAULT_MAX_IN_FLIGHT, DEFAULT_MIN_INTERVAL
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
 from solarDataStore.cruds.solisCruds import insert_solis_generacion_sistema_dia
+from solarDataStore.cruds.estadoRecoleccionCruds import filtrar_pendientes, NIVEL_SISTEMA
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarData.models import Proyecto
 from django.utils import timezone
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Fetch and store Solis system production data for a specific date (with batch processing for >100 systems).'
 
     def add_arguments(self, parser):
@@ -16,12 +22,36 @@ class Command(BaseCommand):
             type=str,
             help='Date to collect data for in YYYY-MM-DD format (defaults to yesterday if not provided)'
         )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            help='Re-ingest archived raw vendor payloads from this directory instead of calling the API'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fetch systems that still lack data for the date (see EstadoRecoleccion)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_MAX_IN_FLIGHT,
+            help=f'Maximum number of page requests in flight at once (default: {DEFAULT_MAX_IN_FLIGHT})'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=DEFAULT_MIN_INTERVAL,
+            help=f'Minimum time in seconds between page request starts (default: {DEFAULT_MIN_INTERVAL})'
+        )
+        parser.add_argument(
+            '--run-id',
+            type=int,
+            help='collect_all_gen run (EjecucionRecoleccion) to checkpoint pages in; committed pages are skipped'
+        )
 
     def handle(self, *args, **options):
         logger.info("|SolisSystemGen|handle| Starting Solis system generation collection")
-        
-        fetcher = SolisFetcher()
-        logger.info("|SolisSystemGen|handle| Created SolisFetcher instance")
 
         # Handle date parameter
         if options['date']:
@@ -42,57 +72,90 @@ class Command(BaseCommand):
 
         logger.info(f"|SolisSystemGen|handle| Processing data for date: {collect_time}")
 
-        batch_number = 1
+        if options['replay']:
+            self.handle_replay(options['replay'], collect_time)
+            return
+
+        if options['only_missing']:
+            # stationDayEnergyList can only be paged through in full, so the only saving is skipping the call
+            pending = filtrar_pendientes(
+                Proyecto.objects.filter(marca_inversor_id=2), NIVEL_SISTEMA, datetime.strptime(collect_time, '%Y-%m-%d').date()
+            ).count()
+            if pending == 0:
+                logger.info(f"|SolisSystemGen|handle| Only missing: every Solis system already has data for {collect_time}, nothing to fetch")
+                self.stdout.write(self.style.SUCCESS(f'Every Solis system already has data for {collect_time}.'))
+                return
+            logger.info(f"|SolisSystemGen|handle| Only missing: {pending} Solis systems still lack data, fetching all pages")
+
+        fetcher = SolisFetcher()
+        logger.info("|SolisSystemGen|handle| Created SolisFetcher instance")
+
+        executor = SolisExecutor(fetcher, max_in_flight=options['workers'], min_interval=options['pause'])
+
+        # Page 1 reports the total; the remaining pages are fetched concurrently and stored as they arrive
+        checkpoints = PuntosControl(options.get('run_id'), 'solis_system_gen')
+        batches = 0
         total_systems = 0
-        
+        pages = executor.run_system_pages(
+            collect_time,
+            skip_pages={int(page) for page in checkpoints.completados('page-')},
+        )
         while True:
-            logger.info(f"|SolisSystemGen|handle| Processing batch {batch_number}")
-            self.stdout.write(self.style.NOTICE(f'Processing batch {batch_number}...'))
-            
             try:
-                system_data = fetcher.fetch_solis_generacion_sistema_dia(
-                    batch_number=batch_number,
-                    collect_time=collect_time
-                )
-                logger.info(f"|SolisSystemGen|handle| Batch {batch_number} fetched successfully: {len(system_data) if system_data else 0} systems")
+                batch_number, system_data = next(pages)
+            except StopIteration:
+                break
             except RuntimeError as e:
-                logger.error(f"|SolisSystemGen|handle| Error fetching system data (batch {batch_number}): {e}")
-                raise CommandError(f'Error fetching system data (batch {batch_number}): {e}')
+                logger.error(f"|SolisSystemGen|handle| Error fetching system data (batch {batches + 1}): {e}")
+                raise CommandError(f'Error fetching system data: {e}')
 
-            # Insert data into database
+            batches += 1
+            logger.info(f"|SolisSystemGen|handle| Batch {batch_number} fetched successfully: {len(system_data)} systems")
+            if checkpoints.completado(f'page-{batch_number}'):
+                logger.info(f"|SolisSystemGen|handle| Batch {batch_number} already committed in run {checkpoints.run_id}, skipping insert")
+                continue
+
+            # Insert data into database, committed together with the page checkpoint
             if system_data:
                 try:
-                    insert_solis_generacion_sistema_dia(system_data)
+                    with checkpoints.lote(f'page-{batch_number}'):
+                        insert_solis_generacion_sistema_dia(system_data)
                     logger.info(f"|SolisSystemGen|handle| Batch {batch_number} data inserted successfully")
                 except Exception as e:
                     logger.error(f"|SolisSystemGen|handle| Error inserting batch {batch_number} data: {e}")
                     raise
-                    
-                systems_in_batch = len(system_data)
-                total_systems += systems_in_batch
-                
+                total_systems += len(system_data)
                 self.stdout.write(self.style.SUCCESS(
-                    f'Batch {batch_number}: {systems_in_batch} systems processed.'
+                    f'Batch {batch_number}: {len(system_data)} systems processed.'
                 ))
-                
-                # If we got less than 100 systems, this is the last batch
-                if systems_in_batch < 100:
-                    logger.info(f"|SolisSystemGen|handle| Last batch completed. Total batches: {batch_number}, Total systems: {total_systems}")
-                    self.stdout.write(self.style.SUCCESS(
-                        f'Last batch completed. Total systems processed: {total_systems}'
-                    ))
-                    break
             else:
-                logger.warning(f"|SolisSystemGen|handle| Batch {batch_number}: No data returned. Stopping.")
+                logger.warning(f"|SolisSystemGen|handle| Batch {batch_number}: No data returned.")
                 self.stdout.write(self.style.WARNING(
-                    f'Batch {batch_number}: No data returned. Stopping.'
+                    f'Batch {batch_number}: No data returned.'
                 ))
-                break
-            
-            batch_number += 1
-            
-        logger.info(f"|SolisSystemGen|handle| Solis system generation collection completed successfully. Total batches: {batch_number}, Total systems: {total_systems}")
+
+        logger.info(f"|SolisSystemGen|handle| Solis system generation collection completed successfully. Total batches: {batches}, Total systems: {total_systems}")
         self.stdout.write(self.style.SUCCESS(
             f'Solis system generation data collection completed successfully. '
-            f'Total batches: {batch_number}, Total systems: {total_systems}'
-        )) 
\ No newline at end of file
+            f'Total batches: {batches}, Total systems: {total_systems}'
+        ))
+
+    def handle_replay(self, replay_dir, collect_time):
+        """Feed archived stationDayEnergyList pages for collect_time through the parse and store path."""
+        logger.info(f"|SolisSystemGen|handle_replay| Replaying archived Solis system payloads for {collect_time} from {replay_dir}")
+        archive = PayloadArchive(replay_dir)
+        batches = 0
+        total_systems = 0
+        for record in archive.records('solis', 'stationDayEnergyList', collect_time):
+            system_data = SolisFetcher.parse_generacion_sistema_dia(record['response'])
+            if system_data:
+                insert_solis_generacion_sistema_dia(system_data)
+                total_systems += len(system_data)
+            batches += 1
+
+        if batches == 0:
+            logger.warning(f"|SolisSystemGen|handle_replay| No archived Solis system payloads found for {collect_time}")
+            self.stdout.write(self.style.WARNING(f'No archived Solis system payloads found for {collect_time}.'))
+            return
+        logger.info(f"|SolisSystemGen|handle_replay| Replay completed for {collect_time}: {batches} batches, {total_systems} systems")
+        self.stdout.write(self.style.SUCCESS(f'Replayed {batches} batches: {total_systems} systems processed.'))
@@ -1,16 +1,19 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
+from solarData.management.base import ProfiledCommand
 from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
-from solarDataNewSystem.register.huaweiRegister import auto_register_huawei_systems
-from solarDataNewSystem.register.solisRegister import SolisRegister
-from solarDataNewSystem.register.hoymilesRegister import auto_register_hoymiles_systems
 import logging
 
 logger = logging.getLogger('management_commands')
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Auto-register new solar systems and inverters from all brands (Huawei, Solis, Hoymiles)'
 
     def handle(self, *args, **options):
+        # The registers import requests at module level; loaded here so --help does not pay for them
+        from solarDataNewSystem.register.huaweiRegister import auto_register_huawei_systems
+        from solarDataNewSystem.register.solisRegister import SolisRegister
+        from solarDataNewSystem.register.hoymilesRegister import auto_register_hoymiles_systems
+
         logger.info("|SystemAutoRegister|handle| Starting system auto-registration for all brands")
         self.stdout.write(self.style.SUCCESS('Starting system auto-registration...'))
         
@@ -24,10 +27,19 @@ class Command(BaseCommand):
         
         try:
             fetcher = HuaweiFetcher()
-            token = fetcher.login()
-            logger.info("|SystemAutoRegister|handle| Huawei login successful")
-            
-            results = auto_register_huawei_systems(token)
+            token = fetcher.get_token()
+            logger.info("|SystemAutoRegister|handle| Huawei token obtained")
+            
+            try:
+                results = auto_register_huawei_systems(token)
+            except RuntimeError as e:
+                # The cached token expired: refresh it once and start over (nothing is created before the station list is read)
+                if len(e.args) > 1 and e.args[1] == 305:
+                    logger.warning("|SystemAutoRegister|handle| Huawei session expired, refreshing token and retrying")
+                    token = fetcher.refresh_token(token)
+                    results = auto_register_huawei_systems(token)
+                else:
+                    raise
             
             self.stdout.write(self.style.SUCCESS('  Huawei registration complete:'))
             self.stdout.write(f'    - Total stations in API: {results["total_huawei_stations"]}')
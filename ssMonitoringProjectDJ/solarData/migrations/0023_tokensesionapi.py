@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solarData', '0022_alter_proyecto_pid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenSesionApi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proveedor', models.CharField(max_length=50, unique=True, verbose_name='proveedor de la API')),
+                ('token', models.TextField(blank=True, default='', verbose_name='token de sesión')),
+                ('fecha_obtencion', models.DateTimeField(blank=True, null=True, verbose_name='fecha de obtención del token')),
+            ],
+            options={
+                'verbose_name': 'Token de sesión API',
+                'verbose_name_plural': 'Tokens de sesión API',
+            },
+        ),
+    ]
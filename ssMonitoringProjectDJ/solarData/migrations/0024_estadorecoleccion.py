@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solarData', '0023_tokensesionapi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoRecoleccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nivel', models.CharField(choices=[('sistema', 'Sistema'), ('inversor', 'Inversor'), ('granular', 'Granular')], max_length=20, verbose_name='nivel')),
+                ('identificador', models.CharField(max_length=100, verbose_name='identificador (planta o inversor)')),
+                ('fecha', models.DateField(verbose_name='fecha de generación')),
+                ('estado', models.CharField(choices=[('completo', 'Completo'), ('sin_datos', 'Sin datos'), ('error', 'Error')], max_length=20, verbose_name='estado')),
+                ('mensaje', models.TextField(blank=True, default='', verbose_name='mensaje')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Estado de recolección',
+                'verbose_name_plural': 'Estados de recolección',
+                'unique_together': {('nivel', 'identificador', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-19 10:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solarData', '0024_estadorecoleccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionRecoleccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='fecha recolectada')),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='en_curso', max_length=20, verbose_name='estado')),
+                ('fecha_inicio', models.DateTimeField(auto_now_add=True, verbose_name='inicio de la ejecución')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='fin de la ejecución')),
+            ],
+            options={
+                'verbose_name': 'Ejecución de recolección',
+                'verbose_name_plural': 'Ejecuciones de recolección',
+                'ordering': ['-fecha_inicio'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PuntoControlRecoleccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comando', models.CharField(max_length=100, verbose_name='comando')),
+                ('lote', models.CharField(max_length=200, verbose_name='lote')),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True, verbose_name='fecha de registro')),
+                ('id_ejecucion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntos_control', to='solarData.ejecucionrecoleccion', verbose_name='ejecución')),
+            ],
+            options={
+                'verbose_name': 'Punto de control de recolección',
+                'verbose_name_plural': 'Puntos de control de recolección',
+                'unique_together': {('id_ejecucion', 'comando', 'lote')},
+            },
+        ),
+    ]
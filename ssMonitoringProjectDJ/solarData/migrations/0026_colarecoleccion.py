@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-19 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solarData', '0025_ejecucionrecoleccion_puntocontrolrecoleccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColaRecoleccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nivel', models.CharField(choices=[('sistema', 'Sistema'), ('inversor', 'Inversor'), ('granular', 'Granular')], max_length=20, verbose_name='nivel')),
+                ('identificador', models.CharField(max_length=100, verbose_name='identificador (planta o inversor)')),
+                ('fecha', models.DateField(verbose_name='fecha de generación')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('resuelto', 'Resuelto'), ('agotado', 'Agotado')], default='pendiente', max_length=20, verbose_name='estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='intentos')),
+                ('proximo_intento', models.DateTimeField(verbose_name='próximo intento')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='último error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='fecha de actualización')),
+                ('marca_inversor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='solarData.marcasinversores', verbose_name='marca de inversor')),
+            ],
+            options={
+                'verbose_name': 'Cola de re-recolección',
+                'verbose_name_plural': 'Cola de re-recolección',
+                'unique_together': {('nivel', 'identificador', 'fecha')},
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='solarData_c_estado_be1664_idx')],
+            },
+        ),
+    ]
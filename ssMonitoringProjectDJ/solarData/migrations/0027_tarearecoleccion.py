@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solarData', '0026_colarecoleccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaRecoleccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comando', models.CharField(max_length=100, verbose_name='comando')),
+                ('fecha', models.DateField(verbose_name='fecha recolectada')),
+                ('fragmento', models.CharField(blank=True, default='', max_length=20, verbose_name='fragmento (K/N)')),
+                ('opciones', models.JSONField(blank=True, default=dict, verbose_name='opciones del comando')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20, verbose_name='estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='intentos')),
+                ('max_intentos', models.PositiveIntegerField(default=3, verbose_name='máximo de intentos')),
+                ('disponible_desde', models.DateTimeField(verbose_name='disponible desde')),
+                ('trabajador', models.CharField(blank=True, default='', max_length=200, verbose_name='trabajador')),
+                ('ultimo_latido', models.DateTimeField(blank=True, null=True, verbose_name='último latido')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='último error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='fecha de finalización')),
+            ],
+            options={
+                'verbose_name': 'Tarea de recolección',
+                'verbose_name_plural': 'Tareas de recolección',
+                'unique_together': {('comando', 'fecha', 'fragmento')},
+                'indexes': [models.Index(fields=['estado', 'disponible_desde'], name='solarData_t_estado_5930ea_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-19 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solarData', '0027_tarearecoleccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TamanoLoteApi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=100, unique=True, verbose_name='endpoint de la API')),
+                ('tamano_lote', models.PositiveIntegerField(verbose_name='último tamaño de lote exitoso')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Tamaño de lote API',
+                'verbose_name_plural': 'Tamaños de lote API',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-19 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solarData', '0028_tamanoloteapi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionComando',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comando', models.CharField(max_length=100, verbose_name='comando')),
+                ('marca', models.CharField(blank=True, default='', max_length=20, verbose_name='marca (proveedor)')),
+                ('estado', models.CharField(choices=[('completada', 'Completada'), ('fallida', 'Fallida')], max_length=20, verbose_name='estado')),
+                ('fecha_inicio', models.DateTimeField(verbose_name='inicio')),
+                ('fecha_fin', models.DateTimeField(verbose_name='fin')),
+                ('duracion_segundos', models.FloatField(verbose_name='duración (s)')),
+                ('entidades', models.PositiveIntegerField(default=0, verbose_name='registros escritos')),
+                ('nulos', models.PositiveIntegerField(default=0, verbose_name='registros nulos')),
+                ('errores', models.PositiveIntegerField(default=0, verbose_name='errores')),
+                ('llamadas_api', models.PositiveIntegerField(default=0, verbose_name='llamadas a la API')),
+                ('limites_tasa', models.PositiveIntegerField(default=0, verbose_name='límites de tasa alcanzados')),
+                ('reintentos', models.PositiveIntegerField(default=0, verbose_name='reintentos')),
+                ('bytes_recibidos', models.PositiveBigIntegerField(default=0, verbose_name='bytes recibidos')),
+                ('segundos_http', models.FloatField(default=0, verbose_name='espera HTTP (s)')),
+                ('segundos_limite_tasa', models.FloatField(default=0, verbose_name='pausas por límite de tasa (s)')),
+                ('metricas', models.JSONField(blank=True, default=dict, verbose_name='métricas por etapa')),
+                ('mensaje_error', models.TextField(blank=True, default='', verbose_name='mensaje de error')),
+                ('id_ejecucion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comandos', to='solarData.ejecucionrecoleccion', verbose_name='ejecución')),
+            ],
+            options={
+                'verbose_name': 'Ejecución de comando',
+                'verbose_name_plural': 'Ejecuciones de comandos',
+                'ordering': ['-fecha_inicio'],
+                'indexes': [models.Index(fields=['comando', 'fecha_inicio'], name='solarData_e_comando_a4f994_idx')],
+            },
+        ),
+    ]
@@ -161,3 +161,188 @@ class GeneracionGranularDiaria(models.Model):
 
     def __str__(self):
         return f'p:{self.id_proyecto} - i:{self.id_inversor} - g:{self.id_granular} - {self.energia_generada_granular_dia}'
+
+class TokenSesionApi(models.Model):
+    proveedor = models.CharField(max_length=50, unique=True, verbose_name= 'proveedor de la API')
+    token = models.TextField(verbose_name= 'token de sesión', blank=True, default="")
+    fecha_obtencion = models.DateTimeField(verbose_name= 'fecha de obtención del token', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Token de sesión API'
+        verbose_name_plural = 'Tokens de sesión API'
+
+    def __str__(self):
+        return f'{self.proveedor} - {self.fecha_obtencion}'
+
+class TamanoLoteApi(models.Model):
+    endpoint = models.CharField(max_length=100, unique=True, verbose_name= 'endpoint de la API')
+    tamano_lote = models.PositiveIntegerField(verbose_name= 'último tamaño de lote exitoso')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name= 'fecha de actualización')
+
+    class Meta:
+        verbose_name = 'Tamaño de lote API'
+        verbose_name_plural = 'Tamaños de lote API'
+
+    def __str__(self):
+        return f'{self.endpoint} - {self.tamano_lote}'
+
+class EstadoRecoleccion(models.Model):
+    NIVEL_CHOICES = [
+        ('sistema', 'Sistema'),
+        ('inversor', 'Inversor'),
+        ('granular', 'Granular'),
+    ]
+    ESTADO_CHOICES = [
+        ('completo', 'Completo'),
+        ('sin_datos', 'Sin datos'),
+        ('error', 'Error'),
+    ]
+
+    nivel = models.CharField(max_length=20, choices=NIVEL_CHOICES, verbose_name= 'nivel')
+    identificador = models.CharField(max_length=100, verbose_name= 'identificador (planta o inversor)')
+    fecha = models.DateField(verbose_name= 'fecha de generación')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, verbose_name= 'estado')
+    mensaje = models.TextField(verbose_name= 'mensaje', blank=True, default="")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name= 'fecha de actualización')
+
+    class Meta:
+        verbose_name = 'Estado de recolección'
+        verbose_name_plural = 'Estados de recolección'
+        unique_together = ('nivel', 'identificador', 'fecha')
+
+    def __str__(self):
+        return f'{self.nivel} - {self.identificador} - {self.fecha}: {self.estado}'
+
+class EjecucionRecoleccion(models.Model):
+    ESTADO_CHOICES = [
+        ('en_curso', 'En curso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    fecha = models.DateField(verbose_name= 'fecha recolectada')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='en_curso', verbose_name= 'estado')
+    fecha_inicio = models.DateTimeField(auto_now_add=True, verbose_name= 'inicio de la ejecución')
+    fecha_fin = models.DateTimeField(verbose_name= 'fin de la ejecución', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Ejecución de recolección'
+        verbose_name_plural = 'Ejecuciones de recolección'
+        ordering = ['-fecha_inicio']
+
+    def __str__(self):
+        return f'Ejecución {self.pk} - {self.fecha} ({self.estado})'
+
+class EjecucionComando(models.Model):
+    ESTADO_CHOICES = [
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    id_ejecucion = models.ForeignKey(EjecucionRecoleccion, on_delete=models.CASCADE, verbose_name= 'ejecución', related_name='comandos')
+    comando = models.CharField(max_length=100, verbose_name= 'comando')
+    marca = models.CharField(max_length=20, blank=True, default="", verbose_name= 'marca (proveedor)')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, verbose_name= 'estado')
+    fecha_inicio = models.DateTimeField(verbose_name= 'inicio')
+    fecha_fin = models.DateTimeField(verbose_name= 'fin')
+    duracion_segundos = models.FloatField(verbose_name= 'duración (s)')
+    entidades = models.PositiveIntegerField(default=0, verbose_name= 'registros escritos')
+    nulos = models.PositiveIntegerField(default=0, verbose_name= 'registros nulos')
+    errores = models.PositiveIntegerField(default=0, verbose_name= 'errores')
+    llamadas_api = models.PositiveIntegerField(default=0, verbose_name= 'llamadas a la API')
+    limites_tasa = models.PositiveIntegerField(default=0, verbose_name= 'límites de tasa alcanzados')
+    reintentos = models.PositiveIntegerField(default=0, verbose_name= 'reintentos')
+    bytes_recibidos = models.PositiveBigIntegerField(default=0, verbose_name= 'bytes recibidos')
+    segundos_http = models.FloatField(default=0, verbose_name= 'espera HTTP (s)')
+    segundos_limite_tasa = models.FloatField(default=0, verbose_name= 'pausas por límite de tasa (s)')
+    metricas = models.JSONField(default=dict, blank=True, verbose_name= 'métricas por etapa')
+    mensaje_error = models.TextField(blank=True, default="", verbose_name= 'mensaje de error')
+
+    class Meta:
+        verbose_name = 'Ejecución de comando'
+        verbose_name_plural = 'Ejecuciones de comandos'
+        ordering = ['-fecha_inicio']
+        indexes = [models.Index(fields=['comando', 'fecha_inicio'])]
+
+    def __str__(self):
+        return f'{self.id_ejecucion_id} - {self.comando} ({self.estado}, {self.duracion_segundos:.0f}s)'
+
+    @property
+    def latencia_media_ms(self):
+        """Average vendor response time of the command's API calls"""
+        if not self.llamadas_api:
+            return None
+        return self.segundos_http / self.llamadas_api * 1000
+
+class PuntoControlRecoleccion(models.Model):
+    id_ejecucion = models.ForeignKey(EjecucionRecoleccion, on_delete=models.CASCADE, verbose_name= 'ejecución', related_name='puntos_control')
+    comando = models.CharField(max_length=100, verbose_name= 'comando')
+    lote = models.CharField(max_length=200, verbose_name= 'lote')
+    fecha_registro = models.DateTimeField(auto_now_add=True, verbose_name= 'fecha de registro')
+
+    class Meta:
+        verbose_name = 'Punto de control de recolección'
+        verbose_name_plural = 'Puntos de control de recolección'
+        unique_together = ('id_ejecucion', 'comando', 'lote')
+
+    def __str__(self):
+        return f'{self.id_ejecucion_id} - {self.comando} - {self.lote}'
+
+class ColaRecoleccion(models.Model):
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('resuelto', 'Resuelto'),
+        ('agotado', 'Agotado'),
+    ]
+
+    marca_inversor = models.ForeignKey(MarcasInversores, on_delete=models.CASCADE, verbose_name= 'marca de inversor')
+    nivel = models.CharField(max_length=20, choices=EstadoRecoleccion.NIVEL_CHOICES, verbose_name= 'nivel')
+    identificador = models.CharField(max_length=100, verbose_name= 'identificador (planta o inversor)')
+    fecha = models.DateField(verbose_name= 'fecha de generación')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name= 'estado')
+    intentos = models.PositiveIntegerField(default=0, verbose_name= 'intentos')
+    proximo_intento = models.DateTimeField(verbose_name= 'próximo intento')
+    ultimo_error = models.TextField(verbose_name= 'último error', blank=True, default="")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name= 'fecha de creación')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name= 'fecha de actualización')
+
+    class Meta:
+        verbose_name = 'Cola de re-recolección'
+        verbose_name_plural = 'Cola de re-recolección'
+        unique_together = ('nivel', 'identificador', 'fecha')
+        indexes = [models.Index(fields=['estado', 'proximo_intento'])]
+
+    def __str__(self):
+        return f'{self.nivel} - {self.identificador} - {self.fecha}: {self.estado} ({self.intentos})'
+
+class TareaRecoleccion(models.Model):
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_curso', 'En curso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    comando = models.CharField(max_length=100, verbose_name= 'comando')
+    fecha = models.DateField(verbose_name= 'fecha recolectada')
+    fragmento = models.CharField(max_length=20, blank=True, default="", verbose_name= 'fragmento (K/N)')
+    opciones = models.JSONField(default=dict, blank=True, verbose_name= 'opciones del comando')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name= 'estado')
+    intentos = models.PositiveIntegerField(default=0, verbose_name= 'intentos')
+    max_intentos = models.PositiveIntegerField(default=3, verbose_name= 'máximo de intentos')
+    disponible_desde = models.DateTimeField(verbose_name= 'disponible desde')
+    trabajador = models.CharField(max_length=200, blank=True, default="", verbose_name= 'trabajador')
+    ultimo_latido = models.DateTimeField(null=True, blank=True, verbose_name= 'último latido')
+    ultimo_error = models.TextField(blank=True, default="", verbose_name= 'último error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name= 'fecha de creación')
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name= 'fecha de finalización')
+
+    class Meta:
+        verbose_name = 'Tarea de recolección'
+        verbose_name_plural = 'Tareas de recolección'
+        unique_together = ('comando', 'fecha', 'fragmento')
+        indexes = [models.Index(fields=['estado', 'disponible_desde'])]
+
+    def __str__(self):
+        fragmento = f' [{self.fragmento}]' if self.fragmento else ''
+        return f'{self.comando}{fragmento} - {self.fecha}: {self.estado}'
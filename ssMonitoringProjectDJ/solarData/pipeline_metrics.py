@@ -0,0 +1,220 @@
+"""
+Collection Pipeline Metrics
+Per-stage timings and counters of the collection pipeline, kept in process memory and shared by
+every fetcher, executor worker, crud and command of a run (collect_all_gen runs the commands in
+one process, like the circuit breakers).
+
+Stage names are '<component>.<stage>':
+- huawei.login, huawei.http, huawei.parse, huawei.rate_limit_sleep (same for solis and hoymiles)
+- store.lookup, store.upsert
+- command.<command name>
+
+    with PipelineMetrics.stage('huawei.http') as stage:
+        response = requests.post(...)
+        stage.add(requests=1, bytes=len(response.content))
+
+Each stage keeps calls, errors, total/max seconds and the counters added to it (requests, bytes,
+rows, nulls, retries, rate_limits). collect_all_gen prints the table at the end of the run, stores
+each command's share in EjecucionComando and writes the run to settings.PIPELINE_METRICS_FILE: a
+JSON line per run, or the Prometheus text format when the file ends in '.prom' (node_exporter
+textfile collector).
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger('management_commands')
+
+COUNTERS = ('requests', 'bytes', 'rows', 'nulls', 'retries', 'rate_limits')
+
+
+class _Stage:
+    """Context manager timing one call of a stage; add() counters while it runs."""
+
+    __slots__ = ('name', 'counters', '_started')
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+
+    def add(self, **counters):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def __enter__(self):
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        PipelineMetrics.record(self.name, time.monotonic() - self._started, error=exc is not None, **self.counters)
+        return False
+
+
+class PipelineMetrics:
+    """Process-wide registry of stage metrics."""
+
+    _stages = {}
+    _lock = threading.Lock()
+    _started = time.time()
+
+    @classmethod
+    def stage(cls, name):
+        """Context manager timing one call of stage name."""
+        return _Stage(name)
+
+    @classmethod
+    def timed(cls, name):
+        """Decorator timing every call of the function as stage name."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with cls.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @classmethod
+    def record(cls, name, seconds=0.0, error=False, calls=1, **counters):
+        """
+        Adds one observation to a stage.
+        Args:
+            name (str): Stage name
+            seconds (float): Time spent
+            error (bool): The call raised
+            calls (int): Calls represented (0 to only add counters, e.g. a retry)
+            **counters: requests, bytes, rows, nulls, retries, rate_limits
+        """
+        with cls._lock:
+            stats = cls._stages.get(name)
+            if stats is None:
+                stats = cls._stages[name] = {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+            stats['calls'] += calls
+            stats['errors'] += int(error)
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            for key, value in counters.items():
+                stats[key] = stats.get(key, 0) + value
+
+    @classmethod
+    def add(cls, name, **counters):
+        """Adds counters to a stage without counting a call."""
+        cls.record(name, calls=0, **counters)
+
+    @classmethod
+    def reset(cls):
+        """Clears every stage (start of a collection run)."""
+        with cls._lock:
+            cls._stages = {}
+            cls._started = time.time()
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Returns:
+            dict: {stage: {calls, errors, seconds, max_seconds, <COUNTERS>}} sorted by stage
+        """
+        with cls._lock:
+            stages = {name: dict(stats) for name, stats in sorted(cls._stages.items())}
+        for stats in stages.values():
+            for key in COUNTERS:
+                stats.setdefault(key, 0)
+        return stages
+
+    @staticmethod
+    def diff(before, after):
+        """
+        Stage metrics accumulated between two snapshot() calls (max_seconds is the later maximum).
+        Returns:
+            dict: {stage: stats} for the stages with calls or counters in between
+        """
+        changes = {}
+        for name, stats in after.items():
+            previous = before.get(name, {})
+            delta = {
+                key: value if key == 'max_seconds' else value - previous.get(key, 0)
+                for key, value in stats.items()
+            }
+            if any(delta[key] for key in delta if key != 'max_seconds'):
+                changes[name] = delta
+        return changes
+
+    @classmethod
+    def summary_rows(cls):
+        """Rows of the run summary table: (stage, calls, total s, avg ms, max ms, requests, bytes, rows, retries, errors)."""
+        rows = []
+        for name, stats in cls.snapshot().items():
+            average = stats['seconds'] / stats['calls'] * 1000 if stats['calls'] else 0.0
+            rows.append((
+                name, stats['calls'], f"{stats['seconds']:.1f}", f"{average:.0f}", f"{stats['max_seconds'] * 1000:.0f}",
+                stats['requests'], stats['bytes'], stats['rows'], stats['retries'], stats['errors'],
+            ))
+        return rows
+
+    @classmethod
+    def to_json(cls, **labels):
+        """One JSON object: labels (e.g. run_id, date), run start/end and every stage."""
+        return json.dumps({
+            **labels,
+            'started': cls._started,
+            'finished': time.time(),
+            'stages': cls.snapshot(),
+        }, separators=(',', ':'), default=str)
+
+    @classmethod
+    def to_prometheus(cls, **labels):
+        """Prometheus text exposition format, one series per stage and measure."""
+        base = ''.join(f',{key}="{value}"' for key, value in labels.items() if value is not None)
+        stages = cls.snapshot()
+        lines = []
+        measures = [
+            ('calls', 'solar_pipeline_stage_calls_total', 'counter', 'Calls of each pipeline stage'),
+            ('errors', 'solar_pipeline_stage_errors_total', 'counter', 'Calls of each pipeline stage that raised'),
+            ('seconds', 'solar_pipeline_stage_seconds_total', 'counter', 'Time spent in each pipeline stage'),
+            ('max_seconds', 'solar_pipeline_stage_max_seconds', 'gauge', 'Slowest call of each pipeline stage'),
+        ] + [
+            (key, f'solar_pipeline_stage_{key}_total', 'counter', f'{key.title()} counted by each pipeline stage')
+            for key in COUNTERS
+        ]
+        for key, metric, kind, help_text in measures:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for name, stats in stages.items():
+                lines.append(f'{metric}{{stage="{name}"{base}}} {stats[key]:g}')
+        lines.append('# HELP solar_pipeline_run_timestamp_seconds End of the last collection run')
+        lines.append('# TYPE solar_pipeline_run_timestamp_seconds gauge')
+        lines.append(f'solar_pipeline_run_timestamp_seconds{{{base.lstrip(",")}}} {time.time():.0f}')
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def write(cls, path=None, **labels):
+        """
+        Writes the metrics to path (default settings.PIPELINE_METRICS_FILE): the Prometheus text
+        format replaces a '.prom' file, any other file gets one JSON line appended.
+        Returns:
+            str: The path written, or None when no file is configured
+        """
+        path = path or getattr(settings, 'PIPELINE_METRICS_FILE', None)
+        if not path:
+            return None
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix == '.prom':
+                # Written aside and renamed, so a collector never reads half a file
+                tmp = path.with_suffix('.prom.tmp')
+                tmp.write_text(cls.to_prometheus(**labels))
+                os.replace(tmp, path)
+            else:
+                with open(path, 'a') as f:
+                    f.write(cls.to_json(**labels) + '\n')
+        except OSError as e:
+            logger.warning(f"|PipelineMetrics|write| Could not write pipeline metrics to {path}: {e}")
+            return None
+        return str(path)
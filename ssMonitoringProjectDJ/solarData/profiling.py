@@ -0,0 +1,258 @@
+"""
+Command Profiling
+Profilers and the SQL tracer behind the --profile and --trace-sql options of the solarData
+management commands (solarData/management/base.py).
+
+- CommandProfiler('sample') samples the stacks of every thread of the process (executor workers
+  included) and writes <command>-<time>.collapsed, one 'frame;frame;frame count' line per stack
+  (flamegraph.pl, speedscope, inferno), and <command>-<time>.txt with the functions holding the
+  most samples.
+- CommandProfiler('cprofile') runs cProfile in the calling thread and writes <command>-<time>.prof
+  (python -m pstats, snakeviz, flameprof) and the same .txt summary.
+- SqlTrace wraps every database connection of the process while it is active and keeps the query
+  count, total SQL time, the slowest statements and the statements with the most time overall.
+
+    with CommandProfiler('huawei_system_gen', 'sample') as profiler, SqlTrace() as sql:
+        ...
+    profiler.files, sql.summary()
+
+Profiles go to settings.PROFILE_DIR.
+"""
+
+import collections
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+PROFILE_MODES = ('sample', 'cprofile')
+SAMPLE_INTERVAL = 0.01
+TOP_FUNCTIONS = 30
+SLOWEST_STATEMENTS = 10
+
+_secuencia = itertools.count(1)
+_activos = threading.local()
+
+
+def profile_path(nombre, extension):
+    """settings.PROFILE_DIR/<nombre>-<YYYYmmdd-HHMMSS>-<pid>-<n>.<extension>, the directory created if missing."""
+    directorio = Path(getattr(settings, 'PROFILE_DIR', None) or 'profiles')
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio / f"{nombre}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_secuencia)}.{extension}"
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """Daemon thread counting the stacks of the other threads every interval seconds."""
+
+    def __init__(self, interval):
+        super().__init__(name='command-profiler', daemon=True)
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.interval):
+            nombres = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(nombres.get(ident, f'thread-{ident}'))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._parar.set()
+        self.join()
+
+
+class CommandProfiler:
+    """
+    Context manager profiling a block in one of PROFILE_MODES and writing its files on exit.
+    A cProfile profiler started inside another one (a command run by collect_all_gen) pauses the
+    outer one while it runs, so each file only holds its own command.
+    """
+
+    def __init__(self, nombre, mode='sample', interval=SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; use one of {', '.join(PROFILE_MODES)}")
+        self.nombre = nombre
+        self.mode = mode
+        self.interval = interval
+        self.files = []
+        # (function, seconds spent in the function itself) with the most time first
+        self.top = []
+        self._profiler = None
+        self._sampler = None
+        self._outer = None
+
+    def __enter__(self):
+        if self.mode == 'cprofile':
+            stack = getattr(_activos, 'stack', None)
+            if stack is None:
+                stack = _activos.stack = []
+            self._outer = stack[-1] if stack else None
+            if self._outer is not None:
+                self._outer.disable()
+            self._profiler = cProfile.Profile()
+            stack.append(self._profiler)
+            self._profiler.enable()
+        else:
+            self._sampler = _Sampler(self.interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+            _activos.stack.pop()
+            # Written before resuming the outer profiler, which would otherwise count the dump
+            self.write_cprofile()
+            if self._outer is not None:
+                self._outer.enable()
+        else:
+            self._sampler.stop()
+            self.write_samples()
+        return False
+
+    def write_cprofile(self):
+        path = profile_path(self.nombre, 'prof')
+        self._profiler.dump_stats(str(path))
+        text = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=text)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        self.top = [
+            (pstats.func_std_string(func), own)
+            for func, (_, _, own, _, _) in sorted(stats.stats.items(), key=lambda item: -item[1][2])[:TOP_FUNCTIONS]
+        ]
+        self.files = [path, self.write_text(text.getvalue())]
+
+    def write_samples(self):
+        sampler = self._sampler
+        path = profile_path(self.nombre, 'collapsed')
+        with open(path, 'w') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(';'.join(frame.replace(';', ',') for frame in stack) + f' {count}\n')
+
+        # Samples in which a function is on the stack (inclusive) or running (self)
+        inclusive = collections.Counter()
+        own = collections.Counter()
+        for stack, count in sampler.stacks.items():
+            for frame in set(stack[1:]):
+                inclusive[frame] += count
+            if len(stack) > 1:
+                own[stack[-1]] += count
+        seconds = sampler.interval
+        self.top = [(frame, count * seconds) for frame, count in own.most_common(TOP_FUNCTIONS)]
+        lines = [
+            f'{sampler.samples} samples every {sampler.interval * 1000:.0f} ms of {len(sampler.stacks)} distinct stacks',
+            '', 'Inclusive (on the stack, any thread):',
+        ]
+        lines += [f'  {count * seconds:>9.2f}s  {frame}' for frame, count in inclusive.most_common(TOP_FUNCTIONS)]
+        lines += ['', 'Self (running, any thread):']
+        lines += [f'  {count * seconds:>9.2f}s  {frame}' for frame, count in own.most_common(TOP_FUNCTIONS)]
+        self.files = [path, self.write_text('\n'.join(lines) + '\n')]
+
+    def write_text(self, text):
+        path = profile_path(self.nombre, 'txt')
+        path.write_text(text)
+        return path
+
+
+class SqlTrace:
+    """
+    Context manager timing every statement run on any database connection of the process while it
+    is active: the connections already open and the ones worker threads open in the meantime.
+    """
+
+    # Literal lists of an IN (...) collapse so the same query with another batch groups together
+    _IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+    def __init__(self, slowest=SLOWEST_STATEMENTS):
+        self.slowest_limit = slowest
+        self.queries = 0
+        self.seconds = 0.0
+        self.slowest = []
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._wrapped = []
+
+    def __enter__(self):
+        for connection in connections.all(initialized_only=True):
+            self._wrap(connection)
+        connection_created.connect(self._connection_created, weak=False)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        connection_created.disconnect(self._connection_created)
+        for connection in self._wrapped:
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+        self._wrapped = []
+        return False
+
+    def _connection_created(self, sender, connection, **kwargs):
+        self._wrap(connection)
+
+    def _wrap(self, connection):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+            with self._lock:
+                self._wrapped.append(connection)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.monotonic() - started, many)
+
+    def record(self, sql, seconds, many=False):
+        statement = self._IN_LIST.sub('IN (...)', sql)
+        with self._lock:
+            self.queries += 1
+            self.seconds += seconds
+            stats = self.statements.setdefault(statement, [0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            if len(self.slowest) < self.slowest_limit or seconds > self.slowest[-1][0]:
+                self.slowest.append((seconds, ('[many] ' if many else '') + sql))
+                self.slowest.sort(key=lambda item: -item[0])
+                del self.slowest[self.slowest_limit:]
+
+    def summary(self, limit=None, width=300):
+        """
+        Returns:
+            list: Text lines with the totals, the slowest statements and the statements with the most total time
+        """
+        limit = limit or self.slowest_limit
+        with self._lock:
+            slowest = list(self.slowest)
+            heaviest = sorted(self.statements.items(), key=lambda item: -item[1][1])[:limit]
+            lines = [f'{self.queries} queries in {self.seconds:.2f}s ({len(self.statements)} distinct statements)']
+        lines.append('Slowest statements:')
+        lines += [f'  {seconds * 1000:>9.1f} ms  {sql[:width]}' for seconds, sql in slowest[:limit]]
+        lines.append('Most time overall:')
+        lines += [
+            f'  {seconds * 1000:>9.1f} ms  {count:>6}x  {statement[:width]}'
+            for statement, (count, seconds) in heaviest
+        ]
+        return lines
@@ -0,0 +1,434 @@
+"""
+Synthetic Fleet Generator
+Projects, inverters, granulars and years of daily generation with a realistic shape, for load
+tests and benchmarks of the collection, query, analysis and report code (generate_synthetic_fleet
+command, solarDataReports query budget tests).
+
+- Projects are spread over the inverter brands (MarcasInversores) with vendor-style identifiers:
+  Huawei plants with string inverters (huawei_devTypeId 1) or residential ones (38) and their
+  MPPTs, Solis plants with string inverters, Hoymiles plants with microinverters and channels.
+- Daily energy follows capacity x specific yield x two dry seasons a year x weather noise x
+  degradation, and contains what real data contains: null values, missing rows, whole-plant
+  outages, single inverter and MPPT failures (zero while the parent produced) and counter resets
+  (a day that reports the inverter's lifetime counter).
+- Everything is drawn from random.Random(f'{seed}-{project number}'), so a seed always produces the
+  same fleet, whatever the batch size.
+- Daily rows are loaded in batches with COPY on PostgreSQL and a multi-row INSERT (executemany)
+  elsewhere, without building model instances.
+
+Synthetic projects are named PREFIJO_SINTETICO + number and are removed by borrar_flota().
+"""
+
+import csv
+import io
+import logging
+import math
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from solarData.models import (
+    Ciudad, Departamento, GeneracionEnergiaDiaria, GeneracionGranularDiaria, GeneracionInversorDiaria,
+    Granular, Inversor, MarcasInversores, Proyecto,
+)
+
+logger = logging.getLogger('management_commands')
+
+PREFIJO_SINTETICO = 'SINTÉTICO '
+
+# Share of the projects per brand
+MEZCLA_MARCAS = (('Huawei', 0.55), ('Solis', 0.25), ('Hoymiles', 0.20))
+# MarcasInversores id each collection command selects its projects by (huaweiBatchPlanner,
+# solis_*_gen, backfill_gen)
+MARCA_IDS = {'Huawei': 1, 'Solis': 2, 'Hoymiles': 3}
+
+RENDIMIENTO_KWH_KWP = 4.1          # mean daily specific yield (kWh per kWp)
+DEGRADACION_ANUAL = 0.005
+PROB_NULO = 0.02                   # value stored as NULL
+PROB_SIN_FILA = 0.01               # no row at all for the day
+PROB_DIA_NUBLADO = 0.08
+PROB_APAGON = 0.002                # whole plant at zero for 1-5 days
+PROB_FALLA_INVERSOR = 0.003        # one inverter at zero for 1-10 days
+PROB_FALLA_GRANULAR = 0.003        # one MPPT/channel at zero for 1-15 days
+PROB_REINICIO_CONTADOR = 0.0005    # the day reports the lifetime counter instead of the daily yield
+FRACCION_NUEVOS = 0.2              # projects entering operation inside the generated range
+
+TAMANO_LOTE = 50000                # daily rows per COPY / INSERT batch
+LOTE_METADATOS = 1000
+
+
+class _CargadorFilas:
+    """Buffers the rows of one daily generation table and loads them in batches."""
+
+    def __init__(self, model, campos, tamano_lote):
+        """
+        Args:
+            model (Model): Daily generation model
+            campos (list): Field attnames of each row tuple (e.g. ['id_proyecto_id', ...])
+            tamano_lote (int): Rows per COPY / INSERT batch
+        """
+        self.model = model
+        self.campos = campos
+        self.columnas = [model._meta.get_field(campo.removesuffix('_id')).column for campo in campos]
+        self.tamano_lote = tamano_lote
+        self.filas = []
+        self.total = 0
+
+    def agregar(self, fila):
+        self.filas.append(fila)
+        if len(self.filas) >= self.tamano_lote:
+            self.vaciar()
+
+    def vaciar(self):
+        if not self.filas:
+            return
+        if connection.vendor == 'postgresql':
+            self._copy()
+        else:
+            sql = (
+                f'INSERT INTO {self.model._meta.db_table} ({", ".join(self.columnas)}) '
+                f'VALUES ({", ".join(["%s"] * len(self.columnas))})'
+            )
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, self.filas)
+        self.total += len(self.filas)
+        self.filas = []
+
+    def _copy(self):
+        # CSV COPY: an unquoted empty field is NULL
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for fila in self.filas:
+            writer.writerow(['' if valor is None else valor for valor in fila])
+        sql = f'COPY {self.model._meta.db_table} ({", ".join(self.columnas)}) FROM STDIN WITH (FORMAT csv)'
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                # psycopg2
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+
+def _energia(valor):
+    """Energy of a row as decimal text with 2 places (None stays None)."""
+    return None if valor is None else f'{valor:.2f}'
+
+
+def _marca(rng):
+    punto = rng.random()
+    acumulado = 0.0
+    for marca, peso in MEZCLA_MARCAS:
+        acumulado += peso
+        if punto < acumulado:
+            return marca
+    return MEZCLA_MARCAS[-1][0]
+
+
+def _estacionalidad(fecha):
+    """Two dry seasons a year (Dec-Feb and Jun-Aug) above the rainy ones, as in the Andean region."""
+    return 1 + 0.10 * math.cos(4 * math.pi * (fecha.timetuple().tm_yday - 20) / 365.25)
+
+
+def _especificacion(numero, semilla, inicio, fin):
+    """
+    Random description of synthetic project number, the same for the same seed.
+    Returns:
+        dict: marca, identificador, entrada, capacidad_ac, capacidad_dc, rendimiento and
+              inversores [{identificador, devtype, capacidad, granulares}]
+    """
+    rng = random.Random(f'{semilla}-{numero}')
+    marca = _marca(rng)
+    dias = (fin - inicio).days + 1
+    if rng.random() < FRACCION_NUEVOS:
+        entrada = inicio + timedelta(days=rng.randrange(dias))
+    else:
+        entrada = inicio - timedelta(days=rng.randrange(1, 3 * 365))
+
+    inversores = []
+    if marca == 'Huawei':
+        identificador = f'NE=9{numero:08d}'
+        if rng.random() < 0.4:
+            # Residential: one inverter, two MPPTs
+            inversores.append({'devtype': '38', 'capacidad': rng.choice((3, 5, 6, 8, 10)), 'granulares': 2})
+        else:
+            for _ in range(rng.randint(1, 6)):
+                inversores.append({'devtype': '1', 'capacidad': rng.choice((20, 30, 40, 50, 60, 100)), 'granulares': rng.randint(2, 6)})
+        for orden, inversor in enumerate(inversores):
+            inversor['identificador'] = f'NE=8{numero:08d}{orden:02d}'
+    elif marca == 'Solis':
+        identificador = f'9{numero:018d}'
+        for orden in range(rng.randint(1, 3)):
+            inversores.append({
+                'identificador': f'9S{numero:010d}{orden:02d}', 'devtype': None,
+                'capacidad': rng.choice((5, 10, 15, 25, 36, 50)), 'granulares': 0,
+            })
+    else:
+        identificador = f'9{numero:07d}'
+        for orden in range(rng.randint(2, 20)):
+            inversores.append({
+                'identificador': f'9H{numero:08d}{orden:03d}', 'devtype': None,
+                'capacidad': rng.choice((0.8, 1.6, 2.0)), 'granulares': rng.choice((2, 4)),
+            })
+
+    capacidad_ac = sum(inversor['capacidad'] for inversor in inversores)
+    return {
+        'marca': marca,
+        'identificador': identificador,
+        'entrada': entrada,
+        'capacidad_ac': capacidad_ac,
+        'capacidad_dc': round(capacidad_ac * rng.uniform(1.05, 1.3), 3),
+        'rendimiento': RENDIMIENTO_KWH_KWP * rng.uniform(0.8, 1.15),
+        'inversores': inversores,
+    }
+
+
+def _generar_metadatos(especificaciones, semilla):
+    """
+    Creates the projects, inverters and granulars in bulk.
+    Returns:
+        list: [(especificacion, proyecto, [(inversor, [granular, ...]), ...]), ...] in project order
+    """
+    departamento, _ = Departamento.objects.get_or_create(nombre_departamento='Antioquia')
+    ciudad_defecto, _ = Ciudad.objects.get_or_create(nombre_ciudad='Medellín', id_departamento=departamento)
+    ciudades = list(Ciudad.objects.order_by('id').values_list('id', flat=True)[:200]) or [ciudad_defecto.id]
+    marcas = {}
+    for marca, _ in MEZCLA_MARCAS:
+        marcas[marca], _ = MarcasInversores.objects.get_or_create(id=MARCA_IDS[marca], defaults={'marca': marca})
+        if marcas[marca].marca != marca:
+            logger.warning(f"|SyntheticFleet|_generar_metadatos| Brand id {MARCA_IDS[marca]} is '{marcas[marca].marca}', used for the synthetic {marca} projects")
+
+    # Rows created below have ids above these (re-read so the objects carry their primary keys on every backend)
+    ultimos = {
+        model: model.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+        for model in (Proyecto, Inversor, Granular)
+    }
+
+    proyectos = []
+    for numero, especificacion in especificaciones:
+        rng = random.Random(f'{semilla}-{numero}-metadatos')
+        # Monthly targets from the expected yield; a tenth of the projects have none
+        prometida = None
+        minima = None
+        if rng.random() > 0.1:
+            prometida = Decimal(f"{especificacion['capacidad_dc'] * RENDIMIENTO_KWH_KWP * 30 * 0.9:.2f}")
+            minima = (prometida * Decimal('0.8')).quantize(Decimal('0.01'))
+        proyectos.append(Proyecto(
+            dealname=f'{PREFIJO_SINTETICO}{numero}',
+            id_ciudad_id=rng.choice(ciudades),
+            marca_inversor=marcas[especificacion['marca']],
+            fecha_entrada_en_operacion=especificacion['entrada'],
+            energia_prometida_mes=prometida,
+            energia_minima_mes=minima,
+            identificador_planta=especificacion['identificador'],
+            capacidad_instalada_ac=Decimal(f"{especificacion['capacidad_ac']:.3f}"),
+            capacidad_instalada_dc=Decimal(f"{especificacion['capacidad_dc']:.3f}"),
+            restriccion_de_autoconsumo=rng.random() < 0.15,
+        ))
+    Proyecto.objects.bulk_create(proyectos, batch_size=LOTE_METADATOS)
+    por_nombre = {
+        proyecto.dealname: proyecto
+        for proyecto in Proyecto.objects.filter(id__gt=ultimos[Proyecto], dealname__startswith=PREFIJO_SINTETICO)
+    }
+
+    inversores = []
+    for numero, especificacion in especificaciones:
+        proyecto = por_nombre[f'{PREFIJO_SINTETICO}{numero}']
+        for inversor in especificacion['inversores']:
+            inversores.append(Inversor(
+                id_proyecto=proyecto,
+                identificador_inversor=inversor['identificador'],
+                huawei_devTypeId=inversor['devtype'],
+                capacidad_inversor=Decimal(f"{inversor['capacidad']:.2f}"),
+            ))
+    Inversor.objects.bulk_create(inversores, batch_size=LOTE_METADATOS)
+    inversores_por_identificador = {
+        inversor.identificador_inversor: inversor
+        for inversor in Inversor.objects.filter(id__gt=ultimos[Inversor])
+    }
+
+    granulares = []
+    for _, especificacion in especificaciones:
+        for inversor in especificacion['inversores']:
+            objeto = inversores_por_identificador[inversor['identificador']]
+            for orden in range(1, inversor['granulares'] + 1):
+                granulares.append(Granular(
+                    id_proyecto_id=objeto.id_proyecto_id, id_inversor=objeto,
+                    serial_granular=f"{inversor['identificador']}-{orden}", tipo_granular='MPPT',
+                ))
+    Granular.objects.bulk_create(granulares, batch_size=LOTE_METADATOS)
+    granulares_por_inversor = {}
+    for granular in Granular.objects.filter(id__gt=ultimos[Granular]):
+        granulares_por_inversor.setdefault(granular.id_inversor_id, []).append(granular)
+
+    resultado = []
+    for numero, especificacion in especificaciones:
+        proyecto = por_nombre[f'{PREFIJO_SINTETICO}{numero}']
+        dispositivos = []
+        for inversor in especificacion['inversores']:
+            objeto = inversores_por_identificador[inversor['identificador']]
+            granulares_inversor = sorted(
+                granulares_por_inversor.get(objeto.id, []),
+                key=lambda granular: int(granular.serial_granular.rsplit('-', 1)[1]),
+            )
+            dispositivos.append((inversor, objeto, granulares_inversor))
+        resultado.append((especificacion, proyecto, dispositivos))
+    return resultado
+
+
+def _duracion_falla(rng, probabilidad, maximo):
+    """Days a failure starting today lasts (0 when none starts)."""
+    return rng.randint(1, maximo) if rng.random() < probabilidad else 0
+
+
+def _generar_diarios(rng, especificacion, proyecto, dispositivos, fechas, sistemas, por_inversor, por_granular):
+    """Adds the daily rows of one project to the three loaders."""
+    inicio_operacion = especificacion['entrada']
+    apagon = 0
+    fallas_inversor = {}
+    fallas_granular = {}
+    acumulados = {}
+    # Each inverter and MPPT has a fixed share of the plant and of its inverter
+    capacidad_total = sum(inversor['capacidad'] for inversor, _, _ in dispositivos) or 1
+    pesos_granular = {
+        objeto.id: [rng.uniform(0.85, 1.15) for _ in granulares]
+        for _, objeto, granulares in dispositivos
+    }
+
+    for fecha in fechas:
+        if fecha < inicio_operacion:
+            continue
+        anios = (fecha - inicio_operacion).days / 365.25
+        clima = rng.gauss(1.0, 0.15)
+        if rng.random() < PROB_DIA_NUBLADO:
+            clima = rng.uniform(0.3, 0.6)
+        clima = min(1.25, max(0.15, clima))
+        base = (
+            especificacion['capacidad_dc'] * especificacion['rendimiento'] * _estacionalidad(fecha)
+            * clima * (1 - DEGRADACION_ANUAL * anios)
+        )
+
+        # Days left of each failure, today included
+        apagon = apagon - 1 if apagon > 0 else _duracion_falla(rng, PROB_APAGON, 5)
+        total_sistema = 0.0
+        for inversor, objeto, granulares in dispositivos:
+            restante = fallas_inversor.get(objeto.id, 0)
+            fallas_inversor[objeto.id] = restante - 1 if restante > 0 else _duracion_falla(rng, PROB_FALLA_INVERSOR, 10)
+            if apagon or fallas_inversor[objeto.id]:
+                energia_inversor = 0.0
+            else:
+                energia_inversor = base * inversor['capacidad'] / capacidad_total * rng.uniform(0.97, 1.03)
+            total_sistema += energia_inversor
+            acumulados[objeto.id] = acumulados.get(objeto.id, 0.0) + energia_inversor
+
+            # Granulars: the inverter's energy split by MPPT/channel, a failed one at zero
+            pesos = pesos_granular[objeto.id]
+            suma_pesos = sum(pesos) or 1
+            for granular, peso in zip(granulares, pesos):
+                restante = fallas_granular.get(granular.id, 0)
+                fallas_granular[granular.id] = restante - 1 if restante > 0 else _duracion_falla(rng, PROB_FALLA_GRANULAR, 15)
+                if rng.random() < PROB_SIN_FILA:
+                    continue
+                energia = 0.0 if fallas_granular[granular.id] else energia_inversor * peso / suma_pesos
+                if rng.random() < PROB_NULO:
+                    energia = None
+                por_granular.agregar((proyecto.id, objeto.id, granular.id, fecha, _energia(energia)))
+
+            if rng.random() < PROB_SIN_FILA:
+                continue
+            energia = energia_inversor
+            if rng.random() < PROB_REINICIO_CONTADOR:
+                energia = acumulados[objeto.id]
+            elif rng.random() < PROB_NULO:
+                energia = None
+            por_inversor.agregar((proyecto.id, objeto.id, fecha, _energia(energia)))
+
+        if rng.random() < PROB_SIN_FILA:
+            continue
+        sistemas.agregar((proyecto.id, fecha, _energia(None if rng.random() < PROB_NULO else total_sistema)))
+
+
+def generar_flota(proyectos, dias, fin=None, semilla=0, tamano_lote=TAMANO_LOTE, primer_numero=None):
+    """
+    Creates proyectos synthetic projects with dias days of daily generation ending on fin.
+
+    Args:
+        proyectos (int): Projects to create
+        dias (int): Days of generation
+        fin (date): Last generated day (defaults to yesterday)
+        semilla (int): Random seed; the same seed and numbers give the same fleet
+        tamano_lote (int): Daily rows per COPY / INSERT batch
+        primer_numero (int): Number of the first project (defaults to after the existing synthetic ones)
+
+    Returns:
+        dict: Created proyectos, inversores, granulares, filas_sistema, filas_inversor, filas_granular and segundos
+    """
+    started = time.monotonic()
+    fin = fin or date.today() - timedelta(days=1)
+    inicio = fin - timedelta(days=dias - 1)
+    fechas = [inicio + timedelta(days=offset) for offset in range(dias)]
+    if primer_numero is None:
+        primer_numero = Proyecto.objects.filter(dealname__startswith=PREFIJO_SINTETICO).count()
+
+    numeros = range(primer_numero, primer_numero + proyectos)
+    especificaciones = [(numero, _especificacion(numero, semilla, inicio, fin)) for numero in numeros]
+
+    sistemas = _CargadorFilas(GeneracionEnergiaDiaria, ['id_proyecto_id', 'fecha_generacion_dia', 'energia_generada_dia'], tamano_lote)
+    por_inversor = _CargadorFilas(
+        GeneracionInversorDiaria,
+        ['id_proyecto_id', 'id_inversor_id', 'fecha_generacion_inversor_dia', 'energia_generada_inversor_dia'],
+        tamano_lote,
+    )
+    por_granular = _CargadorFilas(
+        GeneracionGranularDiaria,
+        ['id_proyecto_id', 'id_inversor_id', 'id_granular_id', 'fecha_generacion_granular_dia', 'energia_generada_granular_dia'],
+        tamano_lote,
+    )
+
+    with transaction.atomic():
+        flota = _generar_metadatos(especificaciones, semilla)
+        logger.info(f"|SyntheticFleet|generar_flota| {len(flota)} projects created, generating {dias} days from {inicio} to {fin}")
+        for (numero, _), (especificacion, proyecto, dispositivos) in zip(especificaciones, flota):
+            rng = random.Random(f'{semilla}-{numero}-diarios')
+            _generar_diarios(rng, especificacion, proyecto, dispositivos, fechas, sistemas, por_inversor, por_granular)
+        for cargador in (sistemas, por_inversor, por_granular):
+            cargador.vaciar()
+
+    resumen = {
+        'proyectos': len(flota),
+        'inversores': sum(len(dispositivos) for _, _, dispositivos in flota),
+        'granulares': sum(len(granulares) for _, _, dispositivos in flota for _, _, granulares in dispositivos),
+        'filas_sistema': sistemas.total,
+        'filas_inversor': por_inversor.total,
+        'filas_granular': por_granular.total,
+        'segundos': round(time.monotonic() - started, 2),
+    }
+    logger.info(f"|SyntheticFleet|generar_flota| Fleet generated: {resumen}")
+    return resumen
+
+
+def borrar_flota():
+    """
+    Deletes every synthetic project with its inverters, granulars and daily rows.
+    Returns:
+        int: Projects deleted
+    """
+    proyectos = Proyecto.objects.filter(dealname__startswith=PREFIJO_SINTETICO)
+    with transaction.atomic():
+        # Daily tables first: without dependants each is a single DELETE, not a cascade collected in memory
+        GeneracionGranularDiaria.objects.filter(id_proyecto__in=proyectos).delete()
+        GeneracionInversorDiaria.objects.filter(id_proyecto__in=proyectos).delete()
+        GeneracionEnergiaDiaria.objects.filter(id_proyecto__in=proyectos).delete()
+        Granular.objects.filter(id_proyecto__in=proyectos).delete()
+        Inversor.objects.filter(id_proyecto__in=proyectos).delete()
+        borrados = proyectos.count()
+        proyectos.delete()
+    logger.info(f"|SyntheticFleet|borrar_flota| {borrados} synthetic projects deleted")
+    return borrados
@@ -0,0 +1,42 @@
+"""
+Test runner (settings.TEST_RUNNER).
+
+Migration 0015 moves the projects' text locations to Ciudad and falls back to the 'vacia' city,
+which production got by hand between 0014 and 0015. The test database is built from the
+migrations, so the runner creates that city right before 0015 is applied.
+"""
+
+from contextlib import contextmanager
+from unittest import mock
+
+from django.db.migrations.executor import MigrationExecutor
+from django.test.runner import DiscoverRunner
+
+MIGRACION_UBICACIONES = ('solarData', '0015_auto_20250708_1840')
+CIUDAD_VACIA = 'vacia'
+
+
+@contextmanager
+def ciudad_vacia_antes_de_0015():
+    """Seeds the 'vacia' Ciudad (with its Departamento) when the executor reaches migration 0015."""
+    apply_migration = MigrationExecutor.apply_migration
+
+    def sembrar_y_aplicar(executor, state, migration, *args, **kwargs):
+        if (migration.app_label, migration.name) == MIGRACION_UBICACIONES:
+            alias = executor.connection.alias
+            Departamento = state.apps.get_model('solarData', 'Departamento')
+            Ciudad = state.apps.get_model('solarData', 'Ciudad')
+            departamento, _ = Departamento.objects.using(alias).get_or_create(nombre_departamento=CIUDAD_VACIA)
+            Ciudad.objects.using(alias).get_or_create(nombre_ciudad=CIUDAD_VACIA, id_departamento=departamento)
+        return apply_migration(executor, state, migration, *args, **kwargs)
+
+    with mock.patch.object(MigrationExecutor, 'apply_migration', sembrar_y_aplicar):
+        yield
+
+
+class SolarTestRunner(DiscoverRunner):
+    """DiscoverRunner whose test databases get the 'vacia' city that migration 0015 expects."""
+
+    def setup_databases(self, **kwargs):
+        with ciudad_vacia_antes_de_0015():
+            return super().setup_databases(**kwargs)
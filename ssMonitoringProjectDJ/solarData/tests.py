@@ -1,3 +1,16 @@
-from django.test import TestCase
+"""
+Startup budget of the management commands: loading any solarData command (what --help and every
+cron, job queue or n8n invocation do before handle()) must not import the heavy libraries, which
+load on first use. Needs no db or network:
+    DB_ENGINE=sqlite python manage.py test solarData
+"""
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from solarData.management.commands.benchmark_startup import heavy_modules_loaded, solar_commands
+
+
+class CommandStartupTests(SimpleTestCase):
+
+    def test_commands_load_without_heavy_modules(self):
+        self.assertEqual(heavy_modules_loaded(solar_commands()), [])
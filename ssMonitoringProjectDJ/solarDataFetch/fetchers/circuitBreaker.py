@@ -0,0 +1,188 @@
+"""
+Vendor Circuit Breaker
+Stops sending requests to a vendor cloud that keeps failing, so one degraded vendor does not
+hold the nightly collection hostage while every batch waits for its own timeout.
+
+- One breaker per vendor and process, shared by every fetcher, executor worker and command
+  (collect_all_gen runs the commands in one process, so an open Huawei circuit also short-cuts
+  the later Huawei commands of the run).
+- closed: requests go through. Timeouts, connection errors and HTTP 5xx count as failures; any
+  answer from the vendor (including 4xx and API-level errors) resets the count.
+- open: after failure_threshold consecutive failures requests fail fast with CircuitOpenError
+  (a RuntimeError, like every other fetch error) without touching the network.
+- half_open: once reset_timeout has passed a single probe request is let through; success closes
+  the circuit, failure opens it for another reset_timeout.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Second arg of the RuntimeError raised while the circuit is open
+CIRCUIT_OPEN_ERROR_CODE = 'circuit_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 300    # seconds before an open circuit lets a probe through
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request while the vendor's circuit is open."""
+
+    def __init__(self, vendor, retry_in):
+        super().__init__(
+            f"{vendor} circuit open after repeated failures, request not sent (next probe in {max(0, retry_in):.0f}s)",
+            CIRCUIT_OPEN_ERROR_CODE,
+        )
+        self.vendor = vendor
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one vendor. Wrap each HTTP call (request and
+    raise_for_status only) in the breaker:
+
+        with self.breaker:
+            response = self.session.post(url, json=body, timeout=self.timeout)
+            response.raise_for_status()
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, vendor, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.vendor = vendor
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = max(0.0, reset_timeout)
+        self.logger = logging.getLogger(f'{vendor}_fetcher')
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_error = ""
+
+    @classmethod
+    def for_vendor(cls, vendor):
+        """Process-wide breaker of a vendor ('huawei', 'solis', 'hoymiles'), configured from settings.VENDOR_CIRCUIT_BREAKER."""
+        with cls._registry_lock:
+            if vendor not in cls._registry:
+                config = getattr(settings, 'VENDOR_CIRCUIT_BREAKER', {})
+                cls._registry[vendor] = cls(
+                    vendor,
+                    failure_threshold=config.get('failure_threshold', DEFAULT_FAILURE_THRESHOLD),
+                    reset_timeout=config.get('reset_timeout', DEFAULT_RESET_TIMEOUT),
+                )
+            return cls._registry[vendor]
+
+    @classmethod
+    def reset_all(cls):
+        """Closes every breaker and clears its counters (start of a collection run)."""
+        with cls._registry_lock:
+            breakers = list(cls._registry.values())
+        for breaker in breakers:
+            breaker.reset()
+
+    @classmethod
+    def summary(cls):
+        """
+        State of every breaker used in this process.
+        Returns:
+            dict: {vendor: snapshot()}
+        """
+        with cls._registry_lock:
+            breakers = sorted(cls._registry.items())
+        return {vendor: breaker.snapshot() for vendor, breaker in breakers}
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self.times_opened = 0
+            self.rejected = 0
+            self.last_error = ""
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: state, consecutive_failures, times_opened, rejected (requests not sent) and last_error
+        """
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'last_error': self.last_error,
+            }
+
+    def before_request(self):
+        """Lets a request through or raises CircuitOpenError. Pair every successful call with record_success/record_failure."""
+        with self._lock:
+            if self._state == OPEN:
+                retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+                if retry_in > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.vendor, retry_in)
+                self._state = HALF_OPEN
+                self.logger.info(f"|CircuitBreaker|before_request| {self.vendor} circuit half-open, sending a probe request")
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.vendor, self.reset_timeout)
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self.logger.info(f"|CircuitBreaker|record_success| {self.vendor} probe succeeded, circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self._failures += 1
+            self.last_error = str(error)[:500]
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.times_opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                self.logger.error(f"|CircuitBreaker|record_failure| {self.vendor} circuit opened after {self._failures} consecutive failures, failing fast for {self.reset_timeout:.0f}s. Last error: {self.last_error}")
+
+    @staticmethod
+    def is_failure(exc):
+        """Timeouts, connection errors and HTTP 5xx mean the vendor is unavailable; anything else is an answer."""
+        import requests
+        if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return True
+        if isinstance(exc, requests.exceptions.HTTPError):
+            response = exc.response
+            return response is None or response.status_code >= 500
+        return False
+
+    def __enter__(self):
+        self.before_request()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and self.is_failure(exc):
+            self.record_failure(exc)
+        else:
+            self.record_success()
+        return False
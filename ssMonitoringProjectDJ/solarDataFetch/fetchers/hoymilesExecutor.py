@@ -0,0 +1,152 @@
+"""
+Hoymiles Concurrent Executor
+Fetches mi_data_day for many microinverters at once without tripping the per-minute quota.
+
+- HoymilesMinuteBudget spaces requests so no more than calls_per_minute start in any 60 second
+  window. It is shared by every executor in the process, so parallel commands (e.g. the backfill
+  day pool) draw from one budget. If the API still answers "More than times of calls per minute",
+  every worker pauses until the window has passed instead of each sleeping on its own.
+- HoymilesExecutor runs the requests on a bounded thread pool, grouped by station, and hands each
+  station's results back to the calling thread once all of its microinverters are done, so the
+  caller can store a whole station with one bulk call on its own DB connection.
+"""
+
+import logging
+import threading
+import time
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from solarDataFetch.fetchers.hoymilesFetcher import RATE_LIMIT_ERROR_CODE, rate_limit_window
+from solarData.pipeline_metrics import PipelineMetrics
+
+logger = logging.getLogger('hoymiles_fetcher')
+
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_CALLS_PER_MINUTE = 30
+RATE_LIMIT_RETRIES = 3
+
+
+def rate_limit_pause():
+    """Seconds every worker waits after a quota error: the quota window plus one second (61 on the real API)."""
+    return rate_limit_window() + 1
+
+
+class HoymilesMinuteBudget:
+    """
+    Sliding one-minute request budget shared by all Hoymiles workers of the process.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, calls_per_minute=DEFAULT_CALLS_PER_MINUTE):
+        self.calls_per_minute = max(1, calls_per_minute)
+        self._starts = deque()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, calls_per_minute=DEFAULT_CALLS_PER_MINUTE):
+        """Process-wide budget; the first caller sets calls_per_minute, later callers may lower it."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(calls_per_minute)
+            else:
+                cls._shared.calls_per_minute = min(cls._shared.calls_per_minute, max(1, calls_per_minute))
+            return cls._shared
+
+    def acquire(self):
+        """Blocks until a request may start, then records its start."""
+        while True:
+            window = rate_limit_window()
+            with self._lock:
+                now = time.monotonic()
+                while self._starts and now - self._starts[0] >= window:
+                    self._starts.popleft()
+                wait = self._paused_until - now
+                if wait <= 0 and len(self._starts) >= self.calls_per_minute:
+                    wait = self._starts[0] + window - now
+                if wait <= 0:
+                    self._starts.append(now)
+                    return
+            with PipelineMetrics.stage('hoymiles.rate_limit_sleep'):
+                time.sleep(wait)
+
+    def pause(self, seconds=None):
+        """Stops every worker from starting requests for the given number of seconds (default rate_limit_pause())."""
+        if seconds is None:
+            seconds = rate_limit_pause()
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class HoymilesExecutor:
+    """
+    Runs mi_data_day requests concurrently under a shared per-minute budget, station by station.
+    """
+
+    def __init__(self, fetcher, max_in_flight=DEFAULT_MAX_IN_FLIGHT, calls_per_minute=DEFAULT_CALLS_PER_MINUTE):
+        self.fetcher = fetcher
+        self.max_in_flight = max(1, max_in_flight)
+        self.budget = HoymilesMinuteBudget.shared(calls_per_minute)
+        self.requests_made = 0
+        self._count_lock = threading.Lock()
+
+    def fetch_inversor(self, plant_id, inverter_sn, target_date):
+        """
+        Fetches one microinverter under the budget. A quota error pauses all workers for a minute
+        and retries the request (up to RATE_LIMIT_RETRIES times); any other error is raised.
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.budget.acquire()
+            with self._count_lock:
+                self.requests_made += 1
+            try:
+                return self.fetcher.fetch_hoymiles_generacion_inversor_granular_dia(
+                    plant_id, inverter_sn, target_date, max_retries=0
+                )
+            except RuntimeError as e:
+                if len(e.args) > 1 and e.args[1] == RATE_LIMIT_ERROR_CODE and attempt < RATE_LIMIT_RETRIES:
+                    pause = rate_limit_pause()
+                    logger.warning(f"|HoymilesExecutor|fetch_inversor| Rate limit hit for {inverter_sn}, pausing all workers {pause} seconds ({attempt + 1}/{RATE_LIMIT_RETRIES})")
+                    PipelineMetrics.add('hoymiles.http', retries=1, rate_limits=1)
+                    self.budget.pause(pause)
+                    continue
+                raise
+
+    def run_stations(self, stations, target_date):
+        """
+        Fetches every microinverter of every station.
+
+        Args:
+            stations (dict): {plant_id: [inverter_sn, ...]}
+            target_date (str): Date in YYYY-MM-DD format
+
+        Yields:
+            tuple: (plant_id, results, errors) once per station, as soon as all its microinverters
+                   finished. results is a list of parsed mi_data_day dicts; errors is {inverter_sn: exception}.
+        """
+        pending = {plant_id: len(sns) for plant_id, sns in stations.items() if sns}
+        results = defaultdict(list)
+        errors = defaultdict(dict)
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = {
+                pool.submit(self.fetch_inversor, plant_id, inverter_sn, target_date): (plant_id, inverter_sn)
+                for plant_id, sns in stations.items()
+                for inverter_sn in sns
+            }
+            try:
+                for future in as_completed(futures):
+                    plant_id, inverter_sn = futures[future]
+                    try:
+                        results[plant_id].append(future.result())
+                    except Exception as e:
+                        errors[plant_id][inverter_sn] = e
+                    pending[plant_id] -= 1
+                    if pending[plant_id] == 0:
+                        yield plant_id, results.pop(plant_id, []), errors.pop(plant_id, {})
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
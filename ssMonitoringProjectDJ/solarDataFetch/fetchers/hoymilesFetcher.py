@@ -3,33 +3,57 @@ Hoymiles API Fetcher
 Handles data collection from Hoymiles solar inverters
 """
 
-import requests
 import json
 import logging
 import time
 import os
 from datetime import datetime, timedelta
-from requests.exceptions import HTTPError, Timeout, RequestException
 from json.decoder import JSONDecodeError
+from django.conf import settings
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataFetch.fetchers.circuitBreaker import CircuitBreaker
+from solarData.log_pipeline import LazyJson, log_event
+from solarData.pipeline_metrics import PipelineMetrics
 
 # Set up logger
 logger = logging.getLogger('hoymiles_fetcher')
 
+# Second arg of the RuntimeError raised once the per-minute quota is still exceeded after all retries
+RATE_LIMIT_ERROR_CODE = 429
+WINDOW_SECONDS = 60.0        # the quota counts calls per minute
+
+
+def rate_limit_window():
+    """Length of the quota window in seconds (settings.VENDOR_RATE_LIMIT_WINDOW, one minute by default)."""
+    return getattr(settings, 'VENDOR_RATE_LIMIT_WINDOW', WINDOW_SECONDS)
+
+
 class HoymilesFetcher:
     """
     Fetcher class for Hoymiles solar inverter data.
     Handles authentication and data retrieval from Hoymiles API.
     """
     
-    def __init__(self):
-        """Initialize the Hoymiles fetcher with base configuration."""
-        self.base_url = "https://wapi.hoymiles.com"
+    def __init__(self, quiet=False):
+        """
+        Initialize the Hoymiles fetcher with base configuration.
+
+        Args:
+            quiet (bool): Skip the debug JSON printed to stdout on every call (batch collection)
+        """
+        self.base_url = settings.VENDOR_API_BASE_URLS['hoymiles'].rstrip('/')
         self.timeout = 30
+        # Shared Hoymiles circuit breaker: after repeated timeouts/5xx requests fail fast for the rest of the run
+        self.breaker = CircuitBreaker.for_vendor('hoymiles')
+        self.quiet = quiet
         self.api_key = os.getenv('HOYMILES_API_KEY')
         
         if not self.api_key:
             raise ValueError("HOYMILES_API_KEY environment variable is required")
         
+        # Raw responses are archived for --replay when PAYLOAD_ARCHIVE_DIR is configured
+        self.archive = PayloadArchive.from_settings()
+        
         logger.info("|HoymilesFetcher|__init__| Hoymiles fetcher initialized")
     
     def _make_request(self, endpoint, method='GET', data=None, headers=None, max_retries=3):
@@ -52,29 +76,36 @@ class HoymilesFetcher:
         # Add the API key parameter to the URL
         separator = "&" if "?" in endpoint else "?"
         url = f"{self.base_url}/{endpoint}{separator}key={self.api_key}"
+        import requests
+        from requests.exceptions import HTTPError, Timeout, RequestException
         
         for attempt in range(max_retries + 1):
             try:
-                if method.upper() == 'GET':
-                    response = requests.get(url, params=data, headers=headers, timeout=self.timeout)
-                elif method.upper() == 'POST':
-                    response = requests.post(url, json=data, headers=headers, timeout=self.timeout)
-                else:
+                if method.upper() not in ('GET', 'POST'):
                     raise ValueError(f"Unsupported HTTP method: {method}")
-                
-                response.raise_for_status()
-                response_data = response.json()
+                with self.breaker, PipelineMetrics.stage('hoymiles.http') as stage:
+                    if method.upper() == 'GET':
+                        response = requests.get(url, params=data, headers=headers, timeout=self.timeout)
+                    else:
+                        response = requests.post(url, json=data, headers=headers, timeout=self.timeout)
+                    stage.add(requests=1, bytes=len(response.content))
+                    response.raise_for_status()
+                with PipelineMetrics.stage('hoymiles.parse'):
+                    response_data = response.json()
                 
                 # Check for Hoymiles API rate limiting
                 if self._is_rate_limited(response_data):
                     if attempt < max_retries:
-                        delay = 61  # 1 minute + 1 second
+                        delay = rate_limit_window() + 1  # the window plus one second
                         logger.warning(f"|HoymilesFetcher|_make_request| Rate limit detected on attempt {attempt + 1}/{max_retries + 1}. Pausing for {delay} seconds...")
-                        print(f"⏳ Rate limit hit! Pausing for {delay} seconds before retry {attempt + 1}...")
-                        time.sleep(delay)
+                        if not self.quiet:
+                            print(f"⏳ Rate limit hit! Pausing for {delay} seconds before retry {attempt + 1}...")
+                        PipelineMetrics.add('hoymiles.http', retries=1, rate_limits=1)
+                        with PipelineMetrics.stage('hoymiles.rate_limit_sleep'):
+                            time.sleep(delay)
                         continue
                     else:
-                        raise RuntimeError(f"Rate limit exceeded after {max_retries} retries")
+                        raise RuntimeError(f"Rate limit exceeded after {max_retries} retries", RATE_LIMIT_ERROR_CODE)
                 
                 return response_data
                 
@@ -127,7 +158,8 @@ class HoymilesFetcher:
         Raises:
             RuntimeError: If there's an HTTP error, JSON decode error, or API returns error status
         """
-        logger.info(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| Starting fetch for station {station_id}, date {target_date}")
+        started = time.monotonic()
+        logger.debug(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| Starting fetch for station {station_id}, date {target_date}")
         
         endpoint = "v0/zhgf-core/oapi/0/findStation30dayEnergy"
         body = {
@@ -143,44 +175,144 @@ class HoymilesFetcher:
                 error_msg = response_data.get("message", "Unknown error from Hoymiles API")
                 raise RuntimeError(f"Hoymiles API error: {error_msg}")
             
-            data = response_data.get("data", [])
+            if self.archive:
+                context = {'station_id': station_id, 'target_date': target_date}
+                self.archive.save('hoymiles', 'findStation30dayEnergy', target_date, context, body, response_data)
             
-            # Parse data to match our expected format - only return data for the target date
-            parsed_data = []
-            found_data = False
+            parsed_data = self.parse_generacion_sistema_dia(response_data, station_id, target_date)
             
-            for entry in data:
-                if entry.get("report_date") == target_date:
-                    parsed_entry = {
-                        "stationCode": station_id,
-                        "collectTime": entry.get("report_date"),
-                        "PVYield": entry.get("total_energy")/1000 if entry.get("total_energy") is not None else None
-                    }
-                    parsed_data.append(parsed_entry)
-                    found_data = True
-                    break
+            log_event(
+                logger, 'fetch_batch', f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| Successfully fetched {len(parsed_data)} entries for station {station_id}",
+                vendor='hoymiles', endpoint='findStation30dayEnergy', station=station_id, returned=len(parsed_data),
+                duration_ms=round((time.monotonic() - started) * 1000),
+            )
+            logger.debug(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| Parsed data: %s", LazyJson(parsed_data))
             
-            # If no data found for target date, still create an entry with null PVYield
-            if not found_data:
+            return parsed_data
+            
+        except Exception as e:
+            logger.error(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| Error fetching data for station {station_id}: {e}")
+            raise
+
+    @staticmethod
+    def parse_generacion_sistema_dia(response_data, station_id, target_date):
+        """
+        Picks the target date out of a findStation30dayEnergy response.
+
+        Args:
+            response_data (dict): Raw findStation30dayEnergy response.
+            station_id (str): The station ID that was requested.
+            target_date (str): Target date in YYYY-MM-DD format.
+
+        Returns:
+            list: One entry [{'stationCode', 'collectTime', 'PVYield'}]; PVYield is None when the day is missing.
+        """
+        data = response_data.get("data", [])
+        
+        # Parse data to match our expected format - only return data for the target date
+        parsed_data = []
+        found_data = False
+        
+        for entry in data:
+            if entry.get("report_date") == target_date:
                 parsed_entry = {
                     "stationCode": station_id,
-                    "collectTime": target_date,
-                    "PVYield": None
+                    "collectTime": entry.get("report_date"),
+                    "PVYield": entry.get("total_energy")/1000 if entry.get("total_energy") is not None else None
                 }
                 parsed_data.append(parsed_entry)
-                logger.warning(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| No data found for station {station_id} on {target_date}, creating null entry")
-            
-            logger.info(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| Successfully fetched {len(parsed_data)} entries for station {station_id}")
-            
-            # Print formatted JSON for debugging
-            print("Parsed JSON response:")
-            print(json.dumps(parsed_data, indent=2, ensure_ascii=False))
+                found_data = True
+                break
+        
+        # If no data found for target date, still create an entry with null PVYield
+        if not found_data:
+            parsed_entry = {
+                "stationCode": station_id,
+                "collectTime": target_date,
+                "PVYield": None
+            }
+            parsed_data.append(parsed_entry)
+            logger.warning(f"|HoymilesFetcher|parse_generacion_sistema_dia| No data found for station {station_id} on {target_date}, creating null entry")
+        
+        return parsed_data
+
+    def fetch_hoymiles_generacion_sistema_rango(self, station_id, start_date, end_date):
+        """
+        Fetch daily energy for a date range with a single findStation30dayEnergy call.
+        The endpoint returns the 30 days ending at endDate, so the range must fit in that window.
+        
+        Args:
+            station_id (str): The station ID
+            start_date (str): First date in YYYY-MM-DD format
+            end_date (str): Last date in YYYY-MM-DD format (at most 29 days after start_date)
             
-            return parsed_data
+        Returns:
+            list: One entry per day [{'stationCode', 'collectTime', 'PVYield'}]; PVYield is None for missing days
             
-        except Exception as e:
-            logger.error(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_dia| Error fetching data for station {station_id}: {e}")
-            raise
+        Raises:
+            ValueError: If the range does not fit in the 30-day window
+            RuntimeError: If there's an HTTP error, JSON decode error, or API returns error status
+        """
+        started = time.monotonic()
+        logger.debug(f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_rango| Starting fetch for station {station_id}, {start_date} to {end_date}")
+        
+        first_day = datetime.strptime(start_date, '%Y-%m-%d')
+        last_day = datetime.strptime(end_date, '%Y-%m-%d')
+        if last_day < first_day or (last_day - first_day).days >= 30:
+            raise ValueError("The date range must be 1 to 30 days long and start_date <= end_date")
+        
+        endpoint = "v0/zhgf-core/oapi/0/findStation30dayEnergy"
+        body = {
+            "endDate": end_date,
+            "stationId": station_id
+        }
+        
+        response_data = self._make_request(endpoint, method='POST', data=body, max_retries=3)
+        
+        if response_data.get("status") != "0":
+            error_msg = response_data.get("message", "Unknown error from Hoymiles API")
+            raise RuntimeError(f"Hoymiles API error: {error_msg}")
+        
+        if self.archive:
+            context = {'station_id': station_id, 'target_date': end_date}
+            self.archive.save('hoymiles', 'findStation30dayEnergy', end_date, context, body, response_data)
+        
+        parsed_data = self.parse_generacion_sistema_rango(response_data, station_id, start_date, end_date)
+        log_event(
+            logger, 'fetch_batch', f"|HoymilesFetcher|fetch_hoymiles_generacion_sistema_rango| Successfully fetched {len(parsed_data)} days for station {station_id}",
+            vendor='hoymiles', endpoint='findStation30dayEnergy', station=station_id, returned=len(parsed_data),
+            duration_ms=round((time.monotonic() - started) * 1000),
+        )
+        return parsed_data
+
+    @staticmethod
+    def parse_generacion_sistema_rango(response_data, station_id, start_date, end_date):
+        """
+        Picks every day between start_date and end_date (inclusive) out of a findStation30dayEnergy response.
+        Days missing from the response get a null PVYield entry, like parse_generacion_sistema_dia.
+
+        Returns:
+            list: [{'stationCode', 'collectTime', 'PVYield'}, ...] ordered by date
+        """
+        by_date = {
+            entry.get("report_date"): entry
+            for entry in response_data.get("data", [])
+            if entry.get("report_date")
+        }
+        
+        parsed_data = []
+        day = datetime.strptime(start_date, '%Y-%m-%d')
+        last_day = datetime.strptime(end_date, '%Y-%m-%d')
+        while day <= last_day:
+            report_date = day.strftime('%Y-%m-%d')
+            total_energy = by_date.get(report_date, {}).get("total_energy")
+            parsed_data.append({
+                "stationCode": station_id,
+                "collectTime": report_date,
+                "PVYield": total_energy/1000 if total_energy is not None else None
+            })
+            day += timedelta(days=1)
+        return parsed_data
 
     def fetch_hoymiles_generacion_inversor_granular_dia(self, plant_id, inverter_sn, target_date, max_retries=3):
         """
@@ -193,33 +325,48 @@ class HoymilesFetcher:
             max_retries (int): Maximum number of retries for rate limiting
             
         Returns:
-            dict: Raw API response containing inverter and granular data
+            dict: Daily energy per DC port and microinverter total (see parse_generacion_inversor_granular_dia)
             
         Raises:
             RuntimeError: If there's an HTTP error, JSON decode error, or API returns error status
         """
-        logger.info(f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Starting fetch for plant {plant_id}, inverter {inverter_sn}, date {target_date}")
+        started = time.monotonic()
+        logger.debug(f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Starting fetch for plant {plant_id}, inverter {inverter_sn}, date {target_date}")
         
         # Note: This endpoint has a different URL structure, so we build it manually
         url = f"{self.base_url}/v2/query/{plant_id}/{inverter_sn}/mi_data_day?key={self.api_key}"
         body = {"date": target_date}
+        import requests
+        from requests.exceptions import HTTPError, Timeout, RequestException
         
         for attempt in range(max_retries + 1):
             try:
-                response = requests.post(url, json=body, timeout=self.timeout)
-                response.raise_for_status()
-                response_data = response.json()
+                with self.breaker, PipelineMetrics.stage('hoymiles.http') as stage:
+                    response = requests.post(url, json=body, timeout=self.timeout)
+                    stage.add(requests=1, bytes=len(response.content))
+                    response.raise_for_status()
+                with PipelineMetrics.stage('hoymiles.parse'):
+                    if self.archive:
+                        # The archive needs the full payload for --replay
+                        response_data = response.json()
+                        max_tp_values = None
+                    else:
+                        # Reduce the time series to per-port maxima while decoding; only the envelope is kept
+                        response_data, max_tp_values = self.reduce_mi_data_day(response.content)
                 
                 # Check for Hoymiles API rate limiting first
                 if self._is_rate_limited(response_data):
                     if attempt < max_retries:
-                        delay = 61  # 1 minute + 1 second
+                        delay = rate_limit_window() + 1  # the window plus one second
                         logger.warning(f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Rate limit detected on attempt {attempt + 1}/{max_retries + 1}. Pausing for {delay} seconds...")
-                        print(f"⏳ Rate limit hit! Pausing for {delay} seconds before retry {attempt + 1}...")
-                        time.sleep(delay)
+                        if not self.quiet:
+                            print(f"⏳ Rate limit hit! Pausing for {delay} seconds before retry {attempt + 1}...")
+                        PipelineMetrics.add('hoymiles.http', retries=1, rate_limits=1)
+                        with PipelineMetrics.stage('hoymiles.rate_limit_sleep'):
+                            time.sleep(delay)
                         continue
                     else:
-                        raise RuntimeError(f"Rate limit exceeded after {max_retries} retries")
+                        raise RuntimeError(f"Rate limit exceeded after {max_retries} retries", RATE_LIMIT_ERROR_CODE)
                 
                 # Check API response status
                 if response_data.get("status") != "0":
@@ -242,69 +389,28 @@ class HoymilesFetcher:
                 logger.error(f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Request error: {e}")
                 raise RuntimeError(f"Request error: {e}")
         
+        if self.archive:
+            context = {'plant_id': plant_id, 'inverter_sn': inverter_sn, 'target_date': target_date}
+            self.archive.save('hoymiles', 'mi_data_day', target_date, context, body, response_data)
+        
         # Process the successful response
         try:
-            data = response_data.get("data", [])
-            
-            # Get maximum channel energies across all time entries (tp is cumulative)
-            channel_energies = {"channel1": None, "channel2": None, "channel3": None, "channel4": None}
-            
-            if data:
-                # Track maximum tp values for each port across all time entries
-                max_tp_values = {1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0}
-                
-                # Iterate through all time entries to find maximum tp values
-                for entry in data:
-                    dc_data = entry.get("dc", [])
-                    for dc_entry in dc_data:
-                        port = dc_entry.get("port")
-                        tp_value = dc_entry.get("tp", 0)
-                        
-                        if port in max_tp_values and tp_value is not None:
-                            max_tp_values[port] = max(max_tp_values[port], tp_value)
-                
-                # Convert from W to kW and assign to channel_energies
-                for port, max_tp in max_tp_values.items():
-                    tp_value_kw = max_tp / 1000.0 if max_tp > 0 else None
-                    
-                    if port == 1:
-                        channel_energies["channel1"] = tp_value_kw
-                    elif port == 2:
-                        channel_energies["channel2"] = tp_value_kw
-                    elif port == 3:
-                        channel_energies["channel3"] = tp_value_kw
-                    elif port == 4:
-                        channel_energies["channel4"] = tp_value_kw
-            
-            # Calculate microinverter total energy as sum of all 4 channels
-            # If no data was found (all channels are None), set total to None
-            if not data:
-                total_microinverter_energy = None
+            if max_tp_values is None:
+                parsed_data = self.parse_generacion_inversor_granular_dia(response_data, plant_id, inverter_sn, target_date)
             else:
-                total_microinverter_energy = 0.0
-                for channel_key in ["channel1", "channel2", "channel3", "channel4"]:
-                    channel_value = channel_energies[channel_key]
-                    if channel_value is not None:
-                        total_microinverter_energy += channel_value
-            
-            # Build the return structure
-            parsed_data = {
-                "stationCode": plant_id,
-                "inverter_sn": inverter_sn,
-                "collectTime": target_date,
-                "PVYield": total_microinverter_energy,
-                "channel1": channel_energies["channel1"],
-                "channel2": channel_energies["channel2"],
-                "channel3": channel_energies["channel3"],
-                "channel4": channel_energies["channel4"]
-            }
-            
-            logger.info(f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Successfully processed {len(data)} time entries for plant {plant_id}, inverter {inverter_sn}")
-            logger.info(f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Total microinverter energy: {total_microinverter_energy} kW, Channels: {channel_energies}")
+                parsed_data = self.build_generacion_inversor_granular_dia(
+                    max_tp_values, len(response_data.get("data") or []), plant_id, inverter_sn, target_date
+                )
+            log_event(
+                logger, 'fetch_batch', f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Successfully fetched inverter {inverter_sn} of plant {plant_id}: total {parsed_data.get('PVYield')} kWh",
+                vendor='hoymiles', endpoint='mi_data_day', station=plant_id, inverter=inverter_sn, returned=1,
+                duration_ms=round((time.monotonic() - started) * 1000),
+            )
             
             # Print formatted JSON for debugging
-            print("Parsed JSON response:")
-            print(json.dumps(parsed_data, indent=2, ensure_ascii=False))
+            if not self.quiet:
+                print("Parsed JSON response:")
+                print(json.dumps(parsed_data, indent=2, ensure_ascii=False))
             
             return parsed_data
             
@@ -312,4 +418,107 @@ class HoymilesFetcher:
             logger.error(f"|HoymilesFetcher|fetch_hoymiles_generacion_inversor_granular_dia| Error processing data for plant {plant_id}, inverter {inverter_sn}: {e}")
             raise
 
+    @staticmethod
+    def _accumulate_tp(max_tp_values, dc_entry):
+        """Folds one dc entry ({'port', 'tp'}) into the per-port maxima (tp is cumulative through the day)."""
+        try:
+            port = int(dc_entry.get("port"))
+        except (TypeError, ValueError):
+            return
+        tp_value = dc_entry.get("tp", 0)
+        if tp_value is None:
+            return
+        max_tp_values[port] = max(max_tp_values.get(port, 0.0), tp_value)
+
+    @classmethod
+    def reduce_mi_data_day(cls, body):
+        """
+        Decodes a mi_data_day body, folding every dc entry into the per-port maxima as soon as it is
+        decoded instead of keeping the time series in memory.
 
+        Args:
+            body (bytes | str): Raw mi_data_day response body.
+
+        Returns:
+            tuple: (envelope, max_tp_values). envelope is the response with every time entry replaced
+                   by None (status, message and len(data) are preserved); max_tp_values is {port: max tp in W}.
+
+        Raises:
+            JSONDecodeError: If the body is not valid JSON
+        """
+        max_tp_values = {}
+
+        def reduce_object(obj):
+            if "port" in obj:
+                cls._accumulate_tp(max_tp_values, obj)
+                return None
+            if "dc" in obj:
+                return None
+            return obj
+
+        envelope = json.loads(body, object_hook=reduce_object)
+        if not isinstance(envelope, dict):
+            raise JSONDecodeError("mi_data_day response is not a JSON object", str(body)[:100], 0)
+        return envelope, max_tp_values
+
+    @staticmethod
+    def build_generacion_inversor_granular_dia(max_tp_values, entry_count, plant_id, inverter_sn, target_date):
+        """
+        Builds the daily result from the per-port maxima: one 'channel<port>' key per port reported
+        (kWh, None when the port produced nothing) and PVYield as their sum.
+
+        Args:
+            max_tp_values (dict): {port: max tp in W}
+            entry_count (int): Number of time entries in the response (PVYield is None when 0)
+            plant_id (str): The plant/station ID.
+            inverter_sn (str): The inverter serial number.
+            target_date (str): Target date in YYYY-MM-DD format.
+
+        Returns:
+            dict: {'stationCode', 'inverter_sn', 'collectTime', 'PVYield', 'channel1', 'channel2', ...}
+        """
+        channel_energies = {
+            f"channel{port}": max_tp / 1000.0 if max_tp > 0 else None
+            for port, max_tp in sorted(max_tp_values.items())
+        }
+        
+        # Microinverter total is the sum of its channels; None when the response had no entries at all
+        if not entry_count:
+            total_microinverter_energy = None
+        else:
+            total_microinverter_energy = sum(value for value in channel_energies.values() if value is not None)
+        
+        parsed_data = {
+            "stationCode": plant_id,
+            "inverter_sn": inverter_sn,
+            "collectTime": target_date,
+            "PVYield": total_microinverter_energy,
+            **channel_energies,
+        }
+        
+        logger.debug(f"|HoymilesFetcher|build_generacion_inversor_granular_dia| Processed {entry_count} time entries for plant {plant_id}, inverter {inverter_sn}: total {total_microinverter_energy} kW, Channels: {channel_energies}")
+        return parsed_data
+
+    @staticmethod
+    def parse_generacion_inversor_granular_dia(response_data, plant_id, inverter_sn, target_date):
+        """
+        Reduces a decoded mi_data_day response to the daily energy per DC port and the microinverter total.
+        Used for archived payloads; live calls reduce while decoding (reduce_mi_data_day).
+
+        Args:
+            response_data (dict): Raw mi_data_day response.
+            plant_id (str): The plant/station ID.
+            inverter_sn (str): The inverter serial number.
+            target_date (str): Target date in YYYY-MM-DD format.
+
+        Returns:
+            dict: {'stationCode', 'inverter_sn', 'collectTime', 'PVYield', 'channel1', 'channel2', ...}
+        """
+        data = response_data.get("data") or []
+        
+        max_tp_values = {}
+        for entry in data:
+            for dc_entry in entry.get("dc", []):
+                HoymilesFetcher._accumulate_tp(max_tp_values, dc_entry)
+        
+        return HoymilesFetcher.build_generacion_inversor_granular_dia(max_tp_values, len(data), plant_id, inverter_sn, target_date)
@@ -0,0 +1,85 @@
+"""
+Huawei Batch Planner
+Loads the Huawei device list once per run, in stable primary-key order, and splits it into
+fixed-size batches for the Huawei endpoints (100 ids for KPI calls, 10 for history calls).
+The nightly commands only take the ordered list and let HuaweiExecutor.run_adaptive cut the
+batches at the size chosen by HuaweiBatchSizer.
+
+Batches are plain lists of identifiers, so they can be handed to the fetchers in any order or
+from several threads at once, and devices added while a run is in progress cannot shift rows
+from one batch into another.
+"""
+
+import logging
+from solarData.models import Proyecto, Inversor
+from solarDataStore.cruds.estadoRecoleccionCruds import filtrar_pendientes, NIVEL_SISTEMA, NIVEL_INVERSOR
+from solarDataStore.cruds.tareasRecoleccionCruds import filtrar_fragmento
+
+logger = logging.getLogger('huawei_fetcher')
+
+HUAWEI_MARCA_ID = 1
+KPI_BATCH_SIZE = 100      # getKpiStationDay / getDevKpiDay accept up to 100 ids
+HISTORY_BATCH_SIZE = 10   # getDevHistoryKpi accepts up to 10 ids
+
+
+class HuaweiBatchPlanner:
+    """
+    Fixed-size batches of Huawei identifiers taken from a single ordered query.
+    """
+
+    def __init__(self, identificadores, batch_size):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.identificadores = list(identificadores)
+        self.batch_size = batch_size
+
+    @classmethod
+    def proyectos(cls, batch_size=KPI_BATCH_SIZE, solo_pendientes_en=None, fragmento=None):
+        """
+        Planner over every Huawei project's identificador_planta, ordered by id.
+        With solo_pendientes_en (a date), only projects still lacking data for that date are planned.
+        With fragmento (K, N), only the projects of shard K of N are planned (see filtrar_fragmento).
+        """
+        queryset = (
+            Proyecto.objects.filter(marca_inversor_id=HUAWEI_MARCA_ID)
+            .exclude(identificador_planta__isnull=True).exclude(identificador_planta='')
+        )
+        if solo_pendientes_en is not None:
+            queryset = filtrar_pendientes(queryset, NIVEL_SISTEMA, solo_pendientes_en)
+        queryset = filtrar_fragmento(queryset, fragmento)
+        identificadores = queryset.order_by('id').values_list('identificador_planta', flat=True)
+        planner = cls(identificadores, batch_size)
+        logger.info(f"|HuaweiBatchPlanner|proyectos| Planned {len(planner.identificadores)} Huawei projects in {len(planner)} batches of {batch_size}")
+        return planner
+
+    @classmethod
+    def inversores(cls, dev_type_id, batch_size=KPI_BATCH_SIZE, solo_pendientes_en=None, nivel=NIVEL_INVERSOR, fragmento=None):
+        """
+        Planner over the identificador_inversor of every inverter with the given devTypeId, ordered by id.
+        With solo_pendientes_en (a date), only inverters still lacking data at the given nivel
+        ('inversor' or 'granular') for that date are planned.
+        With fragmento (K, N), only the inverters of shard K of N are planned.
+        """
+        queryset = Inversor.objects.filter(huawei_devTypeId=dev_type_id).exclude(identificador_inversor='')
+        if solo_pendientes_en is not None:
+            queryset = filtrar_pendientes(queryset, nivel, solo_pendientes_en)
+        queryset = filtrar_fragmento(queryset, fragmento)
+        identificadores = queryset.order_by('id').values_list('identificador_inversor', flat=True)
+        planner = cls(identificadores, batch_size)
+        logger.info(f"|HuaweiBatchPlanner|inversores| Planned {len(planner.identificadores)} inverters of dev_type_id {dev_type_id} in {len(planner)} batches of {batch_size}")
+        return planner
+
+    def __len__(self):
+        return (len(self.identificadores) + self.batch_size - 1) // self.batch_size
+
+    def batch(self, batch_number):
+        """Identifiers of one batch (1-based); an empty list past the last batch."""
+        if batch_number < 1:
+            raise ValueError("batch_number must be >= 1")
+        offset = (batch_number - 1) * self.batch_size
+        return self.identificadores[offset:offset + self.batch_size]
+
+    def batches(self):
+        """Yields (batch_number, identificadores) for every batch, in order."""
+        for batch_number in range(1, len(self) + 1):
+            yield batch_number, self.batch(batch_number)
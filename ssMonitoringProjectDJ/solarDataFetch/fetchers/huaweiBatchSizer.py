@@ -0,0 +1,115 @@
+"""
+Huawei Adaptive Batch Size
+Working batch size for one Huawei endpoint, adjusted while a run is in progress and remembered
+between runs (TamanoLoteApi).
+
+- Shrinks by half when a batch fails with ACCESS_FREQUENCY_IS_TOO_HIGH (407) or times out; the
+  executor then re-queues that batch's identifiers at the new size.
+- Grows (doubling, up to the endpoint's API maximum) after GROW_AFTER consecutive full batches
+  answered within FAST_RESPONSE_SECONDS.
+- The last size that completed a full batch is stored at the end of the run, so the next run
+  starts from it instead of from the maximum.
+"""
+
+import logging
+import threading
+from solarData.models import TamanoLoteApi
+from solarDataFetch.fetchers.huaweiBatchPlanner import KPI_BATCH_SIZE, HISTORY_BATCH_SIZE
+
+logger = logging.getLogger('huawei_fetcher')
+
+# Maximum ids per request documented for each endpoint
+ENDPOINT_MAX_BATCH = {
+    'getKpiStationDay': KPI_BATCH_SIZE,
+    'getDevKpiDay': KPI_BATCH_SIZE,
+    'getDevHistoryKpi': HISTORY_BATCH_SIZE,
+}
+
+FAST_RESPONSE_SECONDS = 5.0
+GROW_AFTER = 3
+
+
+class HuaweiBatchSizer:
+    """
+    Adaptive batch size of one Huawei endpoint, shared by the executor's workers.
+    """
+
+    def __init__(self, endpoint, size=None, max_size=None):
+        """
+        Args:
+            endpoint (str): Huawei endpoint name (key of ENDPOINT_MAX_BATCH)
+            size (int): Starting size (defaults to the maximum)
+            max_size (int): API maximum (defaults to ENDPOINT_MAX_BATCH[endpoint])
+        """
+        self.endpoint = endpoint
+        self.max_size = max(1, max_size or ENDPOINT_MAX_BATCH[endpoint])
+        self._size = min(self.max_size, max(1, size or self.max_size))
+        self.initial_size = self._size
+        self.last_good = None
+        self._fast_streak = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def cargar(cls, endpoint):
+        """Sizer starting from the last good size stored for endpoint (the API maximum if none)."""
+        stored = TamanoLoteApi.objects.filter(endpoint=endpoint).values_list('tamano_lote', flat=True).first()
+        sizer = cls(endpoint, size=stored)
+        logger.info(f"|HuaweiBatchSizer|cargar| {endpoint}: starting with batches of {sizer.size} (max {sizer.max_size})")
+        return sizer
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._size
+
+    def registrar_exito(self, batch_size, latency):
+        """
+        Records a successful request.
+        Args:
+            batch_size (int): Identifiers sent in the request
+            latency (float): Seconds the request took
+        """
+        with self._lock:
+            # Short tail batches say nothing about the current size, and batches cut before a
+            # reduction must not raise last_good back above it
+            if batch_size != self._size:
+                return
+            self.last_good = max(self.last_good or 0, batch_size)
+            if latency > FAST_RESPONSE_SECONDS:
+                self._fast_streak = 0
+                return
+            self._fast_streak += 1
+            if self._fast_streak >= GROW_AFTER and self._size < self.max_size:
+                self._size = min(self.max_size, self._size * 2)
+                self._fast_streak = 0
+                logger.info(f"|HuaweiBatchSizer|registrar_exito| {self.endpoint}: fast responses, batch size raised to {self._size}")
+
+    def reducir(self, batch_size, motivo):
+        """
+        Halves the size after a rate-limited or timed-out request.
+        Args:
+            batch_size (int): Identifiers sent in the failed request
+            motivo (str): Reason, for the log
+        Returns:
+            bool: False when the failed batch was already a single identifier (nothing left to shrink)
+        """
+        with self._lock:
+            if batch_size <= 1:
+                return False
+            # Several in-flight batches may fail together; shrink relative to the failed batch only once
+            nuevo = max(1, min(self._size, batch_size // 2))
+            if nuevo < self._size:
+                logger.warning(f"|HuaweiBatchSizer|reducir| {self.endpoint}: {motivo}, batch size lowered from {self._size} to {nuevo}")
+            self._size = nuevo
+            self._fast_streak = 0
+            if self.last_good and self.last_good > nuevo:
+                self.last_good = nuevo
+            return True
+
+    def guardar(self):
+        """Stores the last size that completed a full batch, to start the next run from it."""
+        if self.last_good is None:
+            return
+        TamanoLoteApi.objects.update_or_create(endpoint=self.endpoint, defaults={'tamano_lote': self.last_good})
+        if self.last_good != self.initial_size:
+            logger.info(f"|HuaweiBatchSizer|guardar| {self.endpoint}: batch size {self.last_good} stored for the next run (started at {self.initial_size})")
@@ -0,0 +1,249 @@
+"""
+Huawei Concurrent Executor
+Keeps several Huawei batch requests in flight at once on a single shared session.
+
+- HuaweiSession holds the xsrf-token taken from the shared token cache. When a request fails
+  with failCode 305 the first worker to notice refreshes the cache; workers that failed with the
+  same stale token wait for that refresh and reuse its token instead of logging in themselves.
+- HuaweiRequestLimiter caps the number of in-flight requests and spaces request starts; new
+  requests wait while the token is being refreshed.
+- HuaweiExecutor runs fetch jobs (HuaweiFetcher methods called with explicit identificadores)
+  on a thread pool and hands the results back to the calling thread, which does the inserts.
+  run_adaptive cuts the batches while it runs, at the size given by a HuaweiBatchSizer: batches
+  rejected with 407 or timed out are split and re-queued instead of failing the command.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from django.conf import settings
+
+from solarData.pipeline_metrics import PipelineMetrics
+
+logger = logging.getLogger('huawei_fetcher')
+
+DEFAULT_MAX_IN_FLIGHT = 4
+RATE_LIMIT_ERROR_CODE = 407   # ACCESS_FREQUENCY_IS_TOO_HIGH
+RATE_LIMIT_PAUSE = 60         # seconds every worker waits after a 407
+MAX_RETRIES_AT_MIN_SIZE = 3   # retries of a single identifier still rate limited or timing out
+
+
+def rate_limit_pause():
+    """Seconds every worker waits after a 407: settings.VENDOR_RATE_LIMIT_WINDOW, RATE_LIMIT_PAUSE by default."""
+    return getattr(settings, 'VENDOR_RATE_LIMIT_WINDOW', RATE_LIMIT_PAUSE)
+
+
+class HuaweiSession:
+    """
+    Shared Huawei login: one token for every worker, refreshed once per expiry.
+    """
+
+    def __init__(self, fetcher, token=None):
+        self.fetcher = fetcher
+        self._token = token
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        if token:
+            self._ready.set()
+
+    @property
+    def token(self):
+        """Current token; blocks while a re-login is in progress."""
+        self._ready.wait()
+        return self._token
+
+    def login(self):
+        """Loads the shared token from the cache (logs in only if none is cached)."""
+        with self._lock:
+            self._ready.clear()
+            try:
+                self._token = self.fetcher.get_token()
+            finally:
+                self._ready.set()
+            return self._token
+
+    def relogin(self, stale_token):
+        """
+        Re-login after a 305 seen with stale_token. Only the first caller logs in;
+        callers holding the same stale token get the fresh one.
+        """
+        with self._lock:
+            if self._token != stale_token:
+                return self._token
+            logger.warning("|HuaweiSession|relogin| Session expired (305), refreshing the token for all workers")
+            self._ready.clear()
+            try:
+                self._token = self.fetcher.refresh_token(stale_token)
+            finally:
+                self._ready.set()
+            return self._token
+
+
+class HuaweiRequestLimiter:
+    """
+    Caps concurrent Huawei requests and enforces a minimum interval between request starts.
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, min_interval=0.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_interval = min_interval
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._start_lock = threading.Lock()
+        self._last_start = 0.0
+        self._paused_until = 0.0
+
+    def pause(self, seconds):
+        """Holds back every new request for the given number of seconds (after a 407)."""
+        with self._start_lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def __enter__(self):
+        self._slots.acquire()
+        with self._start_lock:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                with PipelineMetrics.stage('huawei.rate_limit_sleep'):
+                    time.sleep(pause)
+            if self.min_interval > 0:
+                wait = self._last_start + self.min_interval - time.monotonic()
+                if wait > 0:
+                    with PipelineMetrics.stage('huawei.rate_limit_sleep'):
+                        time.sleep(wait)
+            self._last_start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._slots.release()
+        return False
+
+
+class HuaweiExecutor:
+    """
+    Runs Huawei fetch jobs concurrently on a shared session and limiter.
+    """
+
+    def __init__(self, fetcher, token=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT, min_interval=0.0):
+        self.session = HuaweiSession(fetcher, token)
+        self.limiter = HuaweiRequestLimiter(max_in_flight, min_interval)
+        if token is None:
+            self.session.login()
+
+    def call(self, fetch, **kwargs):
+        """
+        Calls fetch(token=..., **kwargs) under the limiter. A 305 triggers the shared re-login
+        and one retry; any other error is raised to the caller.
+        """
+        for attempt in range(2):
+            token = self.session.token
+            with self.limiter:
+                try:
+                    return fetch(token=token, **kwargs)
+                except RuntimeError as e:
+                    if len(e.args) > 1 and e.args[1] == 305 and attempt == 0:
+                        PipelineMetrics.add('huawei.http', retries=1)
+                        self.session.relogin(token)
+                        continue
+                    raise
+
+    def run(self, fetch, jobs):
+        """
+        Runs fetch for every job (a dict of keyword arguments) with up to max_in_flight requests at once.
+        Yields (job, result) in completion order. The first failure cancels the jobs that have not
+        started and is re-raised to the caller.
+
+        Jobs must not touch the database (pass identificadores explicitly); results are handed back to
+        the calling thread so inserts stay on its connection.
+        """
+        with ThreadPoolExecutor(max_workers=self.limiter.max_in_flight) as pool:
+            futures = {pool.submit(self.call, fetch, **job): job for job in jobs}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _timed_call(self, fetch, job):
+        started = time.monotonic()
+        result = self.call(fetch, **job)
+        return result, time.monotonic() - started
+
+    @staticmethod
+    def _motivo_reduccion(error):
+        """Why a failed batch should be retried smaller, or None when the error is not about its size."""
+        if isinstance(error, RuntimeError) and len(error.args) > 1 and error.args[1] == RATE_LIMIT_ERROR_CODE:
+            return 'ACCESS_FREQUENCY_IS_TOO_HIGH (407)'
+        import requests
+        if isinstance(error, requests.exceptions.Timeout):
+            return 'request timed out'
+        return None
+
+    def run_adaptive(self, fetch, grupos, sizer):
+        """
+        Runs fetch over lists of identifiers, cutting each batch when a worker is free at the
+        current sizer.size. A batch that fails with 407 or a timeout shrinks the size and its
+        identifiers go back to the front of the queue; a 407 also pauses every worker for
+        rate_limit_pause() seconds. A single identifier that still fails that way is re-queued as is,
+        up to MAX_RETRIES_AT_MIN_SIZE times. Any other error (or one past that cap) cancels the jobs
+        that have not started and is re-raised, as in run().
+
+        Args:
+            fetch (callable): HuaweiFetcher method taking token, batch_number and identificadores
+            grupos (list): [(job_kwargs, identificadores), ...]; e.g. one group per dev_type_id.
+                           Groups are drained in order and share the sizer.
+            sizer (HuaweiBatchSizer): Batch size of the endpoint
+
+        Yields:
+            tuple: (job, result) in completion order; job is job_kwargs plus batch_number and identificadores
+        """
+        # One entry per group with identifiers left: [job_kwargs, queued identifiers, batches cut so far]
+        pendientes = deque([dict(job_kwargs), deque(identificadores), 0] for job_kwargs, identificadores in grupos if identificadores)
+        # Retries of identifiers that failed alone, when there was nothing left to shrink
+        reintentos = {}
+        with ThreadPoolExecutor(max_workers=self.limiter.max_in_flight) as pool:
+            futures = {}
+            try:
+                while pendientes or futures:
+                    while pendientes and len(futures) < self.limiter.max_in_flight:
+                        grupo = pendientes[0]
+                        job_kwargs, cola = grupo[0], grupo[1]
+                        grupo[2] += 1
+                        job = dict(job_kwargs, batch_number=grupo[2], identificadores=[cola.popleft() for _ in range(min(sizer.size, len(cola)))])
+                        if not cola:
+                            pendientes.popleft()
+                        futures[pool.submit(self._timed_call, fetch, job)] = (grupo, job)
+
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        grupo, job = futures.pop(future)
+                        try:
+                            result, latency = future.result()
+                        except Exception as e:
+                            motivo = self._motivo_reduccion(e)
+                            if motivo is None:
+                                raise
+                            if not sizer.reducir(len(job['identificadores']), motivo):
+                                identificador = job['identificadores'][0]
+                                reintentos[identificador] = reintentos.get(identificador, 0) + 1
+                                if reintentos[identificador] > MAX_RETRIES_AT_MIN_SIZE:
+                                    raise
+                                logger.warning(f"|HuaweiExecutor|run_adaptive| {motivo} for {identificador} alone, retry {reintentos[identificador]}/{MAX_RETRIES_AT_MIN_SIZE}")
+                            PipelineMetrics.add('huawei.http', retries=1)
+                            if isinstance(e, RuntimeError):
+                                PipelineMetrics.add('huawei.http', rate_limits=1)
+                                self.limiter.pause(rate_limit_pause())
+                            # Re-queued at the front of its group, to be cut again at the new size
+                            if not grupo[1]:
+                                pendientes.appendleft(grupo)
+                            grupo[1].extendleft(reversed(job['identificadores']))
+                            continue
+                        sizer.registrar_exito(len(job['identificadores']), latency)
+                        yield job, result
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
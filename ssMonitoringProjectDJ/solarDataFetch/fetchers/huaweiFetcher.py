@@ -1,22 +1,31 @@
-import requests
 import logging
 import traceback
-import json
+import time
 import os
 from datetime import datetime
+from django.conf import settings
 from django.utils import timezone as django_timezone
 from zoneinfo import ZoneInfo
-from solarData.models import Proyecto, Inversor
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataFetch.fetchers.huaweiBatchPlanner import HuaweiBatchPlanner, KPI_BATCH_SIZE, HISTORY_BATCH_SIZE
+from solarDataFetch.fetchers.huaweiTokenCache import HuaweiTokenCache
+from solarDataFetch.fetchers.circuitBreaker import CircuitBreaker, CircuitOpenError
+from solarData.log_pipeline import LazyJson, log_event
+from solarData.pipeline_metrics import PipelineMetrics
 from collections import defaultdict
 
 # Simple logger that will automatically go to CloudWatch via agent
 logger = logging.getLogger('huawei_fetcher')
 
+# Seconds a login may take; other processes wait for it on the token cache's row lock
+LOGIN_TIMEOUT = 15
+
 class HuaweiFetcher:
-    BASE_URL = "https://la5.fusionsolar.huawei.com/thirdData/"
-    
+
     def __init__(self):
         """Initialize the Huawei fetcher with configuration from environment variables."""
+        # FusionSolar thirdData API (settings.VENDOR_API_BASE_URLS), always ending in '/'
+        self.BASE_URL = settings.VENDOR_API_BASE_URLS['huawei'].rstrip('/') + '/'
         username = os.getenv('HUAWEI_API_USERNAME')
         system_code = os.getenv('HUAWEI_API_SYSTEM_CODE')
         
@@ -28,15 +37,30 @@ class HuaweiFetcher:
             "systemCode": system_code
         }
         
+        # Raw responses are archived for --replay when PAYLOAD_ARCHIVE_DIR is configured
+        self.archive = PayloadArchive.from_settings()
+
+        # Every request has a timeout and goes through the shared Huawei circuit breaker, so a degraded
+        # FusionSolar fails fast instead of hanging the nightly run
+        self.timeout = 60
+        self.login_timeout = LOGIN_TIMEOUT
+        self.breaker = CircuitBreaker.for_vendor('huawei')
+
+        # Logins are throttled by Huawei; the token is shared through the database across commands and processes
+        self.token_cache = HuaweiTokenCache(self.login)
+        
         logger.info("|HuaweiFetcher|__init__| Huawei fetcher initialized")
 
     def login(self):
         login_url = self.BASE_URL + "login"
         logger.info(f"|HuaweiFetcher|login| Starting Huawei API login attempt to {login_url}")
+        import requests
         
         try:
-            response = requests.post(login_url, json=self.LOGIN_BODY)
-            response.raise_for_status()  # Raises HTTPError for bad responses
+            with self.breaker, PipelineMetrics.stage('huawei.login') as stage:
+                response = requests.post(login_url, json=self.LOGIN_BODY, timeout=self.login_timeout)
+                stage.add(requests=1)
+                response.raise_for_status()  # Raises HTTPError for bad responses
             
             xsrf_token = response.headers.get("xsrf-token")
             if not xsrf_token:
@@ -44,6 +68,8 @@ class HuaweiFetcher:
             
             logger.info(f"|HuaweiFetcher|login| Huawei API login successful - token received")
             return xsrf_token
+        except CircuitOpenError:
+            raise
         except requests.exceptions.HTTPError as http_err:
             raise RuntimeError(f"HTTP error occurred during Huawei login: {http_err}") from http_err
         except requests.exceptions.ConnectionError as conn_err:
@@ -57,6 +83,20 @@ class HuaweiFetcher:
         except Exception as exc:
             raise RuntimeError(f"Unexpected error during Huawei login: {exc}") from exc
 
+    def get_token(self):
+        """
+        Returns the shared xsrf-token, logging in only if no token has been cached yet.
+        Use this instead of login() in commands.
+        """
+        return self.token_cache.get()
+
+    def refresh_token(self, stale_token):
+        """
+        Call after a request failed with failCode 305 using stale_token. Logs in once and
+        stores the new token; if another command already refreshed it, that token is reused.
+        """
+        return self.token_cache.refresh(stale_token)
+
     @staticmethod
     def midnight_colombia_timestamp(dt):
         """
@@ -72,8 +112,41 @@ class HuaweiFetcher:
         # Convert to Colombian timezone and set to midnight
         local_midnight = dt.astimezone(colombia_tz).replace(hour=0, minute=0, second=0, microsecond=0)
         return int(local_midnight.timestamp() * 1000)
+
+    @staticmethod
+    def colombia_date_from_timestamp(timestamp_ms):
+        """
+        Inverse of midnight_colombia_timestamp: returns the Colombian date (YYYY-MM-DD) of a millisecond timestamp.
+        """
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=ZoneInfo('America/Bogota')).date().isoformat()
+
+    @staticmethod
+    def raise_for_api_error(api_response):
+        """
+        Raises RuntimeError(message, failCode) for the Huawei error payloads the commands know how to handle.
+        """
+        # Check if user must relogin (failCode 305)
+        if (
+            api_response.get('failCode') == 305
+            and api_response.get('success') is False
+            and api_response.get('message') == 'USER_MUST_RELOGIN'
+        ):
+            raise RuntimeError('Huawei API: USER_MUST_RELOGIN (305). Please re-login.', 305)
+
+        # Check for rate limit error (failCode 407)
+        if (
+            api_response.get('failCode') == 407
+            and api_response.get('success') is False
+            and api_response.get('data') == 'ACCESS_FREQUENCY_IS_TOO_HIGH'
+        ):
+            raise RuntimeError('Huawei API: ACCESS_FREQUENCY_IS_TOO_HIGH (407). Rate limit exceeded.', 407)
+
+    def _archive_response(self, endpoint, collect_date, context, body, api_response):
+        """Archive a successful raw response for --replay (no-op when capture is disabled)."""
+        if self.archive:
+            self.archive.save('huawei', endpoint, collect_date, context, body, api_response)
     
-    def fetch_huawei_generacion_sistema_dia(self, batch_number=1, collect_time=None, token=None):
+    def fetch_huawei_generacion_sistema_dia(self, batch_number=1, collect_time=None, token=None, identificadores=None):
         """
         Fetches daily solar production data for a batch of Huawei solar systems.
 
@@ -81,36 +154,82 @@ class HuaweiFetcher:
             batch_number (int): Which batch of 100 to return (1 = first 100, 2 = second 100, etc.)
             collect_time (int or datetime): The day to fetch, as milliseconds since epoch (UTC midnight) or a datetime (will be converted).
             token (str): The xsrf-token from login (required).
+            identificadores (list): identificador_planta values to request (from HuaweiBatchPlanner);
+                when omitted the batch is taken from a fresh plan using batch_number.
 
         Returns:
             dict: The parsed JSON response from the Huawei API.
         """
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| Starting Huawei system generation data fetch for batch {batch_number} at {collect_time}")
+        started = time.monotonic()
+        logger.debug(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| Starting Huawei system generation data fetch for batch {batch_number} at {collect_time}")
+        if isinstance(collect_time, datetime):
+            collect_time = self.midnight_colombia_timestamp(collect_time)
+        api_response = self._request_kpi_station_day(batch_number, collect_time, token, identificadores)
+        if 'error' in api_response:
+            return api_response
+
+        result = self.parse_generacion_sistema_dia(api_response, collect_time)
+        log_event(
+            logger, 'fetch_batch', f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| Successfully fetched Huawei system generation data for batch {batch_number}: {len(result)} systems",
+            vendor='huawei', endpoint='getKpiStationDay', batch=batch_number,
+            returned=len(result), duration_ms=round((time.monotonic() - started) * 1000),
+        )
+        return result
+
+    def fetch_huawei_generacion_sistema_mes(self, batch_number=1, collect_time=None, token=None, identificadores=None):
+        """
+        Fetches every day of the month containing collect_time for a batch of Huawei solar systems.
+        getKpiStationDay already answers with the whole month, so one call covers up to 31 days.
+
+        Args:
+            batch_number (int): Which batch of 100 to return.
+            collect_time (int or datetime): Any day of the month to fetch (Colombian midnight in milliseconds, or a datetime).
+            token (str): The xsrf-token from login (required).
+            identificadores (list): identificador_planta values to request (see fetch_huawei_generacion_sistema_dia).
+
+        Returns:
+            list: [{'stationCode': str, 'collectTime': int, 'PVYield': float or None}, ...] for every day returned.
+        """
+        started = time.monotonic()
+        logger.debug(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_mes| Starting Huawei monthly system generation data fetch for batch {batch_number} at {collect_time}")
+        if isinstance(collect_time, datetime):
+            collect_time = self.midnight_colombia_timestamp(collect_time)
+        api_response = self._request_kpi_station_day(batch_number, collect_time, token, identificadores)
+        if 'error' in api_response:
+            return api_response
+
+        result = self.parse_generacion_sistema_mes(api_response)
+        log_event(
+            logger, 'fetch_batch', f"|HuaweiFetcher|fetch_huawei_generacion_sistema_mes| Successfully fetched Huawei monthly system generation data for batch {batch_number}: {len(result)} station-days",
+            vendor='huawei', endpoint='getKpiStationDay', batch=batch_number,
+            returned=len(result), duration_ms=round((time.monotonic() - started) * 1000),
+        )
+        return result
+
+    def _request_kpi_station_day(self, batch_number, collect_time, token, identificadores=None):
+        """
+        Calls getKpiStationDay for one batch of up to 100 Huawei projects and returns the raw response.
+        Returns {'error': ...} when the batch is empty.
+        """
         if batch_number < 1:
-            logger.error(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| Invalid batch_number: {batch_number}, must be >= 1")
+            logger.error(f"|HuaweiFetcher|_request_kpi_station_day| Invalid batch_number: {batch_number}, must be >= 1")
             raise ValueError("batch_number must be >= 1")
         if collect_time is None:
-            logger.error("|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| collect_time parameter is required")
+            logger.error("|HuaweiFetcher|_request_kpi_station_day| collect_time parameter is required")
             raise ValueError("collect_time (milliseconds since epoch) is required.")
         if not token:
-            logger.error("|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| xsrf-token parameter is required")
+            logger.error("|HuaweiFetcher|_request_kpi_station_day| xsrf-token parameter is required")
             raise ValueError("xsrf-token is required as a parameter.")
 
-        # If collect_time is a datetime, convert to Colombian midnight ms
-        if isinstance(collect_time, datetime):
-            collect_time = self.midnight_colombia_timestamp(collect_time)
-
-        batch_size = 100
-        offset = (batch_number - 1) * batch_size
-        qs = Proyecto.objects.filter(marca_inversor_id=1).order_by('id')
-        batch = qs[offset:offset + batch_size]
-        plant_codes = ','.join([p.identificador_planta for p in batch if p.identificador_planta])
+        if identificadores is None:
+            identificadores = HuaweiBatchPlanner.proyectos(KPI_BATCH_SIZE).batch(batch_number)
+        plant_codes = ','.join([identificador for identificador in identificadores if identificador])
         
         if not plant_codes:
-            logger.warning(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| No Huawei projects found for batch {batch_number}")
+            logger.warning(f"|HuaweiFetcher|_request_kpi_station_day| No Huawei projects found for batch {batch_number}")
             return {"error": "No Huawei projects found for this batch."}
 
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| Making API call to {self.BASE_URL}getKpiStationDay for batch {batch_number} with {len(batch)} systems")
+        logger.debug(f"|HuaweiFetcher|_request_kpi_station_day| Making API call to {self.BASE_URL}getKpiStationDay for batch {batch_number} with {len(identificadores)} systems")
         url = self.BASE_URL + "getKpiStationDay"
         headers = {
             "xsrf-token": token,
@@ -120,53 +239,55 @@ class HuaweiFetcher:
             "stationCodes": plant_codes,
             "collectTime": collect_time
         }
-        response = requests.post(url, headers=headers, json=body)
-        response.raise_for_status()
-        api_response = response.json()
+        import requests
+        with self.breaker, PipelineMetrics.stage('huawei.http') as stage:
+            response = requests.post(url, headers=headers, json=body, timeout=self.timeout)
+            stage.add(requests=1, bytes=len(response.content))
+            response.raise_for_status()
+        with PipelineMetrics.stage('huawei.parse'):
+            api_response = response.json()
 
-        # Log the full API response for debugging
-        try:
-            response_json_str = json.dumps(api_response, ensure_ascii=False, separators=(',', ':'))
-            # Truncate if very large (>5000 chars) to avoid log bloat
-            if len(response_json_str) > 5000:
-                truncated_response = response_json_str[:5000] + "... [TRUNCATED]"
-                logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| API response for batch {batch_number} (TRUNCATED): {truncated_response}")
-            else:
-                logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| API response for batch {batch_number}: {response_json_str}")
-        except Exception as e:
-            logger.warning(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| Could not serialize API response for logging: {e}")
+        # Log the full API response for debugging (serialized only if DEBUG is enabled)
+        logger.debug(f"|HuaweiFetcher|_request_kpi_station_day| API response for batch {batch_number}: %s", LazyJson(api_response, limit=5000))
 
-        # Check if user must relogin (failCode 305)
-        if (
-            api_response.get('failCode') == 305
-            and api_response.get('success') is False
-            and api_response.get('message') == 'USER_MUST_RELOGIN'
-        ):
-            raise RuntimeError('Huawei API: USER_MUST_RELOGIN (305). Please re-login.', 305)
+        self.raise_for_api_error(api_response)
+        self._archive_response('getKpiStationDay', self.colombia_date_from_timestamp(collect_time), {'collect_time': collect_time}, body, api_response)
+        return api_response
 
-        # Check for rate limit error (failCode 407)
-        if (
-            api_response.get('failCode') == 407
-            and api_response.get('success') is False
-            and api_response.get('data') == 'ACCESS_FREQUENCY_IS_TOO_HIGH'
-        ):
-            raise RuntimeError('Huawei API: ACCESS_FREQUENCY_IS_TOO_HIGH (407). Rate limit exceeded.', 407)
+    @staticmethod
+    def parse_generacion_sistema_dia(api_response, collect_time):
+        """
+        Extracts PVYield per station from a getKpiStationDay response.
+
+        Args:
+            api_response (dict): Raw getKpiStationDay response.
+            collect_time (int): Colombian midnight of the requested day, in milliseconds.
 
+        Returns:
+            list: [{'stationCode': str, 'collectTime': int, 'PVYield': float or None}, ...]
+        """
         # Extract PVYield for the specified collect_time for each plant
+        return [row for row in HuaweiFetcher.parse_generacion_sistema_mes(api_response) if row['collectTime'] == collect_time]
+
+    @staticmethod
+    def parse_generacion_sistema_mes(api_response):
+        """
+        Extracts PVYield per station and day from a getKpiStationDay response (every day it contains).
+
+        Returns:
+            list: [{'stationCode': str, 'collectTime': int, 'PVYield': float or None}, ...]
+        """
         result = []
         for plant in api_response.get('data', []):
-            if plant.get('collectTime') == collect_time:
-                station_code = plant.get('stationCode')
-                pvyield = plant.get('dataItemMap', {}).get('PVYield')
-                result.append({
-                    'stationCode': station_code,
-                    'collectTime': collect_time,
-                    'PVYield': None if pvyield in (None, "None") else pvyield
-                })
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_sistema_dia| Successfully fetched Huawei system generation data for batch {batch_number}: {len(result)} systems")
+            pvyield = plant.get('dataItemMap', {}).get('PVYield')
+            result.append({
+                'stationCode': plant.get('stationCode'),
+                'collectTime': plant.get('collectTime'),
+                'PVYield': None if pvyield in (None, "None") else pvyield
+            })
         return result
     
-    def fetch_huawei_generacion_inversor_dia(self, dev_type_id, batch_number=1, collect_time=None, token=None):
+    def fetch_huawei_generacion_inversor_dia(self, dev_type_id, batch_number=1, collect_time=None, token=None, identificadores=None):
         """
         Fetch daily generation data for inverters with a given devTypeId.
         Args:
@@ -174,29 +295,73 @@ class HuaweiFetcher:
             batch_number (int): Which batch of 100 to return.
             collect_time (int): Timestamp in milliseconds since epoch (midnight Colombian time).
             token (str): Huawei API xsrf-token.
+            identificadores (list): identificador_inversor values to request (from HuaweiBatchPlanner);
+                when omitted the batch is taken from a fresh plan using batch_number.
         Returns:
             Raw API response (dict)
         """
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| Starting Huawei inverter generation data fetch for dev_type_id {dev_type_id}, batch {batch_number}")
-        
+        started = time.monotonic()
+        logger.debug(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| Starting Huawei inverter generation data fetch for dev_type_id {dev_type_id}, batch {batch_number}")
+        api_response, dev_ids = self._request_dev_kpi_day(dev_type_id, batch_number, collect_time, token, identificadores)
+        if 'error' in api_response:
+            return api_response
+
+        result = self.parse_generacion_inversor_dia(api_response, collect_time, dev_ids)
+        log_event(
+            logger, 'fetch_batch', f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| Successfully fetched Huawei inverter generation data for dev_type_id {dev_type_id}, batch {batch_number}: {len(result)} inverters",
+            vendor='huawei', endpoint='getDevKpiDay', batch=batch_number, dev_type_id=dev_type_id, requested=len(dev_ids),
+            returned=len(result), duration_ms=round((time.monotonic() - started) * 1000),
+        )
+        return result
+
+    def fetch_huawei_generacion_inversor_mes(self, dev_type_id, batch_number=1, collect_time=None, token=None, identificadores=None):
+        """
+        Fetch every day of the month containing collect_time for inverters with a given devTypeId.
+        getDevKpiDay answers with the whole month, so one call covers up to 31 days.
+        Args:
+            dev_type_id (str): The devTypeId to filter inverters.
+            batch_number (int): Which batch of 100 to return.
+            collect_time (int): Any day of the month, as Colombian midnight in milliseconds.
+            token (str): Huawei API xsrf-token.
+            identificadores (list): identificador_inversor values to request (see fetch_huawei_generacion_inversor_dia).
+        Returns:
+            list: [{'identificador_inversor': str, 'collectTime': int, 'product_power': float or None}, ...]
+        """
+        started = time.monotonic()
+        logger.debug(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_mes| Starting Huawei monthly inverter generation data fetch for dev_type_id {dev_type_id}, batch {batch_number}")
+        api_response, dev_ids = self._request_dev_kpi_day(dev_type_id, batch_number, collect_time, token, identificadores)
+        if 'error' in api_response:
+            return api_response
+
+        result = self.parse_generacion_inversor_mes(api_response, dev_ids)
+        log_event(
+            logger, 'fetch_batch', f"|HuaweiFetcher|fetch_huawei_generacion_inversor_mes| Successfully fetched Huawei monthly inverter generation data for dev_type_id {dev_type_id}, batch {batch_number}: {len(result)} inverter-days",
+            vendor='huawei', endpoint='getDevKpiDay', batch=batch_number, dev_type_id=dev_type_id, requested=len(dev_ids),
+            returned=len(result), duration_ms=round((time.monotonic() - started) * 1000),
+        )
+        return result
+
+    def _request_dev_kpi_day(self, dev_type_id, batch_number, collect_time, token, identificadores=None):
+        """
+        Calls getDevKpiDay for one batch of up to 100 inverters and returns (raw response, requested identificadores).
+        Returns ({'error': ...}, []) when the batch is empty.
+        """
         if collect_time is None:
-            logger.error("|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| collect_time parameter is required for inverter fetch")
+            logger.error("|HuaweiFetcher|_request_dev_kpi_day| collect_time parameter is required for inverter fetch")
             raise ValueError("collect_time (milliseconds since epoch) is required.")
         if not token:
-            logger.error("|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| xsrf-token parameter is required for inverter fetch")
+            logger.error("|HuaweiFetcher|_request_dev_kpi_day| xsrf-token parameter is required for inverter fetch")
             raise ValueError("xsrf-token is required as a parameter.")
 
-        batch_size = 100
-        offset = (batch_number - 1) * batch_size
-        qs = Inversor.objects.filter(huawei_devTypeId=dev_type_id).order_by('id')
-        batch = qs[offset:offset + batch_size]
-        dev_ids = [inv.identificador_inversor for inv in batch if inv.identificador_inversor]
+        if identificadores is None:
+            identificadores = HuaweiBatchPlanner.inversores(dev_type_id, KPI_BATCH_SIZE).batch(batch_number)
+        dev_ids = [identificador for identificador in identificadores if identificador]
         dev_ids_str = ",".join(dev_ids)
         if not dev_ids_str:
-            logger.warning(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| No Huawei inverters found for dev_type_id {dev_type_id}, batch {batch_number}")
-            return {"error": "No Huawei inverters found for this batch and devTypeId."}
+            logger.warning(f"|HuaweiFetcher|_request_dev_kpi_day| No Huawei inverters found for dev_type_id {dev_type_id}, batch {batch_number}")
+            return {"error": "No Huawei inverters found for this batch and devTypeId."}, []
 
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| Making API call to {self.BASE_URL}getDevKpiDay for dev_type_id {dev_type_id}, batch {batch_number} with {len(dev_ids)} inverters")
+        logger.debug(f"|HuaweiFetcher|_request_dev_kpi_day| Making API call to {self.BASE_URL}getDevKpiDay for dev_type_id {dev_type_id}, batch {batch_number} with {len(dev_ids)} inverters")
         url = self.BASE_URL + "getDevKpiDay"
         headers = {
             "xsrf-token": token,
@@ -207,45 +372,54 @@ class HuaweiFetcher:
             "devTypeId": dev_type_id,
             "collectTime": collect_time
         }
-        response = requests.post(url, headers=headers, json=body)
-        response.raise_for_status()
-        api_response = response.json()
+        import requests
+        with self.breaker, PipelineMetrics.stage('huawei.http') as stage:
+            response = requests.post(url, headers=headers, json=body, timeout=self.timeout)
+            stage.add(requests=1, bytes=len(response.content))
+            response.raise_for_status()
+        with PipelineMetrics.stage('huawei.parse'):
+            api_response = response.json()
+
+        # Log the full API response for debugging (serialized only if DEBUG is enabled)
+        logger.debug(f"|HuaweiFetcher|_request_dev_kpi_day| API response for dev_type_id {dev_type_id}, batch {batch_number}: %s", LazyJson(api_response, limit=5000))
+
+        self.raise_for_api_error(api_response)
+        context = {'collect_time': collect_time, 'dev_type_id': dev_type_id, 'identificadores': dev_ids}
+        self._archive_response('getDevKpiDay', self.colombia_date_from_timestamp(collect_time), context, body, api_response)
+        return api_response, dev_ids
 
-        # Log the full API response for debugging
-        try:
-            response_json_str = json.dumps(api_response, ensure_ascii=False, separators=(',', ':'))
-            # Truncate if very large (>5000 chars) to avoid log bloat
-            if len(response_json_str) > 5000:
-                truncated_response = response_json_str[:5000] + "... [TRUNCATED]"
-                logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| API response for dev_type_id {dev_type_id}, batch {batch_number} (TRUNCATED): {truncated_response}")
-            else:
-                logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| API response for dev_type_id {dev_type_id}, batch {batch_number}: {response_json_str}")
-        except Exception as e:
-            logger.warning(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| Could not serialize API response for logging: {e}")
+    @staticmethod
+    def parse_generacion_inversor_dia(api_response, collect_time, identificadores):
+        """
+        Extracts product_power per inverter from a getDevKpiDay response.
 
-        # Check if user must relogin (failCode 305)
-        if (
-            api_response.get('failCode') == 305
-            and api_response.get('success') is False
-            and api_response.get('message') == 'USER_MUST_RELOGIN'
-        ):
-            raise RuntimeError('Huawei API: USER_MUST_RELOGIN (305). Please re-login.', 305)
+        Args:
+            api_response (dict): Raw getDevKpiDay response.
+            collect_time (int): Colombian midnight of the requested day, in milliseconds.
+            identificadores (list): identificador_inversor values that were requested in this batch.
 
-        # Check for rate limit error (failCode 407)
-        if (
-            api_response.get('failCode') == 407
-            and api_response.get('success') is False
-            and api_response.get('data') == 'ACCESS_FREQUENCY_IS_TOO_HIGH'
-        ):
-            raise RuntimeError('Huawei API: ACCESS_FREQUENCY_IS_TOO_HIGH (407). Rate limit exceeded.', 407)
+        Returns:
+            list: [{'identificador_inversor': str, 'collectTime': int, 'product_power': float or None}, ...]
+        """
+        # Only keep the day we requested
+        return [
+            row for row in HuaweiFetcher.parse_generacion_inversor_mes(api_response, identificadores)
+            if row['collectTime'] == collect_time
+        ]
 
+    @staticmethod
+    def parse_generacion_inversor_mes(api_response, identificadores):
+        """
+        Extracts product_power per inverter and day from a getDevKpiDay response (every day it contains).
+
+        Returns:
+            list: [{'identificador_inversor': str, 'collectTime': int, 'product_power': float or None}, ...]
+        """
         # Build a mapping from the last 8 digits of identificador_inversor to the full identificador_inversor
-        batch_inversors = {inv.identificador_inversor[-8:]: inv.identificador_inversor for inv in batch if inv.identificador_inversor}
+        batch_inversors = {identificador[-8:]: identificador for identificador in identificadores if identificador}
         
         result = []
         for entry in api_response.get('data', []):
-            if entry.get('collectTime') != collect_time:
-                continue  # Only keep the day we requested
             dev_id_str = str(entry.get('devId'))
             dev_id_suffix = dev_id_str[-8:]  # last 8 digits
             our_id = batch_inversors.get(dev_id_suffix)
@@ -254,13 +428,12 @@ class HuaweiFetcher:
             product_power = entry.get('dataItemMap', {}).get('product_power')
             result.append({
                 'identificador_inversor': our_id,
-                'collectTime': collect_time,
+                'collectTime': entry.get('collectTime'),
                 'product_power': None if product_power in (None, "None") else product_power,
             })
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_inversor_dia| Successfully fetched Huawei inverter generation data for dev_type_id {dev_type_id}, batch {batch_number}: {len(result)} inverters")
         return result
 
-    def fetch_huawei_generacion_granular_dia(self, dev_type_id, batch_number=1, collect_time_0=None, collect_time_1=None, token=None):
+    def fetch_huawei_generacion_granular_dia(self, dev_type_id, batch_number=1, collect_time_0=None, collect_time_1=None, token=None, identificadores=None):
         """
         Prepares a batch of up to 10 devices of a given dev_type_id for data fetching.
 
@@ -270,11 +443,14 @@ class HuaweiFetcher:
             collect_time_0: The start of the time range (not used here).
             collect_time_1: The end of the time range (not used here).
             token: The authentication token (not used here).
+            identificadores (list): identificador_inversor values to request (up to 10, from HuaweiBatchPlanner);
+                when omitted the batch is taken from a fresh plan using batch_number.
 
         Returns:
             QuerySet: The batch of devices (Inversor objects) for this request.
         """
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Starting Huawei granular (MPPT) data fetch for dev_type_id {dev_type_id}, batch {batch_number}")
+        started = time.monotonic()
+        logger.debug(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Starting Huawei granular (MPPT) data fetch for dev_type_id {dev_type_id}, batch {batch_number}")
         
         if batch_number < 1:
             logger.error(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Invalid batch_number for granular fetch: {batch_number}, must be >= 1")
@@ -283,21 +459,17 @@ class HuaweiFetcher:
             logger.error("|HuaweiFetcher|fetch_huawei_generacion_granular_dia| dev_type_id is required for granular fetch")
             raise ValueError("dev_type_id is required.")
 
-        batch_size = 10
-        offset = (batch_number - 1) * batch_size
-        qs = Inversor.objects.filter(huawei_devTypeId=dev_type_id).order_by('id')
-        batch = qs[offset:offset + batch_size]
-        if not batch:
+        if identificadores is None:
+            identificadores = HuaweiBatchPlanner.inversores(dev_type_id, HISTORY_BATCH_SIZE).batch(batch_number)
+        identificadores = [identificador for identificador in identificadores if identificador]
+        if not identificadores:
             logger.warning(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| No devices found for dev_type_id {dev_type_id}, batch {batch_number}")
             raise ValueError("No devices found for the given dev_type_id and batch number.")
 
         # Prepare devIds as a comma-separated string of serials
-        dev_ids = ','.join([inv.identificador_inversor for inv in batch if inv.identificador_inversor])
-        if not dev_ids:
-            logger.error(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| No device serials found in batch {batch_number} for dev_type_id {dev_type_id}")
-            raise ValueError("No device serials found in batch.")
+        dev_ids = ','.join(identificadores)
 
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Making API call to {self.BASE_URL}getDevHistoryKpi for dev_type_id {dev_type_id}, batch {batch_number} with {len(batch)} devices")
+        logger.debug(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Making API call to {self.BASE_URL}getDevHistoryKpi for dev_type_id {dev_type_id}, batch {batch_number} with {len(identificadores)} devices")
         url = self.BASE_URL + "getDevHistoryKpi"
         headers = {
             "xsrf-token": token,
@@ -310,38 +482,46 @@ class HuaweiFetcher:
             "endTime": collect_time_1
         }
 
-        response = requests.post(url, headers=headers, json=body)
-        response.raise_for_status()
-        api_response = response.json()
+        import requests
+        with self.breaker, PipelineMetrics.stage('huawei.http') as stage:
+            response = requests.post(url, headers=headers, json=body, timeout=self.timeout)
+            stage.add(requests=1, bytes=len(response.content))
+            response.raise_for_status()
+        with PipelineMetrics.stage('huawei.parse'):
+            api_response = response.json()
+
+        # Log the full API response for debugging (serialized only if DEBUG is enabled)
+        logger.debug(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| API response for dev_type_id {dev_type_id}, batch {batch_number}: %s", LazyJson(api_response, limit=5000))
+
+        self.raise_for_api_error(api_response)
+        context = {
+            'dev_type_id': dev_type_id,
+            'identificadores': identificadores,
+            'collect_time_0': collect_time_0,
+            'collect_time_1': collect_time_1,
+        }
+        self._archive_response('getDevHistoryKpi', self.colombia_date_from_timestamp(collect_time_0), context, body, api_response)
 
-        # Log the full API response for debugging
-        try:
-            response_json_str = json.dumps(api_response, ensure_ascii=False, separators=(',', ':'))
-            # Truncate if very large (>5000 chars) to avoid log bloat
-            if len(response_json_str) > 5000:
-                truncated_response = response_json_str[:5000] + "... [TRUNCATED]"
-                logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| API response for dev_type_id {dev_type_id}, batch {batch_number} (TRUNCATED): {truncated_response}")
-            else:
-                logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| API response for dev_type_id {dev_type_id}, batch {batch_number}: {response_json_str}")
-        except Exception as e:
-            logger.warning(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Could not serialize API response for logging: {e}")
+        results = self.parse_generacion_granular_dia(api_response, identificadores)
+        log_event(
+            logger, 'fetch_batch', f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Successfully fetched Huawei granular (MPPT) data for dev_type_id {dev_type_id}, batch {batch_number}: {len(results)} devices with MPPT data",
+            vendor='huawei', endpoint='getDevHistoryKpi', batch=batch_number, dev_type_id=dev_type_id, requested=len(identificadores),
+            returned=len(results), duration_ms=round((time.monotonic() - started) * 1000),
+        )
+        return results  # Return the final dictionary mapping NE=... serials (or devIds) to their MPPT energy results
 
-        # Check if user must relogin (failCode 305)
-        if (
-            api_response.get('failCode') == 305
-            and api_response.get('success') is False
-            and api_response.get('message') == 'USER_MUST_RELOGIN'
-        ):
-            raise RuntimeError('Huawei API: USER_MUST_RELOGIN (305). Please re-login.', 305)
+    @staticmethod
+    def parse_generacion_granular_dia(api_response, identificadores):
+        """
+        Computes the energy produced by each MPPT tracker per device from a getDevHistoryKpi response.
 
-        # Check for rate limit error (failCode 407)
-        if (
-            api_response.get('failCode') == 407
-            and api_response.get('success') is False
-            and api_response.get('data') == 'ACCESS_FREQUENCY_IS_TOO_HIGH'
-        ):
-            raise RuntimeError('Huawei API: ACCESS_FREQUENCY_IS_TOO_HIGH (407). Rate limit exceeded.', 407)
+        Args:
+            api_response (dict): Raw getDevHistoryKpi response (5-minute samples of cumulative MPPT energy).
+            identificadores (list): identificador_inversor values ('NE=...') that were requested in this batch.
 
+        Returns:
+            dict: { 'NE=...': { 'mppt_1_cap': value, ... }, ... }
+        """
         # Process the response to compute energy produced by each MPPT tracker per device
         data = api_response.get("data", [])
         if isinstance(data, dict):
@@ -358,12 +538,12 @@ class HuaweiFetcher:
 
         # Build a mapping from devId to 'NE=' serials (using last digits)
         serial_map = {}
-        for inv in batch:
+        for identificador in identificadores:
             # Remove any non-digit characters from identificador_inversor for matching
-            serial_digits = ''.join(filter(str.isdigit, inv.identificador_inversor))
+            serial_digits = ''.join(filter(str.isdigit, identificador))
             for dev_id in grouped.keys():
                 if dev_id.endswith(serial_digits):
-                    serial_map[dev_id] = inv.identificador_inversor
+                    serial_map[dev_id] = identificador
 
         results = {}  # Initialize the results dictionary to store energy per device
         for dev_id, records in grouped.items():  # Iterate over each device's grouped records
@@ -387,7 +567,7 @@ class HuaweiFetcher:
                     
                     # Check for negative values (API data inconsistency/counter reset)
                     if daily_generation < 0:
-                        logger.error(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| NEGATIVE GENERATION DETECTED - DevID: {dev_id}, Serial: {serial_map.get(dev_id, dev_id)}, MPPT: {key}, First: {first_val}, Last: {last_val}, Calculated: {daily_generation} kWh. Setting to None.")
+                        logger.error(f"|HuaweiFetcher|parse_generacion_granular_dia| NEGATIVE GENERATION DETECTED - DevID: {dev_id}, Serial: {serial_map.get(dev_id, dev_id)}, MPPT: {key}, First: {first_val}, Last: {last_val}, Calculated: {daily_generation} kWh. Setting to None.")
                         daily_generation = None  # Set to None for invalid data
                     
                     mppt_results[key] = daily_generation  # Store the validated energy produced
@@ -395,5 +575,4 @@ class HuaweiFetcher:
             serial_key = serial_map.get(dev_id, dev_id)  # Use the NE=... serial if available, otherwise use dev_id
             results[serial_key] = mppt_results  # Store the MPPT results for this device in the results dictionary
         
-        logger.info(f"|HuaweiFetcher|fetch_huawei_generacion_granular_dia| Successfully fetched Huawei granular (MPPT) data for dev_type_id {dev_type_id}, batch {batch_number}: {len(results)} devices with MPPT data")
-        return results  # Return the final dictionary mapping NE=... serials (or devIds) to their MPPT energy results
\ No newline at end of file
+        return results
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Huawei Token Cache
+Stores the Huawei xsrf-token in the database (TokenSesionApi) so every command and process
+reuses one login. Huawei throttles logins heavily, so the token is only refreshed when a
+request fails with failCode 305 (session expired).
+
+Refreshes take a row lock (select_for_update): when several processes see the same expired
+token, the first one logs in and the others wait for the lock and pick up the new token. The row
+is created before it is locked (a missing row cannot be locked), and the login runs under the
+lock, so it must be short: HuaweiFetcher.login uses LOGIN_TIMEOUT.
+"""
+
+import logging
+import threading
+from django.db import connection, transaction
+from django.utils import timezone
+from solarData.models import TokenSesionApi
+
+logger = logging.getLogger('huawei_fetcher')
+
+PROVEEDOR_HUAWEI = 'huawei'
+
+
+class HuaweiTokenCache:
+    """
+    Database-backed xsrf-token shared by every Huawei client.
+    """
+
+    def __init__(self, login, proveedor=PROVEEDOR_HUAWEI):
+        """
+        Args:
+            login (callable): Performs the actual Huawei login and returns the xsrf-token
+            proveedor (str): Key of the TokenSesionApi row
+        """
+        self.login = login
+        self.proveedor = proveedor
+
+    def get(self):
+        """
+        Returns the cached token, logging in only when none is stored yet.
+        Returns:
+            str: xsrf-token
+        """
+        opened = connection.connection is None
+        try:
+            token = (
+                TokenSesionApi.objects.filter(proveedor=self.proveedor)
+                .values_list('token', flat=True).first()
+            )
+        finally:
+            self._close_thread_connection(opened)
+        if token:
+            logger.info(f"|HuaweiTokenCache|get| Reusing cached Huawei token")
+            return token
+        return self.refresh(stale_token=None)
+
+    def refresh(self, stale_token):
+        """
+        Replaces stale_token with a new login. If another client already replaced it,
+        the stored token is returned without logging in.
+        Args:
+            stale_token (str): Token that failed with 305 (None when no token was cached)
+        Returns:
+            str: xsrf-token
+        """
+        opened = connection.connection is None
+        try:
+            # Outside the lock: SELECT ... FOR UPDATE on a missing row locks nothing, so two first
+            # logins would not wait for each other
+            fila, _ = TokenSesionApi.objects.get_or_create(proveedor=self.proveedor)
+            with transaction.atomic():
+                cached = TokenSesionApi.objects.select_for_update().get(pk=fila.pk)
+                if cached.token and cached.token != stale_token:
+                    logger.info(f"|HuaweiTokenCache|refresh| Token already refreshed at {cached.fecha_obtencion}, reusing it")
+                    return cached.token
+
+                logger.warning(f"|HuaweiTokenCache|refresh| No valid cached token, logging in to Huawei")
+                cached.token = self.login()
+                cached.fecha_obtencion = timezone.now()
+                cached.save(update_fields=['token', 'fecha_obtencion'])
+                logger.info(f"|HuaweiTokenCache|refresh| New Huawei token stored at {cached.fecha_obtencion}")
+                return cached.token
+        finally:
+            self._close_thread_connection(opened)
+
+    @staticmethod
+    def _close_thread_connection(opened):
+        """Close a connection this call opened in a worker thread so it is not leaked with the thread."""
+        if opened and threading.current_thread() is not threading.main_thread():
+            connection.close()
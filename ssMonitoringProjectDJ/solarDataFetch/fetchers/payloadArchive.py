@@ -0,0 +1,113 @@
+"""
+Vendor Payload Archive
+Captures raw vendor API responses on disk so they can be replayed later through
+the same parse and store path, without calling the vendor APIs again.
+
+Layout:
+    <root>/<YYYY-MM-DD>/<vendor>/<endpoint>/<sha1 of request>.json
+
+Each file holds one request/response pair plus the context the parser needs
+(collect times, the identifiers that were requested, ...).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+ARCHIVE_VERSION = 1
+
+
+class PayloadArchive:
+    """
+    Stores and reads raw vendor payloads grouped by collection date, vendor and endpoint.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Returns an archive rooted at settings.PAYLOAD_ARCHIVE_DIR, or None when capture is disabled.
+        """
+        root = getattr(settings, 'PAYLOAD_ARCHIVE_DIR', None)
+        return cls(root) if root else None
+
+    @staticmethod
+    def request_key(request_body):
+        """Stable file name for a request body (same request -> same file, latest capture wins)."""
+        canonical = json.dumps(request_body, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+    def _endpoint_dir(self, collect_date, vendor, endpoint):
+        return self.root / str(collect_date) / vendor / endpoint
+
+    def save(self, vendor, endpoint, collect_date, context, request_body, response):
+        """
+        Archive one raw response. Never raises: a failing archive must not break collection.
+        Problems are logged to the vendor's fetcher logger.
+
+        Args:
+            vendor (str): 'huawei', 'solis' or 'hoymiles'
+            endpoint (str): API endpoint name (e.g. 'getKpiStationDay')
+            collect_date (str): Collection date in YYYY-MM-DD format
+            context (dict): Whatever the parser needs besides the response
+            request_body (dict): Body sent to the API
+            response (dict): Parsed JSON response
+        """
+        try:
+            directory = self._endpoint_dir(collect_date, vendor, endpoint)
+            directory.mkdir(parents=True, exist_ok=True)
+            record = {
+                'version': ARCHIVE_VERSION,
+                'vendor': vendor,
+                'endpoint': endpoint,
+                'collect_date': str(collect_date),
+                'captured_at': datetime.now(timezone.utc).isoformat(),
+                'context': context,
+                'request': request_body,
+                'response': response,
+            }
+            target = directory / f"{self.request_key(request_body)}.json"
+            # Write to a temp file and rename so a reader never sees half a payload
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                json.dump(record, tmp_file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, target)
+        except Exception as e:
+            logging.getLogger(f'{vendor}_fetcher').warning(f"|PayloadArchive|save| Could not archive {vendor} {endpoint} payload for {collect_date}: {e}")
+
+    def records(self, vendor, endpoint, collect_date):
+        """
+        Yields archived records for one vendor endpoint and date, in file name order.
+        """
+        directory = self._endpoint_dir(collect_date, vendor, endpoint)
+        if not directory.is_dir():
+            return
+        for path in sorted(directory.glob('*.json')):
+            try:
+                with open(path, encoding='utf-8') as archived_file:
+                    yield json.load(archived_file)
+            except (OSError, ValueError) as e:
+                logging.getLogger(f'{vendor}_fetcher').warning(f"|PayloadArchive|records| Skipping unreadable archive file {path}: {e}")
+
+    def dates(self):
+        """Returns the sorted list of collection dates (YYYY-MM-DD) present in the archive."""
+        if not self.root.is_dir():
+            return []
+        found = []
+        for child in self.root.iterdir():
+            if not child.is_dir():
+                continue
+            try:
+                datetime.strptime(child.name, '%Y-%m-%d')
+            except ValueError:
+                continue
+            found.append(child.name)
+        return sorted(found)
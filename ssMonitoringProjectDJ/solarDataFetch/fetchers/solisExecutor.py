@@ -0,0 +1,169 @@
+"""
+Solis Concurrent Executor
+Keeps several signed inverterDay (or stationDayEnergyList page) requests in flight at once,
+paced to the SolisCloud quota.
+
+- Requests go through the fetcher's shared requests.Session, so TLS connections are reused.
+- Each request is signed in the worker right before it is sent (the Date header is part of the
+  signature), and request starts are spaced by min_interval to stay under the quota. The spacing
+  is kept by one SolisRequestPacer per API key for the whole process, so executors running at the
+  same time (e.g. the backfill day pool) share the quota instead of each using all of it.
+- Results are handed back to the calling thread in pages, so the caller can store a whole page
+  with one bulk upsert on its own DB connection.
+"""
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from solarDataFetch.fetchers.solisFetcher import STATION_PAGE_SIZE
+from solarData.pipeline_metrics import PipelineMetrics
+
+logger = logging.getLogger('solis_fetcher')
+
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MIN_INTERVAL = 0.5   # SolisCloud allows about 2 requests per second per key
+DEFAULT_PAGE_SIZE = 100
+
+
+class SolisRequestPacer:
+    """
+    Minimum interval between Solis request starts, shared by every executor of the process that
+    signs with the same API key.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL):
+        self.min_interval = max(0.0, min_interval)
+        self._start_lock = threading.Lock()
+        self._last_start = 0.0
+
+    @classmethod
+    def shared(cls, key_id, min_interval=DEFAULT_MIN_INTERVAL):
+        """Process-wide pacer of key_id; the first caller sets min_interval, later callers may raise it."""
+        with cls._shared_lock:
+            pacer = cls._shared.get(key_id)
+            if pacer is None:
+                pacer = cls._shared[key_id] = cls(min_interval)
+            else:
+                pacer.min_interval = max(pacer.min_interval, min_interval)
+            return pacer
+
+    def wait(self):
+        """Waits until min_interval has passed since the previous request start."""
+        if self.min_interval <= 0:
+            return
+        with self._start_lock:
+            wait = self._last_start + self.min_interval - time.monotonic()
+            if wait > 0:
+                with PipelineMetrics.stage('solis.rate_limit_sleep'):
+                    time.sleep(wait)
+            self._last_start = time.monotonic()
+
+
+class SolisExecutor:
+    """
+    Runs Solis per-inverter fetches on a bounded pool with a minimum interval between request starts.
+    """
+
+    def __init__(self, fetcher, max_in_flight=DEFAULT_MAX_IN_FLIGHT, min_interval=DEFAULT_MIN_INTERVAL):
+        self.fetcher = fetcher
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_interval = max(0.0, min_interval)
+        self.fetcher.configure_pool(self.max_in_flight)
+        self.pacer = SolisRequestPacer.shared(fetcher.key_id, self.min_interval)
+
+    def _pace(self):
+        """Waits until the key's min_interval has passed since the previous request start in the process."""
+        self.pacer.wait()
+
+    def fetch_inversor(self, inverter_id, collect_time):
+        self._pace()
+        return self.fetcher.fetch_solis_generacion_un_inversor_dia(inverter_id=inverter_id, collect_time=collect_time)
+
+    def run_pages(self, inverter_ids, collect_time, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Fetches every inverter and yields results in pages as they complete.
+
+        Args:
+            inverter_ids (list): Solis inverter ids
+            collect_time (str): Date in YYYY-MM-DD format
+            page_size (int): Completed results per page
+
+        Yields:
+            tuple: (results, errors) where results is a list of parsed inverterDay dicts and
+                   errors is {inverter_id: exception}. The last page may be shorter.
+        """
+        results = []
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = {pool.submit(self.fetch_inversor, inverter_id, collect_time): inverter_id for inverter_id in inverter_ids}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                        if result:
+                            results.append(result)
+                    except Exception as e:
+                        errors[futures[future]] = e
+                    if len(results) + len(errors) >= page_size:
+                        yield results, errors
+                        results, errors = [], {}
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        if results or errors:
+            yield results, errors
+
+    def fetch_sistema_pagina(self, page_number, collect_time):
+        self._pace()
+        return self.fetcher.fetch_solis_generacion_sistema_pagina(page_number, collect_time)
+
+    def run_system_pages(self, collect_time, skip_pages=()):
+        """
+        Fetches every stationDayEnergyList page. Page 1 is read first to learn the total record
+        count; the remaining pages are then requested concurrently.
+
+        Args:
+            collect_time (str): Date in YYYY-MM-DD format
+            skip_pages (iterable): Pages already stored (resumed run). Page 1 is always read for the
+                                   total, and sequential paging still reads every page.
+
+        Yields:
+            tuple: (page_number, result_list) in completion order. Errors are raised.
+        """
+        first_page, total = self.fetch_sistema_pagina(1, collect_time)
+        yield 1, first_page
+
+        if total is None:
+            # Total not reported: fall back to reading pages in order until a short page
+            logger.warning("|SolisExecutor|run_system_pages| stationDayEnergyList did not report a total, paging sequentially")
+            page_number, page = 1, first_page
+            while len(page) >= STATION_PAGE_SIZE:
+                page_number += 1
+                page, _ = self.fetch_sistema_pagina(page_number, collect_time)
+                yield page_number, page
+            return
+
+        page_count = math.ceil(total / STATION_PAGE_SIZE)
+        logger.info(f"|SolisExecutor|run_system_pages| {total} systems reported, fetching {page_count - 1} more pages with {self.max_in_flight} workers")
+        if page_count <= 1:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = {
+                pool.submit(self.fetch_sistema_pagina, page_number, collect_time): page_number
+                for page_number in range(2, page_count + 1) if page_number not in skip_pages
+            }
+            try:
+                for future in as_completed(futures):
+                    page, _ = future.result()
+                    yield futures[future], page
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
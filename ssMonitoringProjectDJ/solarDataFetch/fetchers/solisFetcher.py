@@ -1,30 +1,56 @@
-import requests
 import json
 import hashlib
 import base64
 import hmac
-import pytz
 import logging
 import os
+import time
 from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from django.conf import settings
 from solarData.models import Proyecto
+from solarDataFetch.fetchers.payloadArchive import PayloadArchive
+from solarDataFetch.fetchers.circuitBreaker import CircuitBreaker, CircuitOpenError
+from solarData.log_pipeline import LazyJson, log_event
+from solarData.pipeline_metrics import PipelineMetrics
 
 # Set up logger for Solis fetcher operations
 logger = logging.getLogger('solis_fetcher')
 
+# stationDayEnergyList rejects pageSize above 100
+STATION_PAGE_SIZE = 100
+
 class SolisFetcher:
-    url = "https://www.soliscloud.com:13333"
     key_id="1300386381677289904"
     
     def __init__(self):
         """Initialize the Solis fetcher with configuration from environment variables."""
+        self.url = settings.VENDOR_API_BASE_URLS['solis'].rstrip('/')
         self.key_secret = os.getenv('SOLIS_API_SECRET')
         
         if not self.key_secret:
             raise ValueError("SOLIS_API_SECRET environment variable is required")
         
+        # Raw responses are archived for --replay when PAYLOAD_ARCHIVE_DIR is configured
+        self.archive = PayloadArchive.from_settings()
+        
+        # One session for every call so TLS connections to SolisCloud are reused
+        import requests
+        self.session = requests.Session()
+
+        # Requests time out and go through the shared Solis circuit breaker, so a degraded SolisCloud fails fast
+        self.timeout = 60
+        self.breaker = CircuitBreaker.for_vendor('solis')
+        
         logger.info("|SolisFetcher|__init__| Solis fetcher initialized")
 
+    def configure_pool(self, max_connections):
+        """Size the session's connection pool for max_connections concurrent requests."""
+        import requests.adapters
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_connections))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
     def process_data_to_base64_md5(self, body):
         """
         Processes a string body or dict by:
@@ -75,7 +101,7 @@ class SolisFetcher:
         Returns:
             int: Timezone offset in hours (e.g., -5 or -4)
         """
-        colombia_tz = pytz.timezone('America/Bogota')
+        colombia_tz = ZoneInfo('America/Bogota')
         
         if target_date is None:
             target_date = datetime.now()
@@ -85,7 +111,7 @@ class SolisFetcher:
         # Create a datetime in Colombian timezone
         if target_date.tzinfo is None:
             # Make it timezone-aware in UTC first, then convert
-            target_date = pytz.utc.localize(target_date)
+            target_date = target_date.replace(tzinfo=timezone.utc)
         
         colombia_time = target_date.astimezone(colombia_tz)
         
@@ -134,29 +160,40 @@ class SolisFetcher:
         Uses /v1/api/stationDayEnergyList endpoint.
         Returns data with PVYield=0 for any system with no data.
         """
-        logger.info(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Starting Solis system generation data fetch for batch {batch_number} on date {collect_time}")
+        result_list, _ = self.fetch_solis_generacion_sistema_pagina(batch_number, collect_time)
+        return result_list
+
+    def fetch_solis_generacion_sistema_pagina(self, batch_number=1, collect_time=None):
+        """
+        Fetch one stationDayEnergyList page along with the total number of records, so callers
+        can request the remaining pages at once.
+
+        Args:
+            batch_number (int): Page number (1-based)
+            collect_time (str): Date in YYYY-MM-DD format
+
+        Returns:
+            tuple: (result_list, total) where total is None if the response does not report it
+        """
+        started = time.monotonic()
+        logger.debug(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Starting Solis system generation data fetch for batch {batch_number} on date {collect_time}")
         
         endpoint = "/v1/api/stationDayEnergyList"
-        body = {"pageNo":f"{batch_number}", "pageSize": 100, "time": collect_time}
+        body = {"pageNo":f"{batch_number}", "pageSize": STATION_PAGE_SIZE, "time": collect_time}
         headers = self.build_solis_headers("POST", endpoint, body)
+        import requests
 
         try:
-            logger.info(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Making Solis API call to {self.url + endpoint} for batch {batch_number}")
-            response = requests.post(self.url + endpoint, headers=headers, json=body)
-            response.raise_for_status()
-            parsed = response.json()
+            logger.debug(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Making Solis API call to {self.url + endpoint} for batch {batch_number}")
+            with self.breaker, PipelineMetrics.stage('solis.http') as stage:
+                response = self.session.post(self.url + endpoint, headers=headers, json=body, timeout=self.timeout)
+                stage.add(requests=1, bytes=len(response.content))
+                response.raise_for_status()
+            with PipelineMetrics.stage('solis.parse'):
+                parsed = response.json()
             
-            # Log the full API response for debugging
-            try:
-                response_json_str = json.dumps(parsed, ensure_ascii=False, separators=(',', ':'))
-                # Truncate if very large (>5000 chars) to avoid log bloat
-                if len(response_json_str) > 5000:
-                    truncated_response = response_json_str[:5000] + "... [TRUNCATED]"
-                    logger.info(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| API response for batch {batch_number} (TRUNCATED): {truncated_response}")
-                else:
-                    logger.info(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| API response for batch {batch_number}: {response_json_str}")
-            except Exception as e:
-                logger.warning(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Could not serialize API response for logging: {e}")
+            # Log the full API response for debugging (serialized only if DEBUG is enabled)
+            logger.debug(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| API response for batch {batch_number}: %s", LazyJson(parsed, limit=5000))
             
             # Check if the API returned an error in the JSON body
             if not parsed.get("success", False):
@@ -164,32 +201,22 @@ class SolisFetcher:
                 error_code = parsed.get("code", "N/A")
                 logger.error(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Solis API returned error for batch {batch_number}: {error_msg} (code {error_code})")
                 raise RuntimeError(f"Solis API error (code {error_code}): {error_msg}")
-                
-            # Transform to required output structure
-            # If condCodeD is "305" and energy is 0, treat as no data (None)
-            # Otherwise use the actual energy value
-            result_list = []
-            for rec in parsed.get("data", {}).get("records", []):
-                energy = rec.get("energy")
-                cond_code = rec.get("condCodeD")
-                
-                # Check if system is offline (condCodeD=305) with 0 energy → store NULL
-                if cond_code == "305" and energy == 0.0:
-                    pv_yield = None
-                    logger.info(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| System {rec['id']} offline (condCodeD=305, energy=0), setting PVYield to NULL")
-                else:
-                    pv_yield = energy
-                
-                result_list.append({
-                    "id": rec["id"],
-                    "collectTime": rec["dateStr"],
-                    "PVYield": pv_yield
-                })
             
+            if self.archive:
+                self.archive.save('solis', 'stationDayEnergyList', collect_time, {'page': batch_number}, body, parsed)
+                
+            result_list = self.parse_generacion_sistema_dia(parsed)
             
-            logger.info(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Solis system generation data fetched successfully for batch {batch_number}: {len(result_list)} systems")
-            return result_list
+            total = self.parse_total_registros(parsed)
+            log_event(
+                logger, 'fetch_batch', f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Solis system generation data fetched successfully for batch {batch_number}: {len(result_list)} systems (total reported: {total})",
+                vendor='solis', endpoint='stationDayEnergyList', batch=batch_number, returned=len(result_list), total=total,
+                duration_ms=round((time.monotonic() - started) * 1000),
+            )
+            return result_list, total
             
+        except CircuitOpenError:
+            raise
         except requests.exceptions.HTTPError as http_err:
             logger.error(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| HTTP error in Solis system fetch for batch {batch_number}: {http_err}")
             raise RuntimeError(f"HTTP error occurred: {http_err}") from http_err
@@ -200,6 +227,43 @@ class SolisFetcher:
             logger.error(f"|SolisFetcher|fetch_solis_generacion_sistema_dia| Unexpected error in Solis system fetch for batch {batch_number}: {e}")
             raise RuntimeError(f"Unexpected error: {e}") from e
 
+    @staticmethod
+    def parse_total_registros(parsed):
+        """Total number of records reported by a paged response (data.total), or None if missing."""
+        total = (parsed.get("data") or {}).get("total")
+        try:
+            return int(total) if total is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def parse_generacion_sistema_dia(parsed):
+        """
+        Transforms a stationDayEnergyList response into [{'id', 'collectTime', 'PVYield'}, ...].
+        If condCodeD is "305" and energy is 0, the system was offline and PVYield is None.
+        """
+        # Transform to required output structure
+        # If condCodeD is "305" and energy is 0, treat as no data (None)
+        # Otherwise use the actual energy value
+        result_list = []
+        for rec in parsed.get("data", {}).get("records", []):
+            energy = rec.get("energy")
+            cond_code = rec.get("condCodeD")
+            
+            # Check if system is offline (condCodeD=305) with 0 energy → store NULL
+            if cond_code == "305" and energy == 0.0:
+                pv_yield = None
+                logger.debug(f"|SolisFetcher|parse_generacion_sistema_dia| System {rec['id']} offline (condCodeD=305, energy=0), setting PVYield to NULL")
+            else:
+                pv_yield = energy
+            
+            result_list.append({
+                "id": rec["id"],
+                "collectTime": rec["dateStr"],
+                "PVYield": pv_yield
+            })
+        return result_list
+
     def fetch_solis_generacion_un_inversor_dia(self, inverter_id, collect_time):
         """
         Fetch inverter data from Solis API.
@@ -217,7 +281,8 @@ class SolisFetcher:
         Raises:
             RuntimeError: If there's an HTTP error, JSON decode error, or API returns success=False.
         """
-        logger.info(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Starting Solis inverter data fetch for inverter {inverter_id} on date {collect_time}")
+        started = time.monotonic()
+        logger.debug(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Starting Solis inverter data fetch for inverter {inverter_id} on date {collect_time}")
         
         endpoint = "/v1/api/inverterDay"
         body = {
@@ -227,55 +292,38 @@ class SolisFetcher:
             "money": "COP"
         }
         headers = self.build_solis_headers("POST", endpoint, body)
+        import requests
 
         try:
-            logger.info(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Making Solis API call to {self.url + endpoint} for inverter {inverter_id}")
-            response = requests.post(self.url + endpoint, headers=headers, json=body)
-            response.raise_for_status()
-            parsed = response.json()
-            
-            # Log the full API response for debugging
-            try:
-                response_json_str = json.dumps(parsed, ensure_ascii=False, separators=(',', ':'))
-                # Truncate if very large (>5000 chars) to avoid log bloat
-                if len(response_json_str) > 5000:
-                    truncated_response = response_json_str[:5000] + "... [TRUNCATED]"
-                    logger.info(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| API response for inverter {inverter_id} (TRUNCATED): {truncated_response}")
-                else:
-                    logger.info(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| API response for inverter {inverter_id}: {response_json_str}")
-            except Exception as e:
-                logger.warning(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Could not serialize API response for logging: {e}")
+            logger.debug(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Making Solis API call to {self.url + endpoint} for inverter {inverter_id}")
+            with self.breaker, PipelineMetrics.stage('solis.http') as stage:
+                response = self.session.post(self.url + endpoint, headers=headers, json=body, timeout=self.timeout)
+                stage.add(requests=1, bytes=len(response.content))
+                response.raise_for_status()
+            response_text = response.text
             
-            # Extract last eToday value and format output
-            data_array = parsed.get("data", [])
-            if not data_array:
-                logger.warning(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| No data found for Solis inverter {inverter_id} on {collect_time} (offline/no WiFi), returning NULL")
-                # Return NULL when no data found (inverter offline)
-                return {
-                    'identificador_inversor': f'{inverter_id}',
-                    'collectTime': datetime.strptime(collect_time, "%Y-%m-%d").strftime("%d-%m-%Y"),
-                    'PVYield': None
-                }
+            # Log the API response for debugging, first 5000 chars only (formatted only if DEBUG is enabled)
+            logger.debug(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| API response for inverter {inverter_id}: %.5000s", response_text)
             
-            # Get the last entry (latest time)
-            last_entry = data_array[-1]
-            etoday_value = last_entry.get("eToday")  # Allow None values
-            
-            # Extract date from the JSON response (timeStr format: "2025-06-18 18:35:41")
-            time_str = last_entry.get("timeStr", "")
-            date_obj = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-            formatted_date = date_obj.strftime("%d-%m-%Y")
-            
-            # Create output in requested format
-            result = {
-                'identificador_inversor': f'{inverter_id}',
-                'collectTime': formatted_date,
-                    'PVYield': float(etoday_value) if etoday_value is not None else None  # Convert None to 0
-            }
+            with PipelineMetrics.stage('solis.parse'):
+                if self.archive:
+                    # The archive needs the full payload for --replay
+                    parsed = json.loads(response_text)
+                    context = {'inverter_id': inverter_id, 'collect_time': collect_time}
+                    self.archive.save('solis', 'inverterDay', collect_time, context, body, parsed)
+                    result = self.parse_generacion_un_inversor_dia(parsed, inverter_id, collect_time)
+                else:
+                    result = self.parse_ultimo_registro_inversor_dia(response_text, inverter_id, collect_time)
             
-            logger.info(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Solis inverter data fetched successfully for inverter {inverter_id}: PVYield = {result['PVYield']} kWh")
+            log_event(
+                logger, 'fetch_batch', f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Solis inverter data fetched successfully for inverter {inverter_id}: PVYield = {result['PVYield']} kWh",
+                vendor='solis', endpoint='inverterDay', inverter=inverter_id, returned=1,
+                duration_ms=round((time.monotonic() - started) * 1000),
+            )
             return result
             
+        except CircuitOpenError:
+            raise
         except requests.exceptions.HTTPError as http_err:
             logger.error(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| HTTP error in Solis inverter fetch for {inverter_id}: {http_err}")
             raise RuntimeError(f"HTTP error occurred: {http_err}") from http_err
@@ -284,4 +332,95 @@ class SolisFetcher:
             raise RuntimeError(f"Failed to parse JSON response: {json_err}") from json_err
         except Exception as e:
             logger.error(f"|SolisFetcher|fetch_solis_generacion_un_inversor_dia| Unexpected error in Solis inverter fetch for {inverter_id}: {e}")
-            raise RuntimeError(f"Unexpected error: {e}") from e
\ No newline at end of file
+            raise RuntimeError(f"Unexpected error: {e}") from e
+
+    @staticmethod
+    def _last_record(response_text):
+        """
+        Decodes only the last record of the data array of an inverterDay body: the object around the
+        last "timeStr", accepted only when it is the final element of its array.
+        Returns the record, or None when it cannot be located that way.
+        """
+        position = response_text.rfind('"timeStr"')
+        if position < 0:
+            return None
+        start = response_text.rfind('{', 0, position)
+        if start < 0:
+            return None
+        try:
+            record, end = json.JSONDecoder().raw_decode(response_text, start)
+        except json.JSONDecodeError:
+            return None
+        before = response_text[:start].rstrip()
+        after = response_text[end:].lstrip()
+        # A last record without timeStr leaves the previous record here, followed by ',' instead of ']'
+        if not isinstance(record, dict) or "timeStr" not in record or not before.endswith((',', '[')) or not after.startswith(']'):
+            return None
+        return record
+
+    @staticmethod
+    def parse_ultimo_registro_inversor_dia(response_text, inverter_id, collect_time):
+        """
+        Same result as parse_generacion_un_inversor_dia, decoding only the last record of an inverterDay
+        body instead of the whole day series. Bodies without records (errors, offline inverters) or
+        whose last record cannot be located go through the full parse.
+
+        Args:
+            response_text (str): Raw inverterDay response body.
+            inverter_id (str): The ID of the inverter that was requested.
+            collect_time (str): The requested date in YYYY-MM-DD format.
+
+        Returns:
+            dict: {'identificador_inversor', 'collectTime' (DD-MM-YYYY), 'PVYield'}
+        """
+        last_entry = SolisFetcher._last_record(response_text)
+        if last_entry is None:
+            return SolisFetcher.parse_generacion_un_inversor_dia(json.loads(response_text), inverter_id, collect_time)
+        
+        etoday_value = last_entry.get("eToday")
+        date_obj = datetime.strptime(last_entry["timeStr"], "%Y-%m-%d %H:%M:%S")
+        return {
+            'identificador_inversor': f'{inverter_id}',
+            'collectTime': date_obj.strftime("%d-%m-%Y"),
+            'PVYield': float(etoday_value) if etoday_value is not None else None
+        }
+
+    @staticmethod
+    def parse_generacion_un_inversor_dia(parsed, inverter_id, collect_time):
+        """
+        Extracts the last eToday value of an inverterDay response.
+
+        Args:
+            parsed (dict): Raw inverterDay response.
+            inverter_id (str): The ID of the inverter that was requested.
+            collect_time (str): The requested date in YYYY-MM-DD format.
+
+        Returns:
+            dict: {'identificador_inversor', 'collectTime' (DD-MM-YYYY), 'PVYield'}
+        """
+        # Extract last eToday value and format output
+        data_array = parsed.get("data", [])
+        if not data_array:
+            logger.warning(f"|SolisFetcher|parse_generacion_un_inversor_dia| No data found for Solis inverter {inverter_id} on {collect_time} (offline/no WiFi), returning NULL")
+            # Return NULL when no data found (inverter offline)
+            return {
+                'identificador_inversor': f'{inverter_id}',
+                'collectTime': datetime.strptime(collect_time, "%Y-%m-%d").strftime("%d-%m-%Y"),
+                'PVYield': None
+            }
+        
+        # Get the last entry (latest time)
+        last_entry = data_array[-1]
+        etoday_value = last_entry.get("eToday")  # Allow None values
+        
+        # Extract date from the JSON response (timeStr format: "2025-06-18 18:35:41")
+        time_str = last_entry.get("timeStr", "")
+        date_obj = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
+        formatted_date = date_obj.strftime("%d-%m-%Y")
+        
+        # Create output in requested format
+        return {
+            'identificador_inversor': f'{inverter_id}',
+            'collectTime': formatted_date,
+            'PVYield': float(etoday_value) if etoday_value is not None else None
+        }
@@ -0,0 +1,492 @@
+"""
+Vendor API Stand-in Servers
+Local HTTP servers answering the Huawei, Solis and Hoymiles endpoints the collectors call, so the
+fetchers, executors and *_gen commands can be tested and benchmarked without the vendor clouds:
+
+- Huawei thirdData: login, getKpiStationDay, getDevKpiDay, getDevHistoryKpi
+- SolisCloud: /v1/api/stationDayEnergyList, /v1/api/inverterDay
+- Hoymiles: /v0/zhgf-core/oapi/0/findStation30dayEnergy, /v2/query/<plant>/<sn>/mi_data_day
+
+Every server can be configured with:
+- latency / jitter: seconds added to every answer (jitter is a random extra up to that value)
+- quota / window: requests allowed per window seconds; above it Huawei answers failCode 407
+  ACCESS_FREQUENCY_IS_TOO_HIGH (per endpoint) and Hoymiles "More than times of calls per minute"
+  (per key). SolisCloud is only paced by the client, so it has no quota here.
+- token_requests: requests a Huawei token is valid for; then failCode 305 USER_MUST_RELOGIN
+- samples_per_day: points of the intraday series (getDevHistoryKpi, inverterDay, mi_data_day),
+  which sets the payload size (288 = every 5 minutes)
+- offline: share of Solis stations/inverters and Hoymiles microinverters reported without data
+
+Values are derived from a hash of the seed, device and date, so the same request always gets the
+same answer. Point the fetchers at the servers with settings():
+
+    with MockVendorServers(estaciones_solis=ids, latency=0.05) as servers:
+        with override_settings(**servers.settings()):
+            call_command('collect_all_gen', date='2025-06-01')
+"""
+
+import calendar
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque, defaultdict
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger('management_commands')
+
+COLOMBIA_TZ = ZoneInfo('America/Bogota')
+MOCK_TOKEN_PREFIX = 'mock-'
+DEFAULT_SAMPLES_PER_DAY = 288
+DEFAULT_OFFLINE = 0.02
+DEFAULT_CANALES = 4            # MPPTs / DC ports of a device missing from canales
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Reads the JSON body, hands the request to the owning MockVendorServer and writes its JSON answer."""
+
+    # Keep-alive, so client connection pools behave as against the vendor clouds
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        self._answer()
+
+    def _answer(self):
+        server = self.server.mock
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+        url = urlsplit(self.path)
+        server.esperar()
+        try:
+            status, headers, payload = server.responder(url.path, parse_qs(url.query), body, self.headers)
+        except Exception as e:
+            logger.exception(f"|MockVendorServer|_answer| {server.vendor} failed answering {url.path}: {e}")
+            status, headers, payload = 500, {}, {'error': str(e)}
+        data = json.dumps(payload, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        server.contar(len(data))
+
+    def log_message(self, format, *args):
+        # One line per request would drown the benchmark output
+        pass
+
+
+class MockVendorServer:
+    """
+    One vendor stand-in on a local port (port 0 picks a free one). Subclasses implement responder().
+    """
+
+    vendor = None
+
+    def __init__(self, latency=0.0, jitter=0.0, quota=None, window=60.0, samples_per_day=DEFAULT_SAMPLES_PER_DAY,
+                 offline=DEFAULT_OFFLINE, seed=0, host='127.0.0.1', port=0):
+        """
+        Args:
+            latency (float): Seconds added to every answer
+            jitter (float): Random extra seconds, up to this value
+            quota (int): Requests allowed per window (None = unlimited)
+            window (float): Length of the quota window in seconds
+            samples_per_day (int): Points of the intraday series
+            offline (float): Share of devices answered as offline for the day
+            seed (int): Seed of the generated values
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 = any free port)
+        """
+        self.latency = max(0.0, latency)
+        self.jitter = max(0.0, jitter)
+        self.quota = quota
+        self.window = window
+        self.samples_per_day = max(1, samples_per_day)
+        self.offline = offline
+        self.seed = seed
+        self.host = host
+        self.port = port
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._llamadas = defaultdict(deque)
+        self._stats = defaultdict(int)
+        self._http = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def start(self):
+        self._http = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._http.daemon_threads = True
+        self._http.mock = self
+        self.port = self._http.server_address[1]
+        self._thread = threading.Thread(target=self._http.serve_forever, name=f'mock-{self.vendor}', daemon=True)
+        self._thread.start()
+        logger.info(f"|MockVendorServer|start| {self.vendor} stand-in listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+
+    def esperar(self):
+        """Sleeps the configured latency plus jitter."""
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def contar(self, size):
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['bytes'] += size
+
+    def sumar(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def stats(self):
+        """
+        Returns:
+            dict: requests and bytes answered, plus the errors given (rate_limited, relogin)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        for key in ('requests', 'bytes', 'rate_limited', 'relogin'):
+            stats.setdefault(key, 0)
+        return stats
+
+    def excede_cuota(self, clave):
+        """Records a request under clave and tells whether it is over the quota of the current window."""
+        if not self.quota:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            llamadas = self._llamadas[clave]
+            while llamadas and now - llamadas[0] >= self.window:
+                llamadas.popleft()
+            if len(llamadas) >= self.quota:
+                self._stats['rate_limited'] += 1
+                return True
+            llamadas.append(now)
+            return False
+
+    def fraccion(self, *partes):
+        """Deterministic number in [0, 1) for the given parts (device, date, ...)."""
+        digest = hashlib.md5('|'.join(str(parte) for parte in (self.seed,) + partes).encode()).digest()
+        return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+    def energia_dia(self, *partes, base=20.0):
+        """Daily energy in kWh of a device, between 0.4 and 1.2 times base."""
+        return round(base * (0.4 + 0.8 * self.fraccion('energia', *partes)), 2)
+
+    def curva(self, indice):
+        """Cumulative share of the daily energy produced by sample indice (a half cosine: slow, fast, slow)."""
+        return (1 - math.cos(math.pi * (indice + 1) / self.samples_per_day)) / 2
+
+    def responder(self, path, query, body, headers):
+        """
+        Returns:
+            tuple: (HTTP status, extra headers, JSON payload)
+        """
+        raise NotImplementedError
+
+
+def _dias_del_mes(dia):
+    """Every day of dia's month up to the last one that has ended (the vendors answer month KPIs so)."""
+    ultimo = min(date(dia.year, dia.month, calendar.monthrange(dia.year, dia.month)[1]), max(dia, date.today()))
+    return [date(dia.year, dia.month, numero) for numero in range(1, ultimo.day + 1)]
+
+
+def _medianoche_ms(dia):
+    return int(datetime(dia.year, dia.month, dia.day, tzinfo=COLOMBIA_TZ).timestamp() * 1000)
+
+
+def _dia_de_ms(timestamp_ms):
+    return datetime.fromtimestamp(int(timestamp_ms) / 1000, tz=COLOMBIA_TZ).date()
+
+
+class HuaweiMockServer(MockVendorServer):
+    """FusionSolar thirdData: xsrf-token login, day KPIs by the month and 5-minute MPPT history."""
+
+    vendor = 'huawei'
+
+    def __init__(self, token_requests=None, canales=None, **config):
+        """
+        Args:
+            token_requests (int): Requests a token is valid for before failCode 305 (None = never expires)
+            canales (dict): {identificador_inversor: number of MPPTs}; DEFAULT_CANALES otherwise
+            **config: See MockVendorServer
+        """
+        super().__init__(**config)
+        self.token_requests = token_requests
+        self.canales = canales or {}
+        self._tokens = {}
+        self._logins = 0
+
+    def responder(self, path, query, body, headers):
+        endpoint = path.rstrip('/').rsplit('/', 1)[-1]
+        if endpoint == 'login':
+            return self._login()
+
+        token = headers.get('xsrf-token')
+        with self._lock:
+            restantes = self._tokens.get(token)
+            if restantes is not None and restantes > 0:
+                self._tokens[token] = restantes - 1
+        if restantes is None or restantes <= 0:
+            self.sumar('relogin')
+            return 200, {}, {'success': False, 'failCode': 305, 'message': 'USER_MUST_RELOGIN', 'data': None}
+        if self.excede_cuota(endpoint):
+            return 200, {}, {'success': False, 'failCode': 407, 'message': None, 'data': 'ACCESS_FREQUENCY_IS_TOO_HIGH'}
+
+        if endpoint == 'getKpiStationDay':
+            data = self._kpi_estaciones(body)
+        elif endpoint == 'getDevKpiDay':
+            data = self._kpi_dispositivos(body)
+        elif endpoint == 'getDevHistoryKpi':
+            data = self._historia_dispositivos(body)
+        else:
+            return 404, {}, {'success': False, 'failCode': 404, 'message': f'Unknown endpoint {endpoint}'}
+        return 200, {}, {'success': True, 'failCode': 0, 'message': None, 'params': body, 'data': data}
+
+    def _login(self):
+        with self._lock:
+            self._logins += 1
+            token = f'{MOCK_TOKEN_PREFIX}{self.seed}-{self._logins}'
+            self._tokens[token] = self.token_requests if self.token_requests else float('inf')
+        return 200, {'xsrf-token': token}, {'success': True, 'failCode': 0, 'message': None, 'data': None}
+
+    @staticmethod
+    def dev_id(identificador):
+        """Numeric devId of an 'NE=...' identificador (it ends with the identificador's digits, as Huawei's do)."""
+        digitos = ''.join(filter(str.isdigit, identificador))
+        return int('1' + digitos.rjust(15, '0'))
+
+    def _kpi_estaciones(self, body):
+        dias = _dias_del_mes(_dia_de_ms(body.get('collectTime')))
+        data = []
+        for codigo in filter(None, str(body.get('stationCodes', '')).split(',')):
+            for dia in dias:
+                energia = self.energia_dia(codigo, dia, base=60.0)
+                data.append({
+                    'stationCode': codigo,
+                    'collectTime': _medianoche_ms(dia),
+                    'dataItemMap': {'PVYield': energia, 'inverter_power': energia, 'perpower_ratio': round(energia / 15, 3)},
+                })
+        return data
+
+    def _kpi_dispositivos(self, body):
+        dias = _dias_del_mes(_dia_de_ms(body.get('collectTime')))
+        data = []
+        for identificador in filter(None, str(body.get('devIds', '')).split(',')):
+            for dia in dias:
+                data.append({
+                    'devId': self.dev_id(identificador),
+                    'collectTime': _medianoche_ms(dia),
+                    'dataItemMap': {'product_power': self.energia_dia(identificador, dia), 'installed_capacity': 10.0},
+                })
+        return data
+
+    def _historia_dispositivos(self, body):
+        inicio, fin = int(body.get('startTime')), int(body.get('endTime'))
+        paso = (fin - inicio) // self.samples_per_day
+        dia = _dia_de_ms(inicio)
+        data = []
+        for identificador in filter(None, str(body.get('devIds', '')).split(',')):
+            dev_id = self.dev_id(identificador)
+            mppts = self.canales.get(identificador, DEFAULT_CANALES)
+            # Lifetime counters: a start value per MPPT plus the day's energy along the curve
+            arranque = [round(10000 * self.fraccion('contador', identificador, mppt), 2) for mppt in range(1, mppts + 1)]
+            energias = [self.energia_dia(identificador, dia, mppt, base=5.0) for mppt in range(1, mppts + 1)]
+            for indice in range(self.samples_per_day):
+                avance = self.curva(indice)
+                valores = {f'mppt_{mppt}_cap': round(arranque[mppt - 1] + energias[mppt - 1] * avance, 2) for mppt in range(1, mppts + 1)}
+                valores['mppt_total_cap'] = round(sum(valores.values()), 2)
+                data.append({'devId': dev_id, 'sn': identificador, 'collectTime': inicio + indice * paso, 'dataItemMap': valores})
+        return data
+
+
+class SolisMockServer(MockVendorServer):
+    """SolisCloud: paged daily energy of every station of the account and the intraday series of an inverter."""
+
+    vendor = 'solis'
+
+    def __init__(self, estaciones=(), **config):
+        """
+        Args:
+            estaciones (iterable): Station ids of the account (identificador_planta of the Solis projects)
+            **config: See MockVendorServer
+        """
+        super().__init__(**config)
+        self.estaciones = list(estaciones)
+
+    def responder(self, path, query, body, headers):
+        if path == '/v1/api/stationDayEnergyList':
+            return 200, {}, self._energia_estaciones(body)
+        if path == '/v1/api/inverterDay':
+            return 200, {}, self._inversor_dia(body)
+        return 404, {}, {'success': False, 'code': '404', 'msg': f'Unknown endpoint {path}'}
+
+    def _energia_estaciones(self, body):
+        pagina, tamano = int(body.get('pageNo', 1)), int(body.get('pageSize', 100))
+        dia = body.get('time')
+        records = []
+        for estacion in self.estaciones[(pagina - 1) * tamano:pagina * tamano]:
+            # A few stations are offline for the day: energy 0 with condCodeD 305
+            offline = self.fraccion('offline', estacion, dia) < self.offline
+            records.append({
+                'id': estacion,
+                'dateStr': dia,
+                'energy': 0.0 if offline else self.energia_dia(estacion, dia, base=40.0),
+                'condCodeD': '305' if offline else '0',
+            })
+        return {'success': True, 'code': '0', 'msg': 'success', 'data': {'total': len(self.estaciones), 'records': records}}
+
+    def _inversor_dia(self, body):
+        inversor, dia = str(body.get('id')), body.get('time')
+        if self.fraccion('offline', inversor, dia) < self.offline:
+            return {'success': True, 'code': '0', 'msg': 'success', 'data': []}
+        energia = self.energia_dia(inversor, dia)
+        inicio = datetime.strptime(dia, '%Y-%m-%d')
+        paso = timedelta(days=1) / self.samples_per_day
+        data = []
+        for indice in range(self.samples_per_day):
+            avance = self.curva(indice)
+            data.append({
+                'timeStr': (inicio + paso * indice).strftime('%Y-%m-%d %H:%M:%S'),
+                'eToday': round(energia * avance, 2),
+                'pac': round(energia * math.sin(math.pi * (indice + 1) / self.samples_per_day) / 6, 3),
+                'state': 1,
+            })
+        return {'success': True, 'code': '0', 'msg': 'success', 'data': data}
+
+
+class HoymilesMockServer(MockVendorServer):
+    """Hoymiles open API: 30-day station energy and the intraday DC series of a microinverter."""
+
+    vendor = 'hoymiles'
+
+    def __init__(self, canales=None, **config):
+        """
+        Args:
+            canales (dict): {identificador_inversor: number of DC ports}; DEFAULT_CANALES otherwise
+            **config: See MockVendorServer
+        """
+        super().__init__(**config)
+        self.canales = canales or {}
+
+    def responder(self, path, query, body, headers):
+        # The quota counts every call of the key
+        if self.excede_cuota(query.get('key', [''])[0]):
+            return 200, {}, {'status': '1', 'message': 'More than times of calls per minute', 'data': None}
+        if path == '/v0/zhgf-core/oapi/0/findStation30dayEnergy':
+            return 200, {}, self._energia_30_dias(body)
+        partes = path.strip('/').split('/')
+        if len(partes) == 5 and partes[:2] == ['v2', 'query'] and partes[4] == 'mi_data_day':
+            return 200, {}, self._micro_dia(partes[3], body)
+        return 404, {}, {'status': '404', 'message': f'Unknown endpoint {path}', 'data': None}
+
+    def _energia_30_dias(self, body):
+        estacion = str(body.get('stationId'))
+        fin = datetime.strptime(body.get('endDate'), '%Y-%m-%d').date()
+        data = []
+        for atras in range(29, -1, -1):
+            dia = (fin - timedelta(days=atras)).isoformat()
+            # total_energy is in Wh
+            data.append({'report_date': dia, 'total_energy': round(self.energia_dia(estacion, dia, base=8.0) * 1000)})
+        return {'status': '0', 'message': 'success', 'data': data}
+
+    def _micro_dia(self, serial, body):
+        dia = body.get('date')
+        if self.fraccion('offline', serial, dia) < self.offline:
+            return {'status': '0', 'message': 'success', 'data': []}
+        puertos = self.canales.get(serial, DEFAULT_CANALES)
+        # tp is the energy of the port so far in the day, in Wh
+        energias = [self.energia_dia(serial, dia, puerto, base=0.8) * 1000 for puerto in range(1, puertos + 1)]
+        minutos = 24 * 60 / self.samples_per_day
+        data = []
+        for indice in range(self.samples_per_day):
+            avance = self.curva(indice)
+            minuto = int(indice * minutos)
+            data.append({
+                'time': f'{dia} {minuto // 60:02d}:{minuto % 60:02d}',
+                'dc': [
+                    {'port': puerto, 'tp': round(energias[puerto - 1] * avance, 1), 'pv_v': 32.5, 'pv_i': round(8 * avance, 2)}
+                    for puerto in range(1, puertos + 1)
+                ],
+            })
+        return {'status': '0', 'message': 'success', 'data': data}
+
+
+class MockVendorServers:
+    """
+    The three stand-ins started together, with the settings that point the fetchers at them.
+    """
+
+    def __init__(self, estaciones_solis=(), canales=None, token_requests=None, **config):
+        """
+        Args:
+            estaciones_solis (iterable): Station ids returned by stationDayEnergyList
+            canales (dict): {identificador_inversor: MPPTs or DC ports}, for Huawei and Hoymiles
+            token_requests (int): Requests a Huawei token is valid for (None = never expires)
+            **config: latency, jitter, quota, window, samples_per_day, offline, seed, host (see MockVendorServer)
+        """
+        self.window = config.get('window', 60.0)
+        self.huawei = HuaweiMockServer(token_requests=token_requests, canales=canales, **config)
+        self.solis = SolisMockServer(estaciones=estaciones_solis, **config)
+        self.hoymiles = HoymilesMockServer(canales=canales, **config)
+        self.servers = (self.huawei, self.solis, self.hoymiles)
+
+    def __enter__(self):
+        try:
+            for server in self.servers:
+                server.start()
+        except BaseException:
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def stop(self):
+        for server in self.servers:
+            server.stop()
+
+    def settings(self):
+        """Settings overrides (for override_settings) sending every fetcher to the stand-ins."""
+        return {
+            'VENDOR_API_BASE_URLS': {
+                'huawei': f'{self.huawei.url}/thirdData/',
+                'solis': self.solis.url,
+                'hoymiles': self.hoymiles.url,
+            },
+            'VENDOR_RATE_LIMIT_WINDOW': self.window,
+        }
+
+    def stats(self):
+        """
+        Returns:
+            dict: {vendor: MockVendorServer.stats()}
+        """
+        return {server.vendor: server.stats() for server in self.servers}
@@ -0,0 +1,81 @@
+"""
+Vendor circuit breaker (solarDataFetch/fetchers/circuitBreaker.py); needs no db or network:
+    DB_ENGINE=sqlite python manage.py test solarDataFetch.tests.test_circuit_breaker
+"""
+
+import logging
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from solarDataFetch.fetchers.circuitBreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(response=response)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.now = 1000.0
+        patcher = mock.patch('solarDataFetch.fetchers.circuitBreaker.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('huawei', failure_threshold=2, reset_timeout=60)
+
+    def fallar(self, error=None):
+        with self.assertRaises(type(error or requests.exceptions.Timeout())):
+            with self.breaker:
+                raise error or requests.exceptions.Timeout()
+
+    def test_opens_after_consecutive_failures(self):
+        self.fallar()
+        with self.breaker:
+            pass
+        # A success in between resets the count
+        self.fallar()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fallar()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            with self.breaker:
+                self.fail('the request must not be sent')
+        self.assertEqual(self.breaker.snapshot()['rejected'], 1)
+
+    def test_half_open_lets_a_single_probe_through(self):
+        self.fallar()
+        self.fallar()
+        self.now += 61
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # Only one probe at a time
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_opens_again(self):
+        self.fallar()
+        self.fallar()
+        self.now += 61
+        self.fallar()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.snapshot()['times_opened'], 2)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+
+    def test_only_unavailability_counts_as_failure(self):
+        for error in (requests.exceptions.Timeout(), requests.exceptions.ConnectionError(), http_error(503)):
+            self.assertTrue(CircuitBreaker.is_failure(error), error)
+        # The vendor answered: client errors and API-level errors do not open the circuit
+        for error in (http_error(404), http_error(429), RuntimeError('Huawei API error', 407), ValueError('bad json')):
+            self.assertFalse(CircuitBreaker.is_failure(error), error)
+        for _ in range(3):
+            self.fallar(http_error(400))
+        self.assertEqual(self.breaker.state, CLOSED)
@@ -0,0 +1,101 @@
+"""
+Huawei adaptive batch size (huaweiBatchSizer) and HuaweiExecutor.run_adaptive against a fake
+fetch; needs no network:
+    DB_ENGINE=sqlite python manage.py test solarDataFetch.tests.test_huawei_batching
+"""
+
+import logging
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from solarDataFetch.fetchers import huaweiExecutor
+from solarDataFetch.fetchers.huaweiBatchSizer import GROW_AFTER, HuaweiBatchSizer
+from solarDataFetch.fetchers.huaweiExecutor import MAX_RETRIES_AT_MIN_SIZE, HuaweiExecutor
+
+
+class HuaweiBatchSizerTests(SimpleTestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_shrinks_and_grows(self):
+        sizer = HuaweiBatchSizer('getDevKpiDay', size=80, max_size=100)
+        self.assertTrue(sizer.reducir(80, 'test'))
+        self.assertEqual(sizer.size, 40)
+        for _ in range(GROW_AFTER):
+            sizer.registrar_exito(40, latency=0.1)
+        self.assertEqual(sizer.size, 80)
+        for _ in range(GROW_AFTER):
+            sizer.registrar_exito(80, latency=0.1)
+        self.assertEqual(sizer.size, 100)
+        self.assertFalse(sizer.reducir(1, 'test'))
+
+    def test_batches_cut_before_a_reduction_do_not_raise_last_good(self):
+        sizer = HuaweiBatchSizer('getDevKpiDay', size=100, max_size=100)
+        sizer.reducir(100, 'test')
+        # A full batch sent before the reduction succeeds afterwards
+        sizer.registrar_exito(100, latency=0.1)
+        sizer.registrar_exito(50, latency=0.1)
+        self.assertEqual(sizer.last_good, 50)
+
+
+class RunAdaptiveTests(SimpleTestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        patcher = mock.patch.object(huaweiExecutor, 'rate_limit_pause', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.executor = HuaweiExecutor(fetcher=None, token='token', max_in_flight=2)
+        self.lotes = []
+        self._lock = threading.Lock()
+
+    def run_adaptive(self, fetch, identificadores, size):
+        def registrar(token, batch_number, identificadores):
+            with self._lock:
+                self.lotes.append(list(identificadores))
+            return fetch(identificadores)
+        sizer = HuaweiBatchSizer('getDevKpiDay', size=size, max_size=100)
+        resultados = list(self.executor.run_adaptive(registrar, [({}, identificadores)], sizer))
+        return sizer, sorted(identificador for _, result in resultados for identificador in result)
+
+    def test_rate_limited_batch_is_split_and_retried(self):
+        def fetch(identificadores):
+            if len(identificadores) > 2:
+                raise RuntimeError('ACCESS_FREQUENCY_IS_TOO_HIGH', 407)
+            return identificadores
+
+        identificadores = [f'dev{n}' for n in range(8)]
+        sizer, recibidos = self.run_adaptive(fetch, identificadores, size=8)
+        # Every identifier delivered once, and the size stored for the next run is one that worked
+        self.assertEqual(recibidos, sorted(identificadores))
+        self.assertEqual(self.lotes[0], identificadores)
+        self.assertEqual(sizer.last_good, 2)
+
+    def test_single_identifier_is_retried_up_to_the_cap(self):
+        intentos = []
+
+        def fetch(identificadores):
+            intentos.append(identificadores)
+            if len(intentos) <= MAX_RETRIES_AT_MIN_SIZE:
+                raise RuntimeError('ACCESS_FREQUENCY_IS_TOO_HIGH', 407)
+            return identificadores
+
+        _, recibidos = self.run_adaptive(fetch, ['dev0'], size=1)
+        self.assertEqual(recibidos, ['dev0'])
+
+        intentos.clear()
+        with mock.patch.object(huaweiExecutor, 'MAX_RETRIES_AT_MIN_SIZE', MAX_RETRIES_AT_MIN_SIZE - 1):
+            with self.assertRaises(RuntimeError):
+                self.run_adaptive(fetch, ['dev0'], size=1)
+
+    def test_other_errors_are_raised(self):
+        def fetch(identificadores):
+            raise RuntimeError('Huawei API error', 20001)
+
+        with self.assertRaises(RuntimeError):
+            self.run_adaptive(fetch, ['dev0', 'dev1'], size=2)
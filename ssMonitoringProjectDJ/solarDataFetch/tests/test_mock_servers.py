@@ -0,0 +1,86 @@
+"""
+Collection against the local vendor stand-ins (solarDataFetch/mockServers.py); needs no network:
+    DB_ENGINE=sqlite python manage.py test solarDataFetch.tests.test_mock_servers
+"""
+
+import io
+import logging
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from solarData.models import GeneracionEnergiaDiaria, GeneracionGranularDiaria, GeneracionInversorDiaria, Granular, Inversor, Proyecto
+from solarData.synthetic_fleet import generar_flota
+from solarDataFetch.fetchers.hoymilesExecutor import HoymilesExecutor
+from solarDataFetch.fetchers.hoymilesFetcher import HoymilesFetcher
+from solarDataFetch.fetchers.huaweiExecutor import HuaweiExecutor
+from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
+from solarDataFetch.mockServers import MockVendorServers
+
+CREDENCIALES = {
+    'HUAWEI_API_USERNAME': 'test', 'HUAWEI_API_SYSTEM_CODE': 'test', 'SOLIS_API_SECRET': 'test', 'HOYMILES_API_KEY': 'test',
+}
+
+
+@mock.patch.dict(os.environ, CREDENCIALES)
+class MockServersCollectionTests(TransactionTestCase):
+    """The fetchers, executors and commands work end to end against the stand-ins."""
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.dia = date.today() - timedelta(days=1)
+
+    def test_huawei_relogin_after_305(self):
+        with MockVendorServers(token_requests=1) as servers, override_settings(**servers.settings()):
+            fetcher = HuaweiFetcher()
+            executor = HuaweiExecutor(fetcher, token=fetcher.login())
+            collect_time = fetcher.midnight_colombia_timestamp(datetime.combine(self.dia, datetime.min.time()))
+            for _ in range(2):
+                result = executor.call(fetcher.fetch_huawei_generacion_sistema_dia, collect_time=collect_time, identificadores=['NE=123'])
+                self.assertEqual([row['stationCode'] for row in result], ['NE=123'])
+            # The token was good for one request: the second call got a 305 and logged in again
+            self.assertEqual(servers.huawei.stats()['relogin'], 1)
+
+    def test_hoymiles_retries_after_quota(self):
+        with MockVendorServers(quota=2, window=0.5) as servers, override_settings(**servers.settings()):
+            executor = HoymilesExecutor(HoymilesFetcher(quiet=True), max_in_flight=1)
+            results = [result for _, result, errors in executor.run_stations({'900': ['9H1', '9H2', '9H3']}, self.dia.isoformat()) if not errors]
+            self.assertEqual(sorted(entry['inverter_sn'] for entry in results[0]), ['9H1', '9H2', '9H3'])
+            # The third request went over the quota, all workers paused for the window and it was retried
+            self.assertGreaterEqual(servers.hoymiles.stats()['rate_limited'], 1)
+
+    def test_collect_all_gen_covers_the_fleet(self):
+        # Seed 7 gives a Hoymiles, a Solis and two Huawei projects
+        generar_flota(4, 3, fin=self.dia - timedelta(days=1), semilla=7)
+        self.assertEqual(Proyecto.objects.values('marca_inversor').distinct().count(), 3)
+        solis = Proyecto.objects.filter(marca_inversor__marca='Solis').values_list('identificador_planta', flat=True)
+        canales = {inversor.identificador_inversor: inversor.granular_set.count() for inversor in Inversor.objects.all()}
+
+        with MockVendorServers(estaciones_solis=solis, canales=canales, token_requests=3, samples_per_day=24, offline=0) as servers:
+            with override_settings(**servers.settings(), PIPELINE_METRICS_FILE=''):
+                call_command('collect_all_gen', date=self.dia.isoformat(), stdout=io.StringIO())
+
+        self.assertEqual(GeneracionEnergiaDiaria.objects.filter(fecha_generacion_dia=self.dia).count(), Proyecto.objects.count())
+        self.assertEqual(GeneracionInversorDiaria.objects.filter(fecha_generacion_inversor_dia=self.dia).count(), Inversor.objects.count())
+        self.assertEqual(GeneracionGranularDiaria.objects.filter(fecha_generacion_granular_dia=self.dia).count(), Granular.objects.count())
+
+    def test_collect_all_gen_profiles_each_command(self):
+        generar_flota(2, 3, fin=self.dia - timedelta(days=1), semilla=7)
+        canales = {inversor.identificador_inversor: inversor.granular_set.count() for inversor in Inversor.objects.all()}
+        solis = Proyecto.objects.filter(marca_inversor__marca='Solis').values_list('identificador_planta', flat=True)
+        profile_dir = tempfile.mkdtemp()
+
+        with MockVendorServers(estaciones_solis=solis, canales=canales, samples_per_day=24, offline=0) as servers:
+            with override_settings(**servers.settings(), PIPELINE_METRICS_FILE='', PROFILE_DIR=profile_dir):
+                call_command('collect_all_gen', date=self.dia.isoformat(), profile='sample', trace_sql=True, stdout=io.StringIO())
+
+        # --profile reaches every command of the run: stats and collapsed stacks for each one
+        perfiles = os.listdir(profile_dir)
+        for comando in ('collect_all_gen', 'solis_system_gen', 'huawei_granular_gen', 'hoymiles_inverter_granular_gen'):
+            self.assertTrue(any(name.startswith(comando + '-') and name.endswith('.collapsed') for name in perfiles), comando)
+            self.assertTrue(any(name.startswith(comando + '-') and name.endswith('.txt') for name in perfiles), comando)
@@ -0,0 +1,94 @@
+"""
+Fast payload parsers against the full parse they replace on live calls; needs no db or network:
+    DB_ENGINE=sqlite python manage.py test solarDataFetch.tests.test_payload_parsers
+Payloads are the stand-ins' answers (solarDataFetch/mockServers.py) plus hand-edited edge cases.
+"""
+
+import json
+import logging
+
+from django.test import SimpleTestCase
+
+from solarDataFetch.fetchers.hoymilesFetcher import HoymilesFetcher
+from solarDataFetch.fetchers.solisFetcher import SolisFetcher
+from solarDataFetch.mockServers import HoymilesMockServer, SolisMockServer
+
+DIA = '2025-06-18'
+
+
+class SolisUltimoRegistroTests(SimpleTestCase):
+    """parse_ultimo_registro_inversor_dia gives the same result as parse_generacion_un_inversor_dia."""
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def payload(self, offline=0.0):
+        return SolisMockServer(offline=offline)._inversor_dia({'id': '1308', 'time': DIA})
+
+    def assertMismoResultado(self, payload, **dumps):
+        texto = json.dumps(payload, **dumps)
+        self.assertEqual(
+            SolisFetcher.parse_ultimo_registro_inversor_dia(texto, '1308', DIA),
+            SolisFetcher.parse_generacion_un_inversor_dia(json.loads(texto), '1308', DIA),
+        )
+
+    def test_recorded_payloads(self):
+        for dumps in ({}, {'indent': 2}, {'separators': (',', ':')}):
+            self.assertMismoResultado(self.payload(), **dumps)
+        self.assertMismoResultado(self.payload(offline=1.0))
+
+    def test_last_record_without_etoday(self):
+        payload = self.payload()
+        del payload['data'][-1]['eToday']
+        self.assertMismoResultado(payload)
+        self.assertIsNone(SolisFetcher.parse_ultimo_registro_inversor_dia(json.dumps(payload), '1308', DIA)['PVYield'])
+
+    def test_last_record_with_null_etoday_or_keys_reordered(self):
+        payload = self.payload()
+        payload['data'][-1]['eToday'] = None
+        self.assertMismoResultado(payload)
+        payload['data'][-1] = {'eToday': 12.5, 'state': 1, 'timeStr': f'{DIA} 23:55:00', 'pac': 0.0}
+        self.assertMismoResultado(payload)
+
+    def test_last_record_without_timestr_fails_like_the_full_parse(self):
+        payload = self.payload()
+        del payload['data'][-1]['timeStr']
+        with self.assertRaises(ValueError):
+            SolisFetcher.parse_generacion_un_inversor_dia(payload, '1308', DIA)
+        with self.assertRaises(ValueError):
+            SolisFetcher.parse_ultimo_registro_inversor_dia(json.dumps(payload), '1308', DIA)
+
+
+class HoymilesReduceTests(SimpleTestCase):
+    """reduce_mi_data_day, as the live fetch uses it, gives the same result as parse_generacion_inversor_granular_dia."""
+
+    def payload(self, offline=0.0):
+        return HoymilesMockServer(canales={'9H1': 4}, offline=offline)._micro_dia('9H1', {'date': DIA})
+
+    def assertMismoResultado(self, payload):
+        body = json.dumps(payload).encode()
+        envelope, max_tp_values = HoymilesFetcher.reduce_mi_data_day(body)
+        self.assertEqual(envelope.get('status'), payload.get('status'))
+        self.assertEqual(
+            HoymilesFetcher.build_generacion_inversor_granular_dia(max_tp_values, len(envelope.get('data') or []), '900', '9H1', DIA),
+            HoymilesFetcher.parse_generacion_inversor_granular_dia(json.loads(body), '900', '9H1', DIA),
+        )
+
+    def test_recorded_payloads(self):
+        self.assertMismoResultado(self.payload())
+        self.assertMismoResultado(self.payload(offline=1.0))
+        self.assertMismoResultado({'status': '1', 'message': 'More than times of calls per minute', 'data': None})
+
+    def test_irregular_entries(self):
+        payload = self.payload()
+        payload['data'][10]['dc'][0]['tp'] = None
+        payload['data'][20]['dc'][1]['port'] = '2'
+        payload['data'][30]['dc'][2].pop('port')
+        payload['data'][40]['dc'] = []
+        payload['data'][50].pop('dc')
+        for entrada in payload['data']:
+            for dc in entrada.get('dc', []):
+                if dc.get('port') == 4:
+                    dc['tp'] = 0
+        self.assertMismoResultado(payload)
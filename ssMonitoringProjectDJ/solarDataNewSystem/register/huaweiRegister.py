@@ -1,5 +1,6 @@
 import requests
 from solarData.models import Proyecto, Inversor, MarcasInversores
+from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
 from datetime import date
 import logging
 
@@ -34,9 +35,12 @@ def get_huawei_systems(token):
         logger.info(f"|HuaweiNewSystem|get_huawei_systems| Fetching page {page_no}")
         
         try:
-            response = requests.post(url, headers=headers, json=body)
+            response = requests.post(url, headers=headers, json=body, timeout=60)
             response.raise_for_status()
             api_response = response.json()
+
+            # Expired session surfaces as RuntimeError(message, 305) so the caller can refresh the cached token
+            HuaweiFetcher.raise_for_api_error(api_response)
             
             if not api_response.get("success"):
                 logger.error(f"|HuaweiNewSystem|get_huawei_systems| API returned success=false: {api_response.get('message')}")
@@ -194,7 +198,7 @@ def register_huawei_inverters(token, station_code):
     logger.info(f"|HuaweiNewSystem|register_huawei_inverters| Making API call to {url} for station {station_code}")
     
     try:
-        response = requests.post(url, headers=headers, json=body)
+        response = requests.post(url, headers=headers, json=body, timeout=60)
         response.raise_for_status()
         api_response = response.json()
         logger.info(f"|HuaweiNewSystem|register_huawei_inverters| Successfully fetched device list for station {station_code}")
@@ -114,7 +114,7 @@ class SolisRegister:
 
         try:
             logger.info(f"|SolisNewSystem|solis_obtain_inverter_list| Making API call to {self.url + endpoint} for batch {batch_number}")
-            response = requests.post(self.url + endpoint, headers=headers, json=body)
+            response = requests.post(self.url + endpoint, headers=headers, json=body, timeout=60)
             response.raise_for_status()  # Raises HTTPError for 4XX/5XX responses
             parsed = response.json()
             
@@ -950,16 +950,17 @@ class SolarDataAnalysis:
         
         try:
             systems_null_or_missing = []
-            all_systems = Proyecto.objects.all()
+            all_systems = Proyecto.objects.order_by('id')
+
+            # Systems with a non-null value for the date, in one query
+            systems_with_value = set(GeneracionEnergiaDiaria.objects.filter(
+                fecha_generacion_dia=target_date,
+                energia_generada_dia__isnull=False
+            ).values_list('id_proyecto_id', flat=True))
             
             for sistema in all_systems:
-                gen_record = GeneracionEnergiaDiaria.objects.filter(
-                    id_proyecto=sistema,
-                    fecha_generacion_dia=target_date
-                ).first()
-                
                 # If no record exists OR energia is NULL
-                if not gen_record or gen_record.energia_generada_dia is None:
+                if sistema.id not in systems_with_value:
                     systems_null_or_missing.append({
                         "id": sistema.id,
                         "name": sistema.dealname
@@ -992,8 +993,8 @@ class SolarDataAnalysis:
         Returns:
             dict: Systems under their 15-day target
         """
-        from solarData.models import Proyecto, GeneracionEnergiaDiaria
-        from django.db.models import Sum
+        from solarData.models import Proyecto
+        from django.db.models import Q, Sum
         
         target_date = check_date if check_date else date.today() - timedelta(days=1)
         start_date_15d = target_date - timedelta(days=14)
@@ -1002,18 +1003,22 @@ class SolarDataAnalysis:
         try:
             systems_under_target_15d = []
             
-            # Only check systems that have energia_prometida_mes > 0
+            # Only check systems that have energia_prometida_mes > 0, with the days with data
+            # and the energy of the 15-day window computed in the same query
+            window = Q(
+                generacionenergiadiaria__fecha_generacion_dia__gte=start_date_15d,
+                generacionenergiadiaria__fecha_generacion_dia__lte=target_date
+            )
             systems_with_target = Proyecto.objects.filter(
                 energia_prometida_mes__isnull=False
-            ).exclude(energia_prometida_mes=0)
+            ).exclude(energia_prometida_mes=0).annotate(
+                days_with_data=Count('generacionenergiadiaria', filter=window),
+                total_15d=Sum('generacionenergiadiaria__energia_generada_dia', filter=window)
+            ).order_by('id')
             
             for sistema in systems_with_target:
                 # Count days with data in the 15-day window
-                days_with_data = GeneracionEnergiaDiaria.objects.filter(
-                    id_proyecto=sistema,
-                    fecha_generacion_dia__gte=start_date_15d,
-                    fecha_generacion_dia__lte=target_date
-                ).count()
+                days_with_data = sistema.days_with_data
                 
                 # Skip if less than 15 days of data
                 if days_with_data < 15:
@@ -1021,11 +1026,7 @@ class SolarDataAnalysis:
                     continue
                 
                 # Sum energy over 15 days
-                total_15d = GeneracionEnergiaDiaria.objects.filter(
-                    id_proyecto=sistema,
-                    fecha_generacion_dia__gte=start_date_15d,
-                    fecha_generacion_dia__lte=target_date
-                ).aggregate(total=Sum('energia_generada_dia'))['total'] or 0
+                total_15d = sistema.total_15d or 0
                 
                 # Calculate target (monthly / 2)
                 target_15d = float(sistema.energia_prometida_mes) / 2
@@ -1082,13 +1083,16 @@ class SolarDataAnalysis:
                 fecha_generacion_inversor_dia=target_date,
                 energia_generada_inversor_dia=0
             ).select_related('id_inversor__id_proyecto')
+
+            # Parent systems' production for the date, in one query
+            system_records = {
+                record.id_proyecto_id: record
+                for record in GeneracionEnergiaDiaria.objects.filter(fecha_generacion_dia=target_date)
+            }
             
             for inv_record in zero_inverters:
                 # Get parent system's production
-                system_record = GeneracionEnergiaDiaria.objects.filter(
-                    id_proyecto=inv_record.id_inversor.id_proyecto,
-                    fecha_generacion_dia=target_date
-                ).first()
+                system_record = system_records.get(inv_record.id_inversor.id_proyecto_id)
                 
                 # Only flag if parent system produced energy (not NULL, not 0)
                 if system_record and system_record.energia_generada_dia and system_record.energia_generada_dia > 0:
@@ -1138,13 +1142,16 @@ class SolarDataAnalysis:
                 fecha_generacion_granular_dia=target_date,
                 energia_generada_granular_dia=0
             ).select_related('id_granular__id_inversor__id_proyecto')
+
+            # Parent inverters' production for the date, in one query
+            inverter_records = {}
+            for record in GeneracionInversorDiaria.objects.filter(fecha_generacion_inversor_dia=target_date).order_by('-id'):
+                # Lowest id wins, like .first() did
+                inverter_records[record.id_inversor_id] = record
             
             for gran_record in zero_granular:
                 # Get parent inverter's production
-                inverter_record = GeneracionInversorDiaria.objects.filter(
-                    id_inversor=gran_record.id_granular.id_inversor,
-                    fecha_generacion_inversor_dia=target_date
-                ).first()
+                inverter_record = inverter_records.get(gran_record.id_granular.id_inversor_id)
                 
                 # Only flag if parent inverter produced energy (not NULL, not 0)
                 if inverter_record and inverter_record.energia_generada_inversor_dia and inverter_record.energia_generada_inversor_dia > 0:
@@ -9,19 +9,33 @@ import os
 from datetime import datetime
 from io import BytesIO
 
-try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-except ImportError:
-    # Handle case where reportlab is not installed
-    pass
-
 # Initialize logger
 logger = logging.getLogger('solarDataReports.pdf_generator')
 
+
+def _load_reportlab():
+    """
+    Imports reportlab into the module namespace the first time a PDF generator is created, so
+    importing this module (every report command, --help included) does not load it.
+    """
+    if 'SimpleDocTemplate' in globals():
+        return
+    try:
+        from reportlab.lib.pagesizes import letter, A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+        from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    except ImportError:
+        # Handle case where reportlab is not installed
+        return
+    globals().update(
+        letter=letter, A4=A4, getSampleStyleSheet=getSampleStyleSheet, ParagraphStyle=ParagraphStyle, inch=inch,
+        SimpleDocTemplate=SimpleDocTemplate, Paragraph=Paragraph, Spacer=Spacer, PageBreak=PageBreak,
+        TA_CENTER=TA_CENTER, TA_LEFT=TA_LEFT,
+    )
+
+
 class SolarDataPDFGenerator:
     """
     Handles conversion of analysis reports into PDF format
@@ -29,6 +43,7 @@ class SolarDataPDFGenerator:
     
     def __init__(self):
         """Initialize PDF generator with default settings"""
+        _load_reportlab()
         self.page_size = A4
         self.margin = 0.75 * inch
         
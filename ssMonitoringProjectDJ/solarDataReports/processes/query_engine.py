@@ -15,7 +15,51 @@ class SolarDataQuery:
     """
     Main query engine for solar data reports
     Provides methods to extract solar system data for analysis
+
+    Each get_*_production method runs a fixed number of queries whatever the fleet size: one for
+    the devices (related metadata joined in) and one for all their daily rows in the range.
     """
+
+    @staticmethod
+    def _daily_generation(model, device_field, date_field, energy_field, start_date, end_date):
+        """
+        Daily rows of every device in one query, grouped by device.
+
+        Args:
+            model (Model): GeneracionEnergiaDiaria, GeneracionInversorDiaria or GeneracionGranularDiaria
+            device_field (str): Foreign key column of the device (e.g. 'id_proyecto_id')
+            date_field (str): Date field of the model
+            energy_field (str): Energy field of the model
+            start_date (date): Start date (inclusive)
+            end_date (date): End date (inclusive)
+
+        Returns:
+            dict: {device id: [(fecha, energia), ...]} ordered by date
+        """
+        rows = model.objects.filter(
+            **{f'{date_field}__gte': start_date, f'{date_field}__lte': end_date}
+        ).order_by(device_field, date_field).values_list(device_field, date_field, energy_field)
+
+        por_dispositivo = {}
+        for device_id, fecha, energia in rows.iterator(chunk_size=5000):
+            por_dispositivo.setdefault(device_id, []).append((fecha, energia))
+        return por_dispositivo
+
+    @staticmethod
+    def _daily_summary(filas):
+        """
+        Args:
+            filas (list): [(fecha, energia), ...] of one device
+
+        Returns:
+            tuple: (total energy ignoring nulls, like Sum(), [{'fecha', 'energia_kwh'}, ...])
+        """
+        total = sum((energia for _, energia in filas if energia is not None), 0)
+        datos_diarios = [
+            {'fecha': fecha.isoformat(), 'energia_kwh': float(energia) if energia else 0}
+            for fecha, energia in filas
+        ]
+        return total, datos_diarios
     
     def get_systems_production(self, start_date, end_date):
         """
@@ -69,14 +113,19 @@ class SolarDataQuery:
         logger.info(f"Querying systems production from {start_date} to {end_date}")
         
         try:
-            # Get all solar systems (projects)
-            sistemas = Proyecto.objects.all()
-            logger.info(f"Found {sistemas.count()} systems to analyze")
+            # Get all solar systems (projects) with their city, department and brand
+            sistemas = list(Proyecto.objects.select_related('id_ciudad__id_departamento', 'marca_inversor').order_by('id'))
+            logger.info(f"Found {len(sistemas)} systems to analyze")
+
+            # Daily generation of every system in the date range
+            generacion_por_sistema = self._daily_generation(
+                GeneracionEnergiaDiaria, 'id_proyecto_id', 'fecha_generacion_dia', 'energia_generada_dia', start_date, end_date
+            )
             
             result = {
                 'sistemas': {},
                 'resumen': {
-                    'total_sistemas': sistemas.count(),
+                    'total_sistemas': len(sistemas),
                     'rango_fechas': {
                         'inicio': start_date.isoformat(),
                         'fin': end_date.isoformat()
@@ -92,25 +141,8 @@ class SolarDataQuery:
                 logger.info(f"Processing system {sistema.dealname} (ID: {sistema.id})")
                 
                 try:
-                    # Get daily generation data for this system in the date range
-                    generacion_diaria = GeneracionEnergiaDiaria.objects.filter(
-                        id_proyecto=sistema,
-                        fecha_generacion_dia__gte=start_date,
-                        fecha_generacion_dia__lte=end_date
-                    ).order_by('fecha_generacion_dia')
-                    
-                    # Calculate system totals
-                    total_energia_sistema = generacion_diaria.aggregate(
-                        total=Sum('energia_generada_dia')
-                    )['total'] or 0
-                    
-                    # Build daily data list
-                    datos_diarios = []
-                    for gen in generacion_diaria:
-                        datos_diarios.append({
-                            'fecha': gen.fecha_generacion_dia.isoformat(),
-                            'energia_kwh': float(gen.energia_generada_dia) if gen.energia_generada_dia else 0
-                        })
+                    # System total and daily data list
+                    total_energia_sistema, datos_diarios = self._daily_summary(generacion_por_sistema.get(sistema.id, []))
                     
                     logger.debug(f"System {sistema.dealname} has {len(datos_diarios)} days of data, total energy: {total_energia_sistema} kWh")
                     
@@ -200,13 +232,18 @@ class SolarDataQuery:
         
         try:
             # Get all inverters
-            inversores = Inversor.objects.select_related('id_proyecto', 'id_proyecto__marca_inversor').all()
-            logger.info(f"Found {inversores.count()} inverters to analyze")
+            inversores = list(Inversor.objects.select_related('id_proyecto__id_ciudad', 'id_proyecto__marca_inversor').order_by('id'))
+            logger.info(f"Found {len(inversores)} inverters to analyze")
+
+            # Daily generation of every inverter in the date range
+            generacion_por_inversor = self._daily_generation(
+                GeneracionInversorDiaria, 'id_inversor_id', 'fecha_generacion_inversor_dia', 'energia_generada_inversor_dia', start_date, end_date
+            )
             
             result = {
                 'inversores': {},
                 'resumen': {
-                    'total_inversores': inversores.count(),
+                    'total_inversores': len(inversores),
                     'rango_fechas': {
                         'inicio': start_date.isoformat(),
                         'fin': end_date.isoformat()
@@ -222,25 +259,8 @@ class SolarDataQuery:
                 logger.info(f"Processing inverter ID: {inversor.id} from system {inversor.id_proyecto.dealname}")
                 
                 try:
-                    # Get daily generation data for this inverter in the date range
-                    generacion_diaria = GeneracionInversorDiaria.objects.filter(
-                        id_inversor=inversor,
-                        fecha_generacion_inversor_dia__gte=start_date,
-                        fecha_generacion_inversor_dia__lte=end_date
-                    ).order_by('fecha_generacion_inversor_dia')
-                    
-                    # Calculate inverter totals
-                    total_energia_inversor = generacion_diaria.aggregate(
-                        total=Sum('energia_generada_inversor_dia')
-                    )['total'] or 0
-                    
-                    # Build daily data list
-                    datos_diarios = []
-                    for gen in generacion_diaria:
-                        datos_diarios.append({
-                            'fecha': gen.fecha_generacion_inversor_dia.isoformat(),
-                            'energia_kwh': float(gen.energia_generada_inversor_dia) if gen.energia_generada_inversor_dia else 0
-                        })
+                    # Inverter total and daily data list
+                    total_energia_inversor, datos_diarios = self._daily_summary(generacion_por_inversor.get(inversor.id, []))
                     
                     logger.debug(f"Inverter {inversor.id} has {len(datos_diarios)} days of data, total energy: {total_energia_inversor} kWh")
                     
@@ -325,13 +345,18 @@ class SolarDataQuery:
         
         try:
             # Get all granular data
-            granular_data = Granular.objects.select_related('id_proyecto', 'id_proyecto__marca_inversor').all()
-            logger.info(f"Found {granular_data.count()} granular devices to analyze")
+            granular_data = list(Granular.objects.select_related('id_proyecto__id_ciudad', 'id_proyecto__marca_inversor').order_by('id'))
+            logger.info(f"Found {len(granular_data)} granular devices to analyze")
+
+            # Daily generation of every granular unit in the date range
+            generacion_por_granular = self._daily_generation(
+                GeneracionGranularDiaria, 'id_granular_id', 'fecha_generacion_granular_dia', 'energia_generada_granular_dia', start_date, end_date
+            )
             
             result = {
                 'granular': {},
                 'resumen': {
-                    'total_granular': granular_data.count(),
+                    'total_granular': len(granular_data),
                     'rango_fechas': {
                         'inicio': start_date.isoformat(),
                         'fin': end_date.isoformat()
@@ -347,25 +372,8 @@ class SolarDataQuery:
                 logger.info(f"Processing granular device ID: {granular_unit.id} from system {granular_unit.id_proyecto.dealname}")
                 
                 try:
-                    # Get daily generation data for this granular unit in the date range
-                    generacion_diaria = GeneracionGranularDiaria.objects.filter(
-                        id_granular=granular_unit,
-                        fecha_generacion_granular_dia__gte=start_date,
-                        fecha_generacion_granular_dia__lte=end_date
-                    ).order_by('fecha_generacion_granular_dia')
-                    
-                    # Calculate granular totals
-                    total_energia_granular = generacion_diaria.aggregate(
-                        total=Sum('energia_generada_granular_dia')
-                    )['total'] or 0
-                    
-                    # Build daily data list
-                    datos_diarios = []
-                    for gen in generacion_diaria:
-                        datos_diarios.append({
-                            'fecha': gen.fecha_generacion_granular_dia.isoformat(),
-                            'energia_kwh': float(gen.energia_generada_granular_dia) if gen.energia_generada_granular_dia else 0
-                        })
+                    # Granular total and daily data list
+                    total_energia_granular, datos_diarios = self._daily_summary(generacion_por_granular.get(granular_unit.id, []))
                     
                     logger.debug(f"Granular device {granular_unit.id} has {len(datos_diarios)} days of data, total energy: {total_energia_granular} kWh")
                     
@@ -378,7 +386,7 @@ class SolarDataQuery:
                                 'ciudad': granular_unit.id_proyecto.id_ciudad.nombre_ciudad if granular_unit.id_proyecto.id_ciudad else None
                             },
                             'inversor': {
-                                'id': granular_unit.id_inversor.id,
+                                'id': granular_unit.id_inversor_id,
                                 'marca_inversor': granular_unit.id_proyecto.marca_inversor.marca if granular_unit.id_proyecto.marca_inversor else None
                             }
                         },
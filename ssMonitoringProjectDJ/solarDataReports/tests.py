@@ -1,3 +1,175 @@
+"""
+Query-count and latency budgets of SolarDataQuery and SolarDataAnalysis.
+
+Every get_*_production and check_* method runs against a small synthetic fleet
+(solarData/synthetic_fleet.py) and again after the fleet has grown; the number of queries must
+not change and must stay within its budget, so an N+1 (a query per project, inverter or
+granular) fails here. The wall time of each method on
+the larger fleet is written to settings.REPORTS_BASELINE_FILE together with the previous run's
+times, to compare between changes.
+
+Needs no network; runs on Postgres or on SQLite:
+    DB_ENGINE=sqlite python manage.py test solarDataReports
+"""
+
+import json
+import logging
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from solarData.models import GeneracionEnergiaDiaria, Proyecto
+from solarData.synthetic_fleet import generar_flota
+from solarDataReports.processes.analysis_engine import SolarDataAnalysis
+from solarDataReports.processes.query_engine import SolarDataQuery
+
+# Maximum queries of each method, whatever the number of projects, inverters and granulars
+QUERY_BUDGETS = {
+    'get_systems_production': 2,
+    'get_inverters_production': 2,
+    'get_granular_production': 2,
+    'get_last_n_days_production': 2,
+    'get_inverters_last_n_days_production': 2,
+    'get_granular_last_n_days_production': 2,
+    'check_zero_production_system_single_day': 2,
+    'check_zero_production_inverter_single_day': 2,
+    'check_zero_production_granular_single_day': 2,
+    'check_production_deviation_systems': 4,
+    'check_production_deviation_inverters': 4,
+    'check_production_deviation_granular': 4,
+    'check_minimum_production_system_single_day': 2,
+    'check_systems_no_target': 1,
+    'check_systems_zero_production_single_day': 1,
+    'check_systems_null_or_missing_single_day': 2,
+    'check_systems_under_target_15d': 1,
+    'check_inverters_zero_conditional_single_day': 2,
+    'check_granular_zero_conditional_single_day': 2,
+}
+
+FLOTA_PEQUENA = 3
+FLOTA_GRANDE = 30
+DIAS_HISTORIA = 40
+
+
+class QueryBudgetTests(TestCase):
+    """Query counts of the report engines stay flat as the fleet grows."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The engines log every device; only the queries and their time are measured here
+        logging.disable(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.query = SolarDataQuery()
+        self.analysis = SolarDataAnalysis()
+        self.check_date = date.today() - timedelta(days=1)
+
+    def _metodos(self):
+        """Every get_*_production and check_* method of the engines, by name."""
+        metodos = {}
+        for engine in (self.query, self.analysis):
+            for name in dir(engine):
+                if (name.startswith('get_') and name.endswith('_production')) or name.startswith('check_'):
+                    metodos[name] = getattr(engine, name)
+        return metodos
+
+    def _llamar(self, name, method):
+        if 'last_n_days' in name:
+            return method(7)
+        if name.startswith('get_'):
+            return method(self.check_date - timedelta(days=6), self.check_date)
+        return method(check_date=self.check_date)
+
+    def _medir(self):
+        """
+        Returns:
+            dict: {method: {'queries': int, 'seconds': float}}
+        """
+        medidas = {}
+        for name, method in sorted(self._metodos().items()):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                self._llamar(name, method)
+                seconds = time.perf_counter() - started
+            medidas[name] = {'queries': len(queries), 'seconds': round(seconds, 4)}
+        return medidas
+
+    def test_every_method_has_a_budget(self):
+        self.assertEqual(sorted(self._metodos()), sorted(QUERY_BUDGETS))
+
+    def test_query_count_does_not_grow_with_fleet(self):
+        generar_flota(FLOTA_PEQUENA, DIAS_HISTORIA, semilla=1)
+        pequena = self._medir()
+
+        generar_flota(FLOTA_GRANDE - FLOTA_PEQUENA, DIAS_HISTORIA, semilla=1)
+        grande = self._medir()
+
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(method=name):
+                self.assertEqual(
+                    grande[name]['queries'], pequena[name]['queries'],
+                    f"{name}: {pequena[name]['queries']} queries with {FLOTA_PEQUENA} projects, "
+                    f"{grande[name]['queries']} with {FLOTA_GRANDE}"
+                )
+                self.assertLessEqual(grande[name]['queries'], budget)
+
+        self._guardar_baseline(grande)
+
+    def test_results_match_per_device_queries(self):
+        """The grouped queries return what filtering each device separately returns."""
+        generar_flota(FLOTA_PEQUENA, DIAS_HISTORIA, semilla=3)
+        proyectos = Proyecto.objects.all()
+        inicio = self.check_date - timedelta(days=13)
+        result = self.query.get_systems_production(inicio, self.check_date)
+
+        for proyecto in proyectos:
+            filas = GeneracionEnergiaDiaria.objects.filter(
+                id_proyecto=proyecto, fecha_generacion_dia__gte=inicio, fecha_generacion_dia__lte=self.check_date
+            ).order_by('fecha_generacion_dia')
+            produccion = result['sistemas'][str(proyecto.id)]['produccion']
+            self.assertEqual(produccion['dias_con_datos'], filas.count())
+            self.assertEqual([dia['fecha'] for dia in produccion['generacion_diaria']], [fila.fecha_generacion_dia.isoformat() for fila in filas])
+            self.assertAlmostEqual(produccion['total_energia_kwh'], float(sum(fila.energia_generada_dia or 0 for fila in filas)))
 
-# Create your tests here.
+    def _guardar_baseline(self, medidas):
+        """Writes the wall time of each method to REPORTS_BASELINE_FILE, next to the previous run's."""
+        path = getattr(settings, 'REPORTS_BASELINE_FILE', None)
+        if not path:
+            return
+        path = Path(path)
+        anterior = {}
+        if path.exists():
+            try:
+                anterior = json.loads(path.read_text()).get('methods', {})
+            except (OSError, ValueError):
+                anterior = {}
+        for name, medida in medidas.items():
+            if name in anterior:
+                medida['previous_seconds'] = anterior[name].get('seconds')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({
+                'recorded': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'database': connection.vendor,
+                'fleet': {
+                    'projects': FLOTA_GRANDE,
+                    'inverters': Proyecto.objects.aggregate(total=Count('inversor'))['total'],
+                    'days': DIAS_HISTORIA,
+                    'seed': 1,
+                },
+                'methods': medidas,
+            }, indent=2))
+        except OSError:
+            pass
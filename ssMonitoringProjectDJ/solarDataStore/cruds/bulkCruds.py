@@ -0,0 +1,222 @@
+# Bulk ingest helpers shared by the vendor CRUD modules
+# Every upsert also records the collection state of the rows it wrote (see estadoRecoleccionCruds)
+# and queues the entities it stored as NULL for the afternoon re-collection (see colaRecoleccionCruds)
+from solarData.models import Proyecto, GeneracionEnergiaDiaria, Inversor, GeneracionInversorDiaria, Granular, GeneracionGranularDiaria
+from solarDataStore.cruds.estadoRecoleccionCruds import registrar_resultados, NIVEL_SISTEMA, NIVEL_INVERSOR, NIVEL_GRANULAR
+from solarDataStore.cruds.colaRecoleccionCruds import encolar_nulos
+from solarData.pipeline_metrics import PipelineMetrics
+from django.db import transaction
+import logging
+
+# Callers pass their own store logger ('huawei_store', 'solis_store', ...) so lines land in the vendor's log file
+default_logger = logging.getLogger('management_commands')
+
+# Rows per INSERT/UPDATE statement
+BULK_BATCH_SIZE = 500
+
+
+@PipelineMetrics.timed('store.lookup')
+def proyectos_por_identificador(identificadores):
+    """
+    Resolve many identificador_planta values with a single query.
+    Args:
+        identificadores (iterable): identificador_planta values
+    Returns:
+        dict: {identificador_planta: Proyecto}
+    """
+    identificadores = {identificador for identificador in identificadores if identificador}
+    if not identificadores:
+        return {}
+    return {p.identificador_planta: p for p in Proyecto.objects.filter(identificador_planta__in=identificadores)}
+
+
+@PipelineMetrics.timed('store.lookup')
+def inversores_por_identificador(identificadores):
+    """
+    Resolve many identificador_inversor values with a single query (project included).
+    Args:
+        identificadores (iterable): identificador_inversor values
+    Returns:
+        dict: {identificador_inversor: Inversor}
+    """
+    identificadores = {identificador for identificador in identificadores if identificador}
+    if not identificadores:
+        return {}
+    queryset = Inversor.objects.filter(identificador_inversor__in=identificadores).select_related('id_proyecto')
+    return {inv.identificador_inversor: inv for inv in queryset}
+
+
+def _dedupe(rows, key):
+    """Keep the last row per key, the same outcome sequential update_or_create calls would give."""
+    unique = {}
+    for row in rows:
+        unique[key(row)] = row
+    return list(unique.values())
+
+
+def bulk_upsert_generacion_sistema(rows, log=None):
+    """
+    Insert or update GeneracionEnergiaDiaria rows in bulk.
+    Args:
+        rows (list): [(proyecto, fecha_generacion_dia, energia_generada_dia), ...]
+        log (Logger): Logger to report to (defaults to management_commands)
+    Returns:
+        tuple: (created, updated)
+    """
+    rows = _dedupe(rows, key=lambda row: (row[0].id, row[1]))
+    if not rows:
+        return 0, 0
+
+    with PipelineMetrics.stage('store.upsert') as stage, transaction.atomic():
+        stage.add(rows=len(rows), nulls=sum(1 for row in rows if row[-1] is None))
+        existing = {
+            (obj.id_proyecto_id, obj.fecha_generacion_dia): obj
+            for obj in GeneracionEnergiaDiaria.objects.filter(
+                id_proyecto__in={row[0].id for row in rows},
+                fecha_generacion_dia__in={row[1] for row in rows},
+            )
+        }
+        to_create = []
+        to_update = []
+        for proyecto, fecha, energia in rows:
+            obj = existing.get((proyecto.id, fecha))
+            if obj is None:
+                to_create.append(GeneracionEnergiaDiaria(id_proyecto=proyecto, fecha_generacion_dia=fecha, energia_generada_dia=energia))
+            else:
+                obj.energia_generada_dia = energia
+                to_update.append(obj)
+        GeneracionEnergiaDiaria.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        GeneracionEnergiaDiaria.objects.bulk_update(to_update, ['energia_generada_dia'], batch_size=BULK_BATCH_SIZE)
+        registrar_resultados(NIVEL_SISTEMA, [(proyecto.identificador_planta, fecha, energia) for proyecto, fecha, energia in rows], log=log)
+        encolar_nulos(NIVEL_SISTEMA, [(proyecto.marca_inversor_id, proyecto.identificador_planta, fecha, energia) for proyecto, fecha, energia in rows], log=log)
+
+    (log or default_logger).debug(f"|BulkStore|bulk_upsert_generacion_sistema| {len(to_create)} created, {len(to_update)} updated")
+    return len(to_create), len(to_update)
+
+
+def bulk_upsert_generacion_inversor(rows, log=None):
+    """
+    Insert or update GeneracionInversorDiaria rows in bulk.
+    Args:
+        rows (list): [(inversor, fecha_generacion_inversor_dia, energia_generada_inversor_dia), ...]
+                     inversor must have id_proyecto loaded (see inversores_por_identificador)
+        log (Logger): Logger to report to (defaults to management_commands)
+    Returns:
+        tuple: (created, updated)
+    """
+    rows = _dedupe(rows, key=lambda row: (row[0].id, row[1]))
+    if not rows:
+        return 0, 0
+
+    with PipelineMetrics.stage('store.upsert') as stage, transaction.atomic():
+        stage.add(rows=len(rows), nulls=sum(1 for row in rows if row[-1] is None))
+        existing = {
+            (obj.id_proyecto_id, obj.id_inversor_id, obj.fecha_generacion_inversor_dia): obj
+            for obj in GeneracionInversorDiaria.objects.filter(
+                id_inversor__in={row[0].id for row in rows},
+                fecha_generacion_inversor_dia__in={row[1] for row in rows},
+            )
+        }
+        to_create = []
+        to_update = []
+        for inversor, fecha, energia in rows:
+            obj = existing.get((inversor.id_proyecto_id, inversor.id, fecha))
+            if obj is None:
+                to_create.append(GeneracionInversorDiaria(
+                    id_proyecto_id=inversor.id_proyecto_id,
+                    id_inversor=inversor,
+                    fecha_generacion_inversor_dia=fecha,
+                    energia_generada_inversor_dia=energia,
+                ))
+            else:
+                obj.energia_generada_inversor_dia = energia
+                to_update.append(obj)
+        GeneracionInversorDiaria.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        GeneracionInversorDiaria.objects.bulk_update(to_update, ['energia_generada_inversor_dia'], batch_size=BULK_BATCH_SIZE)
+        registrar_resultados(NIVEL_INVERSOR, [(inversor.identificador_inversor, fecha, energia) for inversor, fecha, energia in rows], log=log)
+        encolar_nulos(NIVEL_INVERSOR, [(inversor.id_proyecto.marca_inversor_id, inversor.identificador_inversor, fecha, energia) for inversor, fecha, energia in rows], log=log)
+
+    (log or default_logger).debug(f"|BulkStore|bulk_upsert_generacion_inversor| {len(to_create)} created, {len(to_update)} updated")
+    return len(to_create), len(to_update)
+
+
+def bulk_upsert_generacion_granular(rows, tipo_granular="MPPT", log=None):
+    """
+    Insert or update GeneracionGranularDiaria rows in bulk, creating missing Granular objects first.
+    Granulars are named '<identificador_inversor>-<numero>' (e.g. 'NE=35759038-1').
+    Args:
+        rows (list): [(inversor, numero_granular, fecha_generacion_granular_dia, energia_generada_granular_dia), ...]
+                     inversor must have id_proyecto loaded (see inversores_por_identificador)
+        tipo_granular (str): tipo_granular for newly created Granular objects
+        log (Logger): Logger to report to (defaults to management_commands)
+    Returns:
+        tuple: (created, updated, created_granulars)
+    """
+    rows = _dedupe(rows, key=lambda row: (row[0].id, row[1], row[2]))
+    if not rows:
+        return 0, 0, 0
+
+    with PipelineMetrics.stage('store.upsert') as stage, transaction.atomic():
+        stage.add(rows=len(rows), nulls=sum(1 for row in rows if row[-1] is None))
+        # Granular objects, looked up and created in bulk
+        wanted = {(inversor.id, f"{inversor.identificador_inversor}-{numero}"): inversor for inversor, numero, _, _ in rows}
+        granulars = {
+            (g.id_inversor_id, g.serial_granular): g
+            for g in Granular.objects.filter(
+                id_inversor__in={key[0] for key in wanted},
+                serial_granular__in={key[1] for key in wanted},
+            )
+        }
+        new_granulars = [
+            Granular(id_proyecto_id=inversor.id_proyecto_id, id_inversor=inversor, serial_granular=serial, tipo_granular=tipo_granular)
+            for (inversor_id, serial), inversor in wanted.items()
+            if (inversor_id, serial) not in granulars
+        ]
+        if new_granulars:
+            Granular.objects.bulk_create(new_granulars, batch_size=BULK_BATCH_SIZE)
+            # Re-read so the new objects carry their primary keys on every backend
+            granulars.update({
+                (g.id_inversor_id, g.serial_granular): g
+                for g in Granular.objects.filter(
+                    id_inversor__in={g.id_inversor_id for g in new_granulars},
+                    serial_granular__in={g.serial_granular for g in new_granulars},
+                )
+            })
+            for g in new_granulars:
+                (log or default_logger).debug(f"|BulkStore|bulk_upsert_generacion_granular| Created new Granular: {g.serial_granular}")
+
+        # Daily generation rows; the table has no unique constraint, so every matching row is updated
+        resolved = [
+            (granulars[(inversor.id, f"{inversor.identificador_inversor}-{numero}")], fecha, energia)
+            for inversor, numero, fecha, energia in rows
+        ]
+        existing = {}
+        for obj in GeneracionGranularDiaria.objects.filter(
+            id_granular__in={granular.id for granular, _, _ in resolved},
+            fecha_generacion_granular_dia__in={fecha for _, fecha, _ in resolved},
+        ):
+            existing.setdefault((obj.id_granular_id, obj.fecha_generacion_granular_dia), []).append(obj)
+
+        to_create = []
+        to_update = []
+        for granular, fecha, energia in resolved:
+            matches = existing.get((granular.id, fecha))
+            if not matches:
+                to_create.append(GeneracionGranularDiaria(
+                    id_proyecto_id=granular.id_proyecto_id,
+                    id_inversor_id=granular.id_inversor_id,
+                    id_granular=granular,
+                    fecha_generacion_granular_dia=fecha,
+                    energia_generada_granular_dia=energia,
+                ))
+                continue
+            for obj in matches:
+                obj.energia_generada_granular_dia = energia
+                to_update.append(obj)
+        GeneracionGranularDiaria.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        GeneracionGranularDiaria.objects.bulk_update(to_update, ['energia_generada_granular_dia'], batch_size=BULK_BATCH_SIZE)
+        registrar_resultados(NIVEL_GRANULAR, [(inversor.identificador_inversor, fecha, energia) for inversor, _, fecha, energia in rows], log=log)
+        encolar_nulos(NIVEL_GRANULAR, [(inversor.id_proyecto.marca_inversor_id, inversor.identificador_inversor, fecha, energia) for inversor, _, fecha, energia in rows], log=log)
+
+    (log or default_logger).debug(f"|BulkStore|bulk_upsert_generacion_granular| {len(to_create)} created, {len(to_update)} updated, {len(new_granulars)} new Granular objects")
+    return len(to_create), len(to_update), len(new_granulars)
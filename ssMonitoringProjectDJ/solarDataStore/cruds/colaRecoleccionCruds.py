@@ -0,0 +1,164 @@
+# Re-collection queue: entities stored as NULL that are fetched again later in the day
+from solarData.models import ColaRecoleccion
+from solarDataStore.cruds.estadoRecoleccionCruds import NIVEL_SISTEMA
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger('management_commands')
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_RESUELTO = 'resuelto'
+ESTADO_AGOTADO = 'agotado'
+
+# Only recent days are queued; vendors do not fill in older gaps (and backfills would flood the queue)
+COLA_MAX_DIAS = 7
+# Retry n waits BACKOFF_BASE * 2**(n-1): 30 min, 1 h, 2 h, 4 h; after MAX_INTENTOS the entry is given up
+MAX_INTENTOS = 5
+BACKOFF_BASE = timedelta(minutes=30)
+
+
+def encolar_nulos(nivel, resultados, log=None):
+    """
+    Queue the entities stored without a value and resolve the queued ones that now have one.
+    Called by the bulk upserts, inside their transaction.
+    Args:
+        nivel (str): 'sistema', 'inversor' or 'granular'
+        resultados (list): [(marca_inversor_id, identificador, fecha, energia), ...]
+                           Several rows per entity (granular) count as one; any value resolves it.
+        log (Logger): Logger to report to (defaults to management_commands)
+    """
+    entidades = {}
+    for marca_inversor_id, identificador, fecha, energia in resultados:
+        clave = (marca_inversor_id, identificador, fecha)
+        entidades[clave] = entidades.get(clave, False) or energia is not None
+
+    encolar(nivel, [clave for clave, con_valor in entidades.items() if not con_valor], log=log)
+    resolver(nivel, [(identificador, fecha) for (_, identificador, fecha), con_valor in entidades.items() if con_valor], log=log)
+
+
+def encolar(nivel, entradas, log=None):
+    """
+    Add entities to the queue. Entities still pending keep their attempts and schedule; resolved
+    or exhausted entries that came back without data start over as pending.
+    Args:
+        nivel (str): 'sistema', 'inversor' or 'granular'
+        entradas (iterable): [(marca_inversor_id, identificador, fecha), ...]
+    Returns:
+        int: Number of entries offered to the queue (pending ones are left untouched)
+    """
+    desde = timezone.localdate() - timedelta(days=COLA_MAX_DIAS)
+    ahora = timezone.now()
+    nuevas = {
+        (identificador, fecha): marca_inversor_id
+        for marca_inversor_id, identificador, fecha in entradas
+        if marca_inversor_id and identificador and fecha >= desde
+    }
+    if not nuevas:
+        return 0
+    por_fecha = {}
+    for identificador, fecha in nuevas:
+        por_fecha.setdefault(fecha, set()).add(identificador)
+    reabiertas = 0
+    for fecha, identificadores in por_fecha.items():
+        reabiertas += ColaRecoleccion.objects.filter(
+            nivel=nivel, fecha=fecha, identificador__in=identificadores, estado__in=[ESTADO_RESUELTO, ESTADO_AGOTADO]
+        ).update(estado=ESTADO_PENDIENTE, intentos=0, proximo_intento=ahora, ultimo_error="", fecha_actualizacion=ahora)
+    if reabiertas:
+        (log or logger).info(f"|ColaRecoleccion|encolar| {reabiertas} resolved or exhausted {nivel} entries without data again, queued anew")
+    ColaRecoleccion.objects.bulk_create(
+        [
+            ColaRecoleccion(marca_inversor_id=marca_inversor_id, nivel=nivel, identificador=identificador, fecha=fecha, proximo_intento=ahora)
+            for (identificador, fecha), marca_inversor_id in nuevas.items()
+        ],
+        ignore_conflicts=True,
+    )
+    (log or logger).info(f"|ColaRecoleccion|encolar| {len(nuevas)} {nivel} entities without data offered to the re-collection queue")
+    return len(nuevas)
+
+
+def encolar_faltantes(nivel, solicitados, recibidos, fecha, log=None):
+    """
+    Queue the entities that were requested but missing from the vendor response (e.g. Huawei
+    devices left out of getDevKpiDay).
+    Args:
+        nivel (str): 'sistema', 'inversor' or 'granular'
+        solicitados (iterable): Identifiers sent in the request
+        recibidos (iterable): Identifiers present in the response
+        fecha (date): Generation date
+    """
+    faltantes = set(solicitados) - set(recibidos)
+    if not faltantes:
+        return 0
+    # Imported here: bulkCruds imports this module
+    from solarDataStore.cruds.bulkCruds import proyectos_por_identificador, inversores_por_identificador
+    if nivel == NIVEL_SISTEMA:
+        marcas = {identificador: p.marca_inversor_id for identificador, p in proyectos_por_identificador(faltantes).items()}
+    else:
+        marcas = {identificador: inv.id_proyecto.marca_inversor_id for identificador, inv in inversores_por_identificador(faltantes).items()}
+    (log or logger).warning(f"|ColaRecoleccion|encolar_faltantes| {len(faltantes)} {nivel} entities missing from the response for {fecha}")
+    return encolar(nivel, [(marcas.get(identificador), identificador, fecha) for identificador in faltantes], log=log)
+
+
+def resolver(nivel, claves, log=None):
+    """
+    Mark queued entities as resolved once a value was stored for them.
+    Args:
+        nivel (str): 'sistema', 'inversor' or 'granular'
+        claves (iterable): [(identificador, fecha), ...]
+    """
+    por_fecha = {}
+    for identificador, fecha in claves:
+        por_fecha.setdefault(fecha, set()).add(identificador)
+    resueltas = 0
+    for fecha, identificadores in por_fecha.items():
+        resueltas += ColaRecoleccion.objects.filter(
+            nivel=nivel, fecha=fecha, identificador__in=identificadores, estado=ESTADO_PENDIENTE
+        ).update(estado=ESTADO_RESUELTO, fecha_actualizacion=timezone.now())
+    if resueltas:
+        (log or logger).info(f"|ColaRecoleccion|resolver| {resueltas} queued {nivel} entities resolved")
+    return resueltas
+
+
+def pendientes(limite=None):
+    """
+    Queue entries due for another attempt, oldest schedule first.
+    Args:
+        limite (int): Maximum number of entries (None for all)
+    Returns:
+        list: ColaRecoleccion objects with marca_inversor loaded
+    """
+    queryset = (
+        ColaRecoleccion.objects.filter(estado=ESTADO_PENDIENTE, proximo_intento__lte=timezone.now())
+        .select_related('marca_inversor').order_by('proximo_intento')
+    )
+    return list(queryset[:limite] if limite else queryset)
+
+
+def reprogramar(ids, mensaje="", log=None):
+    """
+    Record a failed attempt for entries still pending: schedule the next one with exponential
+    backoff, or give up after MAX_INTENTOS attempts.
+    Args:
+        ids (iterable): ColaRecoleccion ids that were attempted
+        mensaje (str): Reason (vendor error, or still no data)
+    Returns:
+        tuple: (rescheduled, exhausted)
+    """
+    ahora = timezone.now()
+    entradas = list(ColaRecoleccion.objects.filter(id__in=list(ids), estado=ESTADO_PENDIENTE))
+    if not entradas:
+        return 0, 0
+    agotadas = 0
+    for entrada in entradas:
+        entrada.intentos += 1
+        if entrada.intentos >= MAX_INTENTOS:
+            entrada.estado = ESTADO_AGOTADO
+            agotadas += 1
+        else:
+            entrada.proximo_intento = ahora + BACKOFF_BASE * (2 ** (entrada.intentos - 1))
+        entrada.ultimo_error = str(mensaje)[:1000]
+        entrada.fecha_actualizacion = ahora
+    ColaRecoleccion.objects.bulk_update(entradas, ['estado', 'intentos', 'proximo_intento', 'ultimo_error', 'fecha_actualizacion'])
+    (log or logger).info(f"|ColaRecoleccion|reprogramar| {len(entradas) - agotadas} entries rescheduled, {agotadas} given up after {MAX_INTENTOS} attempts")
+    return len(entradas) - agotadas, agotadas
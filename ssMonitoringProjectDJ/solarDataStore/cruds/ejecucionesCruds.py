@@ -0,0 +1,60 @@
+# Per-command history of collect_all_gen runs (EjecucionComando), built from the pipeline stage metrics
+from solarData.models import EjecucionComando
+import logging
+
+logger = logging.getLogger('management_commands')
+
+VENDORS = ('huawei', 'solis', 'hoymiles')
+
+
+def marca_de_comando(comando):
+    """Vendor of a collection command ('huawei_inverter_gen' -> 'huawei'), '' when it has none."""
+    prefijo = comando.split('_', 1)[0]
+    return prefijo if prefijo in VENDORS else ''
+
+
+def registrar_ejecucion_comando(run_id, comando, inicio, fin, metricas, error=None):
+    """
+    Store the outcome and metrics of one command of a run.
+    Args:
+        run_id (int): EjecucionRecoleccion id (nothing is stored without one)
+        comando (str): Command name
+        inicio (datetime): Start time
+        fin (datetime): End time
+        metricas (dict): Stage metrics of the command (PipelineMetrics.diff of the snapshots around it)
+        error (Exception): The command's error, None when it succeeded
+    Returns:
+        EjecucionComando: The stored record, or None
+    """
+    if run_id is None:
+        return None
+
+    def total(sufijo, campo):
+        return sum(stats.get(campo, 0) for etapa, stats in metricas.items() if etapa.endswith(sufijo))
+
+    ejecucion = EjecucionComando.objects.create(
+        id_ejecucion_id=run_id,
+        comando=comando,
+        marca=marca_de_comando(comando),
+        estado='fallida' if error else 'completada',
+        fecha_inicio=inicio,
+        fecha_fin=fin,
+        duracion_segundos=(fin - inicio).total_seconds(),
+        entidades=total('store.upsert', 'rows'),
+        nulos=total('store.upsert', 'nulls'),
+        errores=sum(stats.get('errors', 0) for etapa, stats in metricas.items() if not etapa.startswith('command.')) + (1 if error else 0),
+        llamadas_api=total('.http', 'requests') + total('.login', 'requests'),
+        limites_tasa=total('.http', 'rate_limits'),
+        reintentos=total('.http', 'retries'),
+        bytes_recibidos=total('.http', 'bytes'),
+        segundos_http=total('.http', 'seconds'),
+        segundos_limite_tasa=total('.rate_limit_sleep', 'seconds'),
+        metricas=metricas,
+        mensaje_error=str(error)[:2000] if error else "",
+    )
+    logger.info(
+        f"|EjecucionesRecoleccion|registrar_ejecucion_comando| Run {run_id}: {comando} {ejecucion.estado} in "
+        f"{ejecucion.duracion_segundos:.1f}s, {ejecucion.entidades} rows ({ejecucion.nulos} null), "
+        f"{ejecucion.llamadas_api} API calls, {ejecucion.limites_tasa} rate-limit hits"
+    )
+    return ejecucion
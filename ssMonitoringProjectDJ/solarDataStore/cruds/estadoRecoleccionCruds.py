@@ -0,0 +1,124 @@
+# Collection-state index: which (entity, date, level) has already been collected
+from solarData.models import EstadoRecoleccion, GeneracionEnergiaDiaria, GeneracionInversorDiaria, GeneracionGranularDiaria
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger('management_commands')
+
+NIVEL_SISTEMA = 'sistema'
+NIVEL_INVERSOR = 'inversor'
+NIVEL_GRANULAR = 'granular'
+
+ESTADO_COMPLETO = 'completo'
+ESTADO_SIN_DATOS = 'sin_datos'
+ESTADO_ERROR = 'error'
+
+
+def registrar_estados(nivel, estados, log=None):
+    """
+    Insert or update collection states in one statement.
+    Args:
+        nivel (str): 'sistema', 'inversor' or 'granular'
+        estados (list): [(identificador, fecha, estado, mensaje), ...]
+        log (Logger): Logger to report to (defaults to management_commands)
+    Returns:
+        int: Number of states written
+    """
+    unique = {}
+    for identificador, fecha, estado, mensaje in estados:
+        if identificador:
+            unique[(identificador, fecha)] = (estado, mensaje or "")
+    if not unique:
+        return 0
+
+    now = timezone.now()
+    EstadoRecoleccion.objects.bulk_create(
+        [
+            EstadoRecoleccion(nivel=nivel, identificador=identificador, fecha=fecha, estado=estado, mensaje=mensaje, fecha_actualizacion=now)
+            for (identificador, fecha), (estado, mensaje) in unique.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['nivel', 'identificador', 'fecha'],
+        update_fields=['estado', 'mensaje', 'fecha_actualizacion'],
+    )
+    (log or logger).debug(f"|EstadoRecoleccion|registrar_estados| {len(unique)} {nivel} states written")
+    return len(unique)
+
+
+def registrar_resultados(nivel, resultados, log=None):
+    """
+    Record fetched values: 'completo' when a value was stored, 'sin_datos' when it was null.
+    Args:
+        nivel (str): 'sistema', 'inversor' or 'granular'
+        resultados (list): [(identificador, fecha, energia), ...]
+    """
+    estados = {}
+    for identificador, fecha, energia in resultados:
+        # Granular levels have several rows per inverter; one non-null value makes the inverter complete
+        if energia is not None or (identificador, fecha) not in estados:
+            estados[(identificador, fecha)] = ESTADO_COMPLETO if energia is not None else ESTADO_SIN_DATOS
+    return registrar_estados(nivel, [(identificador, fecha, estado, "") for (identificador, fecha), estado in estados.items()], log=log)
+
+
+def registrar_errores(nivel, identificadores, fecha, mensaje, log=None):
+    """
+    Record a failed fetch for every identifier (e.g. a whole Huawei batch).
+    Args:
+        nivel (str): 'sistema', 'inversor' or 'granular'
+        identificadores (iterable): identificador_planta or identificador_inversor values
+        fecha (date): Generation date
+        mensaje (str): Error message
+    """
+    try:
+        return registrar_estados(nivel, [(identificador, fecha, ESTADO_ERROR, str(mensaje)[:1000]) for identificador in identificadores], log=log)
+    except Exception as e:
+        (log or logger).warning(f"|EstadoRecoleccion|registrar_errores| Could not record {nivel} errors for {fecha}: {e}")
+        return 0
+
+
+def _pendiente(nivel, fecha):
+    """Condition (two EXISTS subqueries) that is true for entities still lacking data at nivel for fecha."""
+    if nivel == NIVEL_SISTEMA:
+        identificador = OuterRef('identificador_planta')
+        almacenado = GeneracionEnergiaDiaria.objects.filter(
+            id_proyecto=OuterRef('pk'), fecha_generacion_dia=fecha, energia_generada_dia__isnull=False
+        )
+    elif nivel == NIVEL_INVERSOR:
+        identificador = OuterRef('identificador_inversor')
+        almacenado = GeneracionInversorDiaria.objects.filter(
+            id_inversor=OuterRef('pk'), fecha_generacion_inversor_dia=fecha, energia_generada_inversor_dia__isnull=False
+        )
+    elif nivel == NIVEL_GRANULAR:
+        identificador = OuterRef('identificador_inversor')
+        almacenado = GeneracionGranularDiaria.objects.filter(
+            id_inversor=OuterRef('pk'), fecha_generacion_granular_dia=fecha, energia_generada_granular_dia__isnull=False
+        )
+    else:
+        raise ValueError(f"Unknown collection level: {nivel}")
+
+    completo = EstadoRecoleccion.objects.filter(
+        nivel=nivel, identificador=identificador, fecha=fecha, estado=ESTADO_COMPLETO
+    )
+    return ~Exists(completo) & ~Exists(almacenado)
+
+
+def filtrar_pendientes(queryset, nivel, fecha):
+    """
+    Restrict a Proyecto or Inversor queryset to the entities still lacking data for fecha.
+    An entity counts as collected when the index marks it 'completo' or a non-null value is
+    already stored (rows collected before the index existed). The checks are EXISTS subqueries,
+    so the pending list is computed in the same single query.
+    Args:
+        queryset (QuerySet): Proyecto queryset for 'sistema', Inversor queryset otherwise
+        nivel (str | tuple): 'sistema', 'inversor' or 'granular'; with several inverter levels an
+                             entity is pending when it lacks data at any of them
+        fecha (date): Generation date
+    Returns:
+        QuerySet: The filtered queryset
+    """
+    niveles = (nivel,) if isinstance(nivel, str) else tuple(nivel)
+    condicion = _pendiente(niveles[0], fecha)
+    for otro_nivel in niveles[1:]:
+        condicion = condicion | _pendiente(otro_nivel, fecha)
+    return queryset.filter(condicion)
@@ -1,8 +1,13 @@
 # Imports for Hoymiles CRUD operations
 from solarData.models import Proyecto, GeneracionEnergiaDiaria, Inversor, GeneracionInversorDiaria, Granular, GeneracionGranularDiaria
+from solarDataStore.cruds.bulkCruds import (
+    proyectos_por_identificador, inversores_por_identificador,
+    bulk_upsert_generacion_sistema, bulk_upsert_generacion_inversor, bulk_upsert_generacion_granular,
+)
+from solarData.log_pipeline import LazyJson, log_event
 from datetime import datetime, timezone
 import logging
-import json
+import time
 
 logger = logging.getLogger('hoymiles_store')
 
@@ -13,22 +18,17 @@ def insert_hoymiles_generacion_sistema_dia(data):
         data (list): List of dicts as returned by fetch_hoymiles_generacion_sistema_dia
                     Expected format: [{'stationCode': 'station_id', 'collectTime': '2025-06-05', 'PVYield': 17.0}, ...]
     """
-    logger.info(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Starting system generation data insertion for {len(data)} entries")
+    started = time.monotonic()
+    logger.debug(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Starting system generation data insertion for {len(data)} entries")
     
-    # Log the data being processed for debugging
-    try:
-        data_json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-        # Truncate if very large (>3000 chars) to avoid log bloat
-        if len(data_json_str) > 3000:
-            truncated_data = data_json_str[:3000] + "... [TRUNCATED]"
-            logger.info(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Data being processed (TRUNCATED): {truncated_data}")
-        else:
-            logger.info(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Data being processed: {data_json_str}")
-    except Exception as e:
-        logger.warning(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Could not serialize data for logging: {e}")
+    # Log the data being processed for debugging (serialized only if DEBUG is enabled)
+    logger.debug(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Data being processed: %s", LazyJson(data, limit=3000))
     
-    successful_inserts = 0
     skipped_entries = 0
+    rows = []
+    
+    # One query for every project in the payload instead of one per entry
+    proyectos = proyectos_por_identificador(entry.get('stationCode') for entry in data)
     
     for entry in data:
         station_code = entry.get('stationCode')
@@ -48,28 +48,38 @@ def insert_hoymiles_generacion_sistema_dia(data):
             skipped_entries += 1
             continue
         
-        try:
-            proyecto = Proyecto.objects.get(identificador_planta=station_code)
-        except Proyecto.DoesNotExist:
+        proyecto = proyectos.get(station_code)
+        if proyecto is None:
             logger.warning(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Proyecto with identificador_planta '{station_code}' not found. Entry skipped for date {date_obj}.")
             skipped_entries += 1
             continue
         
-        # Update or create the generation record
-        obj, created = GeneracionEnergiaDiaria.objects.update_or_create(
-            id_proyecto=proyecto,
-            fecha_generacion_dia=date_obj,
-            defaults={'energia_generada_dia': pvyield}
-        )
-        
-        if created:
-            logger.info(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Created new GeneracionEnergiaDiaria for project {station_code} on {date_obj}: {pvyield} kWh")
-        else:
-            logger.info(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Updated GeneracionEnergiaDiaria for project {station_code} on {date_obj}: {pvyield} kWh")
-        
-        successful_inserts += 1
+        rows.append((proyecto, date_obj, pvyield))
     
-    logger.info(f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Completed system generation data insertion: {successful_inserts} successful, {skipped_entries} skipped")
+    # Update or create all generation records in one transaction
+    created, updated = bulk_upsert_generacion_sistema(rows, log=logger)
+    
+    log_event(
+        logger, 'store_batch', f"|HoymilesStore|insert_hoymiles_generacion_sistema_dia| Completed system generation data insertion: {created + updated} successful ({created} created, {updated} updated), {skipped_entries} skipped",
+        vendor='hoymiles', function='insert_hoymiles_generacion_sistema_dia', entries=len(data),
+        created=created, updated=updated, skipped=skipped_entries,
+        duration_ms=round((time.monotonic() - started) * 1000),
+    )
+
+
+def channels_of(data):
+    """
+    DC ports reported for one microinverter, in port order.
+    Args:
+        data (dict): Dict as returned by fetch_hoymiles_generacion_inversor_granular_dia
+    Returns:
+        list: [(channel_num, channel_energy), ...] for every 'channel<N>' key present
+    """
+    channels = []
+    for key, value in data.items():
+        if key.startswith('channel') and key[len('channel'):].isdigit():
+            channels.append((int(key[len('channel'):]), value))
+    return sorted(channels)
 
 
 def insert_hoymiles_generacion_inversor_granular_dia(data, fecha_generacion):
@@ -82,105 +92,80 @@ def insert_hoymiles_generacion_inversor_granular_dia(data, fecha_generacion):
                         'inverter_sn': 'serial_number',
                         'collectTime': '2025-06-05', 
                         'PVYield': 17.0,
-                        'channel1': 2.5, 'channel2': 2.6, 'channel3': 2.7, 'channel4': 2.8
+                        'channel1': 2.5, 'channel2': 2.6, ...  (one key per DC port reported)
                     }
         fecha_generacion (str): Date in YYYY-MM-DD format
     """
-    logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Starting inverter and granular data insertion for date {fecha_generacion}")
+    insert_hoymiles_generacion_estacion_dia([data], fecha_generacion)
+
+
+def insert_hoymiles_generacion_estacion_dia(data, fecha_generacion):
+    """
+    Insert or update inverter and granular generation data for many Hoymiles microinverters
+    (typically every microinverter of one station) with one bulk write per table.
+    Args:
+        data (list): List of dicts as returned by fetch_hoymiles_generacion_inversor_granular_dia
+        fecha_generacion (str): Date in YYYY-MM-DD format
+    """
+    started = time.monotonic()
+    logger.debug(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Starting inverter and granular data insertion for {len(data)} inverters, date {fecha_generacion}")
     
-    # Log the data being processed for debugging
-    try:
-        data_json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-        logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Data being processed: {data_json_str}")
-    except Exception as e:
-        logger.warning(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Could not serialize data for logging: {e}")
+    # Log the data being processed for debugging (serialized only if DEBUG is enabled)
+    logger.debug(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Data being processed: %s", LazyJson(data, limit=3000))
     
     # Parse date string to date object
     try:
         date_obj = datetime.strptime(fecha_generacion, '%Y-%m-%d').date()
     except ValueError as e:
-        logger.error(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Invalid date format '{fecha_generacion}'. Error: {e}")
+        logger.error(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Invalid date format '{fecha_generacion}'. Error: {e}")
         return
     
-    station_code = data.get('stationCode')
-    inverter_sn = data.get('inverter_sn')
-    pvyield = data.get('PVYield')
-    
-    if not station_code or not inverter_sn:
-        logger.warning(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Missing stationCode or inverter_sn in data: {data}")
-        return
+    # One query for every inverter in the payload
+    inversores = inversores_por_identificador(entry.get('inverter_sn') for entry in data)
     
-    # Get the inverter object
-    try:
-        inversor = Inversor.objects.get(identificador_inversor=inverter_sn)
-    except Inversor.DoesNotExist:
-        logger.warning(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Inversor with identificador_inversor '{inverter_sn}' not found.")
-        return
+    inverter_rows = []
+    granular_rows = []
+    skipped_entries = 0
     
-    proyecto = inversor.id_proyecto
+    for entry in data:
+        station_code = entry.get('stationCode')
+        inverter_sn = entry.get('inverter_sn')
+        
+        if not station_code or not inverter_sn:
+            logger.warning(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Missing stationCode or inverter_sn in data: {entry}")
+            continue
+        
+        inversor = inversores.get(inverter_sn)
+        if inversor is None:
+            logger.warning(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Inversor with identificador_inversor '{inverter_sn}' not found.")
+            continue
+        
+        # Inverter generation data (always insert, even with None or 0 values)
+        inverter_rows.append((inversor, date_obj, entry.get('PVYield')))
+        
+        # Granular data for each channel (following Huawei pattern: serial_granular = inverter_sn-channel_num)
+        for channel_num, channel_energy in channels_of(entry):
+            if channel_energy is not None:
+                granular_rows.append((inversor, channel_num, date_obj, channel_energy))
+            else:
+                logger.debug(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| {inverter_sn} channel {channel_num} has no data (None)")
+                skipped_entries += 1
     
-    # Insert inverter generation data (always insert, even with None or 0 values)
     try:
-        obj, created = GeneracionInversorDiaria.objects.update_or_create(
-            id_proyecto=proyecto,
-            id_inversor=inversor,
-            fecha_generacion_inversor_dia=date_obj,
-            defaults={'energia_generada_inversor_dia': pvyield}
-        )
-        
-        if created:
-            logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Created new GeneracionInversorDiaria for {inverter_sn} on {date_obj}: {pvyield} kWh")
-        else:
-            logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Updated GeneracionInversorDiaria for {inverter_sn} on {date_obj}: {pvyield} kWh")
+        inverters_created, inverters_updated = bulk_upsert_generacion_inversor(inverter_rows, log=logger)
     except Exception as e:
-        logger.error(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Error inserting inverter data: {e}")
+        logger.error(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Error inserting inverter data: {e}")
+        inverters_created, inverters_updated = 0, 0
     
-    # Insert granular data for each channel (following Huawei pattern)
-    successful_inserts = 0
-    skipped_entries = 0
-    created_granulars = 0
-    
-    for channel_num in range(1, 5):  # Channels 1-4
-        channel_key = f'channel{channel_num}'
-        channel_energy = data.get(channel_key)
-        
-        if channel_energy is not None:
-            try:
-                # Create serial_granular following Huawei pattern: inverter_sn-channel_num
-                serial_granular = f"{inverter_sn}-{channel_num}"  # e.g., 'HWI123456-1'
-                
-                granular, created_granular = Granular.objects.get_or_create(
-                    id_proyecto=proyecto,
-                    id_inversor=inversor,
-                    serial_granular=serial_granular,
-                    defaults={"tipo_granular": "MPPT"}
-                )
-                
-                if created_granular:
-                    logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Created new Granular: {serial_granular} for inverter {inverter_sn}")
-                    created_granulars += 1
-                
-                # Insert/update the generation data
-                obj, created = GeneracionGranularDiaria.objects.update_or_create(
-                    id_proyecto=proyecto,
-                    id_inversor=inversor,
-                    id_granular=granular,
-                    fecha_generacion_granular_dia=date_obj,
-                    defaults={"energia_generada_granular_dia": channel_energy}
-                )
-                
-                if created:
-                    logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Created new GeneracionGranularDiaria for {serial_granular} on {date_obj}: {channel_energy} kWh")
-                else:
-                    logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Updated GeneracionGranularDiaria for {serial_granular} on {date_obj}: {channel_energy} kWh")
-                
-                successful_inserts += 1
-                
-            except Exception as e:
-                logger.error(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Error processing channel {channel_num}: {e}")
-                skipped_entries += 1
-        else:
-            logger.debug(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Channel {channel_num} has no data (None)")
-            skipped_entries += 1
+    try:
+        created, updated, created_granulars = bulk_upsert_generacion_granular(granular_rows, tipo_granular="MPPT", log=logger)
+    except Exception as e:
+        logger.error(f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Error inserting granular data: {e}")
+        return
     
-    logger.info(f"|HoymilesStore|insert_hoymiles_generacion_inversor_granular_dia| Completed granular data insertion: {successful_inserts} successful, {skipped_entries} skipped, {created_granulars} new Granular objects created")
+    log_event(
+        logger, 'store_batch', f"|HoymilesStore|insert_hoymiles_generacion_estacion_dia| Completed insertion: inverters {inverters_created} created, {inverters_updated} updated; granulars {created + updated} successful ({created} created, {updated} updated), {skipped_entries} skipped, {created_granulars} new Granular objects created",
+        vendor='hoymiles', function='insert_hoymiles_generacion_estacion_dia', entries=len(data),
+        created=created, updated=updated, skipped=skipped_entries, inverters_created=inverters_created, inverters_updated=inverters_updated, new_granulars=created_granulars,
+        duration_ms=round((time.monotonic() - started) * 1000),
+    )
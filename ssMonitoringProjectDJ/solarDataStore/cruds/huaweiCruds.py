@@ -1,9 +1,14 @@
 # Imports for Huawei CRUD operations
 from solarDataFetch.fetchers.huaweiFetcher import HuaweiFetcher
 from solarData.models import Proyecto, GeneracionEnergiaDiaria, Inversor, GeneracionInversorDiaria, Granular, GeneracionGranularDiaria
+from solarDataStore.cruds.bulkCruds import (
+    proyectos_por_identificador, inversores_por_identificador,
+    bulk_upsert_generacion_sistema, bulk_upsert_generacion_inversor, bulk_upsert_generacion_granular,
+)
+from solarData.log_pipeline import LazyJson, log_event
 from datetime import datetime, timezone
 import logging
-import json
+import time
 
 logger = logging.getLogger('huawei_store')
 
@@ -13,22 +18,17 @@ def insert_huawei_generacion_sistema_dia(data):
     Args:
         data (list): List of dicts as returned by fetch_huawei_generacion_sistema_dia
     """
-    logger.info(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Starting system generation data insertion for {len(data)} entries")
-    
-    # Log the data being processed for debugging
-    try:
-        data_json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-        # Truncate if very large (>3000 chars) to avoid log bloat
-        if len(data_json_str) > 3000:
-            truncated_data = data_json_str[:3000] + "... [TRUNCATED]"
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Data being processed (TRUNCATED): {truncated_data}")
-        else:
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Data being processed: {data_json_str}")
-    except Exception as e:
-        logger.warning(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Could not serialize data for logging: {e}")
-    
-    successful_inserts = 0
+    started = time.monotonic()
+    logger.debug(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Starting system generation data insertion for {len(data)} entries")
+    
+    # Log the data being processed for debugging (serialized only if DEBUG is enabled)
+    logger.debug(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Data being processed: %s", LazyJson(data, limit=3000))
+    
     skipped_entries = 0
+    rows = []
+    
+    # One query for every project in the payload instead of one per entry
+    proyectos = proyectos_por_identificador(entry.get('stationCode') for entry in data)
     
     for entry in data:
         station_code = entry.get('stationCode')
@@ -42,27 +42,22 @@ def insert_huawei_generacion_sistema_dia(data):
             
         date_obj = datetime.fromtimestamp(collect_time / 1000, tz=timezone.utc).date()
         
-        try:
-            proyecto = Proyecto.objects.get(identificador_planta=station_code)
-        except Proyecto.DoesNotExist:
+        proyecto = proyectos.get(station_code)
+        if proyecto is None:
             logger.warning(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Proyecto with identificador_planta '{station_code}' not found. Entry skipped for date {date_obj}.")
             skipped_entries += 1
             continue
             
-        obj, created = GeneracionEnergiaDiaria.objects.update_or_create(
-            id_proyecto=proyecto,
-            fecha_generacion_dia=date_obj,
-            defaults={'energia_generada_dia': pvyield}
-        )
-        
-        if created:
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Created new GeneracionEnergiaDiaria for project {station_code} on {date_obj}: {pvyield} kWh")
-        else:
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Updated GeneracionEnergiaDiaria for project {station_code} on {date_obj}: {pvyield} kWh")
-        
-        successful_inserts += 1
+        rows.append((proyecto, date_obj, pvyield))
     
-    logger.info(f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Completed system generation data insertion: {successful_inserts} successful, {skipped_entries} skipped")
+    created, updated = bulk_upsert_generacion_sistema(rows, log=logger)
+    
+    log_event(
+        logger, 'store_batch', f"|HuaweiStore|insert_huawei_generacion_sistema_dia| Completed system generation data insertion: {created + updated} successful ({created} created, {updated} updated), {skipped_entries} skipped",
+        vendor='huawei', function='insert_huawei_generacion_sistema_dia', entries=len(data),
+        created=created, updated=updated, skipped=skipped_entries,
+        duration_ms=round((time.monotonic() - started) * 1000),
+    )
 
 def insert_huawei_generacion_inversor_dia(data):
     """
@@ -70,22 +65,17 @@ def insert_huawei_generacion_inversor_dia(data):
     Args:
         data (list): List of dicts as returned by fetch_huawei_generacion_inversor_dia
     """
-    logger.info(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Starting inverter generation data insertion for {len(data)} entries")
-    
-    # Log the data being processed for debugging
-    try:
-        data_json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-        # Truncate if very large (>3000 chars) to avoid log bloat
-        if len(data_json_str) > 3000:
-            truncated_data = data_json_str[:3000] + "... [TRUNCATED]"
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Data being processed (TRUNCATED): {truncated_data}")
-        else:
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Data being processed: {data_json_str}")
-    except Exception as e:
-        logger.warning(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Could not serialize data for logging: {e}")
-    
-    successful_inserts = 0
+    started = time.monotonic()
+    logger.debug(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Starting inverter generation data insertion for {len(data)} entries")
+    
+    # Log the data being processed for debugging (serialized only if DEBUG is enabled)
+    logger.debug(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Data being processed: %s", LazyJson(data, limit=3000))
+    
     skipped_entries = 0
+    rows = []
+    
+    # One query for every inverter in the payload instead of one per entry
+    inversores = inversores_por_identificador(entry.get('identificador_inversor') for entry in data)
     
     for entry in data:
         identificador_inversor = entry.get('identificador_inversor')
@@ -99,28 +89,22 @@ def insert_huawei_generacion_inversor_dia(data):
             
         date_obj = datetime.fromtimestamp(collect_time / 1000, tz=timezone.utc).date()
         
-        try:
-            inversor = Inversor.objects.get(identificador_inversor=identificador_inversor)
-        except Inversor.DoesNotExist:
+        inversor = inversores.get(identificador_inversor)
+        if inversor is None:
             logger.warning(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Inversor with identificador_inversor '{identificador_inversor}' not found. Entry skipped for date {date_obj}.")
             skipped_entries += 1
             continue
             
-        obj, created = GeneracionInversorDiaria.objects.update_or_create(
-            id_proyecto=inversor.id_proyecto,
-            id_inversor=inversor,
-            fecha_generacion_inversor_dia=date_obj,
-            defaults={'energia_generada_inversor_dia': product_power}
-        )
-        
-        if created:
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Created new GeneracionInversorDiaria for inverter {identificador_inversor} on {date_obj}: {product_power} kWh")
-        else:
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Updated GeneracionInversorDiaria for inverter {identificador_inversor} on {date_obj}: {product_power} kWh")
-        
-        successful_inserts += 1
+        rows.append((inversor, date_obj, product_power))
+    
+    created, updated = bulk_upsert_generacion_inversor(rows, log=logger)
     
-    logger.info(f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Completed inverter generation data insertion: {successful_inserts} successful, {skipped_entries} skipped")
+    log_event(
+        logger, 'store_batch', f"|HuaweiStore|insert_huawei_generacion_inversor_dia| Completed inverter generation data insertion: {created + updated} successful ({created} created, {updated} updated), {skipped_entries} skipped",
+        vendor='huawei', function='insert_huawei_generacion_inversor_dia', entries=len(data),
+        created=created, updated=updated, skipped=skipped_entries,
+        duration_ms=round((time.monotonic() - started) * 1000),
+    )
 
 def insert_huawei_generacion_granular_dia(mppt_energy_dict, fecha_generacion):
     """
@@ -129,33 +113,24 @@ def insert_huawei_generacion_granular_dia(mppt_energy_dict, fecha_generacion):
         mppt_energy_dict (dict): { 'NE=...': { 'mppt_1_cap': value, ... }, ... }
         fecha_generacion (date): date object for the day of generation
     """
-    logger.info(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Starting granular (MPPT) data insertion for {len(mppt_energy_dict)} inverters on {fecha_generacion}")
+    started = time.monotonic()
+    logger.debug(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Starting granular (MPPT) data insertion for {len(mppt_energy_dict)} inverters on {fecha_generacion}")
     
     # Log the data being processed for debugging (CRITICAL for granular data issues)
-    try:
-        data_json_str = json.dumps(mppt_energy_dict, ensure_ascii=False, separators=(',', ':'))
-        # Truncate if very large (>3000 chars) to avoid log bloat
-        if len(data_json_str) > 3000:
-            truncated_data = data_json_str[:3000] + "... [TRUNCATED]"
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_granular_dia| MPPT data being processed (TRUNCATED): {truncated_data}")
-        else:
-            logger.info(f"|HuaweiStore|insert_huawei_generacion_granular_dia| MPPT data being processed: {data_json_str}")
-    except Exception as e:
-        logger.warning(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Could not serialize MPPT data for logging: {e}")
-    
-    successful_inserts = 0
+    logger.debug(f"|HuaweiStore|insert_huawei_generacion_granular_dia| MPPT data being processed: %s", LazyJson(mppt_energy_dict, limit=3000))
+    
     skipped_entries = 0
-    created_granulars = 0
+    rows = []
+    
+    # One query for every inverter in the payload instead of one per serial
+    inversores = inversores_por_identificador(mppt_energy_dict.keys())
     
     for serial, mppts in mppt_energy_dict.items():
-        try:
-            inversor = Inversor.objects.get(identificador_inversor=serial)
-        except Inversor.DoesNotExist:
+        inversor = inversores.get(serial)
+        if inversor is None:
             logger.warning(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Inversor with identificador_inversor '{serial}' not found. Entry skipped for date {fecha_generacion}.")
             skipped_entries += 1
             continue
-            
-        proyecto = inversor.id_proyecto
         
         for mppt_key, energia in mppts.items():
             # Extract mppt number from key (e.g., 'mppt_1_cap' -> 1)
@@ -165,33 +140,15 @@ def insert_huawei_generacion_granular_dia(mppt_energy_dict, fecha_generacion):
                 logger.warning(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Could not extract MPPT number from key '{mppt_key}' for inverter {serial}. Skipping.")
                 skipped_entries += 1
                 continue
-                
-            serial_granular = f"{serial}-{mppt_number}"  # e.g., 'NE=35759038-1'
             
-            granular, created_granular = Granular.objects.get_or_create(
-                id_proyecto=proyecto,
-                id_inversor=inversor,
-                serial_granular=serial_granular,
-                defaults={"tipo_granular": "MPPT"}
-            )
-            
-            if created_granular:
-                logger.info(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Created new Granular: {serial_granular} for inverter {serial}")
-                created_granulars += 1
-                
-            obj, created = GeneracionGranularDiaria.objects.update_or_create(
-                id_proyecto=proyecto,
-                id_inversor=inversor,
-                id_granular=granular,
-                fecha_generacion_granular_dia=fecha_generacion,
-                defaults={"energia_generada_granular_dia": energia}
-            )
-            
-            if created:
-                logger.info(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Created new GeneracionGranularDiaria for {serial_granular} on {fecha_generacion}: {energia} kWh")
-            else:
-                logger.info(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Updated GeneracionGranularDiaria for {serial_granular} on {fecha_generacion}: {energia} kWh")
-            
-            successful_inserts += 1
+            # Granular serial becomes e.g. 'NE=35759038-1'
+            rows.append((inversor, mppt_number, fecha_generacion, energia))
+    
+    created, updated, created_granulars = bulk_upsert_generacion_granular(rows, tipo_granular="MPPT", log=logger)
     
-    logger.info(f"|HuaweiStore|insert_huawei_generacion_granular_dia| Completed granular data insertion: {successful_inserts} successful, {skipped_entries} skipped, {created_granulars} new Granular objects created")
+    log_event(
+        logger, 'store_batch', f"|HuaweiStore|insert_huawei_generacion_granular_dia| Completed granular data insertion: {created + updated} successful ({created} created, {updated} updated), {skipped_entries} skipped, {created_granulars} new Granular objects created",
+        vendor='huawei', function='insert_huawei_generacion_granular_dia', entries=len(mppt_energy_dict),
+        created=created, updated=updated, skipped=skipped_entries, new_granulars=created_granulars,
+        duration_ms=round((time.monotonic() - started) * 1000),
+    )
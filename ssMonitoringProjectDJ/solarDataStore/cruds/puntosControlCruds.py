@@ -0,0 +1,76 @@
+# Run checkpoints for collect_all_gen --resume
+from solarData.models import PuntoControlRecoleccion
+from django.db import transaction
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger('management_commands')
+
+# Lote recorded once a whole command has finished for a run
+COMANDO_COMPLETO = '__comando__'
+
+
+class PuntosControl:
+    """
+    Checkpoints of one command inside one collect_all_gen run.
+
+    Commands wrap each batch's inserts in lote(); the inserts and the checkpoint commit in the same
+    transaction, so a resumed run neither loses nor repeats a batch. Without a run id every method
+    is a no-op and batches are only wrapped in a transaction.
+    """
+
+    def __init__(self, run_id, comando):
+        """
+        Args:
+            run_id (int): EjecucionRecoleccion id, or None when the command runs on its own
+            comando (str): Command name (e.g. 'huawei_inverter_gen')
+        """
+        self.run_id = run_id
+        self.comando = comando
+        self._completados = set()
+        if run_id is not None:
+            self._completados = set(
+                PuntoControlRecoleccion.objects.filter(id_ejecucion_id=run_id, comando=comando).values_list('lote', flat=True)
+            )
+            if self._completados:
+                logger.info(f"|PuntosControl|__init__| Run {run_id}: {self.comando} resumes after {len(self._completados)} committed batches")
+
+    def completado(self, lote):
+        """True when the batch was committed by an earlier attempt of this run."""
+        return str(lote) in self._completados
+
+    def completados(self, prefijo=''):
+        """
+        Committed batches whose key starts with prefijo.
+        Returns:
+            list: The keys with prefijo removed
+        """
+        return [lote[len(prefijo):] for lote in self._completados if lote.startswith(prefijo) and lote != COMANDO_COMPLETO]
+
+    @property
+    def comando_completado(self):
+        return COMANDO_COMPLETO in self._completados
+
+    @contextmanager
+    def lote(self, *lotes):
+        """Atomic block for one batch's writes; its checkpoint (one key or several) is committed with them."""
+        with transaction.atomic():
+            yield
+            self.registrar(*lotes)
+
+    def registrar(self, *lotes):
+        """Records committed batches (inside the caller's transaction when there is one)."""
+        if self.run_id is None:
+            return
+        nuevos = [str(lote) for lote in lotes if str(lote) not in self._completados]
+        if not nuevos:
+            return
+        PuntoControlRecoleccion.objects.bulk_create(
+            [PuntoControlRecoleccion(id_ejecucion_id=self.run_id, comando=self.comando, lote=lote) for lote in nuevos],
+            ignore_conflicts=True,
+        )
+        self._completados.update(nuevos)
+
+    def registrar_comando(self):
+        """Marks the whole command as finished for this run."""
+        self.registrar(COMANDO_COMPLETO)
@@ -1,8 +1,13 @@
 # Imports for Solis CRUD operations
 from solarData.models import Proyecto, GeneracionEnergiaDiaria, Inversor, GeneracionInversorDiaria, Granular, GeneracionGranularDiaria
+from solarDataStore.cruds.bulkCruds import (
+    proyectos_por_identificador, inversores_por_identificador,
+    bulk_upsert_generacion_sistema, bulk_upsert_generacion_inversor,
+)
+from solarData.log_pipeline import LazyJson, log_event
 from datetime import datetime, timezone
 import logging
-import json
+import time
 
 logger = logging.getLogger('solis_store')
 
@@ -13,22 +18,17 @@ def insert_solis_generacion_sistema_dia(data):
         data (list): List of dicts as returned by fetch_solis_generacion_sistema_dia
                     Expected format: [{'id': '1298491919449989596', 'collectTime': '2025-06-05', 'PVYield': 17.0}, ...]
     """
-    logger.info(f"|SolisStore|insert_solis_generacion_sistema_dia| Starting system generation data insertion for {len(data)} entries")
+    started = time.monotonic()
+    logger.debug(f"|SolisStore|insert_solis_generacion_sistema_dia| Starting system generation data insertion for {len(data)} entries")
+    
+    # Log the data being processed for debugging (serialized only if DEBUG is enabled)
+    logger.debug(f"|SolisStore|insert_solis_generacion_sistema_dia| Data being processed: %s", LazyJson(data, limit=3000))
     
-    # Log the data being processed for debugging
-    try:
-        data_json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-        # Truncate if very large (>3000 chars) to avoid log bloat
-        if len(data_json_str) > 3000:
-            truncated_data = data_json_str[:3000] + "... [TRUNCATED]"
-            logger.info(f"|SolisStore|insert_solis_generacion_sistema_dia| Data being processed (TRUNCATED): {truncated_data}")
-        else:
-            logger.info(f"|SolisStore|insert_solis_generacion_sistema_dia| Data being processed: {data_json_str}")
-    except Exception as e:
-        logger.warning(f"|SolisStore|insert_solis_generacion_sistema_dia| Could not serialize data for logging: {e}")
-    
-    successful_inserts = 0
     skipped_entries = 0
+    rows = []
+    
+    # One query for every project in the payload instead of one per entry
+    proyectos = proyectos_por_identificador(entry.get('id') for entry in data)
     
     for entry in data:
         station_id = entry.get('id')
@@ -49,28 +49,23 @@ def insert_solis_generacion_sistema_dia(data):
             continue
         
         # Find the project by station ID
-        try:
-            proyecto = Proyecto.objects.get(identificador_planta=station_id)
-        except Proyecto.DoesNotExist:
+        proyecto = proyectos.get(station_id)
+        if proyecto is None:
             logger.warning(f"|SolisStore|insert_solis_generacion_sistema_dia| Proyecto with identificador_planta '{station_id}' not found. Entry skipped for date {date_obj}.")
             skipped_entries += 1
             continue
         
-        # Insert or update the daily generation record
-        obj, created = GeneracionEnergiaDiaria.objects.update_or_create(
-            id_proyecto=proyecto,
-            fecha_generacion_dia=date_obj,
-            defaults={'energia_generada_dia': pvyield}
-        )
-        
-        if created:
-            logger.info(f"|SolisStore|insert_solis_generacion_sistema_dia| Created new GeneracionEnergiaDiaria for project {station_id} on {date_obj}: {pvyield} kWh")
-        else:
-            logger.info(f"|SolisStore|insert_solis_generacion_sistema_dia| Updated GeneracionEnergiaDiaria for project {station_id} on {date_obj}: {pvyield} kWh")
-        
-        successful_inserts += 1
+        rows.append((proyecto, date_obj, pvyield))
+    
+    # Insert or update all daily generation records in one transaction
+    created, updated = bulk_upsert_generacion_sistema(rows, log=logger)
     
-    logger.info(f"|SolisStore|insert_solis_generacion_sistema_dia| Completed system generation data insertion: {successful_inserts} successful, {skipped_entries} skipped")
+    log_event(
+        logger, 'store_batch', f"|SolisStore|insert_solis_generacion_sistema_dia| Completed system generation data insertion: {created + updated} successful ({created} created, {updated} updated), {skipped_entries} skipped",
+        vendor='solis', function='insert_solis_generacion_sistema_dia', entries=len(data),
+        created=created, updated=updated, skipped=skipped_entries,
+        duration_ms=round((time.monotonic() - started) * 1000),
+    )
 
 
 def insert_solis_generacion_inversor_dia(data):
@@ -80,15 +75,10 @@ def insert_solis_generacion_inversor_dia(data):
         data (dict): Dict as returned by fetch_solis_generacion_un_inversor_dia
                     Expected format: {'identificador_inversor': '1308675217948062296', 'collectTime': '18-06-2025', 'PVYield': 22.6}
     """
-    logger.info(f"|SolisStore|insert_solis_generacion_inversor_dia| Starting inverter generation data insertion")
+    logger.debug(f"|SolisStore|insert_solis_generacion_inversor_dia| Starting inverter generation data insertion")
     
-    # Log the data being processed for debugging
-    try:
-        data_json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-        logger.info(f"|SolisStore|insert_solis_generacion_inversor_dia| Data being processed: {data_json_str}")
-    except Exception as e:
-        logger.warning(f"|SolisStore|insert_solis_generacion_inversor_dia| Could not serialize data for logging: {e}")
-        logger.info(f"|SolisStore|insert_solis_generacion_inversor_dia| Data being processed (fallback): {data}")
+    # Log the data being processed for debugging (serialized only if DEBUG is enabled)
+    logger.debug(f"|SolisStore|insert_solis_generacion_inversor_dia| Data being processed: %s", LazyJson(data))
     
     identificador_inversor = data.get('identificador_inversor')
     pvyield = data.get('PVYield')
@@ -106,24 +96,71 @@ def insert_solis_generacion_inversor_dia(data):
         return
     
     # Find the inverter by identificador_inversor
-    try:
-        inversor = Inversor.objects.get(identificador_inversor=identificador_inversor)
-    except Inversor.DoesNotExist:
+    inversor = inversores_por_identificador([identificador_inversor]).get(identificador_inversor)
+    if inversor is None:
         logger.warning(f"|SolisStore|insert_solis_generacion_inversor_dia| Inversor with identificador_inversor '{identificador_inversor}' not found. Entry skipped for date {date_obj}.")
         return
     
     # Insert or update the daily inverter generation record
-    obj, created = GeneracionInversorDiaria.objects.update_or_create(
-        id_proyecto=inversor.id_proyecto,
-        id_inversor=inversor,
-        fecha_generacion_inversor_dia=date_obj,
-        defaults={'energia_generada_inversor_dia': pvyield}
-    )
+    created, _ = bulk_upsert_generacion_inversor([(inversor, date_obj, pvyield)], log=logger)
     
     if created:
-        logger.info(f"|SolisStore|insert_solis_generacion_inversor_dia| Created new GeneracionInversorDiaria for inverter {identificador_inversor} on {date_obj}: {pvyield} kWh")
+        logger.debug(f"|SolisStore|insert_solis_generacion_inversor_dia| Created new GeneracionInversorDiaria for inverter {identificador_inversor} on {date_obj}: {pvyield} kWh")
     else:
-        logger.info(f"|SolisStore|insert_solis_generacion_inversor_dia| Updated GeneracionInversorDiaria for inverter {identificador_inversor} on {date_obj}: {pvyield} kWh")
+        logger.debug(f"|SolisStore|insert_solis_generacion_inversor_dia| Updated GeneracionInversorDiaria for inverter {identificador_inversor} on {date_obj}: {pvyield} kWh")
     
-    logger.info(f"|SolisStore|insert_solis_generacion_inversor_dia| Successfully completed inverter generation data insertion for {identificador_inversor}")
+    logger.debug(f"|SolisStore|insert_solis_generacion_inversor_dia| Successfully completed inverter generation data insertion for {identificador_inversor}")
+
+
 
+def insert_solis_generacion_inversores_dia(data):
+    """
+    Insert or update daily generation data for many Solis inverters with one bulk upsert.
+    Args:
+        data (list): List of dicts as returned by fetch_solis_generacion_un_inversor_dia
+    Returns:
+        tuple: (created, updated, skipped)
+    """
+    started = time.monotonic()
+    logger.debug(f"|SolisStore|insert_solis_generacion_inversores_dia| Starting inverter generation data insertion for {len(data)} entries")
+    
+    skipped_entries = 0
+    rows = []
+    
+    # One query for every inverter in the page
+    inversores = inversores_por_identificador(entry.get('identificador_inversor') for entry in data)
+    
+    for entry in data:
+        identificador_inversor = entry.get('identificador_inversor')
+        collect_time = entry.get('collectTime')
+        
+        if not (identificador_inversor and collect_time):
+            logger.warning(f"|SolisStore|insert_solis_generacion_inversores_dia| Incomplete entry skipped: {entry}")
+            skipped_entries += 1
+            continue
+        
+        # Parse date string (DD-MM-YYYY format) to date object
+        try:
+            date_obj = datetime.strptime(collect_time, '%d-%m-%Y').date()
+        except ValueError as e:
+            logger.warning(f"|SolisStore|insert_solis_generacion_inversores_dia| Invalid date format '{collect_time}' in entry: {entry}. Error: {e}")
+            skipped_entries += 1
+            continue
+        
+        inversor = inversores.get(identificador_inversor)
+        if inversor is None:
+            logger.warning(f"|SolisStore|insert_solis_generacion_inversores_dia| Inversor with identificador_inversor '{identificador_inversor}' not found. Entry skipped for date {date_obj}.")
+            skipped_entries += 1
+            continue
+        
+        rows.append((inversor, date_obj, entry.get('PVYield')))
+    
+    created, updated = bulk_upsert_generacion_inversor(rows, log=logger)
+    
+    log_event(
+        logger, 'store_batch', f"|SolisStore|insert_solis_generacion_inversores_dia| Completed inverter generation data insertion: {created + updated} successful ({created} created, {updated} updated), {skipped_entries} skipped",
+        vendor='solis', function='insert_solis_generacion_inversores_dia', entries=len(data),
+        created=created, updated=updated, skipped=skipped_entries,
+        duration_ms=round((time.monotonic() - started) * 1000),
+    )
+    return created, updated, skipped_entries
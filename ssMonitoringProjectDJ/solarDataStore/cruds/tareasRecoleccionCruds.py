@@ -0,0 +1,216 @@
+# Collection task queue: one task per collection command and date (or per K/N shard of it), leased by collection_worker processes
+from solarData.models import TareaRecoleccion
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Mod
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger('management_commands')
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_EN_CURSO = 'en_curso'
+ESTADO_COMPLETADA = 'completada'
+ESTADO_FALLIDA = 'fallida'
+
+# A task whose worker stopped sending heartbeats for this long is leased again
+DEFAULT_LEASE_TIMEOUT = timedelta(minutes=5)
+# Retry n of a failed task waits RETRY_BACKOFF * 2**(n-1)
+RETRY_BACKOFF = timedelta(minutes=2)
+
+
+def parse_fragmento(valor):
+    """
+    Parse a --shard value.
+    Args:
+        valor (str): 'K/N' with 1 <= K <= N (e.g. '2/4'), or None
+    Returns:
+        tuple: (K, N), or None when valor is empty
+    """
+    if not valor:
+        return None
+    try:
+        k, n = (int(parte) for parte in str(valor).split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{valor}', expected K/N (e.g. 2/4)")
+    if n < 1 or not 1 <= k <= n:
+        raise ValueError(f"Invalid shard '{valor}', K must be between 1 and N")
+    return k, n
+
+
+def filtrar_fragmento(queryset, fragmento, campo='pk'):
+    """
+    Restrict a queryset to one shard: rows whose campo modulo N equals K-1. Primary keys never
+    change, so every worker computes the same split without coordinating.
+    Args:
+        queryset (QuerySet): Proyecto or Inversor queryset
+        fragmento (tuple): (K, N) from parse_fragmento, or None for no sharding
+        campo (str): Integer field to split on ('id_proyecto_id' keeps a station's inverters together)
+    """
+    if not fragmento or fragmento[1] == 1:
+        return queryset
+    k, n = fragmento
+    return queryset.annotate(_fragmento=Mod(campo, n)).filter(_fragmento=k - 1)
+
+
+def _num_fragmentos(fragmento):
+    """Shard count of a stored task: 'K/N' -> N, '' -> 1."""
+    return int(fragmento.split('/')[1]) if fragmento else 1
+
+
+def encolar_tareas(fecha, comandos, opciones=None, reencolar=False):
+    """
+    Create the collection tasks of one date. Existing tasks are kept (enqueueing is idempotent);
+    with reencolar, finished or failed ones are set back to pending. A command already queued for
+    the date with a different shard count has its tasks replaced while none is running or (without
+    reencolar) done; otherwise the new split would overlap the old one, so it is rejected.
+    Args:
+        fecha (date): Date to collect
+        comandos (list): [(comando, fragmentos), ...]; fragmentos > 1 splits the command in K/N shards
+        opciones (dict): Extra call_command options for every task (e.g. {'only_missing': True})
+        reencolar (bool): Reset existing tasks of these commands and date
+    Returns:
+        int: Number of tasks offered to the queue
+    Raises:
+        ValueError: A command has tasks for the date with a different shard count that cannot be replaced
+    """
+    ahora = timezone.now()
+    tareas = []
+    reemplazables = {ESTADO_PENDIENTE, ESTADO_COMPLETADA, ESTADO_FALLIDA} if reencolar else {ESTADO_PENDIENTE}
+    with transaction.atomic():
+        for comando, fragmentos in comandos:
+            existentes = dict(
+                TareaRecoleccion.objects.select_for_update()
+                .filter(comando=comando, fecha=fecha).values_list('fragmento', 'estado')
+            )
+            if any(_num_fragmentos(fragmento) != fragmentos for fragmento in existentes):
+                if not set(existentes.values()) <= reemplazables:
+                    raise ValueError(
+                        f"{comando} for {fecha} is already queued as {sorted(existentes)} and some of "
+                        f"those tasks are running or done; enqueue it with the same shard count"
+                    )
+                TareaRecoleccion.objects.filter(comando=comando, fecha=fecha).delete()
+                logger.info(f"|TareasRecoleccion|encolar_tareas| {len(existentes)} {comando} tasks for {fecha} replaced by {fragmentos} shards")
+            for k in range(1, fragmentos + 1):
+                tareas.append(TareaRecoleccion(
+                    comando=comando, fecha=fecha, fragmento=f'{k}/{fragmentos}' if fragmentos > 1 else '',
+                    opciones=opciones or {}, disponible_desde=ahora,
+                ))
+        TareaRecoleccion.objects.bulk_create(tareas, ignore_conflicts=True)
+        if reencolar:
+            reiniciadas = TareaRecoleccion.objects.filter(
+                fecha=fecha, comando__in=[comando for comando, _ in comandos],
+                estado__in=[ESTADO_COMPLETADA, ESTADO_FALLIDA],
+            ).update(estado=ESTADO_PENDIENTE, intentos=0, disponible_desde=ahora, ultimo_error="", fecha_fin=None)
+            logger.info(f"|TareasRecoleccion|encolar_tareas| {reiniciadas} finished tasks for {fecha} set back to pending")
+    logger.info(f"|TareasRecoleccion|encolar_tareas| {len(tareas)} tasks offered for {fecha}")
+    return len(tareas)
+
+
+def tomar_tarea(trabajador, lease_timeout=DEFAULT_LEASE_TIMEOUT):
+    """
+    Lease the next available task with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+    never receive the same task. Tasks whose worker stopped sending heartbeats are leased again
+    and the lost run counts as a failed attempt.
+    Args:
+        trabajador (str): Worker identity (host:pid)
+        lease_timeout (timedelta): Heartbeat age after which an in-progress task is considered abandoned
+    Returns:
+        TareaRecoleccion: The leased task, or None when nothing is available
+    """
+    while True:
+        ahora = timezone.now()
+        with transaction.atomic():
+            tarea = (
+                TareaRecoleccion.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(estado=ESTADO_PENDIENTE, disponible_desde__lte=ahora)
+                    | Q(estado=ESTADO_EN_CURSO, ultimo_latido__lt=ahora - lease_timeout)
+                )
+                .order_by('disponible_desde', 'id')
+                .first()
+            )
+            if tarea is None:
+                return None
+            if tarea.estado == ESTADO_EN_CURSO:
+                logger.warning(f"|TareasRecoleccion|tomar_tarea| Task {tarea.id} abandoned by {tarea.trabajador} (last heartbeat {tarea.ultimo_latido}), leasing it again")
+                tarea.intentos += 1
+                tarea.ultimo_error = f'Worker {tarea.trabajador} stopped sending heartbeats'
+                if tarea.intentos >= tarea.max_intentos:
+                    tarea.estado = ESTADO_FALLIDA
+                    tarea.fecha_fin = ahora
+                    tarea.save(update_fields=['estado', 'intentos', 'ultimo_error', 'fecha_fin'])
+                    continue
+            tarea.estado = ESTADO_EN_CURSO
+            tarea.trabajador = trabajador
+            tarea.ultimo_latido = ahora
+            tarea.save(update_fields=['estado', 'intentos', 'ultimo_error', 'trabajador', 'ultimo_latido'])
+            return tarea
+
+
+def latido(tarea_id, trabajador):
+    """
+    Refresh the lease of a running task.
+    Returns:
+        bool: False when the lease was lost (the task was taken over by another worker)
+    """
+    return TareaRecoleccion.objects.filter(
+        id=tarea_id, trabajador=trabajador, estado=ESTADO_EN_CURSO
+    ).update(ultimo_latido=timezone.now()) == 1
+
+
+def _arrendada(tarea):
+    """The task row, only while tarea's worker still holds its lease."""
+    return TareaRecoleccion.objects.filter(id=tarea.id, trabajador=tarea.trabajador, estado=ESTADO_EN_CURSO)
+
+
+def completar_tarea(tarea):
+    """
+    Mark a leased task as done.
+    Returns:
+        bool: False when the lease was lost (the task belongs to another worker and is left as is)
+    """
+    tarea.estado = ESTADO_COMPLETADA
+    tarea.fecha_fin = timezone.now()
+    tarea.ultimo_error = ""
+    if not _arrendada(tarea).update(estado=tarea.estado, fecha_fin=tarea.fecha_fin, ultimo_error=tarea.ultimo_error):
+        logger.warning(f"|TareasRecoleccion|completar_tarea| Lease of task {tarea.id} lost by {tarea.trabajador}, not marked as done")
+        return False
+    return True
+
+
+def fallar_tarea(tarea, error):
+    """
+    Record a failed attempt: the task is retried later with exponential backoff, or marked
+    failed after max_intentos attempts.
+    Returns:
+        bool: True when the task will be retried, None when the lease was lost (nothing recorded)
+    """
+    ahora = timezone.now()
+    tarea.intentos += 1
+    tarea.ultimo_error = str(error)[:2000]
+    reintentar = tarea.intentos < tarea.max_intentos
+    if reintentar:
+        tarea.estado = ESTADO_PENDIENTE
+        tarea.disponible_desde = ahora + RETRY_BACKOFF * (2 ** (tarea.intentos - 1))
+    else:
+        tarea.estado = ESTADO_FALLIDA
+        tarea.fecha_fin = ahora
+    if not _arrendada(tarea).update(
+        estado=tarea.estado, intentos=tarea.intentos, ultimo_error=tarea.ultimo_error,
+        disponible_desde=tarea.disponible_desde, fecha_fin=tarea.fecha_fin,
+    ):
+        logger.warning(f"|TareasRecoleccion|fallar_tarea| Lease of task {tarea.id} lost by {tarea.trabajador}, failure not recorded")
+        return None
+    return reintentar
+
+
+def liberar_tarea(tarea):
+    """
+    Give a leased task back without counting an attempt (worker shutting down).
+    Returns:
+        bool: False when the lease was already lost
+    """
+    tarea.estado = ESTADO_PENDIENTE
+    return _arrendada(tarea).update(estado=ESTADO_PENDIENTE, trabajador="") == 1
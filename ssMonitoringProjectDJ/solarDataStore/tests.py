@@ -1,3 +1,117 @@
+"""
+Collection task queue (tareasRecoleccionCruds): leasing, lease takeover and retry backoff.
+Re-collection queue (colaRecoleccionCruds): finished entries without data again are queued anew.
+Run checkpoints (puntosControlCruds): a batch's writes and its checkpoint commit or roll back together.
+    DB_ENGINE=sqlite python manage.py test solarDataStore
+"""
+
+from datetime import date, timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from solarData.models import ColaRecoleccion, EjecucionRecoleccion, MarcasInversores, PuntoControlRecoleccion, TareaRecoleccion
+from solarDataStore.cruds import colaRecoleccionCruds as cola
+from solarDataStore.cruds.puntosControlCruds import PuntosControl
+from solarDataStore.cruds.tareasRecoleccionCruds import (
+    ESTADO_COMPLETADA, ESTADO_EN_CURSO, ESTADO_FALLIDA, ESTADO_PENDIENTE, RETRY_BACKOFF,
+    completar_tarea, encolar_tareas, fallar_tarea, latido, tomar_tarea,
+)
+
+
+class TareasRecoleccionTests(TestCase):
+
+    def setUp(self):
+        encolar_tareas(date(2025, 1, 1), [('huawei_system_gen', 1)])
+
+    def test_task_is_leased_once(self):
+        tarea = tomar_tarea('host:1')
+        self.assertEqual((tarea.estado, tarea.trabajador), (ESTADO_EN_CURSO, 'host:1'))
+        self.assertIsNone(tomar_tarea('host:2'))
+        self.assertTrue(completar_tarea(tarea))
+        self.assertEqual(TareaRecoleccion.objects.get().estado, ESTADO_COMPLETADA)
+
+    def test_abandoned_task_is_taken_over(self):
+        tarea = tomar_tarea('host:1')
+        TareaRecoleccion.objects.update(ultimo_latido=timezone.now() - timedelta(minutes=10))
+
+        nueva = tomar_tarea('host:2', lease_timeout=timedelta(minutes=5))
+        self.assertEqual((nueva.id, nueva.trabajador, nueva.intentos), (tarea.id, 'host:2', 1))
+        # The first worker's heartbeat and outcome no longer touch the task
+        self.assertFalse(latido(tarea.id, 'host:1'))
+        self.assertFalse(completar_tarea(tarea))
+        self.assertIsNone(fallar_tarea(tarea, 'late failure'))
+        actual = TareaRecoleccion.objects.get()
+        self.assertEqual((actual.estado, actual.trabajador, actual.intentos), (ESTADO_EN_CURSO, 'host:2', 1))
+
+    def test_failed_task_backs_off_then_gives_up(self):
+        for intento in range(1, 3):
+            tarea = tomar_tarea('host:1')
+            antes = timezone.now()
+            self.assertTrue(fallar_tarea(tarea, RuntimeError('vendor down')))
+            actual = TareaRecoleccion.objects.get()
+            self.assertEqual((actual.estado, actual.intentos), (ESTADO_PENDIENTE, intento))
+            self.assertGreaterEqual(actual.disponible_desde, antes + RETRY_BACKOFF * 2 ** (intento - 1))
+            self.assertIsNone(tomar_tarea('host:1'))
+            TareaRecoleccion.objects.update(disponible_desde=antes)
+
+        tarea = tomar_tarea('host:1')
+        self.assertFalse(fallar_tarea(tarea, RuntimeError('vendor down')))
+        self.assertEqual(TareaRecoleccion.objects.get().estado, ESTADO_FALLIDA)
+
+    def test_new_shard_count_never_overlaps_the_old_split(self):
+        encolar_tareas(date(2025, 1, 1), [('huawei_system_gen', 3)])
+        fragmentos = TareaRecoleccion.objects.values_list('fragmento', flat=True)
+        self.assertEqual(sorted(fragmentos), ['1/3', '2/3', '3/3'])
+
+        tomar_tarea('host:1')
+        with self.assertRaises(ValueError):
+            encolar_tareas(date(2025, 1, 1), [('huawei_system_gen', 2)])
+        self.assertEqual(sorted(fragmentos), ['1/3', '2/3', '3/3'])
+
+
+class ColaRecoleccionTests(TestCase):
+
+    def test_finished_entries_are_queued_anew(self):
+        marca = MarcasInversores.objects.create(marca='Huawei')
+        hoy = timezone.localdate()
+        cola.encolar('sistema', [(marca.id, 'NE=1', hoy), (marca.id, 'NE=2', hoy), (marca.id, 'NE=3', hoy)])
+        ColaRecoleccion.objects.filter(identificador='NE=1').update(estado=cola.ESTADO_RESUELTO, intentos=1)
+        ColaRecoleccion.objects.filter(identificador='NE=2').update(estado=cola.ESTADO_AGOTADO, intentos=cola.MAX_INTENTOS)
+        ColaRecoleccion.objects.filter(identificador='NE=3').update(intentos=2)
+
+        cola.encolar('sistema', [(marca.id, 'NE=1', hoy), (marca.id, 'NE=2', hoy), (marca.id, 'NE=3', hoy)])
+        self.assertEqual(
+            dict(ColaRecoleccion.objects.values_list('identificador', 'intentos')),
+            {'NE=1': 0, 'NE=2': 0, 'NE=3': 2},
+        )
+        self.assertEqual(set(ColaRecoleccion.objects.values_list('estado', flat=True)), {cola.ESTADO_PENDIENTE})
+
+
+class PuntosControlTests(TestCase):
+
+    def setUp(self):
+        self.run_id = EjecucionRecoleccion.objects.create(fecha=date(2025, 1, 1)).id
+
+    def test_batch_and_checkpoint_commit_together(self):
+        puntos = PuntosControl(self.run_id, 'huawei_inverter_gen')
+        with puntos.lote('1:1'):
+            MarcasInversores.objects.create(marca='Huawei')
+        with self.assertRaises(RuntimeError):
+            with puntos.lote('1:2'):
+                MarcasInversores.objects.create(marca='Solis')
+                raise RuntimeError('store failed')
+
+        # The failed batch left neither rows nor a checkpoint, so a resumed run repeats only it
+        self.assertEqual(list(MarcasInversores.objects.values_list('marca', flat=True)), ['Huawei'])
+        reanudado = PuntosControl(self.run_id, 'huawei_inverter_gen')
+        self.assertTrue(reanudado.completado('1:1'))
+        self.assertFalse(reanudado.completado('1:2'))
+        self.assertEqual(reanudado.completados('1:'), ['1'])
 
-# Create your tests here.
+    def test_without_run_id_nothing_is_recorded(self):
+        puntos = PuntosControl(None, 'huawei_inverter_gen')
+        with puntos.lote('1:1'):
+            pass
+        self.assertFalse(puntos.completado('1:1'))
+        self.assertFalse(PuntoControlRecoleccion.objects.exists())
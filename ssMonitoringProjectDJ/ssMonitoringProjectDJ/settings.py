@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -21,6 +23,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Load .env file from the project root (one level up from Django project)
 load_dotenv(BASE_DIR.parent / '.env')
 
+# Log files, metrics and benchmark results (not tracked by git). `manage.py test` writes them to a
+# temporary directory, shared with the interpreters the tests start, so test runs leave logs/ alone
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+if TESTING and not os.environ.get('LOG_DIR'):
+    os.environ['LOG_DIR'] = tempfile.mkdtemp(prefix='ssmonitoring-test-')
+LOG_DIR = Path(os.environ.get('LOG_DIR') or BASE_DIR.parent / 'logs')
+LOG_DIR.mkdir(parents=True, exist_ok=True)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -98,6 +108,17 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite runs against a local SQLite file instead (tests and benchmarks without Postgres)
+if os.environ.get('DB_ENGINE', '').lower() == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
+    }
+
+
+# Builds the test database from the migrations, seeding the data production got by hand (solarData/test_runner.py)
+TEST_RUNNER = 'solarData.test_runner.SolarTestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,6 +172,42 @@ REST_FRAMEWORK = {
 
 # Django Logging Configuration for CloudWatch
 # This sets up organized logging that writes to separate files for each fetcher
+# Loggers write through one queue to a single listener thread (solarData/log_pipeline.py), so
+# file, console and email I/O never block collection. LOG_QUEUE_ENABLED=false logs synchronously.
+LOGGING_CONFIG = 'solarData.log_pipeline.configure_logging'
+LOG_QUEUE_ENABLED = os.environ.get('LOG_QUEUE_ENABLED', 'true').lower() == 'true'
+
+# Per-logger sampling of DEBUG/INFO records, e.g. LOG_SAMPLING="huawei_fetcher=0.1,solis_store=0.25"
+# keeps 1 in 10 and 1 in 4 records; warnings and errors are always kept
+LOG_SAMPLING = {
+    name.strip(): float(rate)
+    for name, _, rate in (item.partition('=') for item in os.environ.get('LOG_SAMPLING', '').split(',') if '=' in item)
+}
+
+# LOG_FORMAT=json writes the log files (shipped to CloudWatch) as one JSON object per line, with
+# the counts and durations of the per-batch events as queryable fields; the console stays text
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+
+# Per-stage timings and counters of each collect_all_gen run (solarData/pipeline_metrics.py).
+# A '.prom' path is rewritten in the Prometheus text format (node_exporter textfile collector);
+# any other path gets one JSON line per run (shipped by the CloudWatch agent). Empty disables the export.
+PIPELINE_METRICS_FILE = os.environ.get('PIPELINE_METRICS_FILE', str(LOG_DIR / 'pipeline_metrics.json'))
+
+# Wall time per SolarDataQuery / SolarDataAnalysis method measured by the solarDataReports query
+# budget tests, kept to compare later runs against (empty disables it)
+REPORTS_BASELINE_FILE = os.environ.get('REPORTS_BASELINE_FILE', str(LOG_DIR / 'reports_baseline.json'))
+
+# End-to-end collection throughput measured by benchmark_collection against the local vendor
+# stand-ins, one JSON line per run (empty disables it)
+COLLECTION_BENCHMARK_FILE = os.environ.get('COLLECTION_BENCHMARK_FILE', str(LOG_DIR / 'collection_benchmark.json'))
+
+# Startup time of the management commands (--help and a no-op run) measured by benchmark_startup,
+# one JSON line per run (empty disables it)
+STARTUP_BENCHMARK_FILE = os.environ.get('STARTUP_BENCHMARK_FILE', str(LOG_DIR / 'startup_benchmark.json'))
+
+# Where --profile writes the stats and flame graph files of the management commands (solarData/profiling.py)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(LOG_DIR / 'profiles'))
+
 LOGGING = {
     # Always use version 1 for Django logging configuration
     'version': 1,
@@ -175,6 +232,10 @@ LOGGING = {
             'format': '{asctime} {levelname} solarDataReports.{name} {message}',
             'style': '{',
         },
+        'json_format': {
+            # Format: {"time":"2025-01-15T10:30:15.123","level":"INFO","logger":"huawei_store","message":"...","event":"store_batch","created":42,...}
+            '()': 'solarData.log_pipeline.JsonFormatter',
+        },
     },
     
     # HANDLERS: Define where logs should go
@@ -183,7 +244,7 @@ LOGGING = {
         'huawei_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'huawei_fetcher.log',
+            'filename': LOG_DIR / 'huawei_fetcher.log',
             'formatter': 'fetcher_format',
         },
         
@@ -191,7 +252,7 @@ LOGGING = {
         'solis_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'solis_fetcher.log',
+            'filename': LOG_DIR / 'solis_fetcher.log',
             'formatter': 'fetcher_format',
         },
         
@@ -199,7 +260,7 @@ LOGGING = {
         'huawei_store_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'huawei_store.log',
+            'filename': LOG_DIR / 'huawei_store.log',
             'formatter': 'fetcher_format',
         },
         
@@ -207,7 +268,7 @@ LOGGING = {
         'solis_store_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'solis_store.log',
+            'filename': LOG_DIR / 'solis_store.log',
             'formatter': 'fetcher_format',
         },
         
@@ -215,7 +276,7 @@ LOGGING = {
         'hoymiles_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'hoymiles_fetcher.log',
+            'filename': LOG_DIR / 'hoymiles_fetcher.log',
             'formatter': 'fetcher_format',
         },
         
@@ -223,7 +284,7 @@ LOGGING = {
         'hoymiles_store_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'hoymiles_store.log',
+            'filename': LOG_DIR / 'hoymiles_store.log',
             'formatter': 'fetcher_format',
         },
         
@@ -231,7 +292,7 @@ LOGGING = {
         'hoymiles_newsystem_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'hoymiles_newsystem.log',
+            'filename': LOG_DIR / 'hoymiles_newsystem.log',
             'formatter': 'fetcher_format',
         },
         
@@ -239,7 +300,7 @@ LOGGING = {
         'huawei_newsystem_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'huawei_newsystem.log',
+            'filename': LOG_DIR / 'huawei_newsystem.log',
             'formatter': 'fetcher_format',
         },
         
@@ -247,7 +308,7 @@ LOGGING = {
         'solis_newsystem_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'solis_newsystem.log',
+            'filename': LOG_DIR / 'solis_newsystem.log',
             'formatter': 'fetcher_format',
         },
         
@@ -255,7 +316,7 @@ LOGGING = {
         'django_general_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'django_general.log',
+            'filename': LOG_DIR / 'django_general.log',
             'formatter': 'general_format',
         },
         
@@ -263,7 +324,7 @@ LOGGING = {
         'commands_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'management_commands.log',
+            'filename': LOG_DIR / 'management_commands.log',
             'formatter': 'general_format',
         },
         
@@ -275,17 +336,21 @@ LOGGING = {
         },
         
         # EMAIL ALERT HANDLER: Sends emails for ERROR and CRITICAL logs
+        # Alerts are sent from a background thread as digests: repeated errors within digest_window
+        # seconds are grouped into one email, and at most max_emails_per_hour emails are sent
         'email_alert': {
             'level': 'ERROR',
             'class': 'solarData.email_handler.EmailAlertHandler',
             'formatter': 'general_format',
+            'digest_window': int(os.environ.get('ALERT_DIGEST_WINDOW', '300')),
+            'max_emails_per_hour': int(os.environ.get('ALERT_MAX_EMAILS_PER_HOUR', '6')),
         },
 
         # ANALYSIS ENGINE HANDLER: Logs for analysis engine operations
         'analysis_engine_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'analysis_engine.log',
+            'filename': LOG_DIR / 'analysis_engine.log',
             'formatter': 'analysis_format',
         },
 
@@ -293,7 +358,7 @@ LOGGING = {
         'query_engine_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'query_engine.log',
+            'filename': LOG_DIR / 'query_engine.log',
             'formatter': 'analysis_format',
         },
 
@@ -301,7 +366,7 @@ LOGGING = {
         'email_sender_engine_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'email_sender_engine.log',
+            'filename': LOG_DIR / 'email_sender_engine.log',
             'formatter': 'analysis_format',
         },
 
@@ -309,7 +374,7 @@ LOGGING = {
         'pdf_generator_engine_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'pdf_generator_engine.log',
+            'filename': LOG_DIR / 'pdf_generator_engine.log',
             'formatter': 'analysis_format',
         },
 
@@ -317,7 +382,7 @@ LOGGING = {
         'report_engine_file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR.parent / 'logs' / 'report_engine.log',
+            'filename': LOG_DIR / 'report_engine.log',
             'formatter': 'analysis_format',
         },
     },
@@ -438,6 +503,11 @@ LOGGING = {
     },
 }
 
+if LOG_FORMAT == 'json':
+    for _handler in LOGGING['handlers'].values():
+        if _handler['class'] == 'logging.FileHandler':
+            _handler['formatter'] = 'json_format'
+
 # LOGGING LEVELS (from lowest to highest priority):
 # DEBUG    - Detailed diagnostic info (usually only when diagnosing problems)
 # INFO     - General information about program execution
@@ -460,6 +530,10 @@ CRONJOBS = [
     # Format: minute hour day month day_of_week
     ('0 8 * * *', 'django.core.management.call_command', ['collect_all_gen', '--skip-errors']),
     
+    # Re-fetch readings stored as NULL at 3 AM, hourly from 1:00 PM to 6:00 PM Colombian time (18:00-23:00 UTC)
+    # Each entry follows its own exponential backoff, so most hours only touch a few entities
+    ('0 18-23 * * *', 'django.core.management.call_command', ['drain_recollection_queue']),
+    
     # Run daily report at 8:00 AM Colombian time (13:00 UTC = 8:00 AM COT)
     ('0 13 * * *', 'django.core.management.call_command', ['generate_daily_report']),
     
@@ -478,6 +552,32 @@ CRONTAB_COMMAND_PREFIX = 'cd /opt/solar-monitoring/ssMonitoringProjectDJ && sour
 # Optional: Prevent multiple instances from running
 CRONTAB_LOCK_JOBS = True
 
+# Raw vendor payload archive (used by the --replay option of the *_gen commands)
+# When set, every successful Huawei/Solis/Hoymiles API response is stored under this directory
+# so history can be rebuilt later without calling the vendor APIs again.
+PAYLOAD_ARCHIVE_DIR = os.environ.get('PAYLOAD_ARCHIVE_DIR', '')
+
+# Per-vendor circuit breaker (solarDataFetch/fetchers/circuitBreaker.py)
+# After failure_threshold consecutive timeouts/connection errors/5xx a vendor's requests fail fast;
+# a probe request is let through every reset_timeout seconds.
+VENDOR_CIRCUIT_BREAKER = {
+    'failure_threshold': int(os.environ.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '5')),
+    'reset_timeout': int(os.environ.get('CIRCUIT_BREAKER_RESET_TIMEOUT', '300')),
+}
+
+# Vendor API base URLs, read by each fetcher when it is created. Only pointed elsewhere to run the
+# collectors against the local stand-in servers (solarDataFetch/mockServers.py, benchmark_collection).
+VENDOR_API_BASE_URLS = {
+    'huawei': os.environ.get('HUAWEI_API_BASE_URL', 'https://la5.fusionsolar.huawei.com/thirdData/'),
+    'solis': os.environ.get('SOLIS_API_BASE_URL', 'https://www.soliscloud.com:13333'),
+    'hoymiles': os.environ.get('HOYMILES_API_BASE_URL', 'https://wapi.hoymiles.com'),
+}
+
+# Length in seconds of the vendors' rate-limit window: pause after a Huawei 407, pause after a Hoymiles
+# "More than times of calls per minute" (plus one second) and the Hoymiles per-minute budget window.
+# The real APIs count per minute; the stand-in servers can use a shorter window to keep benchmarks short.
+VENDOR_RATE_LIMIT_WINDOW = float(os.environ.get('VENDOR_RATE_LIMIT_WINDOW', '60'))
+
 # Email Configuration (Gmail or AWS SES)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 